@@ -1,46 +1,92 @@
-# aler.py
-import requests
-from requests.auth import HTTPBasicAuth
-import time
-
-API_URL = "http://192.168.2.50:5554/ExecutarComando"
-API_USER = "moni"
-API_PASS = "moni"
-auth = HTTPBasicAuth(API_USER, API_PASS)
-
-
-def enviar_alerta(camera_info, condominio_nome):
-    """
-    Envia alerta para a API Moni.
-    camera_info: dict com os campos necessários (cliente, particao, empresa, ocorrencia, codigomaquina, codigoconjuntodeocorrencias, identificacao, setor, complemento, nome)
-    condominio_nome: str, nome do condomínio
-    """
-    payload = {
-        "comando": (
-            "INSERT INTO EventosNaoProcessados(DataHora, Cliente, Particao, Empresa, Ocorrencia, Identificacao, Codigomaquina, "
-            "CodigoConjuntoOcorrencias, Setor, Complemento) "
-            f"VALUES (CURRENT_TIMESTAMP, '{camera_info['cliente']}', '{camera_info['particao']}', {camera_info['empresa']}, "
-            f"'{camera_info['ocorrencia']}', '{camera_info['identificacao']}', {camera_info['codigomaquina']}, {camera_info['codigoconjuntodeocorrencias']}, "
-            f"{camera_info['setor']}, '{camera_info['complemento']} - {time.strftime('%H:%M:%S')}')"
-        )
-    }
-
-    try:
-        print(
-            f"\n📤 Enviando alerta - {condominio_nome}/{camera_info.get('nome', 'SemNome')}"
-        )
-        response = requests.post(
-            API_URL,
-            json=payload,
-            headers={"Content-Type": "application/json; charset=UTF-8"},
-            auth=auth,
-            timeout=5,
-        )
-        response.raise_for_status()
-        print(f"✅ Alerta enviado com sucesso - Status: {response.status_code}")
-        return True
-    except Exception as e:
-        print(
-            f"❌ Erro ao enviar alerta - {condominio_nome}/{camera_info.get('nome', 'SemNome')}: {e}"
-        )
-        return False
+# aler.py
+import requests
+from requests.auth import HTTPBasicAuth
+import time
+
+from app.utils.logger import get_logger
+from app.utils.metrics import registro
+
+logger = get_logger(__name__)
+
+API_URL = "http://192.168.2.50:5554/ExecutarComando"
+API_USER = "moni"
+API_PASS = "moni"
+auth = HTTPBasicAuth(API_USER, API_PASS)
+
+ENVIO_DURACAO = registro.histograma(
+    "alertas_envio_duracao_segundos",
+    "Duração das chamadas ExecutarComando à API Moni",
+    ("resultado",),
+)
+
+COLUNAS_EVENTO = (
+    "DataHora, Cliente, Particao, Empresa, Ocorrencia, Identificacao, Codigomaquina, "
+    "CodigoConjuntoOcorrencias, Setor, Complemento"
+)
+
+
+def montar_valores(camera_info, horario=None):
+    """
+    Monta a tupla VALUES de um evento para EventosNaoProcessados
+    horario: str HH:MM:SS anexado ao complemento (padrão: horário atual)
+    """
+    horario = horario or time.strftime("%H:%M:%S")
+    return (
+        f"(CURRENT_TIMESTAMP, '{camera_info['cliente']}', '{camera_info['particao']}', {camera_info['empresa']}, "
+        f"'{camera_info['ocorrencia']}', '{camera_info['identificacao']}', {camera_info['codigomaquina']}, {camera_info['codigoconjuntodeocorrencias']}, "
+        f"{camera_info['setor']}, '{camera_info['complemento']} - {horario}')"
+    )
+
+
+def montar_comando(valores):
+    """
+    Monta um único INSERT com uma ou mais tuplas VALUES
+    valores: list[str] retornada por montar_valores
+    """
+    return f"INSERT INTO EventosNaoProcessados({COLUNAS_EVENTO}) VALUES {', '.join(valores)}"
+
+
+def enviar_comando(comando, session=None, timeout=5):
+    """
+    Executa um comando na API Moni (levanta exceção em caso de falha)
+    session: requests.Session reutilizável (padrão: nova conexão por chamada)
+    """
+    cliente = session or requests
+    inicio = time.perf_counter()
+    resultado = "erro"
+    try:
+        response = cliente.post(
+            API_URL,
+            json={"comando": comando},
+            headers={"Content-Type": "application/json; charset=UTF-8"},
+            auth=auth,
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        resultado = "ok"
+        return response
+    finally:
+        ENVIO_DURACAO.observar(time.perf_counter() - inicio, resultado=resultado)
+
+
+def enviar_alerta(camera_info, condominio_nome):
+    """
+    Envia alerta para a API Moni.
+    camera_info: dict com os campos necessários (cliente, particao, empresa, ocorrencia, codigomaquina, codigoconjuntodeocorrencias, identificacao, setor, complemento, nome)
+    condominio_nome: str, nome do condomínio
+    """
+    try:
+        logger.info(
+            "Enviando alerta - %s/%s", condominio_nome, camera_info.get("nome", "SemNome")
+        )
+        response = enviar_comando(montar_comando([montar_valores(camera_info)]))
+        logger.info("Alerta enviado com sucesso - Status: %s", response.status_code)
+        return True
+    except Exception as e:
+        logger.error(
+            "Erro ao enviar alerta - %s/%s: %s",
+            condominio_nome,
+            camera_info.get("nome", "SemNome"),
+            e,
+        )
+        return False
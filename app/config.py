@@ -1,64 +1,207 @@
-"""
-Configurações globais do sistema de monitoramento de câmeras
-"""
-
-import os
-
-
-# Configurações da aplicação Flask
-class Config:
-    SECRET_KEY = "chave-super-secreta"  # Troque por algo seguro em produção
-    PERMANENT_SESSION_LIFETIME = 30  # minutos
-
-    # Configurações de autenticação
-    USUARIO = "admin"
-    SENHA = "1234"
-
-    # Configurações do servidor
-    HOST = "0.0.0.0"
-    PORT = 8081
-    DEBUG = False
-
-    # Configurações de verificação de câmeras
-    TIMEOUT_VERIFICACAO = 12  # segundos
-    TENTATIVAS_VERIFICACAO = 3
-    INTERVALO_VERIFICACAO = 600  # segundos
-
-    # Configurações de workers para escalabilidade
-    MAX_WORKERS_CAMERAS = 10  # Processa até 10 câmeras simultaneamente
-    MAX_WORKERS_CONDOMINIOS = 8  # Processa até 8 condomínios simultaneamente
-    DELAY_ENTRE_CAMERAS = 0.1  # segundos - delay entre submissões de câmeras
-    
-    # Configurações de retry e resiliência
-    TENTATIVAS_RETRY = 2  # Tentativas adicionais em caso de falha
-    RETRY_BACKOFF = 1  # segundos - delay entre retries
-    
-    # Configurações de pool de conexões HTTP
-    USE_CONNECTION_POOL = True  # Habilita pool de conexões reutilizáveis
-    CONNECTION_POOL_SIZE = 50  # Máximo de conexões no pool
-    CONNECTION_POOL_MAXSIZE = 50  # Conexões por host
-
-    # Configurações de cache
-    CACHE_DURATION = 30  # segundos
-    CACHE_DURATION_OFFLINE = 120  # segundos
-
-    # Configurações de protocolo
-    DEFAULT_PROTOCOL = "hikvision"  # Protocolo padrão se não especificado no DVR
-    
-    # Configurações específicas do Intelbras (CGI/Dahua)
-    INTELBRAS_MIN_IMAGE_SIZE = 1024  # bytes - tamanho mínimo para considerar imagem válida
-    INTELBRAS_TRACK_IMAGE_SIZE = True  # Rastreia mudanças no Content-Length entre capturas
-
-    # Configurações de API
-    API_URL = "http://192.168.2.50:55554/"
-    # "http://192.168.2.50:5554/ExecutarComando"
-    API_USERNAME = "moni"
-    # API_PASSWORD = "moni"
-    API_PASSWORD = "senha"
-
-    # Caminhos dos arquivos (BASE_DIR = raiz do projeto)
-    BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    APP_DIR = os.path.join(BASE_DIR, "app")
-    WEB_DIR = os.path.join(BASE_DIR, "web")
-    TEMPLATES_DIR = os.path.join(WEB_DIR, "templates")
-    STATIC_DIR = os.path.join(WEB_DIR, "static")
+"""
+Configurações globais do sistema de monitoramento de câmeras
+"""
+
+import os
+
+
+# Configurações da aplicação Flask
+class Config:
+    SECRET_KEY = "chave-super-secreta"  # Troque por algo seguro em produção
+    PERMANENT_SESSION_LIFETIME = 30  # minutos
+
+    # Configurações de autenticação
+    USUARIO = "admin"
+    SENHA = "1234"
+
+    # Configurações do servidor
+    HOST = "0.0.0.0"
+    PORT = 8081
+    DEBUG = False
+
+    # Configurações de verificação de câmeras
+    TIMEOUT_VERIFICACAO = 12  # segundos
+    TENTATIVAS_VERIFICACAO = 3
+    INTERVALO_VERIFICACAO = 600  # segundos
+
+    # Configurações de workers para escalabilidade
+    MAX_WORKERS_CAMERAS = 10  # Processa até 10 câmeras simultaneamente
+    MAX_WORKERS_CONDOMINIOS = 8  # Processa até 8 condomínios simultaneamente
+    DELAY_ENTRE_CAMERAS = 0.1  # segundos - delay entre submissões de câmeras
+
+    # Motor de verificação assíncrono (asyncio) - substitui os pools de threads
+    USE_ASYNC_ENGINE = True  # False volta ao modo ThreadPoolExecutor aninhado
+    MAX_CONCORRENCIA_GLOBAL = 500  # Requisições simultâneas em toda a frota
+    MAX_CONEXOES_POR_DVR = 2  # Requisições simultâneas por DVR (ip:porta)
+
+    # Sondagem em lote: uma requisição de status de canais por DVR
+    USE_BULK_DVR_PROBE = True
+    BULK_PROBE_MIN_CANAIS = 2  # Só usa o lote para DVRs com pelo menos N câmeras
+    BULK_PROBE_RETRY_INDISPONIVEL = 3600  # segundos - até tentar de novo em DVR sem suporte
+    
+    # Modo de leitura do snapshot: "cabecalhos" decide ON/OFF pelos cabeçalhos e
+    # pelos primeiros bytes da imagem; "completo" baixa o JPEG inteiro
+    SNAPSHOT_PROBE_MODE = "cabecalhos"
+    SNAPSHOT_PROBE_MAX_BYTES = 4096  # bytes - deve ser >= INTELBRAS_MIN_IMAGE_SIZE
+
+    # Validação de streams RTSP (CameraValidator): handshake OPTIONS/DESCRIBE em
+    # asyncio, sem processos externos; ffprobe só como verificação profunda
+    RTSP_TIMEOUT = 5  # segundos por sondagem
+    RTSP_AGUARDAR_RTP = False  # True também exige o primeiro pacote RTP (SETUP/PLAY)
+    RTSP_MAX_CONCORRENCIA = 1000  # sondagens simultâneas
+    RTSP_FFPROBE_PROFUNDO = False  # confirma com ffprobe os streams aprovados no handshake
+    # Descoberta de porta alternativa: candidatas disputadas em paralelo e porta
+    # que funcionou lembrada por host (esquecida apenas quando falha)
+    RTSP_PORTAS_ALTERNATIVAS = (554, 8554, 10554, 8080, 80)
+    RTSP_ESCALONAMENTO_CONEXAO = 0.25  # segundos entre o início das conexões
+    RTSP_TIMEOUT_CONEXAO = 2  # segundos por tentativa de conexão
+
+    # Agendamento: "varredura" verifica toda a frota a cada INTERVALO_VERIFICACAO;
+    # "adaptativo" dá a cada câmera seu próprio intervalo (requer USE_ASYNC_ENGINE)
+    MODO_AGENDAMENTO = "adaptativo"
+    AGENDA_INTERVALO_MIN = 60  # segundos - câmeras que mudaram de estado ou oscilam
+    AGENDA_INTERVALO_MAX = 1200  # segundos - teto do recuo para câmeras estáveis
+    AGENDA_FATOR_BACKOFF = 1.5  # multiplicador do intervalo a cada verificação estável
+    AGENDA_JANELA_FLAPPING = 3600  # segundos
+    AGENDA_LIMITE_FLAPPING = 3  # transições dentro da janela para considerar flapping
+    AGENDA_PROBES_POR_SEGUNDO = 50  # orçamento global de verificações por segundo
+    AGENDA_JANELA_DVR = 30  # segundos - câmeras do mesmo DVR que vencem na janela saem juntas
+    AGENDA_INTERVALO_INVENTARIO = 600  # segundos - recarga das câmeras do banco
+
+    # Distribuição da carga: cada câmera tem uma fase fixa (derivada da sua chave)
+    # dentro do intervalo, em vez de toda a frota ser verificada no início do ciclo
+    USE_PACING = True
+    PACING_FRACAO_INTERVALO = 0.9  # fração de INTERVALO_VERIFICACAO usada para espalhar as verificações
+
+    # Verificação fragmentada (sharding): SHARD_PROCESSOS processos verificam, cada
+    # um, os DVRs das fatias (hash consistente de ip:porta) que arrendou; o processo
+    # do Flask só junta os resultados para o dashboard. Cada processo usa sempre o
+    # motor assíncrono, e MAX_CONCORRENCIA_GLOBAL/AGENDA_PROBES_POR_SEGUNDO valem por processo
+    SHARD_PROCESSOS = 0  # 0 = verificação no próprio processo do Flask
+    SHARD_FATIAS = 64  # unidades de posse e de rebalanceamento entre os processos
+    SHARD_ARRENDAMENTO = 60  # segundos de posse sem renovação (renovada a cada 1/3 disso)
+    SHARD_MARGEM = 10  # segundos antes do vencimento em que o dono para de verificar a fatia
+    SHARD_CARENCIA = 45  # segundos até uma fatia liberada poder ser tomada (verificações em andamento)
+    SHARD_INTERVALO_RESULTADOS = 1  # segundos entre publicações/leituras dos resultados
+
+    # Inventário de câmeras: mantido em memória e atualizado por detecção de mudanças
+    INVENTARIO_COLUNA_VERSAO = "updated_at"  # coluna de última alteração nas três tabelas (None = sempre consulta completa)
+    INVENTARIO_RECARGA_COMPLETA = 3600  # segundos - consulta completa periódica (segurança)
+
+    # Pool de conexões MySQL (inventário e futuros gravadores)
+    DB_POOL_TAMANHO = 4  # conexões simultâneas no máximo
+    DB_POOL_MINIMO = 1  # conexões abertas já na partida
+    DB_POOL_TIMEOUT_ESPERA = 10  # segundos aguardando uma conexão livre
+    DB_PING_INTERVALO = 60  # segundos ociosa antes de testar a conexão com ping
+    DB_CONNECT_TIMEOUT = 5  # segundos
+    DB_READ_TIMEOUT = 30  # segundos
+    DB_WRITE_TIMEOUT = 30  # segundos
+
+    # Status publicado no dashboard
+    STATUS_MAX_ALTERACOES = 50000  # alterações mantidas para o modo delta (/status?since=)
+
+    # Eventos em tempo real (Server-Sent Events em /eventos)
+    SSE_MAX_INSCRICOES = 100  # conexões simultâneas
+    SSE_MAX_FILA = 1000  # eventos pendentes por conexão antes de exigir recarga
+    SSE_KEEPALIVE = 15  # segundos entre comentários de keep-alive
+
+    # Métricas Prometheus (/metrics) - sem token o endpoint exige o login do dashboard
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")  # Authorization: Bearer <token>
+
+    # Logging estruturado (fila + thread de escrita; ver app/utils/logger.py)
+    LOG_NIVEL = os.environ.get("LOG_NIVEL", "INFO")
+    LOG_NIVEL_CAMERAS = os.environ.get("LOG_NIVEL_CAMERAS", "WARNING")  # INFO mostra o ON/OFF de cada câmera
+    LOG_FORMATO = os.environ.get("LOG_FORMATO", "json")  # "json" ou "texto"
+    LOG_FILA_MAX = 10000  # registros pendentes antes de descartar
+    LOG_AGREGACAO_LIMITE = 5  # avisos/erros iguais por janela antes de suprimir
+    LOG_AGREGACAO_JANELA = 60  # segundos
+
+    # Configurações de retry e resiliência
+    TENTATIVAS_RETRY = 2  # Tentativas adicionais em caso de falha
+    RETRY_BACKOFF = 1  # segundos - delay entre retries
+
+    # Disjuntor por DVR: DVR inacessível (teste TCP ou câmeras seguidas sem
+    # resposta) tem as câmeras restantes marcadas OFF sem consulta
+    USE_DISJUNTOR_DVR = True
+    DISJUNTOR_FALHAS_PARA_ABRIR = 3  # falhas seguidas sem resposta do DVR (câmeras ou testes TCP)
+    DISJUNTOR_TEMPO_ABERTO = 60  # segundos até o primeiro teste (semiaberto)
+    DISJUNTOR_TEMPO_ABERTO_MAX = 900  # segundos - teto do recuo (dobra a cada teste que falha)
+    DISJUNTOR_TIMEOUT_TCP = 2  # segundos - teste de conexão TCP com o DVR
+    DISJUNTOR_VALIDADE_RESPOSTA = 60  # segundos - DVR que respondeu há menos que isso dispensa o teste
+    
+    # Configurações de pool de conexões HTTP
+    USE_CONNECTION_POOL = True  # Habilita pool de conexões reutilizáveis
+    CONNECTION_POOL_SIZE = 50  # Máximo de conexões no pool
+    CONNECTION_POOL_MAXSIZE = 50  # Conexões por host
+
+    # Configurações de cache
+    CACHE_DURATION = 30  # segundos
+    CACHE_DURATION_OFFLINE = 120  # segundos
+    CACHE_MAX_ENTRADAS = 100000  # Limite de entradas (despejo LRU acima disso)
+    CACHE_SEGMENTOS = 16  # Segmentos com lock próprio (reduz contenção entre workers)
+
+    # Configurações de protocolo
+    DEFAULT_PROTOCOL = "hikvision"  # Protocolo padrão se não especificado no DVR
+    
+    # Configurações específicas do Intelbras (CGI/Dahua)
+    INTELBRAS_MIN_IMAGE_SIZE = 1024  # bytes - tamanho mínimo para considerar imagem válida
+    INTELBRAS_TRACK_IMAGE_SIZE = True  # Rastreia mudanças no Content-Length entre capturas
+
+    # Saúde da imagem (congelada, preta, "Sem Sinal"): triagem pelo Content-Length
+    # em toda verificação por snapshot; análise (NumPy + Pillow) só das suspeitas
+    IMAGEM_SAUDE_ATIVA = True
+    IMAGEM_ANALISE = True  # False mantém só a triagem (contabilizada, sem alterar o status)
+    IMAGEM_HISTORICO = 8  # tamanhos e impressões guardados por câmera
+    IMAGEM_TAMANHO_SUSPEITO = 6144  # bytes - imagens menores são analisadas
+    IMAGEM_FRACAO_QUEDA = 0.4  # imagem abaixo dessa fração da mediana recente é analisada
+    IMAGEM_REPETICOES_CONGELADA = 2  # verificações seguidas com o mesmo tamanho e o mesmo hash
+    IMAGEM_DISTANCIA_CONGELADA = 2  # bits de diferença no dHash ainda considerados a mesma imagem
+    IMAGEM_FRACAO_UNIFORME = 0.9  # fração de pixels próximos da mediana para imagem uniforme
+    IMAGEM_TOLERANCIA_UNIFORME = 6  # níveis de cinza em torno da mediana
+    IMAGEM_LIMIAR_ESCURO = 24  # luminância média (0-255) abaixo da qual a imagem uniforme é "preta"
+    IMAGEM_CONFIRMACOES_PRETA = 3  # análises seguidas do mesmo quadro escuro até considerar "preta"
+    IMAGEM_AMOSTRAS_LOTE = 1  # canais ON pelo status em lote conferidos por snapshot a cada sondagem (rodízio)
+
+    # Despacho de alertas: outbox persistente (SQLite) drenada por uma thread dedicada
+    ALERTAS_MAX_LOTE = 20  # eventos por INSERT na API Moni (1 = um comando por alerta)
+    ALERTAS_JANELA_LOTE = 0.5  # segundos aguardando mais alertas para o mesmo lote
+    ALERTAS_MAX_TENTATIVAS = 10  # recusas da API até o evento ser marcado como falho
+    ALERTAS_BACKOFF = 1  # segundos - dobra a cada falha seguida
+    ALERTAS_BACKOFF_MAX = 60  # segundos
+    ALERTAS_TIMEOUT = 5  # segundos
+
+    # Configurações de API
+    API_URL = "http://192.168.2.50:55554/"
+    # "http://192.168.2.50:5554/ExecutarComando"
+    API_USERNAME = "moni"
+    # API_PASSWORD = "moni"
+    API_PASSWORD = "senha"
+
+    # Caminhos dos arquivos (BASE_DIR = raiz do projeto)
+    BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    APP_DIR = os.path.join(BASE_DIR, "app")
+    WEB_DIR = os.path.join(BASE_DIR, "web")
+    TEMPLATES_DIR = os.path.join(WEB_DIR, "templates")
+    STATIC_DIR = os.path.join(WEB_DIR, "static")
+    DATA_DIR = os.path.join(APP_DIR, "data")  # Bancos locais (outbox de alertas)
+    ALERTAS_OUTBOX_PATH = os.path.join(DATA_DIR, "alertas_outbox.db")
+    RTSP_MAPA_PORTAS_PATH = os.path.join(DATA_DIR, "portas_rtsp.db")  # porta RTSP que funcionou por host
+    SHARD_COORDENACAO_PATH = os.path.join(DATA_DIR, "fragmentos.db")  # arrendamentos e estados dos processos
+
+    # Último estado conhecido das câmeras (status, ON/OFF, falhas e cache) gravado
+    # em SQLite e restaurado na partida - o dashboard não começa vazio
+    ESTADO_PERSISTIR = True
+    ESTADO_PATH = os.path.join(DATA_DIR, "estado_cameras.db")
+    ESTADO_INTERVALO_GRAVACAO = 60  # segundos
+    ESTADO_IDADE_MAXIMA = 86400  # segundos - retrato mais antigo é ignorado na partida
+
+    # Histórico de status: trechos ON/OFF e agregados por minuto/hora/dia em
+    # SQLite, consultados em /disponibilidade/<condominio>
+    HISTORICO_ATIVO = True
+    HISTORICO_GRAVAR = True  # False = só consulta (dashboard da verificação fragmentada; os processos gravam)
+    HISTORICO_PATH = os.path.join(DATA_DIR, "historico_cameras.db")
+    HISTORICO_INTERVALO_GRAVACAO = 60  # segundos
+    HISTORICO_RETENCAO_MINUTOS = 2 * 86400  # segundos
+    HISTORICO_RETENCAO_HORAS = 90 * 86400  # segundos
+    HISTORICO_RETENCAO_DIAS = 730 * 86400  # segundos
+    HISTORICO_RETENCAO_TRECHOS = 180 * 86400  # segundos
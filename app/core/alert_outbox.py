@@ -0,0 +1,146 @@
+"""
+Módulo responsável pela caixa de saída (outbox) persistente de alertas
+
+Todo alerta é gravado em SQLite (modo WAL) antes da entrega à API Moni e só
+é removido após a confirmação do envio. Se a API estiver fora do ar ou o
+servidor reiniciar, os eventos continuam no disco e são reenviados na ordem
+em que foram gerados (entrega pelo menos uma vez).
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.config import Config
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chave TEXT NOT NULL UNIQUE,
+    condominio TEXT NOT NULL,
+    nome TEXT NOT NULL,
+    valores TEXT NOT NULL,
+    criado_em REAL NOT NULL,
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    falhou INTEGER NOT NULL DEFAULT 0,
+    ultimo_erro TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_pendentes ON outbox (falhou, id);
+"""
+
+
+class EventoOutbox:
+    """Evento pendente lido da outbox"""
+
+    __slots__ = ("id", "chave", "condominio", "nome", "valores", "criado_em", "tentativas")
+
+    def __init__(self, id, chave, condominio, nome, valores, criado_em, tentativas):
+        self.id = id
+        self.chave = chave
+        self.condominio = condominio
+        self.nome = nome
+        self.valores = valores
+        self.criado_em = criado_em
+        self.tentativas = tentativas
+
+
+class AlertOutbox:
+    """Fila persistente de alertas em SQLite (thread-safe)"""
+
+    def __init__(self, caminho: Optional[str] = None):
+        """
+        Args:
+            caminho: Arquivo do banco (padrão Config.ALERTAS_OUTBOX_PATH;
+                ":memory:" para uma outbox volátil)
+        """
+        self.caminho = caminho or Config.ALERTAS_OUTBOX_PATH
+        if self.caminho != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.caminho)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.caminho, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL em WAL: durável após o checkpoint, sem fsync a cada insert
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def adicionar(
+        self,
+        chave: str,
+        condominio: str,
+        nome: str,
+        valores: str,
+        criado_em: Optional[float] = None,
+    ) -> bool:
+        """
+        Grava um evento na outbox
+
+        Args:
+            chave: Chave de idempotência - um evento com a mesma chave já
+                gravado não é duplicado
+            criado_em: Horário do evento (padrão: agora)
+
+        Returns:
+            False se o evento já existia
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO outbox (chave, condominio, nome, valores, criado_em) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (chave, condominio, nome, valores, criado_em or time.time()),
+            )
+        return cursor.rowcount == 1
+
+    def pendentes(self, limite: int) -> List[EventoOutbox]:
+        """Eventos ainda não entregues, na ordem de gravação"""
+        with self._lock:
+            linhas = self._conn.execute(
+                "SELECT id, chave, condominio, nome, valores, criado_em, tentativas "
+                "FROM outbox WHERE falhou = 0 ORDER BY id LIMIT ?",
+                (limite,),
+            ).fetchall()
+        return [EventoOutbox(*linha) for linha in linhas]
+
+    def confirmar(self, ids: Iterable[int]):
+        """Remove os eventos entregues"""
+        with self._lock:
+            self._conn.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in ids])
+
+    def registrar_falha(self, id_evento: int, erro: str, max_tentativas: int) -> bool:
+        """
+        Contabiliza uma recusa da API para o evento; após max_tentativas o
+        evento deixa de ser reenviado (fica na outbox marcado como falho)
+
+        Returns:
+            True se o evento foi marcado como falho
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET tentativas = tentativas + 1, ultimo_erro = ?, "
+                "falhou = (tentativas + 1 >= ?) WHERE id = ?",
+                (erro, max_tentativas, id_evento),
+            )
+            falhou = self._conn.execute(
+                "SELECT falhou FROM outbox WHERE id = ?", (id_evento,)
+            ).fetchone()
+        return bool(falhou and falhou[0])
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            pendentes, mais_antigo = self._conn.execute(
+                "SELECT COUNT(*), MIN(criado_em) FROM outbox WHERE falhou = 0"
+            ).fetchone()
+            falhos = self._conn.execute(
+                "SELECT COUNT(*) FROM outbox WHERE falhou = 1"
+            ).fetchone()[0]
+        return {
+            "pendentes": pendentes,
+            "falhos": falhos,
+            "idade_mais_antigo_s": round(time.time() - mais_antigo, 1) if mais_antigo else 0.0,
+        }
+
+    def fechar(self):
+        with self._lock:
+            self._conn.close()
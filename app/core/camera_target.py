@@ -0,0 +1,168 @@
+"""
+Módulo responsável pelo descritor compacto das câmeras verificadas
+
+O inventário entrega cada câmera como um dicionário com campos opcionais
+(ip/porta da câmera ou do DVR, canal ou channel, credenciais). Derivar os
+dados de conexão, as chaves e a URL a cada verificação custava buscas em
+cadeia e formatação de strings no caminho quente; o CameraTarget faz isso uma
+única vez por carga do inventário e fica guardado no próprio dicionário da
+câmera (chave "_alvo"). As câmeras de um mesmo DVR compartilham o DvrEndpoint.
+"""
+import sys
+from enum import Enum
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from app.utils.protocol_utils import ProtocolUtils
+
+
+CHAVE_ALVO = "_alvo"
+
+
+class Protocolo(str, Enum):
+    """Protocolo de snapshot do DVR (compara igual à string do valor)"""
+
+    HIKVISION = "hikvision"
+    INTELBRAS = "intelbras"
+
+    def __str__(self) -> str:
+        return self.value
+
+    @classmethod
+    def de(cls, valor: Optional[str]) -> "Protocolo":
+        try:
+            return cls(str(valor or cls.HIKVISION.value).lower())
+        except ValueError:
+            return cls.HIKVISION
+
+
+class DvrEndpoint:
+    """DVR/NVR (endpoint ip:porta) com as credenciais usadas pelas suas câmeras"""
+
+    __slots__ = ("ip", "porta", "usuario", "senha", "protocolo", "chave", "url_status")
+
+    def __init__(self, ip: Optional[str], porta: Any, usuario: str, senha: str, protocolo: Protocolo):
+        self.ip = ip
+        self.porta = porta
+        self.usuario = usuario
+        self.senha = senha
+        self.protocolo = protocolo
+        # Chave das filas por DVR, do cache Digest e do estado do lote
+        self.chave = sys.intern(f"{ip}:{porta}")
+        self.url_status = (
+            ProtocolUtils.build_channel_status_url(ip, porta, protocolo.value) if ip else None
+        )
+
+    @property
+    def configurado(self) -> bool:
+        return bool(self.ip and self.usuario and self.senha)
+
+
+class CameraTarget:
+    """Câmera pronta para verificação: chaves, canal e URL já calculados"""
+
+    __slots__ = ("nome", "condominio", "canal", "dvr", "url_snapshot", "chave", "chave_cache", "cam")
+
+    def __init__(self, cam: Dict[str, Any], nome_condominio: str, dvr: DvrEndpoint, canal: str):
+        self.nome: str = cam.get("name", "CAMERA")
+        self.condominio = nome_condominio
+        self.canal = canal
+        self.dvr = dvr
+        self.url_snapshot = (
+            ProtocolUtils.build_snapshot_url(dvr.ip, dvr.porta, canal, dvr.protocolo.value)
+            if dvr.ip
+            else None
+        )
+        # Chave da câmera no agendador, nos estados e nos contadores de falhas
+        self.chave = sys.intern(f"{nome_condominio}_{self.nome}")
+        # Chave do cache de verificação (inclui sufixo do protocolo Intelbras)
+        chave_cache = f"{nome_condominio}_{self.nome}_{dvr.ip}_{canal}"
+        if dvr.protocolo is Protocolo.INTELBRAS:
+            chave_cache += "_intelbras"
+        self.chave_cache = sys.intern(chave_cache)
+        # Dicionário de origem (alertas usam os campos do inventário)
+        self.cam = cam
+
+    @property
+    def protocolo(self) -> Protocolo:
+        return self.dvr.protocolo
+
+    @staticmethod
+    def dados_conexao(cam: Dict[str, Any]) -> Tuple[Optional[str], Any, str, str, str, Protocolo]:
+        """
+        (ip, porta, canal, usuário, senha, protocolo) de um dicionário de
+        câmera: ip/porta da câmera ou do DVR, canal no formato do protocolo e
+        credenciais do DVR
+        """
+        protocolo = Protocolo.de(cam.get("_dvr_protocol"))
+        canal_padrao = "1" if protocolo is Protocolo.INTELBRAS else "101"
+
+        # Tenta obter IP e porta do nível da câmera, se não encontrar, usa do DVR
+        ip = cam.get("ip") or cam.get("_dvr_ip")
+        porta = cam.get("porta") or cam.get("_dvr_porta") or 80
+        canal = cam.get("canal") or cam.get("channel") or canal_padrao
+        if protocolo is Protocolo.INTELBRAS:
+            # Converte canal para formato Intelbras se necessário (101 -> 1)
+            canal = ProtocolUtils.convert_channel_to_intelbras(canal)
+
+        # Credenciais sempre do DVR (fallback para camera se não injetado)
+        usuario = cam.get("_dvr_usuario") or cam.get("usuario") or "admin"
+        senha = cam.get("_dvr_senha") or cam.get("senha") or "admin"
+        return ip, porta, str(canal), usuario, senha, protocolo
+
+    @classmethod
+    def da_camera(
+        cls,
+        cam: Dict[str, Any],
+        nome_condominio: str,
+        dvrs: Optional[Dict[Tuple, DvrEndpoint]] = None,
+    ) -> "CameraTarget":
+        """
+        Monta o descritor da câmera
+
+        Args:
+            dvrs: Endpoints já criados, compartilhados entre as câmeras do
+                mesmo DVR (preenchido com os novos)
+        """
+        ip, porta, canal, usuario, senha, protocolo = cls.dados_conexao(cam)
+        chave_dvr = (ip, porta, usuario, senha, protocolo)
+        dvr = dvrs.get(chave_dvr) if dvrs is not None else None
+        if dvr is None:
+            dvr = DvrEndpoint(ip, porta, usuario, senha, protocolo)
+            if dvrs is not None:
+                dvrs[chave_dvr] = dvr
+        return cls(cam, nome_condominio, dvr, canal)
+
+
+def obter_alvo(
+    cam: Dict[str, Any],
+    nome_condominio: str,
+    dvrs: Optional[Dict[Tuple, DvrEndpoint]] = None,
+) -> CameraTarget:
+    """Descritor guardado na câmera (montado e guardado se ainda não existe)"""
+    alvo = cam.get(CHAVE_ALVO)
+    if alvo is None or alvo.condominio != nome_condominio:
+        alvo = cam[CHAVE_ALVO] = CameraTarget.da_camera(cam, nome_condominio, dvrs)
+    return alvo
+
+
+def montar_alvos(clientes_data: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+    """
+    Garante o descritor de todas as câmeras da lista (cliente_nome, data),
+    reaproveitando os já montados e compartilhando os endpoints de DVR
+
+    Returns:
+        Quantidade de descritores montados
+    """
+    dvrs: Dict[Tuple, DvrEndpoint] = {}
+    pendentes = []
+    for nome_condominio, data in clientes_data:
+        for cam in data.get("cameras", []):
+            alvo = cam.get(CHAVE_ALVO)
+            if alvo is not None and alvo.condominio == nome_condominio:
+                dvr = alvo.dvr
+                dvrs.setdefault((dvr.ip, dvr.porta, dvr.usuario, dvr.senha, dvr.protocolo), dvr)
+            else:
+                pendentes.append((cam, nome_condominio))
+    for cam, nome_condominio in pendentes:
+        cam[CHAVE_ALVO] = CameraTarget.da_camera(cam, nome_condominio, dvrs)
+    return len(pendentes)
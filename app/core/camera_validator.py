@@ -1,119 +1,269 @@
-"""
-Módulo responsável pela validação de câmeras
-"""
-import subprocess
-import socket
-from urllib.parse import urlparse
-from typing import Dict, Any, Optional
-
-
-class CameraValidator:
-    """Classe responsável por validar o status das câmeras"""
-    
-    @staticmethod
-    def verificar_stream_video_avancado(rtsp_url: str, tentativas: int = 3, timeout: int = 8) -> bool:
-        """
-        Verificação avançada que valida se o stream realmente contém vídeo válido.
-        """
-        # Primeira verificação: conectividade básica
-        if not CameraValidator._verificar_conectividade_basica(rtsp_url, timeout):
-            return False
-        
-        # Segunda verificação: ffprobe com validação de conteúdo
-        return CameraValidator._verificar_com_ffprobe_avancado(rtsp_url, tentativas, timeout)
-    
-    @staticmethod
-    def _verificar_conectividade_basica(rtsp_url: str, timeout: int = 5) -> bool:
-        """Verifica conectividade básica com a câmera"""
-        try:
-            parsed = urlparse(rtsp_url)
-            host = parsed.hostname
-            port = parsed.port or 554  # Porta padrão RTSP
-            
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(timeout)
-            result = sock.connect_ex((host, port))
-            sock.close()
-            
-            return result == 0
-        except Exception:
-            return False
-    
-    @staticmethod
-    def _verificar_com_ffprobe_avancado(rtsp_url: str, tentativas: int = 3, timeout: int = 8) -> bool:
-        """Verificação principal com ffprobe usando múltiplas estratégias"""
-        
-        # Estratégia 1: TCP forçado
-        cmd_tcp = [
-            "ffprobe",
-            "-rtsp_transport", "tcp",
-            "-v", "error",
-            "-timeout", str(timeout * 1000000),
-            "-i", rtsp_url
-        ]
-        
-        # Estratégia 2: Auto (pode usar UDP)
-        cmd_auto = [
-            "ffprobe",
-            "-v", "error",
-            "-timeout", str(timeout * 1000000),
-            "-i", rtsp_url
-        ]
-        
-        # Estratégia 3: Verificação de metadados específicos
-        cmd_metadados = [
-            "ffprobe",
-            "-rtsp_transport", "tcp",
-            "-v", "error",
-            "-select_streams", "v:0",  # Apenas stream de vídeo
-            "-show_entries", "stream=codec_type",
-            "-of", "csv=p=0",
-            "-timeout", str(timeout * 1000000),
-            "-i", rtsp_url
-        ]
-
-        for tentativa in range(tentativas):
-            try:
-                if tentativa == 0:
-                    result = subprocess.run(cmd_tcp, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=timeout)
-                elif tentativa == 1:
-                    result = subprocess.run(cmd_auto, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=timeout)
-                else:
-                    result = subprocess.run(cmd_metadados, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=timeout)
-                    
-                if result.returncode == 0:
-                    return True
-                    
-            except (subprocess.TimeoutExpired, Exception):
-                continue
-        return False
-    
-    @staticmethod
-    def verificar_portas_alternativas(rtsp_url: str, timeout: int = 5) -> bool:
-        """Tenta portas alternativas comuns para câmeras"""
-        try:
-            parsed = urlparse(rtsp_url)
-            host = parsed.hostname
-            base_port = parsed.port or 554
-            
-            # Portas alternativas comuns
-            portas_alternativas = [base_port, 8554, 10554, 554, 8080, 80]
-            
-            for porta in portas_alternativas:
-                try:
-                    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                    sock.settimeout(2)  # Timeout menor para portas alternativas
-                    result = sock.connect_ex((host, porta))
-                    sock.close()
-                    
-                    if result == 0:
-                        # Se conectou, tenta ffprobe nesta porta
-                        nova_url = rtsp_url.replace(f":{base_port}", f":{porta}")
-                        if CameraValidator._verificar_com_ffprobe_avancado(nova_url, tentativas=1, timeout=3):
-                            return True
-                except Exception:
-                    continue
-                    
-            return False
-        except Exception:
-            return False 
\ No newline at end of file
+"""
+Módulo responsável pela validação de câmeras
+
+A validação padrão é o handshake RTSP em processo (app.core.rtsp_probe):
+OPTIONS/DESCRIBE com autenticação e, opcionalmente, o primeiro pacote RTP.
+O ffprobe fica como verificação profunda opcional (RTSP_FFPROBE_PROFUNDO ou
+profundo=True), executado só para streams que já passaram no handshake.
+
+A descoberta de porta alternativa tenta as portas candidatas em paralelo,
+escalonadas (happy eyeballs), e lembra a porta que funcionou por host.
+"""
+import asyncio
+import subprocess
+import time
+from urllib.parse import urlsplit, urlunsplit
+from typing import Dict, Iterable, List, Optional
+
+from app.config import Config
+from .port_map import MapaPortas, get_mapa_portas
+from .rtsp_probe import PORTA_PADRAO, SondaRTSP
+
+
+def url_com_porta(rtsp_url: str, porta: int) -> str:
+    """A mesma URL apontando para outra porta (credenciais preservadas)"""
+    partes = urlsplit(rtsp_url)
+    credenciais, _, _ = partes.netloc.rpartition("@")
+    host = partes.hostname or ""
+    if ":" in host:
+        host = f"[{host}]"  # IPv6
+    netloc = f"{credenciais}@{host}:{porta}" if credenciais else f"{host}:{porta}"
+    return urlunsplit((partes.scheme, netloc, partes.path, partes.query, partes.fragment))
+
+
+class CameraValidator:
+    """Classe responsável por validar o status das câmeras"""
+
+    @staticmethod
+    def verificar_stream_video_avancado(
+        rtsp_url: str,
+        tentativas: int = 3,
+        timeout: int = 8,
+        profundo: Optional[bool] = None,
+    ) -> bool:
+        """
+        Verificação avançada que valida se o stream realmente contém vídeo válido.
+
+        Não usar de dentro de um loop asyncio em execução - lá, chame
+        verificar_streams_async.
+        """
+        return asyncio.run(
+            CameraValidator.verificar_streams_async([rtsp_url], tentativas, timeout, profundo)
+        )[rtsp_url]
+
+    @staticmethod
+    def verificar_streams(
+        rtsp_urls: Iterable[str],
+        tentativas: int = 1,
+        timeout: Optional[float] = None,
+        profundo: Optional[bool] = None,
+    ) -> Dict[str, bool]:
+        """Valida vários streams em paralelo (uma thread, um loop asyncio)"""
+        return asyncio.run(
+            CameraValidator.verificar_streams_async(rtsp_urls, tentativas, timeout, profundo)
+        )
+
+    @staticmethod
+    async def verificar_streams_async(
+        rtsp_urls: Iterable[str],
+        tentativas: int = 1,
+        timeout: Optional[float] = None,
+        profundo: Optional[bool] = None,
+    ) -> Dict[str, bool]:
+        """
+        Valida vários streams em paralelo pelo handshake RTSP
+
+        Args:
+            tentativas: Sondagens por stream até a primeira com sucesso
+            profundo: Confirma com ffprobe os streams aprovados no handshake
+                (padrão Config.RTSP_FFPROBE_PROFUNDO)
+
+        Returns:
+            {url: online}
+        """
+        sonda = SondaRTSP(timeout=timeout)
+        urls = list(dict.fromkeys(rtsp_urls))
+        online = {url: False for url in urls}
+        pendentes = urls
+        for _ in range(max(1, tentativas)):
+            if not pendentes:
+                break
+            for resultado in await sonda.sondar_varios(pendentes):
+                online[resultado.url] = resultado.online
+            pendentes = [url for url in pendentes if not online[url]]
+
+        profundo = Config.RTSP_FFPROBE_PROFUNDO if profundo is None else profundo
+        if profundo:
+            aprovados = [url for url in urls if online[url]]
+            loop = asyncio.get_running_loop()
+            confirmados = await asyncio.gather(
+                *(
+                    loop.run_in_executor(
+                        None,
+                        CameraValidator._verificar_com_ffprobe_avancado,
+                        url,
+                        1,
+                        int(sonda.timeout),
+                    )
+                    for url in aprovados
+                )
+            )
+            online.update(zip(aprovados, confirmados))
+        return online
+
+    @staticmethod
+    def _verificar_com_ffprobe_avancado(rtsp_url: str, tentativas: int = 3, timeout: int = 8) -> bool:
+        """Verificação profunda com ffprobe usando múltiplas estratégias (processo externo)"""
+
+        # Estratégia 1: TCP forçado
+        cmd_tcp = [
+            "ffprobe",
+            "-rtsp_transport", "tcp",
+            "-v", "error",
+            "-timeout", str(timeout * 1000000),
+            "-i", rtsp_url
+        ]
+
+        # Estratégia 2: Auto (pode usar UDP)
+        cmd_auto = [
+            "ffprobe",
+            "-v", "error",
+            "-timeout", str(timeout * 1000000),
+            "-i", rtsp_url
+        ]
+
+        # Estratégia 3: Verificação de metadados específicos
+        cmd_metadados = [
+            "ffprobe",
+            "-rtsp_transport", "tcp",
+            "-v", "error",
+            "-select_streams", "v:0",  # Apenas stream de vídeo
+            "-show_entries", "stream=codec_type",
+            "-of", "csv=p=0",
+            "-timeout", str(timeout * 1000000),
+            "-i", rtsp_url
+        ]
+
+        for tentativa in range(tentativas):
+            try:
+                if tentativa == 0:
+                    result = subprocess.run(cmd_tcp, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=timeout)
+                elif tentativa == 1:
+                    result = subprocess.run(cmd_auto, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=timeout)
+                else:
+                    result = subprocess.run(cmd_metadados, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=timeout)
+
+                if result.returncode == 0:
+                    return True
+
+            except (subprocess.TimeoutExpired, Exception):
+                continue
+        return False
+
+    @staticmethod
+    def verificar_portas_alternativas(rtsp_url: str, timeout: int = 5) -> bool:
+        """Tenta portas alternativas comuns para câmeras"""
+        return CameraValidator.descobrir_porta(rtsp_url, timeout) is not None
+
+    @staticmethod
+    def descobrir_porta(rtsp_url: str, timeout: float = 5) -> Optional[int]:
+        """Versão síncrona de descobrir_porta_async"""
+        return asyncio.run(CameraValidator.descobrir_porta_async(rtsp_url, timeout))
+
+    @staticmethod
+    async def descobrir_porta_async(
+        rtsp_url: str,
+        timeout: float = 5,
+        mapa: Optional[MapaPortas] = None,
+        sonda: Optional[SondaRTSP] = None,
+    ) -> Optional[int]:
+        """
+        Porta em que o stream responde ao handshake RTSP
+
+        A porta lembrada para o host é testada primeiro; se falhar, é
+        esquecida e as candidatas (porta da URL + RTSP_PORTAS_ALTERNATIVAS)
+        são disputadas em paralelo.
+
+        Returns:
+            A porta que funcionou (gravada no mapa) ou None
+        """
+        mapa = mapa or get_mapa_portas()
+        sonda = sonda or SondaRTSP(timeout=min(timeout, Config.RTSP_TIMEOUT))
+        partes = urlsplit(rtsp_url)
+        host = partes.hostname
+        if not host:
+            return None
+
+        lembrada = mapa.obter(host)
+        if lembrada is not None:
+            if (await sonda.sondar(url_com_porta(rtsp_url, lembrada))).online:
+                mapa.registrar(host, lembrada)
+                return lembrada
+            mapa.invalidar(host)
+
+        candidatas = [partes.port or PORTA_PADRAO]
+        candidatas += [porta for porta in Config.RTSP_PORTAS_ALTERNATIVAS if porta not in candidatas]
+        if lembrada in candidatas:
+            candidatas.remove(lembrada)  # Acabou de falhar
+        porta = await CameraValidator._disputar_portas(rtsp_url, host, candidatas, timeout, sonda)
+        if porta is not None:
+            mapa.registrar(host, porta)
+        return porta
+
+    @staticmethod
+    async def _disputar_portas(
+        rtsp_url: str,
+        host: str,
+        candidatas: List[int],
+        timeout: float,
+        sonda: SondaRTSP,
+    ) -> Optional[int]:
+        """
+        Happy eyeballs: a tentativa em cada candidata (conexão TCP e, se
+        conectar, handshake RTSP) começa RTSP_ESCALONAMENTO_CONEXAO após a
+        anterior, ou assim que uma tentativa falha; a primeira aprovada vence
+        e as demais são canceladas
+        """
+        timeout_conexao = min(timeout, Config.RTSP_TIMEOUT_CONEXAO)
+
+        async def tentar(porta: int) -> int:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(host, porta), timeout=timeout_conexao
+            )
+            writer.close()
+            resultado = await sonda.sondar(url_com_porta(rtsp_url, porta))
+            if not resultado.online:
+                raise ConnectionError(resultado.erro or f"RTSP {resultado.status_code}")
+            return porta
+
+        pendentes_conexao = list(candidatas)
+        tarefas: Dict[asyncio.Task, int] = {}
+        proximo_inicio = time.monotonic()
+        limite = time.monotonic() + timeout
+        try:
+            while pendentes_conexao or tarefas:
+                agora = time.monotonic()
+                if agora >= limite:
+                    return None
+                if pendentes_conexao and agora >= proximo_inicio:
+                    porta = pendentes_conexao.pop(0)
+                    tarefas[asyncio.ensure_future(tentar(porta))] = porta
+                    proximo_inicio = agora + Config.RTSP_ESCALONAMENTO_CONEXAO
+                espera = limite - agora
+                if pendentes_conexao:
+                    espera = min(espera, max(0.0, proximo_inicio - agora))
+                if not tarefas:
+                    await asyncio.sleep(espera)
+                    continue
+                concluidas, _ = await asyncio.wait(
+                    tarefas, timeout=espera, return_when=asyncio.FIRST_COMPLETED
+                )
+                for tarefa in concluidas:
+                    porta = tarefas.pop(tarefa)
+                    if tarefa.exception() is None:
+                        return porta
+                    proximo_inicio = time.monotonic()  # Falhou - a próxima não espera
+            return None
+        finally:
+            for tarefa in tarefas:
+                tarefa.cancel()
@@ -0,0 +1,302 @@
+"""
+Módulo responsável pelo pool de conexões MySQL
+
+Mantém conexões abertas e aquecidas para o banco remoto (sem handshake
+TCP + autenticação a cada consulta), testa conexões ociosas com ping antes
+de entregá-las e aplica timeouts de conexão, leitura e escrita para que um
+banco travado não bloqueie os loops de verificação. A configuração (.env e
+variáveis de ambiente) é lida uma única vez.
+"""
+import os
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+import pymysql
+
+from app.config import Config
+from app.utils.logger import get_logger
+from app.utils.metrics import registro
+
+
+logger = get_logger(__name__)
+
+ESPERA_CONEXAO = registro.histograma(
+    "db_pool_espera_segundos", "Tempo de espera por uma conexão livre do pool MySQL"
+)
+
+
+_configuracao: Optional[Dict[str, Any]] = None
+_configuracao_lock = threading.Lock()
+
+
+def carregar_configuracao_db() -> Dict[str, Any]:
+    """Parâmetros de conexão do .env / ambiente (lidos uma única vez)"""
+    global _configuracao
+    with _configuracao_lock:
+        if _configuracao is not None:
+            return _configuracao
+
+        env_path = os.path.join(Config.BASE_DIR, ".env")
+        if os.path.exists(env_path):
+            with open(env_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip() and not line.startswith("#") and "=" in line:
+                        key, val = line.strip().split("=", 1)
+                        if key not in os.environ:
+                            os.environ[key] = val.strip("\"'")
+
+        _configuracao = {
+            "host": os.environ.get("DB_HOST", "192.185.209.100"),
+            "user": os.environ.get("DB_USER", "juanca22_admin"),
+            "password": os.environ.get("DB_PASSWORD", "Route@0450"),
+            "database": os.environ.get("DB_NAME", "juanca22_banco_de_dados_route"),
+            "port": int(os.environ.get("DB_PORT", 3306)),
+        }
+        return _configuracao
+
+
+def abrir_conexao(autocommit: bool = True) -> pymysql.connections.Connection:
+    """Abre uma conexão nova com os timeouts configurados"""
+    return pymysql.connect(
+        **carregar_configuracao_db(),
+        cursorclass=pymysql.cursors.DictCursor,
+        connect_timeout=Config.DB_CONNECT_TIMEOUT,
+        read_timeout=Config.DB_READ_TIMEOUT,
+        write_timeout=Config.DB_WRITE_TIMEOUT,
+        autocommit=autocommit,
+    )
+
+
+class PoolEsgotado(Exception):
+    """Nenhuma conexão livre dentro de DB_POOL_TIMEOUT_ESPERA"""
+
+
+class PoolConexoesMySQL:
+    """Pool thread-safe de conexões MySQL com verificação de vida"""
+
+    def __init__(
+        self,
+        tamanho: Optional[int] = None,
+        minimo: Optional[int] = None,
+        timeout_espera: Optional[float] = None,
+    ):
+        self.tamanho = max(1, tamanho or Config.DB_POOL_TAMANHO)
+        self.minimo = min(self.tamanho, Config.DB_POOL_MINIMO if minimo is None else minimo)
+        self.timeout_espera = timeout_espera or Config.DB_POOL_TIMEOUT_ESPERA
+        # LIFO: a conexão usada mais recentemente é a próxima (mais provável de estar viva)
+        self._ociosas: "queue.LifoQueue" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._abertas = 0
+
+        # Métricas
+        self._esperas: deque = deque(maxlen=1000)  # segundos até obter a conexão
+        self._usos: deque = deque(maxlen=1000)  # segundos com a conexão em uso
+        self.criadas = 0
+        self.descartadas = 0
+        self.esgotamentos = 0
+        self.pings_falhos = 0
+
+    def aquecer(self):
+        """Abre as DB_POOL_MINIMO conexões iniciais"""
+        while True:
+            with self._lock:
+                if self._abertas >= self.minimo:
+                    return
+                self._abertas += 1
+            try:
+                self._ociosas.put((self._criar(), time.monotonic()))
+            except Exception:
+                with self._lock:
+                    self._abertas -= 1
+                raise
+
+    def _criar(self):
+        conexao = abrir_conexao()
+        with self._lock:
+            self.criadas += 1
+        return conexao
+
+    def _descartar(self, conexao):
+        with self._lock:
+            self._abertas -= 1
+            self.descartadas += 1
+        try:
+            conexao.close()
+        except Exception:
+            pass
+
+    def _obter(self):
+        limite = time.monotonic() + self.timeout_espera
+        while True:
+            try:
+                conexao, ultimo_uso = self._ociosas.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    pode_criar = self._abertas < self.tamanho
+                    if pode_criar:
+                        self._abertas += 1
+                if pode_criar:
+                    try:
+                        return self._criar()
+                    except Exception:
+                        with self._lock:
+                            self._abertas -= 1
+                        raise
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    with self._lock:
+                        self.esgotamentos += 1
+                    raise PoolEsgotado(
+                        f"Nenhuma conexão MySQL livre em {self.timeout_espera}s ({self.tamanho} em uso)"
+                    )
+                try:
+                    conexao, ultimo_uso = self._ociosas.get(timeout=restante)
+                except queue.Empty:
+                    continue
+
+            if time.monotonic() - ultimo_uso < Config.DB_PING_INTERVALO:
+                return conexao
+            try:
+                conexao.ping(reconnect=False)
+                return conexao
+            except Exception:
+                # Conexão derrubada pelo servidor (wait_timeout) - tenta a próxima
+                with self._lock:
+                    self.pings_falhos += 1
+                self._descartar(conexao)
+
+    @contextmanager
+    def conexao(self):
+        """
+        Empresta uma conexão do pool
+
+        Erros de conexão (OperationalError/InterfaceError) descartam a
+        conexão; nos demais ela volta ao pool.
+        """
+        inicio = time.monotonic()
+        conexao = self._obter()
+        obtida = time.monotonic()
+        self._esperas.append(obtida - inicio)
+        ESPERA_CONEXAO.observar(obtida - inicio)
+        try:
+            yield conexao
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            self._descartar(conexao)
+            raise
+        except BaseException:
+            try:
+                conexao.rollback()
+            except Exception:
+                self._descartar(conexao)
+                raise
+            self._devolver(conexao, obtida)
+            raise
+        else:
+            self._devolver(conexao, obtida)
+
+    def _devolver(self, conexao, obtida: float):
+        agora = time.monotonic()
+        self._usos.append(agora - obtida)
+        self._ociosas.put((conexao, agora))
+
+    def consultar(self, sql: str, parametros=None, uma: bool = False):
+        """Executa uma consulta e retorna todas as linhas (ou apenas a primeira)"""
+        with self.conexao() as conexao:
+            with conexao.cursor() as cursor:
+                cursor.execute(sql, parametros)
+                return cursor.fetchone() if uma else cursor.fetchall()
+
+    def fechar(self):
+        while True:
+            try:
+                conexao, _ = self._ociosas.get_nowait()
+            except queue.Empty:
+                return
+            self._descartar(conexao)
+
+    @staticmethod
+    def _percentis_ms(valores) -> Dict[str, float]:
+        valores = sorted(valores)
+        if not valores:
+            return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+        return {
+            "p50": round(valores[len(valores) // 2] * 1000, 1),
+            "p95": round(valores[int(0.95 * (len(valores) - 1))] * 1000, 1),
+            "max": round(valores[-1] * 1000, 1),
+        }
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            abertas = self._abertas
+            contadores = {
+                "criadas": self.criadas,
+                "descartadas": self.descartadas,
+                "esgotamentos": self.esgotamentos,
+                "pings_falhos": self.pings_falhos,
+            }
+        ociosas = self._ociosas.qsize()
+        return {
+            "tamanho": self.tamanho,
+            "abertas": abertas,
+            "ociosas": ociosas,
+            "em_uso": abertas - ociosas,
+            **contadores,
+            "espera_ms": self._percentis_ms(list(self._esperas)),
+            "uso_ms": self._percentis_ms(list(self._usos)),
+        }
+
+
+_pool: Optional[PoolConexoesMySQL] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> PoolConexoesMySQL:
+    """Pool compartilhado do processo (criado e aquecido no primeiro uso)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PoolConexoesMySQL()
+            try:
+                _pool.aquecer()
+            except Exception as e:
+                logger.error("Falha ao aquecer o pool de conexões MySQL: %s", e)
+        return _pool
+
+
+def estatisticas_pool() -> Optional[Dict[str, Any]]:
+    """Métricas do pool compartilhado (None se ainda não foi criado)"""
+    return _pool.estatisticas() if _pool is not None else None
+
+
+def _coletar_metricas():
+    estatisticas = estatisticas_pool()
+    if estatisticas is None:
+        return []
+    return [
+        (
+            "db_pool_conexoes",
+            "gauge",
+            "Conexões MySQL do pool por estado",
+            [
+                ({"estado": "em_uso"}, estatisticas["em_uso"]),
+                ({"estado": "ociosa"}, estatisticas["ociosas"]),
+            ],
+        ),
+        ("db_pool_tamanho", "gauge", "Máximo de conexões do pool", [({}, estatisticas["tamanho"])]),
+        (
+            "db_pool_eventos_total",
+            "counter",
+            "Conexões criadas e descartadas, esgotamentos e pings falhos",
+            [
+                ({"evento": evento}, estatisticas[evento])
+                for evento in ("criadas", "descartadas", "esgotamentos", "pings_falhos")
+            ],
+        ),
+    ]
+
+
+registro.registrar_coletor(_coletar_metricas)
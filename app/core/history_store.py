@@ -0,0 +1,511 @@
+"""
+Módulo responsável pelo histórico de status das câmeras
+
+Cada câmera tem em memória um trecho aberto (estado atual e desde quando).
+Uma verificação que confirma o estado não grava nada; uma transição fecha o
+trecho (codificação por trechos - run-length) e abre outro. O tempo ON/OFF,
+as transições e a latência das verificações são somados incrementalmente em
+agregados por minuto, hora e dia, gravados em SQLite (modo WAL) a cada
+HISTORICO_INTERVALO_GRAVACAO segundos. Uma consulta de disponibilidade decompõe
+o intervalo em dias inteiros + horas + minutos das bordas e soma poucas linhas
+por câmera, qualquer que seja o tamanho do intervalo.
+
+O trecho aberto de cada câmera também é gravado (tabela abertos) quando muda,
+para que um processo que só consulta (o dashboard da verificação fragmentada,
+em que só os processos de verificação gravam) mostre o estado atual.
+
+Os agregados de minuto e hora são mantidos por menos tempo
+(HISTORICO_RETENCAO_*); consultas antigas usam a resolução ainda disponível.
+Os baldes de dia seguem o fuso local do servidor.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.config import Config
+from app.utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+MINUTO = 60
+HORA = 3600
+DIA = 86400
+RESOLUCOES = {"minuto": MINUTO, "hora": HORA, "dia": DIA}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trechos (
+    condominio TEXT NOT NULL,
+    camera TEXT NOT NULL,
+    inicio REAL NOT NULL,
+    fim REAL NOT NULL,
+    online INTEGER NOT NULL,
+    PRIMARY KEY (condominio, camera, inicio)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS abertos (
+    condominio TEXT NOT NULL,
+    camera TEXT NOT NULL,
+    inicio REAL NOT NULL,
+    online INTEGER NOT NULL,
+    PRIMARY KEY (condominio, camera)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS agregados (
+    resolucao INTEGER NOT NULL,
+    condominio TEXT NOT NULL,
+    balde INTEGER NOT NULL,
+    camera TEXT NOT NULL,
+    segundos_on REAL NOT NULL DEFAULT 0,
+    segundos_off REAL NOT NULL DEFAULT 0,
+    transicoes INTEGER NOT NULL DEFAULT 0,
+    latencia_soma REAL NOT NULL DEFAULT 0,
+    latencias INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (resolucao, condominio, balde, camera)
+) WITHOUT ROWID;
+"""
+
+_SQL_SOMAR = """
+INSERT INTO agregados
+    (resolucao, condominio, balde, camera, segundos_on, segundos_off, transicoes, latencia_soma, latencias)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (resolucao, condominio, balde, camera) DO UPDATE SET
+    segundos_on = segundos_on + excluded.segundos_on,
+    segundos_off = segundos_off + excluded.segundos_off,
+    transicoes = transicoes + excluded.transicoes,
+    latencia_soma = latencia_soma + excluded.latencia_soma,
+    latencias = latencias + excluded.latencias
+"""
+
+# Índices da lista acumulada por balde
+_ON, _OFF, _TRANSICOES, _LATENCIA_SOMA, _LATENCIAS = range(5)
+
+
+def interpretar_periodo(texto: str) -> float:
+    """Converte "90s", "15m", "24h" ou "30d" em segundos (sem sufixo: segundos)"""
+    texto = texto.strip().lower()
+    multiplicador = {"s": 1, "m": MINUTO, "h": HORA, "d": DIA}.get(texto[-1:])
+    if multiplicador is None:
+        return float(texto)
+    return float(texto[:-1]) * multiplicador
+
+
+class _TrechoAberto:
+    """Estado atual de uma câmera e até onde o tempo já foi somado aos agregados"""
+
+    __slots__ = ("online", "inicio", "contabilizado_ate")
+
+    def __init__(self, online: bool, inicio: float):
+        self.online = online
+        self.inicio = inicio
+        self.contabilizado_ate = inicio
+
+
+class HistoricoCameras:
+    """Histórico de estados (trechos + agregados) em SQLite (thread-safe)"""
+
+    def __init__(self, caminho: Optional[str] = None):
+        """
+        Args:
+            caminho: Arquivo do banco (padrão Config.HISTORICO_PATH; ":memory:"
+                para testes)
+        """
+        self.caminho = caminho or Config.HISTORICO_PATH
+        if self.caminho != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.caminho)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        # Workers e dashboard podem abrir o mesmo arquivo: espera o lock em vez de falhar
+        self._conn = sqlite3.connect(
+            self.caminho, check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+        # Baldes de dia alinhados à meia-noite local
+        self._deslocamento = time.localtime().tm_gmtoff
+        self.retencao = {
+            MINUTO: Config.HISTORICO_RETENCAO_MINUTOS,
+            HORA: Config.HISTORICO_RETENCAO_HORAS,
+            DIA: Config.HISTORICO_RETENCAO_DIAS,
+        }
+
+        # Estado em memória (lock próprio - os workers não esperam pela gravação)
+        self._lock_memoria = threading.Lock()
+        self._abertos: Dict[Tuple[str, str], _TrechoAberto] = {}
+        # Câmeras cujo trecho aberto mudou (novo, transição ou fechado) desde a gravação
+        self._abertos_alterados: Set[Tuple[str, str]] = set()
+        # (resolução, condomínio, balde, câmera) -> [on, off, transições, soma latência, latências]
+        self._agregados: Dict[Tuple[int, str, int, str], List[float]] = {}
+        # (condomínio, câmera, início, fim, online) ainda não gravados
+        self._trechos: List[Tuple[str, str, float, float, int]] = []
+
+        self._thread: Optional[threading.Thread] = None
+        self._parar = threading.Event()
+        self._proxima_limpeza = 0.0
+        self.gravacoes = 0
+        self.ultima_gravacao: Dict[str, Any] = {}
+
+    def balde(self, instante: float, largura: int) -> int:
+        """Início do balde de `largura` segundos que contém o instante"""
+        return int((instante + self._deslocamento) // largura * largura) - self._deslocamento
+
+    def _acumulado(self, largura: int, condominio: str, balde: int, camera: str) -> List[float]:
+        chave = (largura, condominio, balde, camera)
+        acumulado = self._agregados.get(chave)
+        if acumulado is None:
+            acumulado = self._agregados[chave] = [0.0, 0.0, 0, 0.0, 0]
+        return acumulado
+
+    def _somar_tempo(self, condominio: str, camera: str, inicio: float, fim: float, online: bool):
+        """Distribui o tempo [inicio, fim) pelos baldes de cada resolução (lock de memória)"""
+        indice = _ON if online else _OFF
+        for largura in RESOLUCOES.values():
+            balde = self.balde(inicio, largura)
+            while balde < fim:
+                proximo = balde + largura
+                segundos = min(fim, proximo) - max(inicio, balde)
+                if segundos > 0:
+                    self._acumulado(largura, condominio, balde, camera)[indice] += segundos
+                balde = proximo
+
+    def registrar(
+        self,
+        condominio: str,
+        camera: str,
+        online: bool,
+        instante: Optional[float] = None,
+        latencia: Optional[float] = None,
+    ):
+        """
+        Registra o resultado de uma verificação real
+
+        Args:
+            latencia: Duração da requisição ao DVR em segundos (se houve resposta)
+        """
+        agora = instante if instante is not None else time.time()
+        chave = (condominio, camera)
+        with self._lock_memoria:
+            trecho = self._abertos.get(chave)
+            if trecho is None:
+                self._abertos[chave] = _TrechoAberto(online, agora)
+                self._abertos_alterados.add(chave)
+            elif trecho.online != online:
+                # Uma gravação concorrente pode ter somado até um instante posterior
+                agora = max(agora, trecho.contabilizado_ate)
+                self._somar_tempo(condominio, camera, trecho.contabilizado_ate, agora, trecho.online)
+                self._trechos.append((condominio, camera, trecho.inicio, agora, int(trecho.online)))
+                for largura in RESOLUCOES.values():
+                    self._acumulado(largura, condominio, self.balde(agora, largura), camera)[_TRANSICOES] += 1
+                trecho.online = online
+                trecho.inicio = trecho.contabilizado_ate = agora
+                self._abertos_alterados.add(chave)
+            if latencia is not None:
+                for largura in RESOLUCOES.values():
+                    acumulado = self._acumulado(largura, condominio, self.balde(agora, largura), camera)
+                    acumulado[_LATENCIA_SOMA] += latencia
+                    acumulado[_LATENCIAS] += 1
+
+    def remover(self, condominio: str, camera: str, instante: Optional[float] = None):
+        """Fecha o trecho de uma câmera que saiu do inventário"""
+        agora = instante if instante is not None else time.time()
+        with self._lock_memoria:
+            trecho = self._abertos.pop((condominio, camera), None)
+            if trecho is not None:
+                self._fechar_trecho(condominio, camera, trecho, agora)
+                self._abertos_alterados.add((condominio, camera))
+
+    def _fechar_trecho(self, condominio: str, camera: str, trecho: _TrechoAberto, agora: float):
+        if agora > trecho.contabilizado_ate:
+            self._somar_tempo(condominio, camera, trecho.contabilizado_ate, agora, trecho.online)
+        self._trechos.append((condominio, camera, trecho.inicio, agora, int(trecho.online)))
+
+    def descarregar(self, instante: Optional[float] = None, encerrar: bool = False):
+        """
+        Soma o tempo dos trechos abertos até agora e grava os agregados e os
+        trechos fechados (uma transação)
+
+        Args:
+            encerrar: Fecha também os trechos abertos (encerramento do processo;
+                o tempo até a próxima partida fica sem registro)
+        """
+        agora = instante if instante is not None else time.time()
+        inicio = time.time()
+        with self._lock_memoria:
+            for (condominio, camera), trecho in self._abertos.items():
+                if encerrar:
+                    self._fechar_trecho(condominio, camera, trecho, agora)
+                elif agora > trecho.contabilizado_ate:
+                    self._somar_tempo(condominio, camera, trecho.contabilizado_ate, agora, trecho.online)
+                    trecho.contabilizado_ate = agora
+            if encerrar:
+                self._abertos_alterados.update(self._abertos)
+                self._abertos.clear()
+            agregados, self._agregados = self._agregados, {}
+            trechos, self._trechos = self._trechos, []
+            alterados, self._abertos_alterados = self._abertos_alterados, set()
+            abertos, fechados = [], []
+            for chave in alterados:
+                trecho = self._abertos.get(chave)
+                if trecho is None:
+                    fechados.append(chave)
+                else:
+                    abertos.append(chave + (trecho.inicio, int(trecho.online)))
+
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    _SQL_SOMAR, (chave + tuple(valores) for chave, valores in agregados.items())
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO trechos (condominio, camera, inicio, fim, online) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    trechos,
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO abertos (condominio, camera, inicio, online) "
+                    "VALUES (?, ?, ?, ?)",
+                    abertos,
+                )
+                self._conn.executemany(
+                    "DELETE FROM abertos WHERE condominio = ? AND camera = ?", fechados
+                )
+                if agora >= self._proxima_limpeza:
+                    self._limpar(agora)
+                self._conn.execute("COMMIT")
+            except Exception:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                self._devolver(agregados, trechos, alterados)
+                raise
+            self.gravacoes += 1
+            self.ultima_gravacao = {
+                "gravado_em": inicio,
+                "duracao_ms": round((time.time() - inicio) * 1000, 1),
+                "agregados": len(agregados),
+                "trechos": len(trechos),
+            }
+
+    def _devolver(
+        self, agregados: Dict[Tuple, List[float]], trechos: List[Tuple], alterados: Set[Tuple]
+    ):
+        """Gravação falhou: devolve à memória o que foi retirado para a próxima tentativa"""
+        with self._lock_memoria:
+            self._abertos_alterados |= alterados
+            for chave, valores in agregados.items():
+                acumulado = self._agregados.get(chave)
+                if acumulado is None:
+                    self._agregados[chave] = valores
+                else:
+                    for indice, valor in enumerate(valores):
+                        acumulado[indice] += valor
+            self._trechos[:0] = trechos
+
+    def _limpar(self, agora: float):
+        """Remove o que passou da retenção (lock do banco adquirido, uma vez por hora)"""
+        self._proxima_limpeza = agora + HORA
+        for largura, retencao in self.retencao.items():
+            self._conn.execute(
+                "DELETE FROM agregados WHERE resolucao = ? AND balde < ?",
+                (largura, agora - retencao - largura),
+            )
+        self._conn.execute(
+            "DELETE FROM trechos WHERE fim < ?", (agora - Config.HISTORICO_RETENCAO_TRECHOS,)
+        )
+
+    def iniciar_gravacao(self, intervalo: Optional[float] = None):
+        """Inicia a thread que grava a cada intervalo (padrão Config.HISTORICO_INTERVALO_GRAVACAO)"""
+        intervalo = intervalo or Config.HISTORICO_INTERVALO_GRAVACAO
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        def executar():
+            while not self._parar.wait(intervalo):
+                try:
+                    self.descarregar()
+                except Exception as e:
+                    logger.error("Falha ao gravar o histórico das câmeras: %s", e)
+
+        self._thread = threading.Thread(target=executar, name="historico-cameras", daemon=True)
+        self._thread.start()
+
+    def _resolucao_disponivel(self, de: float, agora: float) -> int:
+        """Resolução mais fina cuja retenção ainda cobre o início da consulta"""
+        for largura in (MINUTO, HORA):
+            if agora - de <= self.retencao[largura]:
+                return largura
+        return DIA
+
+    def decompor(self, de: float, ate: float, agora: Optional[float] = None) -> List[Tuple[int, int, int]]:
+        """
+        Decompõe [de, ate) em faixas (resolução, balde inicial, balde final):
+        dias inteiros no meio, horas e minutos apenas nas bordas
+
+        As bordas são arredondadas para a resolução mais fina disponível.
+        """
+        agora = agora if agora is not None else time.time()
+        fina = self._resolucao_disponivel(de, agora)
+        de = self.balde(de, fina)
+        fim = self.balde(ate, fina)
+        ate = fim if fim >= ate else fim + fina
+        larguras = [largura for largura in (DIA, HORA, MINUTO) if largura >= fina]
+
+        faixas: List[Tuple[int, int, int]] = []
+
+        def dividir(inicio: int, fim: int, nivel: int):
+            if inicio >= fim:
+                return
+            largura = larguras[nivel]
+            if nivel == len(larguras) - 1:
+                faixas.append((largura, inicio, fim))
+                return
+            primeiro = self.balde(inicio, largura)
+            if primeiro < inicio:
+                primeiro += largura
+            ultimo = self.balde(fim, largura)
+            if primeiro < ultimo:
+                faixas.append((largura, primeiro, ultimo))
+                dividir(inicio, primeiro, nivel + 1)
+                dividir(ultimo, fim, nivel + 1)
+            else:
+                dividir(inicio, fim, nivel + 1)
+
+        dividir(de, ate, 0)
+        return faixas
+
+    @staticmethod
+    def _resumo(on: float, off: float, transicoes: int, latencia_soma: float, latencias: int, duracao: float):
+        observado = on + off
+        return {
+            "disponibilidade": round(on / observado * 100, 3) if observado else None,
+            "segundos_on": round(on, 1),
+            "segundos_off": round(off, 1),
+            # Fração do intervalo com estado conhecido (serviço parado = sem registro)
+            "cobertura": round(min(observado / duracao, 1.0) * 100, 1) if duracao > 0 else None,
+            "transicoes": int(transicoes),
+            "latencia_media_ms": round(latencia_soma / latencias * 1000, 1) if latencias else None,
+        }
+
+    def disponibilidade(
+        self,
+        condominio: str,
+        de: float,
+        ate: float,
+        camera: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Disponibilidade no intervalo [de, ate) por câmera e do condomínio
+        (somente o que já foi gravado - até HISTORICO_INTERVALO_GRAVACAO de atraso)
+
+        Returns:
+            {"de", "ate", "condominio": resumo, "cameras": {nome: resumo}}
+        """
+        totais: Dict[str, List[float]] = {}
+        filtro_camera = " AND camera = ?" if camera is not None else ""
+        with self._lock:
+            for largura, inicio, fim in self.decompor(de, ate):
+                parametros = [largura, condominio, inicio, fim]
+                if camera is not None:
+                    parametros.append(camera)
+                for linha in self._conn.execute(
+                    "SELECT camera, SUM(segundos_on), SUM(segundos_off), SUM(transicoes), "
+                    "SUM(latencia_soma), SUM(latencias) FROM agregados "
+                    "WHERE resolucao = ? AND condominio = ? AND balde >= ? AND balde < ?"
+                    + filtro_camera
+                    + " GROUP BY camera",
+                    parametros,
+                ):
+                    acumulado = totais.setdefault(linha[0], [0.0, 0.0, 0, 0.0, 0])
+                    for indice, valor in enumerate(linha[1:]):
+                        acumulado[indice] += valor
+
+        duracao = ate - de
+        geral = [sum(valores[indice] for valores in totais.values()) for indice in range(5)]
+        resumo_condominio = self._resumo(*geral, duracao * max(len(totais), 1))
+        return {
+            "de": de,
+            "ate": ate,
+            "condominio": resumo_condominio,
+            "cameras": {nome: self._resumo(*valores, duracao) for nome, valores in sorted(totais.items())},
+        }
+
+    def serie(
+        self,
+        condominio: str,
+        camera: str,
+        de: float,
+        ate: float,
+        resolucao: int,
+    ) -> List[Dict[str, Any]]:
+        """Baldes de uma resolução no intervalo (um item por balde com registro)"""
+        with self._lock:
+            linhas = self._conn.execute(
+                "SELECT balde, segundos_on, segundos_off, transicoes, latencia_soma, latencias "
+                "FROM agregados WHERE resolucao = ? AND condominio = ? AND balde >= ? AND balde < ? "
+                "AND camera = ? ORDER BY balde",
+                (resolucao, condominio, self.balde(de, resolucao), ate, camera),
+            ).fetchall()
+        return [{"inicio": balde, **self._resumo(*valores, resolucao)} for balde, *valores in linhas]
+
+    def trechos(
+        self,
+        condominio: str,
+        camera: str,
+        de: float,
+        ate: float,
+        limite: int = 500,
+    ) -> List[Dict[str, Any]]:
+        """Trechos ON/OFF que tocam o intervalo, incluindo o trecho atual (mais recentes primeiro)"""
+        with self._lock:
+            linhas = self._conn.execute(
+                "SELECT inicio, fim, online FROM trechos "
+                "WHERE condominio = ? AND camera = ? AND inicio < ? AND fim > ? "
+                "ORDER BY inicio DESC LIMIT ?",
+                (condominio, camera, ate, de, limite),
+            ).fetchall()
+        resultado = [
+            {"inicio": inicio, "fim": fim, "status": "ON" if online else "OFF"}
+            for inicio, fim, online in linhas
+        ]
+        chave = (condominio, camera)
+        with self._lock_memoria:
+            aberto = self._abertos.get(chave)
+            pendente = chave in self._abertos_alterados
+        if aberto is not None:
+            atual = (aberto.inicio, aberto.online)
+        elif pendente:
+            atual = None  # Fechado nesta memória e ainda não gravado
+        else:
+            # Trecho de outro processo (ou desta memória já gravado): o do banco
+            with self._lock:
+                atual = self._conn.execute(
+                    "SELECT inicio, online FROM abertos WHERE condominio = ? AND camera = ?", chave
+                ).fetchone()
+        if atual is not None and atual[0] < ate:
+            resultado.insert(0, {"inicio": atual[0], "fim": None, "status": "ON" if atual[1] else "OFF"})
+        return resultado[:limite]
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock_memoria:
+            abertos = len(self._abertos)
+            pendentes = len(self._agregados)
+        with self._lock:
+            return {
+                "cameras": abertos,
+                "agregados_pendentes": pendentes,
+                "gravacoes": self.gravacoes,
+                **self.ultima_gravacao,
+            }
+
+    def fechar(self):
+        """Fecha os trechos abertos, grava o pendente e fecha o banco"""
+        if self._parar.is_set():
+            return
+        self._parar.set()
+        try:
+            self.descarregar(encerrar=True)
+        finally:
+            with self._lock:
+                self._conn.close()
@@ -0,0 +1,302 @@
+"""
+Módulo responsável pelo inventário de câmeras monitoradas (banco MySQL)
+
+O conjunto de câmeras fica em memória e é atualizado por detecção de
+mudanças: uma consulta leve (contagem, maior INVENTARIO_COLUNA_VERSAO e soma
+dos CRC32 das chaves de cada tabela) decide se algo mudou; havendo mudança,
+só as linhas alteradas desde a última marca d'água são lidas. A consulta
+completa (JOIN das três tabelas com o filtro servicos LIKE '%on_off%') fica
+para a carga inicial, para exclusões e para a recarga periódica de segurança.
+A soma das chaves denuncia uma exclusão compensada por inclusão (mesma
+contagem); exclusões com um saldo maior de inclusões no mesmo intervalo só
+são vistas na recarga periódica.
+"""
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import pymysql
+from pymysql.constants import ER
+
+from app.config import Config
+from app.utils.logger import get_logger
+from app.utils.metrics import registro
+from .camera_target import CHAVE_ALVO, montar_alvos
+from .db_pool import get_pool
+
+
+logger = get_logger(__name__)
+
+CARGA_DURACAO = registro.histograma(
+    "inventario_carga_duracao_segundos",
+    "Duração da leitura do inventário de câmeras no MySQL",
+    ("tipo",),
+)
+CAMERAS_INVENTARIO = registro.medidor(
+    "inventario_cameras", "Câmeras monitoradas no inventário em memória"
+)
+
+
+# (tabela, alias na consulta, chave da linha na soma de CRC32 da impressão)
+_TABELAS = (
+    ("dispositivos", "d", "id"),
+    (
+        "pontos_monitoramento",
+        "c",
+        "CONCAT_WS(':', dispositivo_id, canal_fisico, numero_setor, uuid_camera)",
+    ),
+    ("clientes", "cli", "codigo_moni"),
+)
+
+_SQL_BASE = """
+SELECT
+    d.id AS dispositivo_id, d.ip AS dvr_ip, d.porta AS dvr_porta,
+    d.usuario AS dvr_usuario, d.senha AS dvr_senha,
+    d.tipo_dispositivo AS dvr_tipo, d.marca AS dvr_marca, d.servicos AS dvr_servicos,
+    c.uuid_camera, c.canal_fisico, c.numero_setor, c.complemento,
+    cli.nome AS cliente_nome, cli.empresa_id, cli.codigo_moni
+FROM dispositivos d
+JOIN pontos_monitoramento c ON d.id = c.dispositivo_id
+JOIN clientes cli ON d.codigo_moni = cli.codigo_moni
+"""
+
+
+def _monitorado(row: Dict[str, Any]) -> bool:
+    """Mesmo critério do filtro servicos LIKE '%on_off%'"""
+    return "on_off" in (row.get("dvr_servicos") or "")
+
+
+def _chave_linha(row: Dict[str, Any]) -> Tuple:
+    if row.get("uuid_camera"):
+        return ("uuid", row["uuid_camera"])
+    return (row["dispositivo_id"], row.get("canal_fisico"), row.get("numero_setor"))
+
+
+def _nome_cliente(row: Dict[str, Any]) -> str:
+    return row["cliente_nome"] or f"Cliente_{row['codigo_moni']}"
+
+
+def montar_camera(row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Converte uma linha do banco no dicionário de câmera usado na verificação"""
+    # Using the rule: append 01 after the channel
+    base_channel = row["canal_fisico"]
+    if base_channel is None:
+        base_channel = row["numero_setor"]
+    if base_channel is None:
+        return None  # Skip if no channel information is available
+
+    canal_convertido = f"{base_channel}01"
+
+    # Protocol logic
+    marca = str(row["dvr_marca"]).lower() if row["dvr_marca"] else ""
+    protocol = "intelbras" if "intelbras" in marca else "hikvision"
+
+    # Determine camera name
+    cam_name = row["complemento"]
+    if not cam_name:
+        cam_name = f"Camera {base_channel}"
+
+    return {
+        "name": cam_name,
+        "canal": canal_convertido,
+        "channel": canal_convertido,  # verification_service checks both
+        "_dvr_ip": row["dvr_ip"],
+        "_dvr_porta": row["dvr_porta"] or 80,
+        "_dvr_usuario": row["dvr_usuario"] or "admin",
+        "_dvr_senha": row["dvr_senha"] or "admin",
+        "_dvr_protocol": protocol,
+        "uuid": row["uuid_camera"],
+    }
+
+
+class InventarioDispositivos:
+    """Inventário em memória das câmeras com serviço on_off"""
+
+    def __init__(self, coluna_versao: Optional[str] = None):
+        self.coluna_versao = coluna_versao or Config.INVENTARIO_COLUNA_VERSAO
+        self._lock = threading.Lock()
+        # chave da linha -> (cliente, metadata, câmera)
+        self._linhas: Dict[Tuple, Tuple[str, Dict[str, Any], Dict[str, Any]]] = {}
+        self._clientes_data: List[Tuple[str, Dict[str, Any]]] = []
+        self._impressao: Optional[Tuple] = None
+        self._ultima_completa = 0.0
+        self.versao = 0
+        self.ultima_sincronizacao: Dict[str, Any] = {}
+
+    def carregar(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Retorna a lista (cliente_nome, data) atualizada
+
+        Sem mudanças no banco a mesma lista (mesmo objeto) é retornada; em
+        caso de erro mantém o último inventário conhecido.
+        """
+        with self._lock:
+            inicio = time.time()
+            try:
+                # Conexões do pool usam autocommit - cada consulta vê os dados atuais
+                with get_pool().conexao() as connection, connection.cursor() as cursor:
+                    tipo, linhas = self._sincronizar(cursor)
+            except Exception as e:
+                logger.error("Exception while fetching alert devices: %s", e)
+                CARGA_DURACAO.observar(time.time() - inicio, tipo="erro")
+                return self._clientes_data
+
+            CARGA_DURACAO.observar(time.time() - inicio, tipo=tipo)
+            CAMERAS_INVENTARIO.definir(len(self._linhas))
+            self.ultima_sincronizacao = {
+                "tipo": tipo,
+                "linhas_lidas": linhas,
+                "cameras": len(self._linhas),
+                "duracao_ms": round((time.time() - inicio) * 1000, 1),
+                "versao": self.versao,
+            }
+            if tipo != "sem_mudanca":
+                logger.info(
+                    "Inventário: sincronização %s - %d linhas lidas, %d câmeras (%s ms)",
+                    tipo,
+                    linhas,
+                    len(self._linhas),
+                    self.ultima_sincronizacao["duracao_ms"],
+                )
+            return self._clientes_data
+
+    def _sincronizar(self, cursor) -> Tuple[str, int]:
+        impressao = None
+        if self.coluna_versao:
+            try:
+                impressao = self._ler_impressao(cursor)
+            except pymysql.MySQLError as e:
+                if not e.args or e.args[0] != ER.BAD_FIELD_ERROR:
+                    raise  # Falha de conexão etc.: mantém o inventário atual
+                # Coluna de versão inexistente - desativa o modo incremental
+                logger.warning(
+                    "Inventário sem coluna %r (%s) - usando apenas a consulta completa",
+                    self.coluna_versao,
+                    e,
+                )
+                self.coluna_versao = None
+
+        agora = time.time()
+        recarga_vencida = agora - self._ultima_completa >= Config.INVENTARIO_RECARGA_COMPLETA
+        if impressao is None or self._impressao is None or recarga_vencida:
+            linhas = self._carga_completa(cursor)
+            self._impressao = impressao
+            return "completa", linhas
+
+        if impressao == self._impressao:
+            return "sem_mudanca", 0
+
+        # Menos linhas, ou as mesmas em quantidade com outras chaves (exclusão + inclusão)
+        excluiu = any(
+            contagem < anterior or (contagem == anterior and chaves != chaves_anteriores)
+            for contagem, anterior, chaves, chaves_anteriores in zip(
+                impressao[0::3], self._impressao[0::3], impressao[2::3], self._impressao[2::3]
+            )
+        )
+        if excluiu:
+            # Exclusões não aparecem na marca d'água - recarrega tudo
+            linhas = self._carga_completa(cursor)
+            self._impressao = impressao
+            return "completa", linhas
+
+        linhas = self._carga_delta(cursor)
+        self._impressao = impressao
+        return "delta", linhas
+
+    def _ler_impressao(self, cursor) -> Tuple:
+        """(contagem, maior versão, soma dos CRC32 das chaves) de cada tabela em uma única consulta"""
+        colunas = []
+        for tabela, _, chave in _TABELAS:
+            colunas.append(f"(SELECT COUNT(*) FROM {tabela})")
+            colunas.append(f"(SELECT MAX({self.coluna_versao}) FROM {tabela})")
+            colunas.append(f"(SELECT COALESCE(SUM(CRC32({chave})), 0) FROM {tabela})")
+        cursor.execute("SELECT " + ", ".join(colunas))
+        linha = cursor.fetchone()
+        return tuple(linha.values()) if isinstance(linha, dict) else tuple(linha)
+
+    def _marca_atual(self):
+        if self._impressao is None:
+            return None
+        versoes = [v for v in self._impressao[1::3] if v is not None]
+        return max(versoes) if versoes else None
+
+    def _carga_completa(self, cursor) -> int:
+        cursor.execute(_SQL_BASE + "WHERE d.servicos LIKE '%on_off%'")
+        resultados = cursor.fetchall()
+        linhas = {}
+        for row in resultados:
+            cam = montar_camera(row)
+            if cam is None:
+                continue
+            linhas[_chave_linha(row)] = self._entrada(row, cam)
+        self._linhas = linhas
+        self._ultima_completa = time.time()
+        self._publicar()
+        return len(resultados)
+
+    def _carga_delta(self, cursor) -> int:
+        marca = self._marca_atual()
+        if marca is None:
+            return self._carga_completa(cursor)
+        # >= : linhas alteradas no mesmo instante da marca são relidas (upsert idempotente)
+        filtro = " OR ".join(f"{alias}.{self.coluna_versao} >= %s" for _, alias, _ in _TABELAS)
+        cursor.execute(_SQL_BASE + "WHERE " + filtro, (marca,) * len(_TABELAS))
+        resultados = cursor.fetchall()
+
+        alteradas = 0
+        for row in resultados:
+            chave = _chave_linha(row)
+            cam = montar_camera(row) if _monitorado(row) else None
+            if cam is None:
+                alteradas += self._linhas.pop(chave, None) is not None
+                continue
+            anterior = self._linhas.get(chave)
+            entrada = self._entrada(row, cam)
+            if (
+                anterior is None
+                or anterior[0] != entrada[0]
+                or anterior[1] != entrada[1]
+                or {k: v for k, v in anterior[2].items() if k != CHAVE_ALVO} != cam
+            ):
+                self._linhas[chave] = entrada
+                alteradas += 1
+
+        if alteradas:
+            self._publicar()
+        return len(resultados)
+
+    @staticmethod
+    def _entrada(row: Dict[str, Any], cam: Dict[str, Any]):
+        metadata = {
+            "empresa": row["empresa_id"] or "",
+            "codigo_moni": row["codigo_moni"] or "",
+            "origem": "banco_de_dados",
+        }
+        return _nome_cliente(row), metadata, cam
+
+    def _publicar(self):
+        """
+        Reagrupa as câmeras por cliente (nova lista - nova versão) e monta o
+        descritor das câmeras novas ou alteradas (CameraTarget)
+        """
+        clientes: Dict[str, Dict[str, Any]] = {}
+        for cliente, metadata, cam in self._linhas.values():
+            if cliente not in clientes:
+                clientes[cliente] = {"metadata": metadata, "cameras": []}
+            clientes[cliente]["cameras"].append(cam)
+        self._clientes_data = list(clientes.items())
+        montar_alvos(self._clientes_data)
+        self.versao += 1
+
+
+_inventario: Optional[InventarioDispositivos] = None
+_inventario_lock = threading.Lock()
+
+
+def get_inventario() -> InventarioDispositivos:
+    """Inventário compartilhado do processo"""
+    global _inventario
+    with _inventario_lock:
+        if _inventario is None:
+            _inventario = InventarioDispositivos()
+        return _inventario
@@ -0,0 +1,95 @@
+"""
+Módulo responsável pelo mapa de portas RTSP descobertas por host
+
+Quando a porta informada de uma câmera não responde, o CameraValidator
+procura uma porta alternativa; a porta que funcionou fica gravada aqui
+(SQLite) e as próximas verificações do host vão direto a ela. A entrada só é
+removida quando a porta lembrada falha.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from app.config import Config
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS portas (
+    host TEXT PRIMARY KEY,
+    porta INTEGER NOT NULL,
+    confirmada_em REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class MapaPortas:
+    """host -> porta RTSP que funcionou (em memória, gravado a cada alteração)"""
+
+    def __init__(self, caminho: Optional[str] = None):
+        """
+        Args:
+            caminho: Arquivo do banco (padrão Config.RTSP_MAPA_PORTAS_PATH;
+                ":memory:" para testes)
+        """
+        self.caminho = caminho or Config.RTSP_MAPA_PORTAS_PATH
+        if self.caminho != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.caminho)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.caminho, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._portas: Dict[str, int] = dict(self._conn.execute("SELECT host, porta FROM portas"))
+        self.acertos = 0
+        self.invalidacoes = 0
+
+    def obter(self, host: str) -> Optional[int]:
+        with self._lock:
+            return self._portas.get(host)
+
+    def registrar(self, host: str, porta: int):
+        """Guarda a porta que funcionou (não grava se já era a lembrada)"""
+        with self._lock:
+            if self._portas.get(host) == porta:
+                self.acertos += 1
+                return
+            self._portas[host] = porta
+            self._conn.execute(
+                "INSERT OR REPLACE INTO portas (host, porta, confirmada_em) VALUES (?, ?, ?)",
+                (host, porta, time.time()),
+            )
+
+    def invalidar(self, host: str):
+        """Esquece a porta do host (ela falhou)"""
+        with self._lock:
+            if self._portas.pop(host, None) is None:
+                return
+            self.invalidacoes += 1
+            self._conn.execute("DELETE FROM portas WHERE host = ?", (host,))
+
+    def estatisticas(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hosts": len(self._portas),
+                "acertos": self.acertos,
+                "invalidacoes": self.invalidacoes,
+            }
+
+    def fechar(self):
+        with self._lock:
+            self._conn.close()
+
+
+_mapa: Optional[MapaPortas] = None
+_mapa_lock = threading.Lock()
+
+
+def get_mapa_portas() -> MapaPortas:
+    """Mapa de portas compartilhado do processo"""
+    global _mapa
+    with _mapa_lock:
+        if _mapa is None:
+            _mapa = MapaPortas()
+        return _mapa
@@ -0,0 +1,277 @@
+"""
+Módulo responsável pela coordenação dos processos de verificação fragmentada
+
+Os DVRs são divididos em SHARD_FATIAS fatias fixas (hash consistente da
+chave ip:porta, ver app.services.sharding) e cada fatia é verificada por um
+único processo, dono de um arrendamento com prazo gravado em SQLite (modo
+WAL; toda alteração em transação BEGIN IMMEDIATE):
+
+- membros: processos vivos, com as estatísticas que cada um publica; a cota
+  de cada processo é ceil(fatias / membros vivos)
+- arrendamentos: dono e vencimento de cada fatia. O dono renova as suas;
+  fatias acima da cota são liberadas (sem dono, tomáveis após
+  SHARD_CARENCIA - tempo para as verificações em andamento terminarem) e
+  fatias livres ou vencidas são tomadas por quem está abaixo da cota. O dono
+  só verifica a fatia até SHARD_MARGEM antes do vencimento que ele mesmo
+  gravou: sem renovação, para antes que outro processo possa tomá-la.
+- estados: último status de cada câmera publicado pelo dono, com uma
+  sequência global. O processo do dashboard lê apenas o que mudou desde a
+  última sequência lida, e o novo dono de uma fatia herda daqui o último
+  estado das câmeras (alertas de transição sem repetir nem perder eventos).
+"""
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.config import Config
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS membros (
+    dono TEXT PRIMARY KEY,
+    visto_em REAL NOT NULL,
+    estatisticas TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS arrendamentos (
+    fatia INTEGER PRIMARY KEY,
+    dono TEXT NOT NULL,
+    expira_em REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS estados (
+    condominio TEXT NOT NULL,
+    nome TEXT NOT NULL,
+    fatia INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    verificado_em REAL NOT NULL,
+    seq INTEGER NOT NULL,
+    PRIMARY KEY (condominio, nome)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS estados_seq ON estados (seq);
+CREATE INDEX IF NOT EXISTS estados_fatia ON estados (fatia);
+"""
+
+# Dono de uma fatia liberada (ninguém)
+LIVRE = ""
+
+
+class CoordenacaoFragmentos:
+    """Arrendamentos, membros e estados compartilhados pelos processos (thread-safe)"""
+
+    def __init__(
+        self,
+        caminho: Optional[str] = None,
+        fatias: Optional[int] = None,
+        arrendamento: Optional[float] = None,
+    ):
+        """
+        Args:
+            caminho: Arquivo do banco (padrão Config.SHARD_COORDENACAO_PATH;
+                ":memory:" para testes com um único processo)
+        """
+        self.caminho = caminho or Config.SHARD_COORDENACAO_PATH
+        self.fatias = max(1, fatias or Config.SHARD_FATIAS)
+        self.arrendamento = arrendamento or Config.SHARD_ARRENDAMENTO
+        if self.caminho != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.caminho)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        # Os processos disputam o bloqueio de escrita: espera em vez de falhar
+        self._conn = sqlite3.connect(
+            self.caminho, check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    @contextlib.contextmanager
+    def _transacao(self):
+        """Transação de escrita (lock do objeto adquirido)"""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._conn
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def anunciar(self, donos: Iterable[str]):
+        """
+        Registra processos que ainda vão iniciar: a primeira renovação de
+        cada um já considera todos na cota, sem um tomar todas as fatias
+        """
+        agora = time.time()
+        with self._lock, self._transacao() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO membros (dono, visto_em) VALUES (?, ?)",
+                [(dono, agora) for dono in donos],
+            )
+
+    def renovar(
+        self, dono: str, estatisticas: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Set[int], float]:
+        """
+        Renova a presença e os arrendamentos do processo, libera as fatias
+        acima da cota e toma fatias livres ou vencidas até completá-la
+
+        Returns:
+            (fatias arrendadas, vencimento gravado - epoch)
+        """
+        agora = time.time()
+        expira_em = agora + self.arrendamento
+        with self._lock, self._transacao() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO membros (dono, visto_em, estatisticas) VALUES (?, ?, ?)",
+                (dono, agora, json.dumps(estatisticas, ensure_ascii=False) if estatisticas else None),
+            )
+            conn.execute("DELETE FROM membros WHERE visto_em < ?", (agora - self.arrendamento,))
+            vivos = conn.execute("SELECT COUNT(*) FROM membros").fetchone()[0]
+            cota = -(-self.fatias // max(1, vivos))
+
+            proprias = [
+                fatia
+                for (fatia,) in conn.execute(
+                    "SELECT fatia FROM arrendamentos WHERE dono = ? AND fatia < ? ORDER BY fatia",
+                    (dono, self.fatias),
+                )
+            ]
+            mantidas, excedentes = proprias[:cota], proprias[cota:]
+            if excedentes:
+                conn.executemany(
+                    "UPDATE arrendamentos SET dono = ?, expira_em = MIN(expira_em, ?) WHERE fatia = ?",
+                    [(LIVRE, agora + Config.SHARD_CARENCIA, fatia) for fatia in excedentes],
+                )
+            conn.executemany(
+                "UPDATE arrendamentos SET expira_em = ? WHERE fatia = ?",
+                [(expira_em, fatia) for fatia in mantidas],
+            )
+
+            tomadas: List[int] = []
+            if len(mantidas) < cota:
+                ocupadas = {
+                    fatia
+                    for (fatia,) in conn.execute(
+                        "SELECT fatia FROM arrendamentos WHERE expira_em > ?", (agora,)
+                    )
+                }
+                livres = [fatia for fatia in range(self.fatias) if fatia not in ocupadas]
+                tomadas = livres[: cota - len(mantidas)]
+                conn.executemany(
+                    "INSERT OR REPLACE INTO arrendamentos (fatia, dono, expira_em) VALUES (?, ?, ?)",
+                    [(fatia, dono, expira_em) for fatia in tomadas],
+                )
+        return set(mantidas) | set(tomadas), expira_em
+
+    def liberar(self, dono: str):
+        """Encerramento do processo: fatias livres na hora e saída dos membros"""
+        with self._lock, self._transacao() as conn:
+            conn.execute(
+                "UPDATE arrendamentos SET dono = ?, expira_em = ? WHERE dono = ?",
+                (LIVRE, time.time(), dono),
+            )
+            conn.execute("DELETE FROM membros WHERE dono = ?", (dono,))
+
+    def publicar_estados(self, itens: List[Tuple[str, str, int, str, float]]):
+        """
+        Grava o último status de câmeras (condomínio, nome, fatia, status,
+        verificado_em), numeradas após a maior sequência existente
+        """
+        if not itens:
+            return
+        with self._lock, self._transacao() as conn:
+            seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM estados").fetchone()[0]
+            conn.executemany(
+                "INSERT OR REPLACE INTO estados "
+                "(condominio, nome, fatia, status, verificado_em, seq) VALUES (?, ?, ?, ?, ?, ?)",
+                [item + (seq + numero,) for numero, item in enumerate(itens, 1)],
+            )
+
+    def alteracoes_desde(self, seq: int) -> Tuple[List[Tuple[str, str, str]], int]:
+        """
+        Status gravados após a sequência `seq`, na ordem de gravação
+
+        Returns:
+            ([(condomínio, nome, status)], última sequência lida)
+        """
+        with self._lock:
+            linhas = self._conn.execute(
+                "SELECT condominio, nome, status, seq FROM estados WHERE seq > ? ORDER BY seq",
+                (seq,),
+            ).fetchall()
+        if not linhas:
+            return [], seq
+        return [linha[:3] for linha in linhas], linhas[-1][3]
+
+    def estados_das_fatias(self, fatias: Iterable[int]) -> List[Tuple[str, str, str, float]]:
+        """Último (condomínio, nome, status, verificado_em) das câmeras das fatias"""
+        fatias = list(fatias)
+        if not fatias:
+            return []
+        with self._lock:
+            return self._conn.execute(
+                "SELECT condominio, nome, status, verificado_em FROM estados "
+                f"WHERE fatia IN ({', '.join('?' * len(fatias))})",
+                fatias,
+            ).fetchall()
+
+    def remover_estados_ausentes(self, cameras: Set[Tuple[str, str]]) -> int:
+        """
+        Remove os estados de câmeras que saíram do inventário
+
+        Returns:
+            Quantidade removida
+        """
+        with self._lock:
+            ausentes = [
+                chave
+                for chave in self._conn.execute("SELECT condominio, nome FROM estados")
+                if chave not in cameras
+            ]
+            if ausentes:
+                with self._transacao() as conn:
+                    conn.executemany(
+                        "DELETE FROM estados WHERE condominio = ? AND nome = ?", ausentes
+                    )
+        return len(ausentes)
+
+    def membros(self) -> List[Dict[str, Any]]:
+        """Processos vivos, fatias arrendadas e estatísticas publicadas por cada um"""
+        agora = time.time()
+        with self._lock:
+            fatias = dict(
+                self._conn.execute(
+                    "SELECT dono, COUNT(*) FROM arrendamentos "
+                    "WHERE dono != ? AND expira_em > ? GROUP BY dono",
+                    (LIVRE, agora),
+                )
+            )
+            linhas = self._conn.execute(
+                "SELECT dono, visto_em, estatisticas FROM membros WHERE visto_em >= ? ORDER BY dono",
+                (agora - self.arrendamento,),
+            ).fetchall()
+        return [
+            {
+                "dono": dono,
+                "visto_ha_s": round(agora - visto_em, 1),
+                "fatias": fatias.get(dono, 0),
+                "estatisticas": json.loads(estatisticas) if estatisticas else {},
+            }
+            for dono, visto_em, estatisticas in linhas
+        ]
+
+    def estatisticas(self) -> Dict[str, int]:
+        agora = time.time()
+        with self._lock:
+            arrendadas = self._conn.execute(
+                "SELECT COUNT(*) FROM arrendamentos WHERE dono != ? AND expira_em > ? AND fatia < ?",
+                (LIVRE, agora, self.fatias),
+            ).fetchone()[0]
+            cameras = self._conn.execute("SELECT COUNT(*) FROM estados").fetchone()[0]
+        return {"fatias": self.fatias, "arrendadas": arrendadas, "cameras": cameras}
+
+    def fechar(self):
+        with self._lock:
+            self._conn.close()
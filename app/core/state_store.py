@@ -0,0 +1,203 @@
+"""
+Módulo responsável pela persistência do último estado conhecido das câmeras
+
+Grava periodicamente, em SQLite (modo WAL), um retrato compacto do estado
+mantido em memória pelo VerificationService: o status publicado no dashboard
+(o próprio JSON já serializado do snapshot), o último estado ON/OFF e o
+horário da última verificação real de cada câmera, os contadores de falhas
+consecutivas e as entradas do cache de verificação. Na partida o retrato é
+carregado: o dashboard já abre com o último status conhecido, os alertas de
+transição são calculados contra o estado anterior ao reinício e o agendador
+prioriza as câmeras que estavam OFF ou cuja verificação está vencida.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.config import Config
+from app.utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS status (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    versao INTEGER NOT NULL,
+    corpo BLOB NOT NULL,
+    gravado_em REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cameras (
+    chave TEXT PRIMARY KEY,
+    online INTEGER,
+    verificado_em REAL,
+    falhas INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS cache (
+    chave TEXT PRIMARY KEY,
+    online INTEGER NOT NULL,
+    verificado_em REAL NOT NULL,
+    chave_falhas TEXT
+) WITHOUT ROWID;
+"""
+
+
+class EstadoCamera:
+    """Último estado conhecido de uma câmera (chave condomínio_nome)"""
+
+    __slots__ = ("online", "verificado_em", "falhas")
+
+    def __init__(self, online: Optional[bool], verificado_em: Optional[float], falhas: int = 0):
+        self.online = online
+        self.verificado_em = verificado_em
+        self.falhas = falhas
+
+
+class RetratoEstado:
+    """Estado completo gravado em um instante"""
+
+    def __init__(
+        self,
+        status: Optional[Dict[str, Any]] = None,
+        cameras: Optional[Dict[str, EstadoCamera]] = None,
+        cache: Optional[List[Tuple[str, bool, float, Optional[str]]]] = None,
+        gravado_em: Optional[float] = None,
+    ):
+        # Dados do snapshot de status ({condomínio: {"cameras", "metadata"}})
+        self.status = status or {}
+        self.cameras = cameras or {}
+        # (chave_cache, online, verificado_em, chave_falhas)
+        self.cache = cache or []
+        self.gravado_em = gravado_em
+
+
+class EstadoPersistente:
+    """Retrato do estado das câmeras em SQLite (thread-safe)"""
+
+    def __init__(self, caminho: Optional[str] = None):
+        """
+        Args:
+            caminho: Arquivo do banco (padrão Config.ESTADO_PATH; ":memory:"
+                para testes)
+        """
+        self.caminho = caminho or Config.ESTADO_PATH
+        if self.caminho != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.caminho)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.caminho, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+        self._thread: Optional[threading.Thread] = None
+        self._parar = threading.Event()
+        self.gravacoes = 0
+        self.ultima_gravacao: Dict[str, Any] = {}
+
+    def gravar(
+        self,
+        versao: int,
+        corpo_status: bytes,
+        cameras: Iterable[Tuple[str, Optional[bool], Optional[float], int]],
+        cache: Iterable[Tuple[str, bool, float, Optional[str]]],
+    ):
+        """
+        Substitui o retrato gravado (uma transação - quem lê nunca vê um
+        retrato pela metade)
+
+        Args:
+            corpo_status: JSON do snapshot de status (SnapshotStatus.corpo)
+            cameras: (chave, online, verificado_em, falhas consecutivas)
+            cache: (chave_cache, online, verificado_em, chave_falhas)
+        """
+        inicio = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO status (id, versao, corpo, gravado_em) VALUES (1, ?, ?, ?)",
+                    (versao, corpo_status, inicio),
+                )
+                self._conn.execute("DELETE FROM cameras")
+                self._conn.executemany(
+                    "INSERT INTO cameras (chave, online, verificado_em, falhas) VALUES (?, ?, ?, ?)",
+                    cameras,
+                )
+                self._conn.execute("DELETE FROM cache")
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO cache (chave, online, verificado_em, chave_falhas) "
+                    "VALUES (?, ?, ?, ?)",
+                    cache,
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.gravacoes += 1
+            self.ultima_gravacao = {
+                "gravado_em": inicio,
+                "duracao_ms": round((time.time() - inicio) * 1000, 1),
+                "versao": versao,
+            }
+
+    def carregar(self, idade_maxima: Optional[float] = None) -> Optional[RetratoEstado]:
+        """
+        Lê o último retrato gravado
+
+        Returns:
+            None se não há retrato ou se ele é mais antigo que idade_maxima
+            (padrão Config.ESTADO_IDADE_MAXIMA)
+        """
+        idade_maxima = idade_maxima if idade_maxima is not None else Config.ESTADO_IDADE_MAXIMA
+        with self._lock:
+            linha = self._conn.execute("SELECT corpo, gravado_em FROM status WHERE id = 1").fetchone()
+            if linha is None:
+                return None
+            corpo, gravado_em = linha
+            if idade_maxima and time.time() - gravado_em > idade_maxima:
+                return None
+            cameras = {
+                chave: EstadoCamera(None if online is None else bool(online), verificado_em, falhas)
+                for chave, online, verificado_em, falhas in self._conn.execute(
+                    "SELECT chave, online, verificado_em, falhas FROM cameras"
+                )
+            }
+            cache = [
+                (chave, bool(online), verificado_em, chave_falhas)
+                for chave, online, verificado_em, chave_falhas in self._conn.execute(
+                    "SELECT chave, online, verificado_em, chave_falhas FROM cache"
+                )
+            ]
+        return RetratoEstado(json.loads(corpo), cameras, cache, gravado_em)
+
+    def iniciar_gravacao(self, gravar: Callable[[], None], intervalo: Optional[float] = None):
+        """
+        Inicia a thread que chama `gravar` a cada intervalo (padrão
+        Config.ESTADO_INTERVALO_GRAVACAO)
+        """
+        intervalo = intervalo or Config.ESTADO_INTERVALO_GRAVACAO
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        def executar():
+            while not self._parar.wait(intervalo):
+                try:
+                    gravar()
+                except Exception as e:
+                    logger.error("Falha ao gravar o estado das câmeras: %s", e)
+
+        self._thread = threading.Thread(target=executar, name="estado-cameras", daemon=True)
+        self._thread.start()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"gravacoes": self.gravacoes, **self.ultima_gravacao}
+
+    def fechar(self):
+        self._parar.set()
+        with self._lock:
+            self._conn.close()
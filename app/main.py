@@ -1,12 +1,30 @@
-from flask import Flask, jsonify, render_template, request, redirect, url_for, session
+from flask import (
+    Flask,
+    Response,
+    jsonify,
+    render_template,
+    request,
+    redirect,
+    stream_with_context,
+    url_for,
+    session,
+)
 from datetime import timedelta
+import json
 import os
+import queue
 import time
 import threading
 import concurrent.futures
 
 from app.config import Config
+from app.utils.logger import configurar_logging, get_logger
 from app.services.verification_service import VerificationService
+from app.utils.metrics import registro
+
+# Fila + thread de escrita antes de qualquer serviço começar a registrar
+configurar_logging()
+logger = get_logger(__name__)
 
 app = Flask(
     __name__, template_folder=Config.TEMPLATES_DIR, static_folder=Config.STATIC_DIR
@@ -16,8 +34,17 @@ app.permanent_session_lifetime = timedelta(minutes=Config.PERMANENT_SESSION_LIFE
 
 USUARIO = Config.USUARIO
 SENHA = Config.SENHA
+if Config.SHARD_PROCESSOS > 0:
+    # Só os processos de verificação gravam o histórico; o dashboard consulta
+    Config.HISTORICO_GRAVAR = False
 verification_service = VerificationService()
 
+CICLO_DURACAO = registro.histograma(
+    "verificacao_ciclo_duracao_segundos",
+    "Duração da varredura completa de todas as câmeras",
+    faixas=(10, 30, 60, 120, 300, 600, 900, 1200, 1800, 3600),
+)
+
 
 def login_obrigatorio(f):
     from functools import wraps
@@ -58,52 +85,86 @@ def processar_condominio_db(cliente_nome, data):
         verification_service.verificar_cameras(cameras, cliente_nome, config_global)
         return True
     except Exception as e:
-        print(f"[ERRO] Falha ao processar {cliente_nome}: {e}")
+        logger.error("Falha ao processar %s: %s", cliente_nome, e)
         return False
 
 
+def processar_condominios_threads(clientes_data):
+    max_workers = (
+        min(len(clientes_data), getattr(Config, "MAX_WORKERS_CONDOMINIOS", 3)) or 1
+    )
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                processar_condominio_db,
+                cliente_nome,
+                data,
+            )
+            for cliente_nome, data in clientes_data
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                logger.error("Erro ao processar condomínio: %s", e)
+
+
 def loop_verificacao():
     from app.core.database import get_alert_devices
     while True:
+        tempo_inicio = None
         try:
             clientes_data = get_alert_devices()
             if not clientes_data:
-                print("[AVISO] Nenhum dispositivo para alerta encontrado no banco de dados.")
+                logger.warning("Nenhum dispositivo para alerta encontrado no banco de dados.")
                 time.sleep(Config.INTERVALO_VERIFICACAO)
                 continue
 
-            print(f"[INFO] Iniciando verificação de {len(clientes_data)} condomínios (DB)...")
+            logger.info("Iniciando verificação de %d condomínios (DB)...", len(clientes_data))
             tempo_inicio = time.time()
+            verification_service.iniciar_ciclo()
 
-            max_workers = (
-                min(len(clientes_data), getattr(Config, "MAX_WORKERS_CONDOMINIOS", 3)) or 1
-            )
-            with concurrent.futures.ThreadPoolExecutor(
-                max_workers=max_workers
-            ) as executor:
-                futures = [
-                    executor.submit(
-                        processar_condominio_db,
-                        cliente_nome,
-                        data,
-                    )
-                    for cliente_nome, data in clientes_data
-                ]
-                for future in concurrent.futures.as_completed(futures):
-                    try:
-                        future.result()
-                    except Exception as e:
-                        print(f"[ERRO] Erro ao processar condomínio: {e}")
+            if Config.USE_ASYNC_ENGINE:
+                verification_service.verificar_todos(clientes_data)
+            else:
+                processar_condominios_threads(clientes_data)
 
             tempo_total = time.time() - tempo_inicio
-            print(f"[INFO] Verificação concluída em {tempo_total:.2f} segundos")
+            logger.info("Verificação concluída em %.2f segundos", tempo_total)
+            CICLO_DURACAO.observar(tempo_total)
+            verification_service.finalizar_ciclo()
+        except Exception as e:
+            logger.critical("Ocorreu um erro inesperado no loop de verificação DB: %s", e, exc_info=True)
+
+        if Config.USE_PACING and Config.USE_ASYNC_ENGINE and tempo_inicio:
+            # A varredura já ocupa o intervalo - mantém o período fixo entre ciclos
+            time.sleep(max(0.0, Config.INTERVALO_VERIFICACAO - (time.time() - tempo_inicio)))
+        else:
+            time.sleep(Config.INTERVALO_VERIFICACAO)
+
+
+def loop_agendado():
+    from app.core.database import get_alert_devices
+    while True:
+        try:
+            verification_service.executar_agendado(get_alert_devices)
         except Exception as e:
-            print(
-                f"[ERRO CRÍTICO] Ocorreu um erro inesperado no loop de verificação DB: {e}"
+            logger.critical(
+                "Ocorreu um erro inesperado no loop de verificação agendada: %s", e, exc_info=True
             )
-        time.sleep(Config.INTERVALO_VERIFICACAO)
+        time.sleep(Config.AGENDA_INTERVALO_MIN)
 
-threading.Thread(target=loop_verificacao, daemon=True).start()
+
+if Config.SHARD_PROCESSOS > 0:
+    # A verificação roda em processos separados; este só junta os resultados
+    from app.services.sharding import SupervisorFragmentos
+
+    verification_service.fragmentos = SupervisorFragmentos(verification_service)
+    verification_service.fragmentos.iniciar()
+elif Config.USE_ASYNC_ENGINE and Config.MODO_AGENDAMENTO == "adaptativo":
+    threading.Thread(target=loop_agendado, daemon=True).start()
+else:
+    threading.Thread(target=loop_verificacao, daemon=True).start()
 
 
 @app.route("/")
@@ -125,19 +186,220 @@ def condominio_page(condominio):
 @app.route("/status")
 @login_obrigatorio
 def status():
-    return jsonify(verification_service.get_status_atual())
+    desde = request.args.get("since", type=int)
+    if desde is not None:
+        delta = verification_service.status.delta(desde)
+        if delta is None:
+            # Versão desconhecida ou fora do log de alterações - cliente busca o snapshot completo
+            return jsonify({"error": "Versão indisponível"}), 410
+        resposta = jsonify(delta)
+        resposta.headers["X-Status-Versao"] = str(delta["versao"])
+        return resposta
+
+    snapshot = verification_service.status.snapshot()
+    if snapshot.etag in request.if_none_match:
+        resposta = Response(status=304)
+    elif "gzip" in request.accept_encodings:
+        resposta = Response(snapshot.corpo_gzip, mimetype="application/json")
+        resposta.headers["Content-Encoding"] = "gzip"
+    else:
+        resposta = Response(snapshot.corpo, mimetype="application/json")
+    resposta.set_etag(snapshot.etag)
+    resposta.headers["X-Status-Versao"] = str(snapshot.versao)
+    resposta.headers["Cache-Control"] = "no-cache"
+    resposta.vary.add("Accept-Encoding")
+    return resposta
+
+
+@app.route("/eventos")
+@login_obrigatorio
+def eventos():
+    """
+    Alterações de status em tempo real (Server-Sent Events)
+
+    ?condominio= (pode repetir) limita os eventos aos condomínios indicados;
+    ?since= (ou o cabeçalho Last-Event-ID da reconexão automática) envia
+    primeiro o que mudou desde essa versão. Se a versão não está mais no log,
+    ou se o cliente não acompanha o ritmo, o evento "reset" pede que ele
+    recarregue o snapshot e reconecte.
+    """
+    from app.services.event_hub import formatar_evento
+    from app.services.status_snapshot import montar_delta
+
+    condominios = set(request.args.getlist("condominio"))
+    # Na reconexão automática o navegador envia o id do último evento recebido,
+    # mais recente que o ?since= da URL original
+    desde = request.headers.get("Last-Event-ID", type=int)
+    if desde is None:
+        desde = request.args.get("since", type=int)
+
+    hub = verification_service.event_hub
+    # Inscreve antes do catch-up: nenhuma alteração fica entre os dois
+    inscricao = hub.inscrever(condominios)
+    if inscricao is None:
+        return jsonify({"error": "Limite de conexões em tempo real atingido"}), 503
+
+    def gerar():
+        try:
+            yield "retry: 5000\n\n"
+            versao = 0
+            if desde is not None:
+                delta = verification_service.status.delta(desde)
+                if delta is None:
+                    yield formatar_evento("{}", evento="reset")
+                    return
+                versao = delta["versao"]
+                if condominios:
+                    delta = montar_delta(
+                        versao,
+                        [
+                            (cam["condominio"], cam["nome"], cam["status"])
+                            for cam in delta["cameras"]
+                            if cam["condominio"] in condominios
+                        ]
+                        + [
+                            (nome, None, metadata)
+                            for nome, metadata in delta["condominios"].items()
+                            if nome in condominios
+                        ],
+                    )
+                if delta["cameras"] or delta["condominios"]:
+                    yield formatar_evento(
+                        json.dumps(delta, ensure_ascii=False), id_evento=versao
+                    )
+
+            while True:
+                try:
+                    versao_evento, frame = inscricao.fila.get(timeout=Config.SSE_KEEPALIVE)
+                except queue.Empty:
+                    # Mantém a conexão aberta em proxies e detecta clientes desconectados
+                    yield ": ping\n\n"
+                    continue
+                if inscricao.transbordou:
+                    yield formatar_evento("{}", evento="reset")
+                    return
+                if versao_evento <= versao:
+                    continue  # já incluído no catch-up
+                yield frame
+        finally:
+            hub.cancelar(inscricao)
+
+    resposta = Response(stream_with_context(gerar()), mimetype="text/event-stream")
+    resposta.headers["Cache-Control"] = "no-cache"
+    # Desativa o buffer do nginx para que cada evento seja entregue na hora
+    resposta.headers["X-Accel-Buffering"] = "no"
+    return resposta
+
+
+@app.route("/estatisticas")
+@login_obrigatorio
+def estatisticas():
+    from app.core.db_pool import estatisticas_pool
+    from app.core.inventory import get_inventario
+
+    estatisticas = verification_service.get_estatisticas()
+    estatisticas["banco"] = estatisticas_pool()
+    estatisticas["inventario"] = get_inventario().ultima_sincronizacao
+    return jsonify(estatisticas)
+
+
+@app.route("/metrics")
+def metrics():
+    """Métricas no formato de texto do Prometheus"""
+    if Config.METRICS_TOKEN:
+        if request.headers.get("Authorization") != f"Bearer {Config.METRICS_TOKEN}":
+            return Response("Unauthorized\n", status=401, mimetype="text/plain")
+    elif "usuario" not in session:
+        return redirect(url_for("login"))
+    return Response(registro.exportar(), content_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 @app.route("/status/<condominio>")
 @login_obrigatorio
 def status_condominio(condominio):
-    status_atual = verification_service.get_status_atual()
-    if condominio in status_atual:
-        # Retorna apenas as câmeras para manter compatibilidade
-        return jsonify(status_atual[condominio].get("cameras", []))
+    snapshot = verification_service.status.snapshot()
+    if condominio in snapshot.dados:
+        if snapshot.etag in request.if_none_match:
+            resposta = Response(status=304)
+        else:
+            # Retorna apenas as câmeras para manter compatibilidade
+            resposta = jsonify(snapshot.dados[condominio].get("cameras", []))
+        resposta.set_etag(snapshot.etag)
+        resposta.headers["X-Status-Versao"] = str(snapshot.versao)
+        resposta.headers["Cache-Control"] = "no-cache"
+        return resposta
     else:
         return jsonify({"error": "Condomínio não encontrado"}), 404
 
 
+def _intervalo_consulta():
+    """
+    Intervalo [de, ate) da consulta de histórico: ?de= e ?ate= (epoch em
+    segundos) ou ?periodo= até agora (ex.: 24h, 7d, 30d; padrão 24h)
+    """
+    from app.core.history_store import interpretar_periodo
+
+    ate = request.args.get("ate", type=float) or time.time()
+    de = request.args.get("de", type=float)
+    if de is None:
+        de = ate - interpretar_periodo(request.args.get("periodo", "24h"))
+    if de >= ate:
+        raise ValueError("Intervalo vazio")
+    return de, ate
+
+
+@app.route("/disponibilidade/<condominio>")
+@login_obrigatorio
+def disponibilidade_condominio(condominio):
+    """Disponibilidade do condomínio e de cada câmera no intervalo"""
+    historico = verification_service.historico
+    if historico is None:
+        return jsonify({"error": "Histórico desativado"}), 404
+    try:
+        de, ate = _intervalo_consulta()
+    except ValueError:
+        return jsonify({"error": "Intervalo inválido"}), 400
+    return jsonify(historico.disponibilidade(condominio, de, ate))
+
+
+@app.route("/disponibilidade/<condominio>/<camera>")
+@login_obrigatorio
+def disponibilidade_camera(condominio, camera):
+    """
+    Disponibilidade de uma câmera: resumo do intervalo, série por
+    ?resolucao= (minuto, hora ou dia; padrão conforme o intervalo) e trechos
+    ON/OFF (?limite=, padrão 500)
+    """
+    from app.core.history_store import DIA, HORA, RESOLUCOES
+
+    historico = verification_service.historico
+    if historico is None:
+        return jsonify({"error": "Histórico desativado"}), 404
+    try:
+        de, ate = _intervalo_consulta()
+    except ValueError:
+        return jsonify({"error": "Intervalo inválido"}), 400
+
+    resolucao = request.args.get("resolucao")
+    if resolucao is None:
+        resolucao = "minuto" if ate - de <= 6 * HORA else "hora" if ate - de <= 14 * DIA else "dia"
+    if resolucao not in RESOLUCOES:
+        return jsonify({"error": "Resolução inválida"}), 400
+
+    resumo = historico.disponibilidade(condominio, de, ate, camera)
+    return jsonify(
+        {
+            "de": de,
+            "ate": ate,
+            "resumo": resumo["cameras"].get(camera),
+            "resolucao": resolucao,
+            "serie": historico.serie(condominio, camera, de, ate, RESOLUCOES[resolucao]),
+            "trechos": historico.trechos(
+                condominio, camera, de, ate, request.args.get("limite", 500, type=int)
+            ),
+        }
+    )
+
+
 if __name__ == "__main__":
     app.run(host=Config.HOST, port=Config.PORT, debug=Config.DEBUG)
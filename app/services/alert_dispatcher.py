@@ -0,0 +1,339 @@
+"""
+Módulo responsável pelo despacho assíncrono de alertas para a API Moni
+
+Os workers de verificação apenas gravam o alerta na outbox persistente
+(AlertOutbox); uma thread dedicada drena a outbox em ordem com uma sessão
+HTTP reutilizável, agrupando vários eventos em um único INSERT (um
+ExecutarComando por lote) e recuando com backoff enquanto a API estiver fora.
+Um evento só sai da outbox após a confirmação da API: a entrega é pelo menos
+uma vez - se a resposta se perder depois do commit na API, o lote é reenviado
+e chega duplicado em EventosNaoProcessados (a tabela não tem chave única e a
+Moni não deduplica). A chave única de cada evento (UUID) evita apenas
+duplicatas na própria outbox, como a regravação de um evento mantido em
+memória. Um evento recusado pela API (HTTP 4xx) ALERTAS_MAX_TENTATIVAS vezes
+é marcado como falho e deixa de bloquear os seguintes; erros 5xx e falhas de
+rede são tratados como API fora do ar (mesmo lote, na ordem, após o backoff,
+sem contar tentativa).
+Nenhum alerta é descartado por pressão local: se a gravação na outbox
+falhar (ex.: disco cheio, banco bloqueado), o evento fica em memória e é
+gravado pela thread de envio, antes dos seguintes, assim que possível.
+"""
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from app.config import Config
+from app import alert
+from ..core.alert_outbox import AlertOutbox, EventoOutbox
+from ..utils.logger import get_logger
+from ..utils.metrics import registro
+
+
+logger = get_logger(__name__)
+
+ALERTAS_ENVIADOS = registro.contador(
+    "alertas_enviados_total", "Alertas confirmados pela API Moni"
+)
+ALERTAS_ATRASO = registro.histograma(
+    "alertas_atraso_segundos",
+    "Tempo entre gravar o alerta na outbox e a confirmação da API",
+    faixas=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0),
+)
+
+
+class AlertDispatcher:
+    """Drena a outbox de alertas em lotes com uma thread dedicada"""
+
+    def __init__(
+        self,
+        outbox: Optional[AlertOutbox] = None,
+        max_lote: Optional[int] = None,
+    ):
+        self.outbox = outbox or AlertOutbox()
+        self.max_lote = max(1, max_lote or Config.ALERTAS_MAX_LOTE)
+        self._session = None
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._sinal = threading.Event()
+        self._falhas_seguidas = 0
+        # Eventos que não puderam ser gravados na outbox, na ordem de geração
+        self._transbordo: deque = deque()
+        self._transbordo_lock = threading.Lock()
+
+        # Métricas
+        self._metricas_lock = threading.Lock()
+        self.enviados = 0
+        self.falhas = 0
+        self.duplicados = 0
+        self.lotes = 0
+        self.retentativas = 0
+        self._latencias: deque = deque(maxlen=1000)  # segundos entre gravar e entregar
+        self.ultimo_erro: Optional[str] = None
+
+        pendentes = self.outbox.estatisticas()["pendentes"]
+        if pendentes:
+            logger.info("%d alertas pendentes na outbox - retomando envio", pendentes)
+            self.iniciar()
+
+    def _criar_session(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=0)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def iniciar(self):
+        """Inicia a thread de envio (chamado automaticamente no primeiro alerta)"""
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._executar, name="alert-dispatcher", daemon=True
+                )
+                self._thread.start()
+
+    @staticmethod
+    def chave_idempotencia() -> str:
+        """Identificador único de um evento (chave da outbox)"""
+        return uuid.uuid4().hex
+
+    def enfileirar(self, camera_info: Dict[str, Any], nome_condominio: str) -> bool:
+        """
+        Grava o alerta na outbox (o horário do evento é fixado agora) e
+        acorda a thread de envio
+
+        Returns:
+            False se o mesmo evento já estava na outbox
+        """
+        chave = self.chave_idempotencia()
+        evento = (
+            chave,
+            nome_condominio,
+            camera_info.get("nome", "SemNome"),
+            alert.montar_valores(camera_info),
+            time.time(),
+        )
+        with self._transbordo_lock:
+            if self._transbordo:
+                # Eventos anteriores ainda em memória: este entra depois deles
+                self._transbordo.append(evento)
+                gravado = True
+            else:
+                gravado = self._gravar(evento)
+        if not gravado:
+            with self._metricas_lock:
+                self.duplicados += 1
+        self.iniciar()
+        self._sinal.set()
+        return gravado
+
+    def _gravar(self, evento: tuple) -> bool:
+        """
+        Grava o evento na outbox; se a gravação falhar, mantém em memória
+        (lock do transbordo adquirido)
+
+        Returns:
+            False se o mesmo evento já estava na outbox
+        """
+        try:
+            return self.outbox.adicionar(*evento)
+        except Exception as e:
+            logger.error(
+                "Falha ao gravar alerta na outbox (%s) - mantido em memória até a gravação voltar", e
+            )
+            self._transbordo.append(evento)
+            return True
+
+    def _gravar_transbordo(self):
+        """Grava na outbox, em ordem, os eventos mantidos em memória"""
+        with self._transbordo_lock:
+            gravados = 0
+            while self._transbordo:
+                try:
+                    self.outbox.adicionar(*self._transbordo[0])
+                except Exception as e:
+                    logger.debug("Outbox ainda indisponível: %s", e)
+                    break
+                self._transbordo.popleft()
+                gravados += 1
+            if gravados:
+                logger.info(
+                    "%d alertas mantidos em memória gravados na outbox (%d restantes)",
+                    gravados,
+                    len(self._transbordo),
+                )
+
+    def _executar(self):
+        while True:
+            # Acorda com novos alertas ou periodicamente
+            self._sinal.wait(timeout=1.0)
+            self._sinal.clear()
+            try:
+                if self._transbordo:
+                    self._gravar_transbordo()
+                while self._drenar_lote():
+                    pass
+            except Exception as e:
+                logger.exception("Falha inesperada no despacho de alertas: %s", e)
+                time.sleep(Config.ALERTAS_BACKOFF)
+
+    def _drenar_lote(self) -> bool:
+        """
+        Envia o próximo lote da outbox
+
+        Returns:
+            True se deve continuar drenando imediatamente
+        """
+        lote = self.outbox.pendentes(self.max_lote)
+        if not lote:
+            return False
+        if len(lote) < self.max_lote:
+            # Aguarda brevemente por mais alertas (ex.: queda de energia em um
+            # condomínio derruba várias câmeras ao mesmo tempo)
+            espera = Config.ALERTAS_JANELA_LOTE - (time.time() - lote[0].criado_em)
+            if espera > 0:
+                time.sleep(espera)
+                lote = self.outbox.pendentes(self.max_lote)
+
+        try:
+            self._enviar(lote)
+        except Exception as e:
+            self._registrar_erro(e)
+            if not self._recusado(e):
+                # API inacessível ou com erro próprio (5xx) - mantém a ordem e
+                # tenta o mesmo lote depois, sem contar tentativa dos eventos
+                return self._recuar()
+            # API recusou o comando - isola o evento problemático
+            if len(lote) > 1:
+                return self._enviar_individualmente(lote)
+            self._registrar_recusa(lote[0], e)
+            return self._recuar()
+
+        self._falhas_seguidas = 0
+        return True
+
+    @staticmethod
+    def _recusado(erro: Exception) -> bool:
+        """A API respondeu 4xx: o comando (o evento) foi recusado, não a API que falhou"""
+        import requests
+
+        resposta = getattr(erro, "response", None)
+        return (
+            isinstance(erro, requests.HTTPError)
+            and resposta is not None
+            and 400 <= resposta.status_code < 500
+        )
+
+    def _enviar_individualmente(self, lote: List[EventoOutbox]) -> bool:
+        recusados = []
+        entregues = 0
+        indisponivel = False
+        for evento in lote:
+            try:
+                self._enviar([evento])
+                entregues += 1
+            except Exception as e:
+                self._registrar_erro(e)
+                if not self._recusado(e):
+                    indisponivel = True
+                    break
+                recusados.append((evento, e))
+
+        # Cada recusa conta para o evento: após ALERTAS_MAX_TENTATIVAS ele é
+        # marcado como falho e não bloqueia mais os que estão atrás dele
+        for evento, erro in recusados:
+            self._registrar_recusa(evento, erro)
+        if indisponivel or not entregues:
+            # API fora do ar no meio do lote ou todos recusados - recua antes de tentar de novo
+            return self._recuar()
+        self._falhas_seguidas = 0
+        return True
+
+    def _enviar(self, lote: List[EventoOutbox]):
+        """Entrega o lote em um único comando e o remove da outbox"""
+        if self._session is None:
+            self._session = self._criar_session()
+        comando = alert.montar_comando([evento.valores for evento in lote])
+        descricao = ", ".join(f"{e.condominio}/{e.nome}" for e in lote[:5])
+        if len(lote) > 5:
+            descricao += f" (+{len(lote) - 5})"
+
+        logger.info("Enviando %d alerta(s) - %s", len(lote), descricao)
+        response = alert.enviar_comando(
+            comando, session=self._session, timeout=Config.ALERTAS_TIMEOUT
+        )
+        self.outbox.confirmar(evento.id for evento in lote)
+        agora = time.time()
+        with self._metricas_lock:
+            self.enviados += len(lote)
+            self.lotes += 1
+            self._latencias.extend(agora - evento.criado_em for evento in lote)
+        ALERTAS_ENVIADOS.incrementar(len(lote))
+        for evento in lote:
+            ALERTAS_ATRASO.observar(agora - evento.criado_em)
+        logger.info(
+            "Alerta(s) enviado(s) com sucesso - Status: %s", response.status_code, extra={"alertas": len(lote)}
+        )
+
+    def _registrar_erro(self, erro: Exception):
+        logger.error("Erro ao enviar alerta(s): %s", erro)
+        with self._metricas_lock:
+            self.ultimo_erro = repr(erro)
+
+    def _registrar_recusa(self, evento: EventoOutbox, erro: Exception):
+        if self.outbox.registrar_falha(evento.id, repr(erro), Config.ALERTAS_MAX_TENTATIVAS):
+            with self._metricas_lock:
+                self.falhas += 1
+            logger.error(
+                "Alerta %s/%s recusado %d vezes - mantido na outbox como falho",
+                evento.condominio,
+                evento.nome,
+                Config.ALERTAS_MAX_TENTATIVAS,
+            )
+
+    def _recuar(self) -> bool:
+        """Backoff exponencial entre tentativas: 1s, 2s, 4s... até ALERTAS_BACKOFF_MAX"""
+        self._falhas_seguidas += 1
+        with self._metricas_lock:
+            self.retentativas += 1
+        time.sleep(
+            min(Config.ALERTAS_BACKOFF_MAX, Config.ALERTAS_BACKOFF * 2 ** (self._falhas_seguidas - 1))
+        )
+        return True
+
+    def aguardar(self, timeout: float = 30.0) -> bool:
+        """Aguarda a outbox esvaziar (True se todos os alertas foram entregues)"""
+        limite = time.monotonic() + timeout
+        while self._transbordo or self.outbox.estatisticas()["pendentes"]:
+            if time.monotonic() >= limite:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def estatisticas(self) -> Dict[str, Any]:
+        outbox = self.outbox.estatisticas()
+        with self._metricas_lock:
+            latencias = sorted(self._latencias)
+            estatisticas = {
+                "fila": outbox["pendentes"] + len(self._transbordo),
+                "em_memoria": len(self._transbordo),
+                "falhos_na_outbox": outbox["falhos"],
+                "idade_mais_antigo_s": outbox["idade_mais_antigo_s"],
+                "enviados": self.enviados,
+                "falhas": self.falhas,
+                "duplicados": self.duplicados,
+                "lotes": self.lotes,
+                "retentativas": self.retentativas,
+                "ultimo_erro": self.ultimo_erro,
+            }
+        if latencias:
+            estatisticas["latencia_media_ms"] = round(sum(latencias) / len(latencias) * 1000, 1)
+            estatisticas["latencia_p95_ms"] = round(
+                latencias[int(0.95 * (len(latencias) - 1))] * 1000, 1
+            )
+            estatisticas["latencia_max_ms"] = round(latencias[-1] * 1000, 1)
+        return estatisticas
@@ -0,0 +1,623 @@
+"""
+Módulo responsável pelo motor de verificação assíncrono
+
+Substitui os pools de threads aninhados (condomínios x câmeras) por um único
+loop asyncio com orçamento global de concorrência para toda a frota. Opera em
+varredura completa (executar) ou contínuo, guiado pelo agendador adaptativo
+(executar_continuo).
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import Config
+from ..utils.async_http import AsyncHTTPClient
+from ..utils.logger import LOGGER_CAMERAS, get_logger
+from ..utils.pacing import fase_deterministica
+from ..core.camera_target import CameraTarget, DvrEndpoint
+from ..utils.protocol_utils import ProtocolUtils
+from .circuit_breaker import BLOQUEADO, TESTAR, testar_conexao_async
+from .verification_service import RETENTATIVAS
+
+
+logger = get_logger(__name__)
+logger_cameras = get_logger(LOGGER_CAMERAS)
+
+# Respostas ao status em lote que indicam DVR sem suporte (e não falha momentânea)
+STATUS_SEM_LOTE = frozenset({400, 401, 404, 501})
+
+class AsyncVerificationEngine:
+    """Executa a varredura de todas as câmeras concorrentemente em um loop asyncio"""
+
+    def __init__(self, service, max_concorrencia: Optional[int] = None):
+        """
+        Args:
+            service: VerificationService que mantém cache, estados e status_atual
+            max_concorrencia: Máximo de requisições simultâneas em toda a frota
+        """
+        self.service = service
+        self.max_concorrencia = max_concorrencia or Config.MAX_CONCORRENCIA_GLOBAL
+        # No modo contínuo o agendador já controla a frequência - sem cache
+        self.usar_cache = True
+        self._concluir_camera = self._concluir_camera_varredura
+        # Início da varredura (time.monotonic) quando as verificações são
+        # espalhadas pelo intervalo (USE_PACING); None dispara tudo de imediato
+        self._inicio_pacing: Optional[float] = None
+        self._periodo_pacing = Config.INTERVALO_VERIFICACAO * Config.PACING_FRACAO_INTERVALO
+
+    def executar(self, clientes_data: List[Tuple[str, Dict[str, Any]]]):
+        """Executa uma varredura completa (bloqueia até todas as câmeras responderem)"""
+        asyncio.run(self._executar(clientes_data))
+
+    async def _executar(self, clientes_data: List[Tuple[str, Dict[str, Any]]]):
+        semaforo = asyncio.Semaphore(self.max_concorrencia)
+        cliente = AsyncHTTPClient(
+            Config.TIMEOUT_VERIFICACAO, cache_digest=self.service.digest_cache
+        )
+        self._condominios: Dict[str, Dict[str, Any]] = {}
+
+        # Agrupa as câmeras por DVR (ip:porta) - cada DVR vira uma fila própria
+        filas: Dict[str, deque] = {}
+        for nome_condominio, data in clientes_data:
+            config_global = data.get("metadata", {})
+            cameras = data.get("cameras", [])
+            self._condominios[nome_condominio] = {
+                "metadata": config_global or {},
+                "cameras": [],
+                "pendentes": len(cameras),
+            }
+            if not cameras:
+                self._publicar_condominio(nome_condominio)
+            for cam in cameras:
+                alvo = self.service.alvo(cam, nome_condominio)
+                filas.setdefault(alvo.dvr.chave, deque()).append((alvo, config_global))
+
+        logger.info(
+            "%d DVRs distintos - até %d requisições simultâneas por DVR",
+            len(filas),
+            max(1, Config.MAX_CONEXOES_POR_DVR),
+        )
+        if Config.USE_PACING:
+            # Cada fila segue a ordem das fases das suas câmeras
+            for chave_dvr, fila in filas.items():
+                filas[chave_dvr] = deque(sorted(fila, key=lambda item: self._fase(item[0])))
+            self._inicio_pacing = time.monotonic()
+            logger.info("Verificações distribuídas ao longo de %.0fs", self._periodo_pacing)
+        self.service.filas_dvr = filas
+        try:
+            await asyncio.gather(
+                *(
+                    self._processar_dvr(chave_dvr, fila, semaforo, cliente)
+                    for chave_dvr, fila in filas.items()
+                )
+            )
+        finally:
+            self.service.filas_dvr = {}
+
+    async def _processar_dvr(
+        self,
+        chave_dvr: str,
+        fila: deque,
+        semaforo: asyncio.Semaphore,
+        cliente: AsyncHTTPClient,
+    ):
+        """Verifica todas as câmeras de um DVR"""
+        if fila:
+            # O lote (e a primeira verificação) sai na fase da primeira câmera
+            await self._aguardar_fase(fila[0][0])
+            if not self.service.dvr_proprio(fila[0][0].dvr):
+                # Fatia arrendada a outro processo (verificação fragmentada)
+                while fila:
+                    self._concluir_camera(fila.popleft()[0], None)
+                return
+            if not await self._dvr_liberado(fila[0][0].dvr, semaforo):
+                # DVR inacessível: as câmeras restantes não gastam timeouts
+                while fila:
+                    alvo, config_global = fila.popleft()
+                    self._concluir_camera(
+                        alvo, await self._registrar_inacessivel(alvo, config_global)
+                    )
+                return
+
+        if Config.USE_BULK_DVR_PROBE and len(fila) >= Config.BULK_PROBE_MIN_CANAIS:
+            try:
+                await self._sondar_dvr_em_lote(chave_dvr, fila, semaforo, cliente)
+            except Exception as e:
+                logger.error("Falha na sondagem em lote do DVR %s: %s", chave_dvr, e)
+
+        # Cada DVR recebe no máximo MAX_CONEXOES_POR_DVR workers; todos disputam
+        # o semáforo global (FIFO), o que alterna as requisições entre os DVRs
+        limite_dvr = max(1, Config.MAX_CONEXOES_POR_DVR)
+        await asyncio.gather(
+            *(
+                self._worker_dvr(fila, semaforo, cliente)
+                for _ in range(min(limite_dvr, len(fila)))
+            )
+        )
+
+    async def _sondar_dvr_em_lote(
+        self,
+        chave_dvr: str,
+        fila: deque,
+        semaforo: asyncio.Semaphore,
+        cliente: AsyncHTTPClient,
+    ):
+        """
+        Consulta o estado de todos os canais do DVR em uma única requisição e
+        resolve as câmeras com estado definido; as câmeras com estado ambíguo
+        permanecem na fila para verificação individual por snapshot
+        """
+        service = self.service
+        indisponivel_desde = service.dvr_sem_bulk.get(chave_dvr)
+        if (
+            indisponivel_desde is not None
+            and time.time() - indisponivel_desde < Config.BULK_PROBE_RETRY_INDISPONIVEL
+        ):
+            return
+
+        candidatas = []
+        for item in fila:
+            alvo = item[0]
+            if not alvo.dvr.configurado:
+                continue
+            if self.usar_cache:
+                encontrado, _ = service.cache_manager.get_cached_result(alvo.chave_cache)
+                if encontrado:
+                    continue
+            candidatas.append(item)
+
+        if len(candidatas) < Config.BULK_PROBE_MIN_CANAIS:
+            return
+
+        dvr = candidatas[0][0].dvr
+        protocol = dvr.protocolo
+
+        try:
+            async with semaforo:
+                service.medidor_probes.registrar()
+                inicio = time.perf_counter()
+                try:
+                    resp = await cliente.get(dvr.url_status, dvr.usuario, dvr.senha)
+                except Exception as e:
+                    service.registrar_probe(protocol, "lote", inicio, e)
+                    raise
+                service.registrar_probe(protocol, "lote", inicio)
+                latencia = time.perf_counter() - inicio
+        except Exception as e:
+            # DVR fora do ar ou lento - não diz nada sobre o suporte ao lote
+            service.registrar_alcance(dvr, False, e)
+            logger.info(
+                "DVR %s sem resposta ao status em lote (%r) - snapshots nesta passada", chave_dvr, e
+            )
+            return
+
+        if resp.status_code != 200 and resp.status_code not in STATUS_SEM_LOTE:
+            # 5xx (e afins): falha momentânea do DVR - snapshots só nesta passada
+            service.registrar_alcance(dvr, False, ValueError(f"HTTP {resp.status_code}"))
+            logger.info(
+                "DVR %s respondeu HTTP %d ao status em lote - snapshots nesta passada",
+                chave_dvr,
+                resp.status_code,
+            )
+            return
+        service.registrar_alcance(dvr, True)
+
+        try:
+            if resp.status_code != 200:
+                raise ValueError(f"HTTP {resp.status_code}")
+            estados = ProtocolUtils.parse_channel_status(protocol, resp.corpo)
+            if not estados:
+                raise ValueError("nenhum canal na resposta")
+        except ValueError as e:
+            # DVR sem suporte (ex.: analógico) - snapshots até BULK_PROBE_RETRY_INDISPONIVEL
+            logger.info("DVR %s sem status em lote (%s) - usando snapshots", chave_dvr, e)
+            service.dvr_sem_bulk[chave_dvr] = time.time()
+            return
+
+        service.dvr_sem_bulk.pop(chave_dvr, None)
+        # O lote não traz imagem: parte dos canais ON passa pelo snapshot
+        amostras = service.amostras_imagem(
+            [item[0] for item in candidatas if estados.get(item[0].canal)]
+        )
+        resolvidas = set()
+        for item in candidatas:
+            alvo, config_global = item
+            online = estados.get(alvo.canal)
+            if online is None:
+                continue  # Estado ambíguo - confirma por snapshot
+            if online and alvo.chave in amostras:
+                continue  # Saúde da imagem - confirma por snapshot
+            resultado = await self._registrar(alvo, config_global, online, "lote", latencia)
+            self._concluir_camera(alvo, resultado)
+            resolvidas.add(id(item))
+
+        logger.debug(
+            "DVR %s: %d/%d canais resolvidos em lote (%d conferidos por snapshot)",
+            chave_dvr,
+            len(resolvidas),
+            len(candidatas),
+            len(amostras),
+        )
+        restantes = [item for item in fila if id(item) not in resolvidas]
+        fila.clear()
+        fila.extend(restantes)
+
+    async def _worker_dvr(
+        self,
+        fila: deque,
+        semaforo: asyncio.Semaphore,
+        cliente: AsyncHTTPClient,
+    ):
+        """Consome a fila de câmeras de um único DVR"""
+        while fila:
+            alvo, config_global = fila.popleft()
+            resultado = None
+            try:
+                await self._aguardar_fase(alvo)
+                resultado = await self._verificar_camera(alvo, config_global, semaforo, cliente)
+            except Exception as e:
+                logger.error("Erro ao processar câmera em %s: %s", alvo.condominio, e)
+            self._concluir_camera(alvo, resultado)
+
+    def _fase(self, alvo: CameraTarget) -> float:
+        return fase_deterministica(alvo.chave, self._periodo_pacing)
+
+    async def _aguardar_fase(self, alvo: CameraTarget):
+        """Aguarda o horário da câmera dentro da varredura (somente com pacing)"""
+        if self._inicio_pacing is None:
+            return
+        atraso = self._inicio_pacing + self._fase(alvo) - time.monotonic()
+        if atraso > 0:
+            await asyncio.sleep(atraso)
+
+    def _concluir_camera_varredura(self, alvo: CameraTarget, resultado: Optional[Tuple[str, str]]):
+        condominio = self._condominios[alvo.condominio]
+        if resultado is not None:
+            nome, status_str = resultado
+            condominio["cameras"].append({"nome": nome, "status": status_str})
+        condominio["pendentes"] -= 1
+        if condominio["pendentes"] == 0:
+            self._publicar_condominio(alvo.condominio)
+
+    def _publicar_condominio(self, nome_condominio: str):
+        """Publica o condomínio inteiro de uma vez (sem lista parcial no dashboard)"""
+        condominio = self._condominios[nome_condominio]
+        self.service.status.publicar_condominio(
+            nome_condominio, condominio["cameras"], condominio["metadata"]
+        )
+
+    def executar_continuo(
+        self, agendador, carregar_inventario, intervalo_inventario: Optional[float] = None
+    ):
+        """
+        Executa verificações contínuas conforme o agendador adaptativo (não retorna)
+
+        Dois relógios independentes: o inventário é recarregado a cada
+        intervalo_inventario; o relatório da agenda e a virada do ciclo de
+        estatísticas acontecem sempre a cada AGENDA_INTERVALO_INVENTARIO.
+
+        Args:
+            agendador: AgendadorAdaptativo com as câmeras e seus horários
+            carregar_inventario: Função bloqueante que retorna a lista
+                (cliente_nome, data) - executada fora do loop de eventos
+            intervalo_inventario: Segundos entre recargas do inventário
+                (padrão AGENDA_INTERVALO_INVENTARIO)
+        """
+        asyncio.run(self._executar_continuo(agendador, carregar_inventario, intervalo_inventario))
+
+    async def _executar_continuo(self, agendador, carregar_inventario, intervalo_inventario=None):
+        self.usar_cache = False
+        self._inicio_pacing = None  # O agendador já distribui as verificações
+        self._agendador = agendador
+        self._concluir_camera = self._concluir_camera_continuo
+        self._filas_ativas: Dict[str, deque] = {}
+        self.service.filas_dvr = self._filas_ativas
+        self._tarefas = set()
+        self._inventario_atual = None
+        self._adicionadas = self._removidas = 0
+        intervalo_inventario = intervalo_inventario or Config.AGENDA_INTERVALO_INVENTARIO
+
+        semaforo = asyncio.Semaphore(self.max_concorrencia)
+        cliente = AsyncHTTPClient(
+            Config.TIMEOUT_VERIFICACAO, cache_digest=self.service.digest_cache
+        )
+        loop = asyncio.get_running_loop()
+        proxima_sincronizacao = proximo_relatorio = 0.0
+
+        while True:
+            agora = time.time()
+            if agora >= proxima_sincronizacao:
+                proxima_sincronizacao = agora + intervalo_inventario
+                await self._sincronizar_inventario(loop, agendador, carregar_inventario)
+            if agora >= proximo_relatorio:
+                proximo_relatorio = agora + Config.AGENDA_INTERVALO_INVENTARIO
+                self._relatar_agenda(agendador)
+                self.service.finalizar_ciclo()
+                self.service.iniciar_ciclo()
+
+            for item in agendador.proximas(agora):
+                self._despachar(item, semaforo, cliente)
+
+            await asyncio.sleep(min(1.0, max(0.05, agendador.segundos_ate_proxima())))
+
+    async def _sincronizar_inventario(self, loop, agendador, carregar_inventario):
+        try:
+            clientes_data = await loop.run_in_executor(None, carregar_inventario)
+        except Exception as e:
+            logger.error("Falha ao carregar inventário de câmeras: %s", e)
+            return
+        if not clientes_data:
+            logger.warning("Nenhum dispositivo para alerta encontrado - mantendo agenda atual")
+            return
+
+        # Inventário inalterado (mesma lista) - nada a aplicar na agenda
+        if clientes_data is not self._inventario_atual:
+            self._inventario_atual = clientes_data
+            adicionadas, removidas = agendador.sincronizar(clientes_data)
+            self._adicionadas += adicionadas
+            self._removidas += removidas
+            self.service.sincronizar_status(clientes_data)
+
+    def _relatar_agenda(self, agendador):
+        """Registra a agenda e as alterações do inventário desde o último relatório"""
+        estatisticas = agendador.estatisticas()
+        logger.info(
+            "Agenda: %d câmeras (+%d/-%d), intervalo médio %.0fs, %d oscilando",
+            estatisticas["cameras"],
+            self._adicionadas,
+            self._removidas,
+            estatisticas["intervalo_medio"],
+            estatisticas["oscilando"],
+        )
+        self._adicionadas = self._removidas = 0
+
+    def _despachar(self, item, semaforo: asyncio.Semaphore, cliente: AsyncHTTPClient):
+        """
+        Encaminha a câmera vencida para a fila do seu DVR; se o DVR já está
+        sendo processado a câmera entra na fila existente (limite por DVR mantido)
+        """
+        alvo = self.service.alvo(item.cam, item.nome_condominio)
+        chave_dvr = alvo.dvr.chave
+        entrada = (alvo, item.config_global)
+
+        fila = self._filas_ativas.get(chave_dvr)
+        if fila is not None:
+            fila.append(entrada)
+            return
+
+        fila = deque([entrada])
+        self._filas_ativas[chave_dvr] = fila
+        tarefa = asyncio.ensure_future(
+            self._processar_dvr_continuo(chave_dvr, fila, semaforo, cliente)
+        )
+        self._tarefas.add(tarefa)
+        tarefa.add_done_callback(self._tarefas.discard)
+
+    async def _processar_dvr_continuo(
+        self,
+        chave_dvr: str,
+        fila: deque,
+        semaforo: asyncio.Semaphore,
+        cliente: AsyncHTTPClient,
+    ):
+        try:
+            while fila:
+                await self._processar_dvr(chave_dvr, fila, semaforo, cliente)
+        except Exception as e:
+            logger.error("Falha ao processar DVR %s: %s", chave_dvr, e)
+            for alvo, _ in fila:
+                self._concluir_camera(alvo, None)
+        finally:
+            # Sem await entre a checagem da fila vazia e a remoção
+            self._filas_ativas.pop(chave_dvr, None)
+
+    def _concluir_camera_continuo(self, alvo: CameraTarget, resultado: Optional[Tuple[str, str]]):
+        if resultado is None:
+            self._agendador.reagendar(alvo.chave, Config.AGENDA_INTERVALO_MIN)
+            return
+        nome, status_str = resultado
+        self.service.atualizar_status_camera(alvo.condominio, nome, status_str)
+        self._agendador.registrar_resultado(alvo.chave, status_str)
+
+    async def _verificar_camera(
+        self,
+        alvo: CameraTarget,
+        config_global: Optional[Dict[str, Any]],
+        semaforo: asyncio.Semaphore,
+        cliente: AsyncHTTPClient,
+    ) -> Optional[Tuple[str, str]]:
+        service = self.service
+        nome = alvo.nome
+
+        if not alvo.dvr.configurado:
+            logger.warning("%s não possui dados de conexão suficientes. IP: %s", nome, alvo.dvr.ip)
+            return nome, "NO_CONFIG"
+
+        if not service.dvr_proprio(alvo.dvr):
+            return None  # A fatia do DVR passou a outro processo
+
+        # Verifica cache primeiro
+        resultado_encontrado, resultado_cache = (
+            service.cache_manager.get_cached_result(alvo.chave_cache)
+            if self.usar_cache
+            else (False, False)
+        )
+        if resultado_encontrado:
+            alertas = service.coletar_alertas(
+                alvo.cam, alvo.condominio, config_global, resultado_cache, alvo.chave
+            )
+            await self._enviar_alertas(alertas, alvo.condominio)
+            return nome, "ON" if resultado_cache else "OFF"
+
+        if not await self._dvr_liberado(alvo.dvr, semaforo):
+            return await self._registrar_inacessivel(alvo, config_global)
+
+        online, latencia, erro = await self._sondar_snapshot(cliente, alvo, semaforo)
+        service.registrar_alcance(alvo.dvr, latencia is not None, erro)
+
+        return await self._registrar(alvo, config_global, online, "snapshot", latencia)
+
+    async def _dvr_liberado(self, dvr: DvrEndpoint, semaforo: asyncio.Semaphore) -> bool:
+        """Consulta o disjuntor do DVR, fazendo o teste TCP se pedido"""
+        disjuntores = self.service.disjuntores
+        if disjuntores is None or not dvr.configurado:
+            return True
+        decisao = disjuntores.avaliar(dvr.chave)
+        if decisao == TESTAR:
+            async with semaforo:
+                erro = await testar_conexao_async(dvr.ip, dvr.porta)
+            return disjuntores.registrar_teste(dvr.chave, erro)
+        return decisao != BLOQUEADO
+
+    async def _registrar_inacessivel(
+        self, alvo: CameraTarget, config_global: Optional[Dict[str, Any]]
+    ) -> Tuple[str, str]:
+        alertas = self.service.registrar_dvr_inacessivel(alvo, config_global)
+        await self._enviar_alertas(alertas, alvo.condominio)
+        return alvo.nome, "OFF"
+
+    async def _registrar(
+        self,
+        alvo: CameraTarget,
+        config_global: Optional[Dict[str, Any]],
+        online: bool,
+        origem: str,
+        latencia: Optional[float] = None,
+    ) -> Tuple[str, str]:
+        """Registra o resultado de uma verificação real e envia alertas de transição"""
+        status_str = "ON" if online else "OFF"
+        logger_cameras.info(
+            "%s está %s [%s %s]",
+            alvo.nome,
+            status_str,
+            alvo.protocolo,
+            origem,
+            extra={"condominio": alvo.condominio},
+        )
+
+        alertas = self.service.registrar_resultado(
+            alvo.cam, alvo.condominio, config_global, alvo.chave_cache, online, alvo.chave, latencia
+        )
+        await self._enviar_alertas(alertas, alvo.condominio)
+        return alvo.nome, status_str
+
+    async def _sondar_snapshot(
+        self, cliente: AsyncHTTPClient, alvo: CameraTarget, semaforo: asyncio.Semaphore
+    ) -> Tuple[bool, Optional[float], Optional[Exception]]:
+        """
+        Solicita o snapshot com retry e backoff exponencial (sem bloquear o loop)
+
+        Cada tentativa adquire o semáforo global apenas durante a requisição:
+        o backoff de uma câmera morta não ocupa o orçamento de concorrência
+
+        Returns:
+            (online, duração da última resposta em segundos ou None, erro da
+            última tentativa que falhou)
+        """
+        dvr = alvo.dvr
+        protocol = dvr.protocolo
+
+        # No modo "cabecalhos" só os primeiros bytes do corpo trafegam
+        max_corpo = (
+            Config.SNAPSHOT_PROBE_MAX_BYTES
+            if Config.SNAPSHOT_PROBE_MODE == "cabecalhos"
+            else None
+        )
+
+        ultima_exception = None
+        latencia = None
+        for tentativa in range(Config.TENTATIVAS_RETRY + 1):
+            if tentativa:
+                RETENTATIVAS.incrementar(protocolo=protocol)
+            try:
+                async with semaforo:
+                    self.service.medidor_probes.registrar()
+                    inicio = time.perf_counter()
+                    try:
+                        resp = await cliente.get(
+                            alvo.url_snapshot, dvr.usuario, dvr.senha, max_corpo=max_corpo
+                        )
+                    except Exception as e:
+                        self.service.registrar_probe(protocol, "snapshot", inicio, e)
+                        raise
+                    self.service.registrar_probe(protocol, "snapshot", inicio)
+                    latencia = time.perf_counter() - inicio
+                content_length = self.service.ler_content_length(
+                    resp.header("Content-Length")
+                )
+                self.service.contabilizar_bytes(
+                    content_length, len(resp.corpo), resp.completo
+                )
+                if not content_length and resp.completo:
+                    content_length = len(resp.corpo)
+                online, sem_sinal = self.service.avaliar_snapshot(
+                    protocol,
+                    resp.status_code,
+                    resp.header("Content-Type"),
+                    content_length,
+                    resp.corpo[:16],
+                )
+                if online:
+                    saudavel = await self._imagem_saudavel(
+                        cliente, alvo, content_length, resp.corpo, semaforo
+                    )
+                    return saudavel, latencia, None
+                if sem_sinal:
+                    logger.warning(
+                        "%s: Imagem muito pequena (%d bytes) - possível 'Sem Sinal'",
+                        alvo.nome,
+                        content_length,
+                    )
+                    return False, latencia, None
+            except Exception as e:
+                ultima_exception = e
+                if tentativa < Config.TENTATIVAS_RETRY:
+                    # Backoff exponencial: 1s, 2s, 4s...
+                    await asyncio.sleep(Config.RETRY_BACKOFF * (2**tentativa))
+
+        if ultima_exception:
+            logger.warning("%s: %r", alvo.nome, ultima_exception)
+        return False, latencia, ultima_exception
+
+    async def _imagem_saudavel(
+        self,
+        cliente: AsyncHTTPClient,
+        alvo: CameraTarget,
+        content_length: int,
+        corpo: bytes,
+        semaforo: asyncio.Semaphore,
+    ) -> bool:
+        """
+        Saúde da imagem do snapshot aprovado: triagem e, se suspeita, download
+        completo (modo "cabecalhos") e análise fora do loop de eventos
+        """
+        service = self.service
+        if not service.imagem_suspeita(alvo, content_length):
+            return True
+        if len(corpo) < content_length:
+            dvr = alvo.dvr
+            async with semaforo:
+                service.medidor_probes.registrar()
+                inicio = time.perf_counter()
+                try:
+                    resp = await cliente.get(alvo.url_snapshot, dvr.usuario, dvr.senha)
+                except Exception as e:
+                    service.registrar_probe(dvr.protocolo, "imagem", inicio, e)
+                    logger.debug("%s: falha ao baixar a imagem para análise: %r", alvo.nome, e)
+                    return True
+                service.registrar_probe(dvr.protocolo, "imagem", inicio)
+            corpo = resp.corpo
+            service.contabilizar_bytes(len(corpo), len(corpo), True)
+        problema = await asyncio.get_running_loop().run_in_executor(
+            None, service.imagens.analisar, alvo.chave, corpo
+        )
+        return service.confirmar_imagem(alvo, problema)
+
+    async def _enviar_alertas(
+        self, alertas: List[Dict[str, Any]], nome_condominio: str
+    ):
+        """Enfileira os alertas no AlertDispatcher (não bloqueia o loop de eventos)"""
+        if alertas:
+            self.service.enviar_alertas(alertas, nome_condominio)
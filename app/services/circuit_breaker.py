@@ -0,0 +1,313 @@
+"""
+Módulo responsável pelo disjuntor (circuit breaker) por DVR
+
+Quando um condomínio perde energia ou link, cada canal do DVR gastava
+TIMEOUT_VERIFICACAO x (TENTATIVAS_RETRY + 1) mais os backoffs - perto de 40s
+de worker por câmera, atrasando os condomínios saudáveis do mesmo ciclo.
+
+Estados de cada DVR (ip:porta):
+- fechado: câmeras verificadas normalmente; se o DVR não responde há mais de
+  DISJUNTOR_VALIDADE_RESPOSTA, um teste de conexão TCP (um chamador por vez)
+  antecede as verificações. Um teste que falha conta como uma câmera sem
+  resposta - um SYN perdido não basta para abrir. Só falhas de conexão das
+  câmeras contam (recusada, timeout de conexão): o timeout de leitura de um
+  canal não diz nada sobre o DVR
+- aberto: DISJUNTOR_FALHAS_PARA_ABRIR falhas seguidas (testes TCP ou câmeras
+  sem conexão) e um teste TCP final que também falhou confirmaram o DVR
+  inacessível; as câmeras restantes são marcadas OFF sem consulta
+- semiaberto: vencido o tempo aberto, um único teste TCP decide entre fechar
+  e reabrir com o dobro do tempo (até DISJUNTOR_TEMPO_ABERTO_MAX)
+"""
+import asyncio
+import socket
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import requests
+from urllib3.exceptions import NewConnectionError
+
+from app.config import Config
+from ..utils.async_http import FalhaConexao
+from ..utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+FECHADO = "fechado"
+ABERTO = "aberto"
+SEMIABERTO = "semiaberto"
+
+# Decisões de DisjuntoresDVR.avaliar
+LIBERADO = "liberado"
+TESTAR = "testar"
+BLOQUEADO = "bloqueado"
+
+
+def _porta(porta: Any) -> int:
+    try:
+        return int(porta or 80)
+    except (TypeError, ValueError):
+        return 80
+
+
+def falha_de_conexao(erro: Optional[BaseException]) -> bool:
+    """A verificação falhou antes de a conexão TCP abrir (DVR possivelmente fora do ar)"""
+    if erro is None:
+        return True  # Sem detalhe - tratada como sem resposta
+    if isinstance(erro, (FalhaConexao, requests.exceptions.ConnectTimeout)):
+        return True
+    if isinstance(erro, requests.exceptions.ConnectionError) and erro.args:
+        # requests embrulha a recusa/sem rota do urllib3 em MaxRetryError.reason
+        return isinstance(getattr(erro.args[0], "reason", erro.args[0]), NewConnectionError)
+    return False
+
+
+def testar_conexao(host: str, porta: Any, timeout: Optional[float] = None) -> Optional[str]:
+    """
+    Teste de alcance do DVR: apenas abre e fecha a conexão TCP
+
+    Returns:
+        None se conectou, senão o motivo da falha
+    """
+    try:
+        socket.create_connection(
+            (host, _porta(porta)), timeout=timeout or Config.DISJUNTOR_TIMEOUT_TCP
+        ).close()
+        return None
+    except OSError as e:
+        return repr(e)
+
+
+async def testar_conexao_async(host: str, porta: Any, timeout: Optional[float] = None) -> Optional[str]:
+    """Versão asyncio de testar_conexao"""
+    try:
+        _, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, _porta(porta)),
+            timeout=timeout or Config.DISJUNTOR_TIMEOUT_TCP,
+        )
+    except (OSError, asyncio.TimeoutError) as e:
+        return repr(e) if str(e) else type(e).__name__
+    writer.close()
+    return None
+
+
+class EstadoDisjuntor:
+    """Situação de um DVR no disjuntor"""
+
+    __slots__ = (
+        "estado",
+        "falhas",
+        "tempo_aberto",
+        "reavaliar_em",
+        "aberto_desde",
+        "respondeu_em",
+        "testando_ate",
+        "motivo",
+        "poupadas",
+    )
+
+    def __init__(self):
+        self.estado = FECHADO
+        # Falhas seguidas (câmeras sem resposta e testes TCP) sem resposta do DVR
+        self.falhas = 0
+        self.tempo_aberto = 0.0
+        # Aberto: início do teste; semiaberto: prazo do teste em andamento
+        self.reavaliar_em = 0.0
+        self.aberto_desde: Optional[float] = None
+        self.respondeu_em = 0.0
+        # Fechado: prazo do teste TCP em andamento (os demais seguem liberados)
+        self.testando_ate = 0.0
+        self.motivo: Optional[str] = None
+        # Câmeras marcadas OFF sem consulta desde a abertura
+        self.poupadas = 0
+
+
+class DisjuntoresDVR:
+    """Disjuntores de todos os DVRs (thread-safe; usado pelos dois motores)"""
+
+    def __init__(
+        self,
+        falhas_para_abrir: Optional[int] = None,
+        tempo_aberto: Optional[float] = None,
+        tempo_aberto_max: Optional[float] = None,
+        validade_resposta: Optional[float] = None,
+    ):
+        self.falhas_para_abrir = max(1, falhas_para_abrir or Config.DISJUNTOR_FALHAS_PARA_ABRIR)
+        self.tempo_aberto = tempo_aberto or Config.DISJUNTOR_TEMPO_ABERTO
+        self.tempo_aberto_max = max(self.tempo_aberto, tempo_aberto_max or Config.DISJUNTOR_TEMPO_ABERTO_MAX)
+        self.validade_resposta = (
+            Config.DISJUNTOR_VALIDADE_RESPOSTA if validade_resposta is None else validade_resposta
+        )
+        self._lock = threading.Lock()
+        self._dvrs: Dict[str, EstadoDisjuntor] = {}
+        self.aberturas = 0
+        self.fechamentos = 0
+        self.testes = 0
+        self.cameras_poupadas = 0
+
+    def _estado(self, chave_dvr: str) -> EstadoDisjuntor:
+        estado = self._dvrs.get(chave_dvr)
+        if estado is None:
+            estado = self._dvrs[chave_dvr] = EstadoDisjuntor()
+        return estado
+
+    def avaliar(self, chave_dvr: str) -> str:
+        """
+        Decide se as câmeras do DVR podem ser consultadas
+
+        Returns:
+            LIBERADO; TESTAR - o chamador deve fazer o teste TCP e informar o
+            resultado em registrar_teste (apenas um chamador recebe TESTAR
+            por vez); ou BLOQUEADO - marcar OFF sem consulta
+        """
+        agora = time.monotonic()
+        with self._lock:
+            estado = self._estado(chave_dvr)
+            if estado.estado == FECHADO:
+                if agora - estado.respondeu_em < self.validade_resposta:
+                    return LIBERADO
+                if agora < estado.testando_ate:
+                    return LIBERADO  # Outro chamador já está testando
+                estado.testando_ate = agora + 2 * Config.DISJUNTOR_TIMEOUT_TCP
+                return TESTAR
+            if agora < estado.reavaliar_em:
+                return BLOQUEADO
+            # Tempo aberto vencido (ou teste anterior sem retorno): novo teste
+            estado.estado = SEMIABERTO
+            estado.reavaliar_em = agora + 2 * Config.DISJUNTOR_TIMEOUT_TCP
+            return TESTAR
+
+    def registrar_teste(self, chave_dvr: str, erro: Optional[str]) -> bool:
+        """
+        Resultado do teste TCP (erro None = conectou)
+
+        Returns:
+            True se as câmeras podem ser consultadas
+        """
+        with self._lock:
+            self.testes += 1
+            estado = self._estado(chave_dvr)
+            estado.testando_ate = 0.0
+            if erro is None:
+                self._fechar(chave_dvr, estado)
+                return True
+            estado.falhas += 1
+            if estado.estado == FECHADO and estado.falhas < self.falhas_para_abrir:
+                # Ainda não confirmado: as câmeras são consultadas e somam falhas
+                logger.info(
+                    "DVR %s: teste TCP falhou (%s) - %d/%d falhas para abrir o disjuntor",
+                    chave_dvr,
+                    erro,
+                    estado.falhas,
+                    self.falhas_para_abrir,
+                )
+                return True
+            self._abrir(chave_dvr, estado, f"teste TCP: {erro}")
+            return False
+
+    def registrar_resposta(self, chave_dvr: str):
+        """O DVR respondeu (qualquer resposta HTTP, mesmo de câmera offline)"""
+        with self._lock:
+            self._fechar(chave_dvr, self._estado(chave_dvr))
+
+    def registrar_sem_resposta(self, chave_dvr: str, erro: Optional[BaseException] = None):
+        """
+        Uma câmera esgotou as tentativas sem nenhuma resposta do DVR
+
+        Só conta se a conexão não chegou a abrir (falha_de_conexao). No limite
+        de falhas o disjuntor não abre direto: a próxima avaliação pede o
+        teste TCP, e só a falha dele abre.
+        """
+        if not falha_de_conexao(erro):
+            return
+        with self._lock:
+            estado = self._estado(chave_dvr)
+            estado.falhas += 1
+            if estado.estado != FECHADO:
+                motivo = f"{estado.falhas} falhas seguidas sem resposta"
+                self._abrir(chave_dvr, estado, f"{motivo} ({erro!r})" if erro else motivo)
+            elif estado.falhas >= self.falhas_para_abrir:
+                estado.respondeu_em = 0.0  # Resposta antiga não dispensa o teste
+
+    def registrar_poupadas(self, chave_dvr: str, quantidade: int = 1):
+        """Câmeras marcadas OFF sem consulta por causa do disjuntor"""
+        with self._lock:
+            self._estado(chave_dvr).poupadas += quantidade
+            self.cameras_poupadas += quantidade
+
+    def _fechar(self, chave_dvr: str, estado: EstadoDisjuntor):
+        estado.respondeu_em = time.monotonic()
+        estado.falhas = 0
+        if estado.estado == FECHADO:
+            return
+        logger.info(
+            "DVR %s voltou a responder após %.0fs (%d câmeras marcadas OFF sem consulta)",
+            chave_dvr,
+            time.time() - estado.aberto_desde,
+            estado.poupadas,
+        )
+        estado.estado = FECHADO
+        estado.aberto_desde = None
+        estado.motivo = None
+        estado.poupadas = 0
+        self.fechamentos += 1
+
+    def _abrir(self, chave_dvr: str, estado: EstadoDisjuntor, motivo: str):
+        if estado.estado == ABERTO:
+            return
+        if estado.estado == SEMIABERTO:
+            # Teste falhou - recua até o teto
+            estado.tempo_aberto = min(estado.tempo_aberto * 2, self.tempo_aberto_max)
+        else:
+            estado.tempo_aberto = self.tempo_aberto
+            estado.aberto_desde = time.time()
+            self.aberturas += 1
+            logger.warning(
+                "DVR %s inacessível (%s) - câmeras marcadas OFF sem consulta", chave_dvr, motivo
+            )
+        estado.estado = ABERTO
+        estado.motivo = motivo
+        estado.reavaliar_em = time.monotonic() + estado.tempo_aberto
+
+    def estado(self, chave_dvr: str) -> str:
+        with self._lock:
+            estado = self._dvrs.get(chave_dvr)
+            return estado.estado if estado is not None else FECHADO
+
+    def inacessiveis(self, limite: int = 100) -> List[Dict[str, Any]]:
+        """DVRs abertos ou em teste, os mais antigos primeiro (dashboard)"""
+        agora = time.monotonic()
+        with self._lock:
+            abertos = [
+                (chave, estado)
+                for chave, estado in self._dvrs.items()
+                if estado.estado != FECHADO
+            ]
+            abertos.sort(key=lambda item: item[1].aberto_desde)
+            return [
+                {
+                    "dvr": chave,
+                    "estado": estado.estado,
+                    "desde": estado.aberto_desde,
+                    "proximo_teste_s": max(0.0, round(estado.reavaliar_em - agora, 1)),
+                    "motivo": estado.motivo,
+                    "cameras_poupadas": estado.poupadas,
+                }
+                for chave, estado in abertos[:limite]
+            ]
+
+    def estatisticas(self) -> Dict[str, int]:
+        with self._lock:
+            contagem = {FECHADO: 0, ABERTO: 0, SEMIABERTO: 0}
+            for estado in self._dvrs.values():
+                contagem[estado.estado] += 1
+            return {
+                "dvrs": len(self._dvrs),
+                "abertos": contagem[ABERTO],
+                "semiabertos": contagem[SEMIABERTO],
+                "aberturas": self.aberturas,
+                "fechamentos": self.fechamentos,
+                "testes_tcp": self.testes,
+                "cameras_poupadas": self.cameras_poupadas,
+            }
@@ -0,0 +1,109 @@
+"""
+Módulo responsável pela distribuição de eventos de status em tempo real (SSE)
+
+O PublicadorStatus notifica o EventHub a cada conjunto de alterações; o hub
+serializa o evento uma única vez (por condomínio, para inscrições filtradas)
+e o entrega às filas dos navegadores conectados em /eventos.
+"""
+import json
+import queue
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.config import Config
+from .status_snapshot import montar_delta
+
+
+def formatar_evento(dados: str, evento: Optional[str] = None, id_evento: Optional[int] = None) -> str:
+    """Monta um frame text/event-stream"""
+    linhas = []
+    if id_evento is not None:
+        linhas.append(f"id: {id_evento}")
+    if evento:
+        linhas.append(f"event: {evento}")
+    linhas.extend(f"data: {linha}" for linha in dados.split("\n"))
+    return "\n".join(linhas) + "\n\n"
+
+
+class Inscricao:
+    """Conexão SSE de um navegador"""
+
+    __slots__ = ("fila", "condominios", "transbordou")
+
+    def __init__(self, condominios: Optional[Set[str]]):
+        self.fila: "queue.Queue[Tuple[int, str]]" = queue.Queue(maxsize=Config.SSE_MAX_FILA)
+        # None = todos os condomínios
+        self.condominios = condominios
+        # Cliente lento demais: eventos perdidos, precisa recarregar o snapshot
+        self.transbordou = False
+
+
+class EventHub:
+    """Inscrições SSE e entrega das alterações de status"""
+
+    def __init__(self, max_inscricoes: Optional[int] = None):
+        self.max_inscricoes = max_inscricoes or Config.SSE_MAX_INSCRICOES
+        self._lock = threading.Lock()
+        self._inscricoes: Set[Inscricao] = set()
+        self.eventos_publicados = 0
+
+    def inscrever(self, condominios: Optional[Iterable[str]] = None) -> Optional[Inscricao]:
+        """Registra uma conexão (None se o limite de conexões foi atingido)"""
+        inscricao = Inscricao(set(condominios) if condominios else None)
+        with self._lock:
+            if len(self._inscricoes) >= self.max_inscricoes:
+                return None
+            self._inscricoes.add(inscricao)
+        return inscricao
+
+    def cancelar(self, inscricao: Inscricao):
+        with self._lock:
+            self._inscricoes.discard(inscricao)
+
+    def publicar(self, versao: int, alteracoes: List[Tuple[str, Optional[str], Any]]):
+        """Entrega as alterações às inscrições interessadas (chamado pelo PublicadorStatus)"""
+        if not alteracoes:
+            return
+        with self._lock:
+            inscricoes = list(self._inscricoes)
+        if not inscricoes:
+            return
+
+        self.eventos_publicados += 1
+        frames: Dict[Optional[str], Optional[str]] = {}
+
+        def frame(nome_condominio: Optional[str]) -> Optional[str]:
+            # Serializa uma vez para todos os inscritos (None) e por condomínio
+            if nome_condominio not in frames:
+                selecionadas = [
+                    alteracao
+                    for alteracao in alteracoes
+                    if nome_condominio is None or alteracao[0] == nome_condominio
+                ]
+                frames[nome_condominio] = (
+                    formatar_evento(
+                        json.dumps(montar_delta(versao, selecionadas), ensure_ascii=False),
+                        id_evento=versao,
+                    )
+                    if selecionadas
+                    else None
+                )
+            return frames[nome_condominio]
+
+        for inscricao in inscricoes:
+            if inscricao.condominios is None:
+                partes = [frame(None)]
+            else:
+                partes = [frame(nome) for nome in inscricao.condominios]
+            for parte in partes:
+                if parte is None:
+                    continue
+                try:
+                    inscricao.fila.put_nowait((versao, parte))
+                except queue.Full:
+                    inscricao.transbordou = True
+
+    def estatisticas(self) -> Dict[str, int]:
+        with self._lock:
+            conexoes = len(self._inscricoes)
+        return {"conexoes": conexoes, "eventos_publicados": self.eventos_publicados}
@@ -0,0 +1,270 @@
+"""
+Módulo responsável pela saúde da imagem dos snapshots (congelada, preta, "Sem Sinal")
+
+Um canal com a imagem congelada ou com a placa "Sem Sinal"/"No Video" do DVR
+responde ao snapshot com um JPEG válido e era reportado ON. A avaliação tem
+dois níveis:
+
+1. Triagem (toda verificação, custo desprezível): tendência do
+   Content-Length da câmera. Tamanho idêntico ao anterior (o ruído do sensor
+   faz a imagem ao vivo raramente repetir o tamanho exato), queda brusca
+   em relação à mediana recente ou imagem abaixo de IMAGEM_TAMANHO_SUSPEITO
+   tornam a imagem suspeita.
+2. Análise (apenas imagens suspeitas; requer NumPy e Pillow): o JPEG é
+   decodificado já reduzido (escala DCT do decodificador) e a partir dele
+   são calculados o hash perceptual (dHash de 64 bits), a média e a fração
+   de pixels uniformes. Imagem clara e uniforme é "sem_sinal" e tamanho
+   repetido com hash igual ao anterior é "congelada". Uma cena noturna
+   escura também é uniforme, mas o ruído do sensor varia o JPEG: só o quadro
+   escuro sintético (mesmo tamanho repetido) confirmado em
+   IMAGEM_CONFIRMACOES_PRETA análises seguidas é "preta".
+
+Canais resolvidos pelo status em lote não trazem imagem: a cada sondagem
+em lote de um DVR, as câmeras em observação (problema ou suspeita em
+aberto) e IMAGEM_AMOSTRAS_LOTE das demais, em rodízio, são conferidas por
+snapshot (amostrar).
+
+Cada câmera guarda apenas anéis compactos (array) com os últimos tamanhos e
+impressões; as impressões só são alocadas na primeira análise.
+"""
+import importlib.util
+import io
+import threading
+from array import array
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.config import Config
+from ..utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+CONGELADA = "congelada"
+PRETA = "preta"
+SEM_SINAL = "sem_sinal"
+PROBLEMAS = (CONGELADA, PRETA, SEM_SINAL)
+
+# Lado da imagem reduzida usada nas estatísticas (32x32 = 1024 pixels)
+_LADO_ESTATISTICAS = 32
+
+
+def analise_disponivel() -> bool:
+    """
+    NumPy e Pillow instalados (sem eles só a triagem é feita); não importa
+    os módulos - isso fica para a primeira análise
+    """
+    return all(importlib.util.find_spec(modulo) is not None for modulo in ("numpy", "PIL"))
+
+
+def impressao_imagem(jpeg: bytes) -> Tuple[int, float, float]:
+    """
+    Decodifica o JPEG reduzido e calcula a impressão da imagem
+
+    Returns:
+        (dhash de 64 bits, média de luminância 0-255, fração de pixels
+        a até IMAGEM_TOLERANCIA_UNIFORME níveis da mediana)
+    """
+    import numpy as np
+    from PIL import Image
+
+    imagem = Image.open(io.BytesIO(jpeg))
+    # Decodifica direto em tons de cinza e em escala 1/2..1/8 (sem IDCT completa)
+    imagem.draft("L", (_LADO_ESTATISTICAS * 2, _LADO_ESTATISTICAS * 2))
+    imagem = imagem.convert("L")
+
+    pixels = np.asarray(
+        imagem.resize((_LADO_ESTATISTICAS, _LADO_ESTATISTICAS), Image.BILINEAR), dtype=np.int16
+    )
+    mediana = np.median(pixels)
+    uniforme = float(np.mean(np.abs(pixels - mediana) <= Config.IMAGEM_TOLERANCIA_UNIFORME))
+
+    # dHash: gradiente horizontal de uma versão 9x8 (64 bits)
+    reduzida = np.asarray(imagem.resize((9, 8), Image.BILINEAR), dtype=np.int16)
+    bits = np.packbits(reduzida[:, 1:] > reduzida[:, :-1])
+    return int.from_bytes(bits.tobytes(), "big"), float(pixels.mean()), uniforme
+
+
+class EstadoImagem:
+    """Anéis de tamanhos e impressões de uma câmera"""
+
+    __slots__ = (
+        "tamanhos",
+        "total_tamanhos",
+        "repeticoes",
+        "impressoes",
+        "total_impressoes",
+        "escuras",
+        "problema",
+    )
+
+    def __init__(self):
+        self.tamanhos = array("I", bytes(4 * Config.IMAGEM_HISTORICO))
+        self.total_tamanhos = 0
+        # Verificações seguidas com o mesmo Content-Length
+        self.repeticoes = 0
+        self.impressoes: Optional[array] = None
+        self.total_impressoes = 0
+        # Análises seguidas de quadro escuro, uniforme e de tamanho repetido
+        self.escuras = 0
+        self.problema: Optional[str] = None
+
+    def em_observacao(self) -> bool:
+        """Problema detectado ou suspeita ainda sem conclusão"""
+        return self.problema is not None or self.repeticoes > 0 or self.escuras > 0
+
+    def ultimo_tamanho(self) -> int:
+        if not self.total_tamanhos:
+            return 0
+        return self.tamanhos[(self.total_tamanhos - 1) % len(self.tamanhos)]
+
+    def mediana_tamanhos(self) -> int:
+        amostras = sorted(self.tamanhos[: min(self.total_tamanhos, len(self.tamanhos))])
+        return amostras[len(amostras) // 2] if amostras else 0
+
+    def adicionar_tamanho(self, tamanho: int):
+        self.repeticoes = self.repeticoes + 1 if tamanho == self.ultimo_tamanho() else 0
+        self.tamanhos[self.total_tamanhos % len(self.tamanhos)] = min(tamanho, 0xFFFFFFFF)
+        self.total_tamanhos += 1
+
+    def ultima_impressao(self) -> Optional[int]:
+        if not self.total_impressoes:
+            return None
+        return self.impressoes[(self.total_impressoes - 1) % len(self.impressoes)]
+
+    def adicionar_impressao(self, dhash: int):
+        if self.impressoes is None:
+            self.impressoes = array("Q", bytes(8 * Config.IMAGEM_HISTORICO))
+        self.impressoes[self.total_impressoes % len(self.impressoes)] = dhash
+        self.total_impressoes += 1
+
+
+class MonitorImagem:
+    """Triagem e análise das imagens de todas as câmeras (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cameras: Dict[str, EstadoImagem] = {}
+        # Próxima posição do rodízio de amostras de cada DVR
+        self._rodizio: Dict[str, int] = {}
+        self.analise_ativa = Config.IMAGEM_ANALISE and analise_disponivel()
+        if Config.IMAGEM_ANALISE and not self.analise_ativa:
+            logger.warning(
+                "NumPy/Pillow não instalados - saúde da imagem apenas pela tendência do tamanho"
+            )
+        self.triagens = 0
+        self.suspeitas = 0
+        self.analises = 0
+        self.falhas_decodificacao = 0
+        self.problemas: Dict[str, int] = {problema: 0 for problema in PROBLEMAS}
+
+    def triagem(self, chave: str, content_length: int) -> bool:
+        """
+        Registra o tamanho do snapshot e diz se a imagem é suspeita
+
+        Returns:
+            True se vale analisar a imagem (analisar)
+        """
+        if content_length <= 0:
+            return False  # Tamanho desconhecido (chunked) - sem tendência
+        with self._lock:
+            estado = self._cameras.get(chave)
+            if estado is None:
+                estado = self._cameras[chave] = EstadoImagem()
+            mediana = estado.mediana_tamanhos() if estado.total_tamanhos >= 3 else 0
+            estado.adicionar_tamanho(content_length)
+            self.triagens += 1
+            suspeita = (
+                estado.repeticoes > 0
+                or content_length < Config.IMAGEM_TAMANHO_SUSPEITO
+                or content_length < mediana * Config.IMAGEM_FRACAO_QUEDA
+                # Problema anterior: confirma a cada verificação até a imagem voltar
+                or estado.problema is not None
+            )
+            if suspeita:
+                self.suspeitas += 1
+            return suspeita and self.analise_ativa
+
+    def analisar(self, chave: str, jpeg: bytes) -> Optional[str]:
+        """
+        Análise completa de uma imagem suspeita (CPU; fora do loop asyncio)
+
+        Returns:
+            CONGELADA, PRETA, SEM_SINAL ou None (imagem saudável ou ilegível)
+        """
+        try:
+            dhash, media, uniforme = impressao_imagem(jpeg)
+        except Exception as e:
+            with self._lock:
+                self.falhas_decodificacao += 1
+            logger.debug("Falha ao decodificar snapshot de %s: %r", chave, e)
+            return None
+
+        with self._lock:
+            estado = self._cameras.get(chave)
+            if estado is None:
+                estado = self._cameras[chave] = EstadoImagem()
+            anterior = estado.ultima_impressao()
+            estado.adicionar_impressao(dhash)
+            self.analises += 1
+
+            problema = None
+            escura = uniforme >= Config.IMAGEM_FRACAO_UNIFORME and media < Config.IMAGEM_LIMIAR_ESCURO
+            # Cena noturna varia o tamanho a cada captura; o quadro preto do DVR não
+            estado.escuras = estado.escuras + 1 if escura and estado.repeticoes > 0 else 0
+            if escura:
+                if estado.escuras >= Config.IMAGEM_CONFIRMACOES_PRETA:
+                    problema = PRETA
+            elif uniforme >= Config.IMAGEM_FRACAO_UNIFORME:
+                problema = SEM_SINAL
+            elif (
+                estado.repeticoes >= Config.IMAGEM_REPETICOES_CONGELADA
+                and anterior is not None
+                and bin(dhash ^ anterior).count("1") <= Config.IMAGEM_DISTANCIA_CONGELADA
+            ):
+                problema = CONGELADA
+
+            if problema is not None:
+                self.problemas[problema] += 1
+            estado.problema = problema
+            return problema
+
+    def amostrar(self, chave_dvr: str, chaves: List[str], quantidade: int) -> Set[str]:
+        """
+        Câmeras com status ON pelo lote que devem ser conferidas por snapshot:
+        as em observação e `quantidade` das demais, em rodízio por DVR
+
+        Args:
+            chaves: Câmeras do DVR resolvidas como ON pelo status em lote
+        """
+        with self._lock:
+            amostras = {
+                chave
+                for chave in chaves
+                if (estado := self._cameras.get(chave)) is not None and estado.em_observacao()
+            }
+            demais = sorted(chave for chave in chaves if chave not in amostras)
+            if demais and quantidade > 0:
+                inicio = self._rodizio.get(chave_dvr, 0) % len(demais)
+                amostras.update((demais + demais)[inicio:inicio + min(quantidade, len(demais))])
+                self._rodizio[chave_dvr] = inicio + quantidade
+            return amostras
+
+    def remover(self, chave: str):
+        with self._lock:
+            self._cameras.pop(chave, None)
+
+    def estatisticas(self) -> Dict[str, int]:
+        with self._lock:
+            com_problema = sum(
+                estado.problema is not None for estado in self._cameras.values()
+            )
+            return {
+                "cameras": len(self._cameras),
+                "com_problema": com_problema,
+                "analise_ativa": self.analise_ativa,
+                "triagens": self.triagens,
+                "suspeitas": self.suspeitas,
+                "analises": self.analises,
+                "falhas_decodificacao": self.falhas_decodificacao,
+                **self.problemas,
+            }
@@ -0,0 +1,307 @@
+"""
+Módulo responsável pelo agendamento adaptativo das verificações
+
+Cada câmera tem seu próprio intervalo: câmeras que acabaram de mudar de estado
+ou que oscilam (flapping) são verificadas com frequência; câmeras estáveis
+recuam gradualmente até AGENDA_INTERVALO_MAX. Um token bucket limita o total
+de verificações por segundo da frota. Após um reinício, o estado persistido de
+cada câmera decide a primeira verificação: as que estavam OFF e as vencidas
+saem primeiro; as verificadas há pouco aguardam o próprio vencimento.
+
+Quando uma câmera vence, as demais do mesmo DVR que venceriam dentro de
+AGENDA_JANELA_DVR são antecipadas e saem junto com ela, para que a fila do DVR
+tenha câmeras suficientes para a sonda em lote (uma requisição por DVR).
+"""
+import heapq
+import itertools
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import Config
+from ..core.camera_target import obter_alvo
+from ..utils.pacing import fase_deterministica
+
+
+class CameraAgendada:
+    """Estado de agendamento de uma câmera"""
+
+    __slots__ = (
+        "chave",
+        "cam",
+        "dvr",
+        "nome_condominio",
+        "config_global",
+        "intervalo",
+        "proxima",
+        "status",
+        "transicoes",
+        "geracao",
+        "em_execucao",
+    )
+
+    def __init__(self, chave, cam, nome_condominio, config_global, proxima, dvr=""):
+        self.chave = chave
+        self.cam = cam
+        self.dvr = dvr  # Chave do DVR - agrupa as câmeras que vencem juntas
+        self.nome_condominio = nome_condominio
+        self.config_global = config_global
+        self.intervalo = float(Config.INTERVALO_VERIFICACAO)
+        self.proxima = proxima
+        self.status: Optional[str] = None
+        self.transicoes: deque = deque(maxlen=Config.AGENDA_LIMITE_FLAPPING)
+        # Incrementada a cada reagendamento; entradas antigas do heap são ignoradas
+        self.geracao = 0
+        self.em_execucao = False
+
+
+class AgendadorAdaptativo:
+    """Fila de prioridade (heap) de câmeras ordenada pelo horário da próxima verificação"""
+
+    def __init__(
+        self,
+        probes_por_segundo: Optional[float] = None,
+        estados_anteriores: Optional[Dict[str, Tuple[Optional[str], Optional[float]]]] = None,
+    ):
+        """
+        Args:
+            estados_anteriores: Estado antes do reinício (chave -> (status,
+                horário da última verificação real)), usado quando a câmera
+                entra na agenda
+        """
+        self.intervalo_min = Config.AGENDA_INTERVALO_MIN
+        self.intervalo_max = Config.AGENDA_INTERVALO_MAX
+        self.fator_backoff = Config.AGENDA_FATOR_BACKOFF
+        self.janela_flapping = Config.AGENDA_JANELA_FLAPPING
+        self.probes_por_segundo = probes_por_segundo or Config.AGENDA_PROBES_POR_SEGUNDO
+        self.janela_dvr = Config.AGENDA_JANELA_DVR
+
+        self.cameras: Dict[str, CameraAgendada] = {}
+        self._por_dvr: Dict[str, set] = {}
+        self._heap: List[Tuple[float, int, str, int]] = []
+        self._sequencia = itertools.count()
+
+        # Token bucket do orçamento global de verificações
+        self._tokens = float(self.probes_por_segundo)
+        self._ultimo_abastecimento = time.monotonic()
+
+        self.estados_anteriores = dict(estados_anteriores or {})
+
+    @staticmethod
+    def chave_camera(nome_condominio: str, cam: Dict[str, Any]) -> str:
+        return obter_alvo(cam, nome_condominio).chave
+
+    def _agendar(self, item: CameraAgendada, proxima: float):
+        item.proxima = proxima
+        item.geracao += 1
+        heapq.heappush(
+            self._heap, (proxima, next(self._sequencia), item.chave, item.geracao)
+        )
+
+    def sincronizar(self, clientes_data: List[Tuple[str, Dict[str, Any]]]) -> Tuple[int, int]:
+        """
+        Sincroniza o agendador com o inventário atual de câmeras
+
+        Câmeras novas entram na agenda (ver primeira_verificacao); câmeras que sumiram do
+        inventário são descartadas; as demais mantêm intervalo e horário.
+
+        Returns:
+            (adicionadas, removidas)
+        """
+        agora = time.time()
+        vistas = set()
+        adicionadas = 0
+        novas = []
+
+        for nome_condominio, data in clientes_data:
+            config_global = data.get("metadata", {})
+            for cam in data.get("cameras", []):
+                alvo = obter_alvo(cam, nome_condominio)
+                chave = alvo.chave
+                vistas.add(chave)
+                item = self.cameras.get(chave)
+                if item is None:
+                    item = CameraAgendada(
+                        chave, cam, nome_condominio, config_global, agora, alvo.dvr.chave
+                    )
+                    self.cameras[chave] = item
+                    self._por_dvr.setdefault(item.dvr, set()).add(chave)
+                    anterior = self.estados_anteriores.pop(chave, None)
+                    proxima = self.primeira_verificacao(item, agora, anterior)
+                    novas.append((proxima, self._prioridade(anterior), item))
+                    adicionadas += 1
+                else:
+                    # Atualiza dados de conexão sem perder o histórico de agendamento
+                    item.cam = cam
+                    item.config_global = config_global
+                    if item.dvr != alvo.dvr.chave:
+                        self._remover_do_dvr(item)
+                        item.dvr = alvo.dvr.chave
+                        self._por_dvr.setdefault(item.dvr, set()).add(chave)
+
+        # No mesmo horário o heap desempata pela ordem de inserção
+        for proxima, _, item in sorted(novas, key=lambda nova: nova[:2]):
+            self._agendar(item, proxima)
+
+        removidas = [chave for chave in self.cameras if chave not in vistas]
+        for chave in removidas:
+            self._remover_do_dvr(self.cameras.pop(chave))
+
+        return adicionadas, len(removidas)
+
+    def _remover_do_dvr(self, item: CameraAgendada):
+        irmas = self._por_dvr.get(item.dvr)
+        if irmas is not None:
+            irmas.discard(item.chave)
+            if not irmas:
+                del self._por_dvr[item.dvr]
+
+    @staticmethod
+    def _prioridade(anterior: Optional[Tuple[Optional[str], Optional[float]]]) -> Tuple[int, float]:
+        """Ordem entre câmeras vencidas no mesmo horário: OFF, depois as mais antigas"""
+        if anterior is None:
+            return 2, 0.0
+        status, verificado_em = anterior
+        return (0 if status == "OFF" else 1), verificado_em or 0.0
+
+    def primeira_verificacao(
+        self,
+        item: CameraAgendada,
+        agora: float,
+        anterior: Optional[Tuple[Optional[str], Optional[float]]] = None,
+    ) -> float:
+        """
+        Horário da primeira verificação de uma câmera recém-adicionada
+
+        Com estado anterior ao reinício, câmeras OFF são verificadas
+        imediatamente e as demais no vencimento do intervalo contado a partir
+        da última verificação (imediatamente, se já passou). Sem ele, com
+        USE_PACING a câmera entra na fase determinística do seu DVR dentro do
+        intervalo (câmeras do mesmo DVR começam juntas); sem pacing é verificada imediatamente (todas de uma vez na
+        partida, limitadas apenas pelo token bucket).
+        """
+        if anterior is not None:
+            status, verificado_em = anterior
+            if status in ("ON", "OFF"):
+                item.status = status
+            if status == "OFF" or not verificado_em:
+                return agora
+            return max(agora, verificado_em + item.intervalo)
+        if not Config.USE_PACING:
+            return agora
+        periodo = Config.INTERVALO_VERIFICACAO * Config.PACING_FRACAO_INTERVALO
+        return agora + fase_deterministica(item.dvr or item.chave, periodo)
+
+    def _abastecer_tokens(self):
+        agora = time.monotonic()
+        decorrido = agora - self._ultimo_abastecimento
+        self._ultimo_abastecimento = agora
+        self._tokens = min(
+            float(self.probes_por_segundo), self._tokens + decorrido * self.probes_por_segundo
+        )
+
+    def proximas(self, agora: Optional[float] = None) -> List[CameraAgendada]:
+        """
+        Retira do heap as câmeras vencidas, respeitando o orçamento de
+        verificações por segundo; o excedente continua no heap (atrasado)
+
+        Junto com cada câmera vencida saem as do mesmo DVR que venceriam em
+        até AGENDA_JANELA_DVR (a entrada delas no heap fica obsoleta).
+        """
+        agora = agora or time.time()
+        self._abastecer_tokens()
+
+        vencidas = []
+        limite_antecipacao = agora + self.janela_dvr
+        while self._heap and self._heap[0][0] <= agora and self._tokens >= 1:
+            _, _, chave, geracao = heapq.heappop(self._heap)
+            item = self.cameras.get(chave)
+            if item is None or item.geracao != geracao or item.em_execucao:
+                continue  # Câmera removida ou entrada obsoleta
+            self._retirar(item, vencidas)
+            if self.janela_dvr <= 0:
+                continue
+            for chave_irma in self._por_dvr.get(item.dvr, ()):
+                if self._tokens < 1:
+                    break
+                irma = self.cameras[chave_irma]
+                if not irma.em_execucao and irma.proxima <= limite_antecipacao:
+                    self._retirar(irma, vencidas)
+        return vencidas
+
+    def _retirar(self, item: CameraAgendada, vencidas: List[CameraAgendada]):
+        item.em_execucao = True
+        self._tokens -= 1
+        vencidas.append(item)
+
+    def segundos_ate_proxima(self, agora: Optional[float] = None) -> float:
+        """Tempo até a próxima câmera vencer (ou até haver orçamento disponível)"""
+        agora = agora or time.time()
+        while self._heap:
+            _, _, chave, geracao = self._heap[0]
+            item = self.cameras.get(chave)
+            if item is not None and item.geracao == geracao and not item.em_execucao:
+                break
+            heapq.heappop(self._heap)  # Descarta entradas obsoletas
+        if not self._heap:
+            return 1.0
+        if self._tokens < 1:
+            return 1.0 / self.probes_por_segundo
+        return max(0.0, self._heap[0][0] - agora)
+
+    def registrar_resultado(self, chave: str, status: str, agora: Optional[float] = None):
+        """
+        Reagenda a câmera a partir do resultado da verificação
+
+        - Mudança de estado ou flapping: volta ao intervalo mínimo
+        - Estado estável: intervalo multiplicado por AGENDA_FATOR_BACKOFF,
+          limitado a AGENDA_INTERVALO_MAX
+        """
+        item = self.cameras.get(chave)
+        if item is None:
+            return  # Removida do inventário durante a verificação
+        agora = agora or time.time()
+        item.em_execucao = False
+
+        if status == "NO_CONFIG":
+            item.intervalo = self.intervalo_max
+        elif item.status is None:
+            pass  # Primeira verificação - mantém o intervalo inicial
+        elif status != item.status:
+            item.transicoes.append(agora)
+            item.intervalo = self.intervalo_min
+        elif self._oscilando(item, agora):
+            item.intervalo = self.intervalo_min
+        else:
+            item.intervalo = min(self.intervalo_max, item.intervalo * self.fator_backoff)
+
+        item.status = status
+        self._agendar(item, agora + item.intervalo)
+
+    def reagendar(self, chave: str, atraso: float):
+        """Reagenda sem avaliar resultado (ex.: erro inesperado na verificação)"""
+        item = self.cameras.get(chave)
+        if item is None:
+            return
+        item.em_execucao = False
+        self._agendar(item, time.time() + atraso)
+
+    def _oscilando(self, item: CameraAgendada, agora: float) -> bool:
+        """Flapping: AGENDA_LIMITE_FLAPPING transições dentro da janela"""
+        return (
+            len(item.transicoes) == item.transicoes.maxlen
+            and agora - item.transicoes[0] <= self.janela_flapping
+        )
+
+    def estatisticas(self) -> Dict[str, Any]:
+        agora = time.time()
+        # Cópia: pode ser chamado de outra thread (dashboard) durante a agenda
+        itens = list(self.cameras.values())
+        intervalos = [item.intervalo for item in itens]
+        return {
+            "cameras": len(itens),
+            "vencidas": sum(1 for item in itens if item.proxima <= agora),
+            "oscilando": sum(1 for item in itens if self._oscilando(item, agora)),
+            "intervalo_medio": sum(intervalos) / len(intervalos) if intervalos else 0.0,
+            "probes_por_segundo_max": self.probes_por_segundo,
+        }
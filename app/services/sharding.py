@@ -0,0 +1,568 @@
+"""
+Módulo responsável pela verificação fragmentada (sharding) em vários processos
+
+Com Config.SHARD_PROCESSOS > 0 o processo do Flask não verifica câmeras:
+ele inicia SHARD_PROCESSOS processos de verificação
+(python -m app.services.sharding --indice N) e só junta os resultados para o
+dashboard. Cada DVR (ip:porta) pertence a uma das SHARD_FATIAS fatias pelo
+hash consistente da sua chave (jump consistent hash - mudar a quantidade de
+fatias move só a fração mínima dos DVRs), e as fatias são arrendadas aos
+processos por app.core.shard_store. Um processo só verifica, e só alerta,
+as câmeras dos DVRs das fatias que arrendou; todas as câmeras de um DVR
+ficam no mesmo processo (limite por DVR, lote, Digest e disjuntor seguem
+locais).
+
+Cada processo roda o VerificationService completo (varredura ou agendamento
+adaptativo) sobre o inventário filtrado, com a sua própria outbox de
+alertas. O histórico de status (HISTORICO_PATH) é gravado só pelos processos
+de verificação, todos no mesmo banco (cada câmera está em um só processo); o
+dashboard apenas o consulta, incluindo os trechos abertos gravados por eles. A posse é conferida de novo no despacho de cada DVR e de cada
+câmera: uma fatia perdida deixa de ser verificada antes que o novo dono
+possa tomá-la.
+"""
+import argparse
+import atexit
+import hashlib
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from app.config import Config
+from ..core.camera_target import DvrEndpoint, montar_alvos
+from ..core.shard_store import CoordenacaoFragmentos
+from ..utils.logger import get_logger
+from ..utils.metrics import registro
+
+
+logger = get_logger(__name__)
+
+# Segundos mínimos entre o início de um processo e o seu reinício
+_ESPERA_REINICIO = 10
+
+
+def fatia_da_chave(chave: str, fatias: int) -> int:
+    """
+    Fatia da chave em [0, fatias) - jump consistent hash (Lamping e Veach)
+    sobre BLAKE2b, estável entre processos e máquinas
+    """
+    valor = int.from_bytes(hashlib.blake2b(chave.encode("utf-8"), digest_size=8).digest(), "big")
+    fatia, proxima = -1, 0
+    while proxima < fatias:
+        fatia = proxima
+        valor = (valor * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        proxima = int((fatia + 1) * ((1 << 31) / ((valor >> 33) + 1)))
+    return fatia
+
+
+def dono_processo(indice: int) -> str:
+    """Identificação estável do processo: reiniciado, retoma as próprias fatias"""
+    return f"{socket.gethostname()}/{indice}"
+
+
+def _caminho_processo(caminho: str, indice: int) -> str:
+    raiz, extensao = os.path.splitext(caminho)
+    return f"{raiz}.{indice}{extensao}"
+
+
+class FragmentoVerificacao:
+    """Processo de verificação: arrenda fatias e verifica só os DVRs delas"""
+
+    def __init__(
+        self,
+        service,
+        coordenacao: CoordenacaoFragmentos,
+        dono: str,
+        carregar_inventario: Optional[Callable[[], List[tuple]]] = None,
+    ):
+        """
+        Args:
+            service: VerificationService deste processo
+            carregar_inventario: Função que retorna a lista (cliente_nome,
+                data) completa (padrão get_alert_devices)
+        """
+        if carregar_inventario is None:
+            from ..core.database import get_alert_devices
+
+            carregar_inventario = get_alert_devices
+        self.service = service
+        self.coordenacao = coordenacao
+        self.dono = dono
+        self.carregar_inventario = carregar_inventario
+        self.intervalo_renovacao = coordenacao.arrendamento / 3
+
+        # Fatias arrendadas e até quando podem ser verificadas (epoch)
+        self.proprias: FrozenSet[int] = frozenset()
+        self._valido_ate = 0.0
+        self._fatias_dvr: Dict[str, int] = {}
+        # (condomínio, nome) -> fatia de toda câmera já filtrada (inclusive das
+        # fatias perdidas: o resultado de uma verificação em andamento ainda é publicado)
+        self._fatias_camera: Dict[Tuple[str, str], int] = {}
+        self.cameras = 0
+        self._inventario = None
+        self._filtrado: List[tuple] = []
+        self._proprias_filtradas: Optional[FrozenSet[int]] = None
+
+        # Status alterados desde a última publicação: (condomínio, nome) -> (status, instante)
+        self._lock = threading.Lock()
+        self._pendentes: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self._parar = threading.Event()
+        self.renovacoes = 0
+        self.falhas_renovacao = 0
+        self.fatias_tomadas = 0
+        self.fatias_perdidas = 0
+        self.publicados = 0
+
+        service.filtro_posse = self.possui_dvr
+        service.status.ouvintes.append(self._registrar_alteracoes)
+
+    def fatia_dvr(self, chave_dvr: str) -> int:
+        fatia = self._fatias_dvr.get(chave_dvr)
+        if fatia is None:
+            fatia = self._fatias_dvr[chave_dvr] = fatia_da_chave(chave_dvr, self.coordenacao.fatias)
+        return fatia
+
+    def possui_dvr(self, dvr: DvrEndpoint) -> bool:
+        """O DVR é de uma fatia arrendada e o arrendamento ainda vale"""
+        return time.time() < self._valido_ate and self.fatia_dvr(dvr.chave) in self.proprias
+
+    def renovar(self):
+        """Renova os arrendamentos; fatias novas herdam o último estado das câmeras"""
+        try:
+            proprias, expira_em = self.coordenacao.renovar(self.dono, self.estatisticas())
+        except Exception as e:
+            self.falhas_renovacao += 1
+            logger.error("Falha ao renovar os arrendamentos de %s: %s", self.dono, e)
+            return
+        self.renovacoes += 1
+        novas = proprias - self.proprias
+        perdidas = self.proprias - proprias
+        if novas:
+            try:
+                self._herdar_estados(novas)
+            except Exception as e:
+                logger.error("Falha ao herdar o estado das fatias %s: %s", sorted(novas), e)
+        self.proprias = frozenset(proprias)
+        self._valido_ate = expira_em - Config.SHARD_MARGEM
+        if novas or perdidas:
+            self.fatias_tomadas += len(novas)
+            self.fatias_perdidas += len(perdidas)
+            logger.info(
+                "%s: %d fatias arrendadas (+%d/-%d)", self.dono, len(proprias), len(novas), len(perdidas)
+            )
+
+    def _herdar_estados(self, fatias: Set[int]):
+        """
+        Último estado publicado pelo dono anterior: transições calculadas
+        contra ele e agenda priorizando câmeras OFF ou vencidas
+        """
+        service = self.service
+        anteriores = {}
+        for nome_condominio, nome, status, verificado_em in self.coordenacao.estados_das_fatias(fatias):
+            chave = f"{nome_condominio}_{nome}"
+            if status in ("ON", "OFF"):
+                service.ultimo_estado[chave] = status == "ON"
+            anteriores[chave] = (status, verificado_em)
+        agendador = service.agendador
+        if agendador is not None:
+            agendador.estados_anteriores.update(anteriores)
+        else:
+            service.estados_restaurados.update(anteriores)
+
+    def carregar(self) -> List[tuple]:
+        """
+        Inventário com todos os condomínios, mas só as câmeras das fatias
+        arrendadas (a mesma lista enquanto inventário e fatias não mudam)
+        """
+        clientes_data = self.carregar_inventario()
+        proprias = self.proprias
+        if clientes_data is self._inventario and proprias == self._proprias_filtradas:
+            return self._filtrado
+        if not clientes_data:
+            return clientes_data
+
+        montar_alvos(clientes_data)
+        filtrado = []
+        fatias_camera = {}
+        for nome_condominio, data in clientes_data:
+            cameras = []
+            for cam in data.get("cameras", []):
+                alvo = self.service.alvo(cam, nome_condominio)
+                fatia = self.fatia_dvr(alvo.dvr.chave)
+                if fatia in proprias:
+                    cameras.append(cam)
+                    fatias_camera[(nome_condominio, alvo.nome)] = fatia
+            filtrado.append((nome_condominio, {**data, "cameras": cameras}))
+
+        self._inventario = clientes_data
+        self._proprias_filtradas = proprias
+        self._filtrado = filtrado
+        self._fatias_camera.update(fatias_camera)
+        self.cameras = len(fatias_camera)
+        return filtrado
+
+    def _registrar_alteracoes(self, versao: int, alteracoes: List[Tuple[str, Optional[str], Any]]):
+        """
+        Ouvinte do status: guarda os status de câmeras para publicação
+        (remoções e metadados vêm do inventário no processo do dashboard)
+        """
+        agora = time.time()
+        with self._lock:
+            for nome_condominio, nome, valor in alteracoes:
+                if nome is not None and valor is not None:
+                    self._pendentes[(nome_condominio, nome)] = (valor, agora)
+
+    def publicar(self):
+        """Grava os status alterados na coordenação (lidos pelo dashboard)"""
+        with self._lock:
+            pendentes, self._pendentes = self._pendentes, {}
+        if not pendentes:
+            return
+        fatias_camera = self._fatias_camera
+        itens = [
+            (nome_condominio, nome, fatias_camera[(nome_condominio, nome)], status, instante)
+            for (nome_condominio, nome), (status, instante) in pendentes.items()
+            if (nome_condominio, nome) in fatias_camera
+        ]
+        try:
+            self.coordenacao.publicar_estados(itens)
+        except Exception as e:
+            logger.error("Falha ao publicar %d status: %s", len(itens), e)
+            with self._lock:
+                # Devolve sem sobrescrever status mais recentes
+                for chave, valor in pendentes.items():
+                    self._pendentes.setdefault(chave, valor)
+            return
+        self.publicados += len(itens)
+
+    def iniciar(self):
+        """Primeira renovação (antes de carregar o inventário) e thread de coordenação"""
+        self.renovar()
+        threading.Thread(target=self._executar, name="coordenacao-fragmento", daemon=True).start()
+        atexit.register(self.encerrar)
+
+    def _executar(self):
+        proxima_renovacao = time.time() + self.intervalo_renovacao
+        while not self._parar.wait(Config.SHARD_INTERVALO_RESULTADOS):
+            self.publicar()
+            if time.time() >= proxima_renovacao:
+                proxima_renovacao = time.time() + self.intervalo_renovacao
+                self.renovar()
+
+    def encerrar(self):
+        """Publica o que falta e libera as fatias para os demais processos"""
+        if self._parar.is_set():
+            return
+        self._parar.set()
+        self._valido_ate = 0.0
+        try:
+            self.publicar()
+            self.coordenacao.liberar(self.dono)
+        except Exception as e:
+            logger.error("Falha ao liberar as fatias de %s: %s", self.dono, e)
+
+    def executar(self):
+        """Verifica as câmeras das fatias arrendadas (não retorna)"""
+        self.iniciar()
+        service = self.service
+        if Config.MODO_AGENDAMENTO == "adaptativo":
+            while True:
+                try:
+                    # Recarga a cada renovação: fatias tomadas entram logo na agenda
+                    service.executar_agendado(self.carregar, self.intervalo_renovacao)
+                except Exception as e:
+                    logger.critical(
+                        "Erro inesperado na verificação agendada de %s: %s", self.dono, e, exc_info=True
+                    )
+                time.sleep(Config.AGENDA_INTERVALO_MIN)
+
+        while True:
+            inicio = time.time()
+            try:
+                clientes_data = self.carregar()
+                if clientes_data:
+                    service.sincronizar_status(clientes_data)
+                    service.iniciar_ciclo()
+                    service.verificar_todos(clientes_data)
+                    logger.info(
+                        "%s: varredura de %d câmeras concluída em %.2f segundos",
+                        self.dono,
+                        self.cameras,
+                        time.time() - inicio,
+                    )
+                    service.finalizar_ciclo()
+                else:
+                    logger.warning("Nenhum dispositivo para alerta encontrado no banco de dados.")
+            except Exception as e:
+                logger.critical(
+                    "Erro inesperado na varredura de %s: %s", self.dono, e, exc_info=True
+                )
+            if Config.USE_PACING:
+                time.sleep(max(0.0, Config.INTERVALO_VERIFICACAO - (time.time() - inicio)))
+            else:
+                time.sleep(Config.INTERVALO_VERIFICACAO)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Indicadores publicados junto com a renovação (somados no dashboard)"""
+        service = self.service
+        estatisticas = {
+            "pid": os.getpid(),
+            "cameras": self.cameras,
+            "fatias_tomadas": self.fatias_tomadas,
+            "fatias_perdidas": self.fatias_perdidas,
+            "status_publicados": self.publicados,
+            "probes": service.medidor_probes.estatisticas(),
+            "alertas": service.medidor_alertas.estatisticas(),
+        }
+        if service.disjuntores is not None:
+            estatisticas["disjuntores"] = service.disjuntores.estatisticas()
+            estatisticas["disjuntores"]["inacessiveis"] = service.disjuntores.inacessiveis(20)
+        if service.imagens is not None:
+            estatisticas["imagens"] = service.imagens.estatisticas()
+        return estatisticas
+
+
+def _somar(partes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Soma campo a campo os indicadores numéricos de cada processo"""
+    total: Dict[str, Any] = {}
+    for parte in partes:
+        for campo, valor in parte.items():
+            if isinstance(valor, bool):
+                total[campo] = total.get(campo, False) or valor
+            elif isinstance(valor, (int, float)):
+                total[campo] = total.get(campo, 0) + valor
+            elif isinstance(valor, list):
+                total.setdefault(campo, []).extend(valor)
+    return total
+
+
+class SupervisorFragmentos:
+    """
+    Processos de verificação iniciados pelo processo do dashboard, que
+    aplica no status publicado os resultados gravados por eles
+    """
+
+    def __init__(
+        self,
+        service,
+        processos: Optional[int] = None,
+        coordenacao: Optional[CoordenacaoFragmentos] = None,
+    ):
+        """
+        Args:
+            service: VerificationService do dashboard (status, histórico e estado persistido)
+        """
+        self.service = service
+        self.processos = processos or Config.SHARD_PROCESSOS
+        self.coordenacao = coordenacao or CoordenacaoFragmentos()
+        self._filhos: Dict[int, subprocess.Popen] = {}
+        self._iniciados_em: Dict[int, float] = {}
+        self._seq = 0
+        self._inventario = None
+        # (condomínio, nome) do inventário atual - resultados de câmeras removidas são ignorados
+        self._cameras: Optional[Set[Tuple[str, str]]] = None
+        self._encerrando = False
+        self.reinicios = 0
+        self.aplicadas = 0
+        registro.registrar_coletor(self.coletar_metricas)
+
+    def iniciar(self):
+        self.coordenacao.anunciar(dono_processo(indice) for indice in range(self.processos))
+        for indice in range(self.processos):
+            self._iniciar_processo(indice)
+        atexit.register(self.encerrar)
+        threading.Thread(target=self._executar, name="supervisor-fragmentos", daemon=True).start()
+        logger.info(
+            "Verificação fragmentada: %d processos, %d fatias", self.processos, self.coordenacao.fatias
+        )
+
+    def _iniciar_processo(self, indice: int):
+        self._filhos[indice] = subprocess.Popen(
+            [sys.executable, "-m", "app.services.sharding", "--indice", str(indice)],
+            cwd=Config.BASE_DIR,
+        )
+        self._iniciados_em[indice] = time.monotonic()
+
+    def _verificar_processos(self):
+        """Reinicia os processos que terminaram (sem reiniciar em laço)"""
+        for indice, processo in list(self._filhos.items()):
+            codigo = processo.poll()
+            if codigo is None or self._encerrando:
+                continue
+            if time.monotonic() - self._iniciados_em[indice] < _ESPERA_REINICIO:
+                continue
+            logger.error(
+                "Processo de verificação %d terminou (código %s) - reiniciando", indice, codigo
+            )
+            self.reinicios += 1
+            self._iniciar_processo(indice)
+
+    def _executar(self):
+        proxima_sincronizacao = 0.0
+        while not self._encerrando:
+            try:
+                if time.time() >= proxima_sincronizacao:
+                    proxima_sincronizacao = time.time() + Config.AGENDA_INTERVALO_INVENTARIO
+                    self.sincronizar_inventario()
+                self.aplicar_resultados()
+                self._verificar_processos()
+            except Exception as e:
+                logger.error("Falha ao juntar os resultados dos processos de verificação: %s", e)
+            time.sleep(Config.SHARD_INTERVALO_RESULTADOS)
+
+    def sincronizar_inventario(self):
+        """Condomínios, metadados e remoções vêm do inventário completo"""
+        from ..core.database import get_alert_devices
+
+        clientes_data = get_alert_devices()
+        if not clientes_data or clientes_data is self._inventario:
+            return
+        self._inventario = clientes_data
+        self.service.sincronizar_status(clientes_data)
+        self._cameras = {
+            (nome_condominio, cam.get("name", "CAMERA"))
+            for nome_condominio, data in clientes_data
+            for cam in data.get("cameras", [])
+        }
+        removidos = self.coordenacao.remover_estados_ausentes(self._cameras)
+        if removidos:
+            logger.info("%d estados de câmeras fora do inventário removidos", removidos)
+
+    def aplicar_resultados(self) -> int:
+        """
+        Aplica no status do dashboard o que os processos gravaram desde a
+        última leitura (aguarda a primeira carga do inventário)
+
+        Returns:
+            Quantidade de status lidos
+        """
+        if self._cameras is None:
+            return 0
+        alteracoes, self._seq = self.coordenacao.alteracoes_desde(self._seq)
+        if alteracoes:
+            cameras = self._cameras
+            self.service.status.atualizar_cameras(
+                alteracao for alteracao in alteracoes if alteracao[:2] in cameras
+            )
+            self.aplicadas += len(alteracoes)
+        return len(alteracoes)
+
+    def encerrar(self):
+        """Encerra os processos (cada um libera as suas fatias ao sair)"""
+        self._encerrando = True
+        for processo in self._filhos.values():
+            if processo.poll() is None:
+                processo.terminate()
+        limite = time.monotonic() + 10
+        for processo in self._filhos.values():
+            try:
+                processo.wait(max(0.1, limite - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                processo.kill()
+
+    def mesclar_estatisticas(self, estatisticas: Dict[str, Any]):
+        """Substitui os indicadores de verificação do dashboard pela soma dos processos"""
+        membros = self.coordenacao.membros()
+        partes = [membro["estatisticas"] for membro in membros]
+        for campo in ("probes", "alertas", "disjuntores", "imagens"):
+            valores = [parte[campo] for parte in partes if campo in parte]
+            if valores:
+                estatisticas[campo] = _somar(valores)
+        if "disjuntores" in estatisticas:
+            estatisticas["disjuntores"]["inacessiveis"] = sorted(
+                estatisticas["disjuntores"].get("inacessiveis", []),
+                key=lambda dvr: dvr["desde"] or 0,
+            )[:100]
+        estatisticas["fragmentos"] = {
+            **self.coordenacao.estatisticas(),
+            "processos": self.processos,
+            "reinicios": self.reinicios,
+            "status_aplicados": self.aplicadas,
+            "membros": [
+                {
+                    "dono": membro["dono"],
+                    "fatias": membro["fatias"],
+                    "cameras": membro["estatisticas"].get("cameras", 0),
+                    "probes_1min": membro["estatisticas"].get("probes", {}).get("taxa_1min", 0.0),
+                    "visto_ha_s": membro["visto_ha_s"],
+                }
+                for membro in membros
+            ],
+        }
+
+    def coletar_metricas(self):
+        membros = self.coordenacao.membros()
+        return [
+            (
+                "fragmento_fatias",
+                "gauge",
+                "Fatias de DVRs arrendadas por processo de verificação",
+                [({"dono": membro["dono"]}, membro["fatias"]) for membro in membros],
+            ),
+            (
+                "fragmento_cameras",
+                "gauge",
+                "Câmeras verificadas por processo de verificação",
+                [
+                    ({"dono": membro["dono"]}, membro["estatisticas"].get("cameras", 0))
+                    for membro in membros
+                ],
+            ),
+            (
+                "fragmento_probes_por_segundo",
+                "gauge",
+                "Requisições por segundo aos DVRs no último minuto, por processo",
+                [
+                    (
+                        {"dono": membro["dono"]},
+                        membro["estatisticas"].get("probes", {}).get("taxa_1min", 0.0),
+                    )
+                    for membro in membros
+                ],
+            ),
+            (
+                "fragmento_reinicios_total",
+                "counter",
+                "Processos de verificação reiniciados pelo supervisor",
+                [({}, self.reinicios)],
+            ),
+        ]
+
+
+def configurar_processo(indice: int):
+    """
+    Ajusta a configuração herdada para um processo de verificação: outbox de
+    alertas própria e estado compartilhado pela coordenação (o retrato em
+    disco fica com o processo do dashboard); o histórico continua gravado
+    aqui - o dashboard só o consulta
+    """
+    Config.ALERTAS_OUTBOX_PATH = _caminho_processo(Config.ALERTAS_OUTBOX_PATH, indice)
+    Config.ESTADO_PERSISTIR = False
+    Config.HISTORICO_GRAVAR = True
+
+
+def main():
+    from ..utils.logger import configurar_logging
+    from .verification_service import VerificationService
+
+    parser = argparse.ArgumentParser(description="Processo de verificação fragmentada")
+    parser.add_argument("--indice", type=int, required=True, help="número do processo neste host")
+    args = parser.parse_args()
+
+    configurar_processo(args.indice)
+    configurar_logging()
+    # terminate() do supervisor: encerra pelo atexit (publica e libera as fatias)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    fragmento = FragmentoVerificacao(
+        VerificationService(), CoordenacaoFragmentos(), dono_processo(args.indice)
+    )
+    fragmento.executar()
+
+
+if __name__ == "__main__":
+    main()
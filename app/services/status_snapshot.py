@@ -0,0 +1,264 @@
+"""
+Módulo responsável pela publicação versionada do status das câmeras
+
+Toda alteração de status passa pelo PublicadorStatus (protegido por lock) e
+incrementa a versão. O snapshot completo é serializado (JSON e gzip) uma
+única vez por versão e reutilizado por todas as requisições; o log de
+alterações permite responder apenas o que mudou desde uma versão (?since=).
+"""
+import gzip
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.config import Config
+from app.utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+def montar_delta(versao: int, alteracoes: Iterable[Tuple[str, Optional[str], Any]]) -> Dict[str, Any]:
+    """
+    Converte alterações (condomínio, câmera ou None, valor) no formato de
+    /status?since= e dos eventos SSE (a última alteração de cada item prevalece)
+
+    Returns:
+        {"versao", "condominios": {nome: metadata ou None (removido)},
+         "cameras": [{"condominio", "nome", "status" ou None (removida)}]}
+    """
+    condominios: Dict[str, Any] = {}
+    cameras: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+    for nome_condominio, nome, valor in alteracoes:
+        if nome is None:
+            condominios[nome_condominio] = valor
+        else:
+            cameras.pop((nome_condominio, nome), None)
+            cameras[(nome_condominio, nome)] = valor
+    return {
+        "versao": versao,
+        "condominios": condominios,
+        "cameras": [
+            {"condominio": nome_condominio, "nome": nome, "status": status}
+            for (nome_condominio, nome), status in cameras.items()
+        ],
+    }
+
+
+class SnapshotStatus:
+    """Snapshot imutável do status de todas as câmeras"""
+
+    __slots__ = ("versao", "dados", "corpo", "_corpo_gzip")
+
+    def __init__(self, versao: int, dados: Dict[str, Any]):
+        self.versao = versao
+        self.dados = dados
+        self.corpo = json.dumps(dados, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self._corpo_gzip: Optional[bytes] = None
+
+    @property
+    def etag(self) -> str:
+        return str(self.versao)
+
+    @property
+    def corpo_gzip(self) -> bytes:
+        # Comprimido sob demanda (uma vez) - nem todo cliente aceita gzip
+        if self._corpo_gzip is None:
+            self._corpo_gzip = gzip.compress(self.corpo, compresslevel=6)
+        return self._corpo_gzip
+
+
+class PublicadorStatus:
+    """Estado atual (condomínio -> câmeras) com versão e log de alterações"""
+
+    def __init__(self, max_alteracoes: Optional[int] = None):
+        self._lock = threading.Lock()
+        # condomínio -> {"metadata": dict, "cameras": OrderedDict(nome -> status)}
+        self._condominios: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Parte da época em microssegundos: versões de um novo processo não
+        # colidem com as que os navegadores guardaram do anterior
+        self.versao = time.time_ns() // 1000
+        self._versao_inicial = self.versao
+        # (versão, condomínio, nome ou None, status/metadata ou None = removido)
+        self._alteracoes: deque = deque(maxlen=max_alteracoes or Config.STATUS_MAX_ALTERACOES)
+        self._snapshot: Optional[SnapshotStatus] = None
+        # Alterações da operação em andamento e funções notificadas ao fim dela
+        self._pendentes: List[Tuple[str, Optional[str], Any]] = []
+        self.ouvintes: List[Callable[[int, List[Tuple[str, Optional[str], Any]]], None]] = []
+
+    def _registrar(self, condominio: str, nome: Optional[str], valor):
+        self.versao += 1
+        self._alteracoes.append((self.versao, condominio, nome, valor))
+        self._pendentes.append((condominio, nome, valor))
+
+    def _notificar(self):
+        """
+        Entrega as alterações pendentes aos ouvintes (com o lock adquirido,
+        para que os eventos saiam na mesma ordem das versões)
+        """
+        if not self._pendentes:
+            return
+        alteracoes, self._pendentes = self._pendentes, []
+        for ouvinte in self.ouvintes:
+            try:
+                ouvinte(self.versao, alteracoes)
+            except Exception as e:
+                logger.exception("Falha ao notificar alteração de status: %s", e)
+
+    def _condominio(self, nome_condominio: str, metadata: Optional[Dict[str, Any]]):
+        condominio = self._condominios.get(nome_condominio)
+        if condominio is None:
+            condominio = {"metadata": metadata or {}, "cameras": OrderedDict()}
+            self._condominios[nome_condominio] = condominio
+            self._registrar(nome_condominio, None, condominio["metadata"])
+        elif metadata is not None and metadata != condominio["metadata"]:
+            condominio["metadata"] = metadata
+            self._registrar(nome_condominio, None, metadata)
+        return condominio
+
+    def publicar_condominio(
+        self,
+        nome_condominio: str,
+        cameras: List[Dict[str, str]],
+        metadata: Optional[Dict[str, Any]] = None,
+    ):
+        """Substitui todas as câmeras do condomínio (fim da varredura dele)"""
+        with self._lock:
+            condominio = self._condominio(nome_condominio, metadata or {})
+            atuais = condominio["cameras"]
+            novas = OrderedDict((cam["nome"], cam["status"]) for cam in cameras)
+            for nome in [nome for nome in atuais if nome not in novas]:
+                del atuais[nome]
+                self._registrar(nome_condominio, nome, None)
+            for nome, status in novas.items():
+                if atuais.get(nome) != status:
+                    self._registrar(nome_condominio, nome, status)
+            condominio["cameras"] = novas
+            self._notificar()
+
+    def atualizar_camera(self, nome_condominio: str, nome: str, status: str):
+        """Atualiza uma única câmera (modo agendado)"""
+        with self._lock:
+            cameras = self._condominio(nome_condominio, None)["cameras"]
+            if cameras.get(nome) != status:
+                cameras[nome] = status
+                self._registrar(nome_condominio, nome, status)
+            self._notificar()
+
+    def atualizar_cameras(self, alteracoes: Iterable[Tuple[str, str, str]]):
+        """Atualiza várias câmeras (condomínio, nome, status) em uma única operação"""
+        with self._lock:
+            for nome_condominio, nome, status in alteracoes:
+                cameras = self._condominio(nome_condominio, None)["cameras"]
+                if cameras.get(nome) != status:
+                    cameras[nome] = status
+                    self._registrar(nome_condominio, nome, status)
+            self._notificar()
+
+    def sincronizar(self, clientes_data: List[tuple]) -> List[Tuple[str, str]]:
+        """
+        Ajusta o estado ao inventário: cria os condomínios novos e remove
+        condomínios e câmeras que não estão mais no banco
+
+        Returns:
+            Lista (condomínio, câmera) das câmeras removidas
+        """
+        removidas = []
+        with self._lock:
+            vistos = OrderedDict()
+            for nome_condominio, data in clientes_data:
+                vistos[nome_condominio] = {
+                    cam.get("name", "CAMERA") for cam in data.get("cameras", [])
+                }
+                self._condominio(nome_condominio, data.get("metadata", {}) or {})
+
+            for nome_condominio in list(self._condominios):
+                cameras_vistas = vistos.get(nome_condominio)
+                cameras = self._condominios[nome_condominio]["cameras"]
+                if cameras_vistas is None:
+                    for nome in cameras:
+                        removidas.append((nome_condominio, nome))
+                        self._registrar(nome_condominio, nome, None)
+                    del self._condominios[nome_condominio]
+                    self._registrar(nome_condominio, None, None)
+                    continue
+                for nome in [nome for nome in cameras if nome not in cameras_vistas]:
+                    del cameras[nome]
+                    removidas.append((nome_condominio, nome))
+                    self._registrar(nome_condominio, nome, None)
+            self._notificar()
+        return removidas
+
+    def restaurar(self, dados: Dict[str, Any]) -> int:
+        """
+        Carrega o status persistido antes do reinício (formato de
+        SnapshotStatus.dados) para os condomínios ainda sem status
+
+        Returns:
+            Quantidade de câmeras restauradas
+        """
+        restauradas = 0
+        with self._lock:
+            for nome_condominio, condominio in dados.items():
+                if nome_condominio in self._condominios:
+                    continue
+                atual = self._condominio(nome_condominio, condominio.get("metadata") or {})
+                for cam in condominio.get("cameras", []):
+                    atual["cameras"][cam["nome"]] = cam["status"]
+                    self._registrar(nome_condominio, cam["nome"], cam["status"])
+                    restauradas += 1
+            self._notificar()
+        return restauradas
+
+    def snapshot(self) -> SnapshotStatus:
+        """Snapshot da versão atual (serializado apenas quando a versão muda)"""
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.versao == self.versao:
+                return snapshot
+            versao = self.versao
+            dados = {
+                nome_condominio: {
+                    "cameras": [
+                        {"nome": nome, "status": status}
+                        for nome, status in condominio["cameras"].items()
+                    ],
+                    "metadata": condominio["metadata"],
+                }
+                for nome_condominio, condominio in self._condominios.items()
+            }
+        snapshot = SnapshotStatus(versao, dados)
+        with self._lock:
+            if self._snapshot is None or self._snapshot.versao < versao:
+                self._snapshot = snapshot
+        return snapshot
+
+    def delta(self, desde: int) -> Optional[Dict[str, Any]]:
+        """
+        Alterações posteriores à versão `desde` (formato de montar_delta)
+
+        Returns:
+            None se a versão é desconhecida ou anterior ao log mantido
+            (o cliente deve buscar o snapshot completo)
+        """
+        with self._lock:
+            if desde > self.versao or desde < self._versao_inicial:
+                return None
+            mais_antiga = self._alteracoes[0][0] if self._alteracoes else self.versao + 1
+            if desde < mais_antiga - 1:
+                return None
+            selecionadas = []
+            for versao, nome_condominio, nome, valor in reversed(self._alteracoes):
+                if versao <= desde:
+                    break
+                selecionadas.append((nome_condominio, nome, valor))
+            versao_atual = self.versao
+        selecionadas.reverse()
+        return montar_delta(versao_atual, selecionadas)
+
+    def condominio(self, nome_condominio: str) -> Optional[List[Dict[str, str]]]:
+        """Câmeras de um condomínio a partir do snapshot atual"""
+        dados = self.snapshot().dados.get(nome_condominio)
+        return dados["cameras"] if dados is not None else None
@@ -1,417 +1,1211 @@
-"""
-Módulo responsável pelo serviço de verificação
-"""
-
-import time
-import concurrent.futures
-from typing import Dict, Any, List, Optional
-from ..core.config_manager import ConfigManager
-from ..utils.cache_manager import CacheManager
-from ..utils.protocol_utils import ProtocolUtils
-from app.config import Config
-from app.alert import enviar_alerta
-
-
-class VerificationService:
-    """Classe responsável por gerenciar verificações de câmeras"""
-
-    def __init__(self):
-        self.cache_manager = CacheManager()
-        self.ultimo_estado: Dict[str, bool] = {}
-        self.status_atual: Dict[str, List[Dict[str, str]]] = {}
-
-        # Pool de conexões HTTP reutilizável para melhor performance
-        self.http_session = None
-        if Config.USE_CONNECTION_POOL:
-            import requests
-            from requests.adapters import HTTPAdapter
-            from urllib3.util.retry import Retry
-
-            self.http_session = requests.Session()
-
-            # Configurar adapter com pool de conexões
-            adapter = HTTPAdapter(
-                pool_connections=Config.CONNECTION_POOL_SIZE,
-                pool_maxsize=Config.CONNECTION_POOL_MAXSIZE,
-                max_retries=0,  # Trataremos retry manualmente
-            )
-            self.http_session.mount("http://", adapter)
-            self.http_session.mount("https://", adapter)
-
-            print(
-                f"[INFO] ✅ Pool de conexões HTTP ativado - {Config.CONNECTION_POOL_SIZE} conexões"
-            )
-
-    def verificar_camera_individual(
-        self,
-        cam: Dict[str, Any],
-        nome_condominio: str,
-        config_global: Optional[Dict[str, Any]] = None,
-    ) -> tuple[str, str]:
-        """
-        Dispatcher que roteia para o método de verificação apropriado baseado no protocolo do DVR
-
-        O protocolo é injetado pelo condominio_service como '_dvr_protocol'
-        """
-        protocol = ProtocolUtils.get_protocol_from_camera(cam)
-
-        if protocol == "intelbras":
-            return self.verificar_camera_intelbras(cam, nome_condominio, config_global)
-        else:  # hikvision or default
-            return self.verificar_camera_hikvision(cam, nome_condominio, config_global)
-
-    def verificar_camera_hikvision(
-        self,
-        cam: Dict[str, Any],
-        nome_condominio: str,
-        config_global: Optional[Dict[str, Any]] = None,
-    ) -> tuple[str, str]:
-        """Verifica uma câmera Hikvision usando snapshot da API ISAPI (HTTPDigestAuth)"""
-        import requests
-        from requests.auth import HTTPDigestAuth
-
-        nome = cam.get("name", "CAMERA")
-        # Tenta obter IP e porta do nível da câmera, se não encontrar, usa do DVR
-        ip = cam.get("ip") or cam.get("_dvr_ip")
-        porta = cam.get("porta") or cam.get("_dvr_porta", 80)
-        canal = cam.get("canal") or cam.get("channel") or "101"
-        # Credenciais sempre do DVR (fallback para camera se não injetado)
-        usuario = cam.get("_dvr_usuario") or cam.get("usuario") or "admin"
-        senha = cam.get("_dvr_senha") or cam.get("senha") or "admin"
-
-        if not ip or not usuario or not senha:
-            print(f"[⚠️] {nome} não possui dados de conexão suficientes. IP: {ip}")
-            return nome, "NO_CONFIG"
-
-        # Verifica cache primeiro
-        chave_cache = f"{nome_condominio}_{nome}_{ip}_{canal}"
-        resultado_encontrado, resultado_cache = self.cache_manager.get_cached_result(
-            chave_cache
-        )
-        if resultado_encontrado:
-            status_str = "ON" if resultado_cache else "OFF"
-            print(f"📷 {nome} está {status_str} (cache)")
-            chave = f"{nome_condominio}_{nome}"
-            estado_anterior = self.ultimo_estado.get(chave)
-            if estado_anterior is False and resultado_cache:
-                cam_info = ConfigManager.construir_camera_info(
-                    cam, nome_condominio, config_global
-                )
-                cam_info["ocorrencia"] = "961"
-                cam_info["complemento"] = f"{nome} voltou online"
-                enviar_alerta(cam_info, nome_condominio)
-            if estado_anterior != resultado_cache and not resultado_cache:
-                cam_info = ConfigManager.construir_camera_info(
-                    cam, nome_condominio, config_global
-                )
-                enviar_alerta(cam_info, nome_condominio)
-            self.ultimo_estado[chave] = resultado_cache
-            return nome, status_str
-
-        # Verificação real via snapshot API Hikvision
-        url = f"http://{ip}:{porta}/ISAPI/Streaming/channels/{canal}/picture"
-
-        # Retry com backoff exponencial
-        online = False
-        ultima_exception = None
-
-        for tentativa in range(Config.TENTATIVAS_RETRY + 1):
-            try:
-                # Usa pool de conexões se disponível, senão cria nova requisição
-                if self.http_session:
-                    resp = self.http_session.get(
-                        url,
-                        auth=HTTPDigestAuth(usuario, senha),
-                        timeout=Config.TIMEOUT_VERIFICACAO,
-                    )
-                else:
-                    import requests
-
-                    resp = requests.get(
-                        url,
-                        auth=HTTPDigestAuth(usuario, senha),
-                        timeout=Config.TIMEOUT_VERIFICACAO,
-                    )
-
-                online = resp.status_code == 200 and resp.headers.get(
-                    "Content-Type", ""
-                ).startswith("image")
-
-                if online:
-                    break  # Sucesso, sai do loop de retry
-
-            except Exception as e:
-                ultima_exception = e
-                if tentativa < Config.TENTATIVAS_RETRY:
-                    # Backoff exponencial: 1s, 2s, 4s...
-                    backoff = Config.RETRY_BACKOFF * (2**tentativa)
-                    time.sleep(backoff)
-                continue
-
-        # Log apenas se falhou após todas as tentativas
-        if not online and ultima_exception:
-            print(f"[ERRO] {nome}: {ultima_exception}")
-
-        status_str = "ON" if online else "OFF"
-        print(f"📷 {nome} está {status_str}")
-
-        # Atualiza cache
-        self.cache_manager.set_cached_result(chave_cache, online)
-
-        # Atualiza contador de falhas consecutivas
-        chave_falhas = f"{nome_condominio}_{nome}"
-        self.cache_manager.update_falhas_consecutivas(chave_falhas, online)
-
-        chave = f"{nome_condominio}_{nome}"
-        estado_anterior = self.ultimo_estado.get(chave)
-
-        # Envia alerta se voltou online
-        if estado_anterior is False and online:
-            cam_info = ConfigManager.construir_camera_info(
-                cam, nome_condominio, config_global
-            )
-            cam_info["ocorrencia"] = "961"
-            cam_info["complemento"] = f"{nome} voltou online"
-            enviar_alerta(cam_info, nome_condominio)
-
-        # Envia alerta se acabou de cair
-        if estado_anterior != online and not online:
-            cam_info = ConfigManager.construir_camera_info(
-                cam, nome_condominio, config_global
-            )
-            enviar_alerta(cam_info, nome_condominio)
-
-        self.ultimo_estado[chave] = online
-        return nome, status_str
-
-    def verificar_camera_intelbras(
-        self,
-        cam: Dict[str, Any],
-        nome_condominio: str,
-        config_global: Optional[Dict[str, Any]] = None,
-    ) -> tuple[str, str]:
-        """
-        Verifica uma câmera Intelbras usando snapshot CGI (HTTPDigestAuth)
-
-        Protocolo CGI (Dahua): /cgi-bin/snapshot.cgi?channel={n}
-        Canais em formato numérico simples: 1, 2, 3, 4...
-
-        Validação em cascata:
-        1. Conectividade TCP (porta configurada)
-        2. Autenticação Digest (Status 200)
-        3. Content-Type: image/jpeg
-        4. Content-Length > MIN_SIZE (detecta imagens estáticas "Sem Sinal")
-        """
-        import requests
-        from requests.auth import HTTPDigestAuth
-
-        nome = cam.get("name", "CAMERA")
-        ip = cam.get("ip") or cam.get("_dvr_ip")
-        porta = cam.get("porta") or cam.get("_dvr_porta", 80)
-        canal = cam.get("canal") or cam.get("channel") or "1"
-        # Credenciais sempre do DVR (fallback para camera se não injetado)
-        usuario = cam.get("_dvr_usuario") or cam.get("usuario") or "admin"
-        senha = cam.get("_dvr_senha") or cam.get("senha") or "admin"
-
-        if not ip or not usuario or not senha:
-            print(f"[⚠️] {nome} não possui dados de conexão suficientes. IP: {ip}")
-            return nome, "NO_CONFIG"
-
-        # Converte canal para formato Intelbras se necessário (101 -> 1)
-        canal = ProtocolUtils.convert_channel_to_intelbras(canal)
-
-        # Verifica cache primeiro
-        chave_cache = f"{nome_condominio}_{nome}_{ip}_{canal}_intelbras"
-        resultado_encontrado, resultado_cache = self.cache_manager.get_cached_result(
-            chave_cache
-        )
-        if resultado_encontrado:
-            status_str = "ON" if resultado_cache else "OFF"
-            print(f"📷 {nome} está {status_str} (cache) [Intelbras]")
-            chave = f"{nome_condominio}_{nome}"
-            estado_anterior = self.ultimo_estado.get(chave)
-            if estado_anterior is False and resultado_cache:
-                cam_info = ConfigManager.construir_camera_info(
-                    cam, nome_condominio, config_global
-                )
-                cam_info["ocorrencia"] = "961"
-                cam_info["complemento"] = f"{nome} voltou online"
-                enviar_alerta(cam_info, nome_condominio)
-            if estado_anterior != resultado_cache and not resultado_cache:
-                cam_info = ConfigManager.construir_camera_info(
-                    cam, nome_condominio, config_global
-                )
-                enviar_alerta(cam_info, nome_condominio)
-            self.ultimo_estado[chave] = resultado_cache
-            return nome, status_str
-
-        # Verificação real via snapshot CGI Intelbras
-        url = f"http://{ip}:{porta}/cgi-bin/snapshot.cgi?channel={canal}"
-
-        # Retry com backoff exponencial
-        online = False
-        ultima_exception = None
-        content_length = 0
-
-        for tentativa in range(Config.TENTATIVAS_RETRY + 1):
-            try:
-                # Usa pool de conexões se disponível
-                if self.http_session:
-                    resp = self.http_session.get(
-                        url,
-                        auth=HTTPDigestAuth(usuario, senha),
-                        timeout=Config.TIMEOUT_VERIFICACAO,
-                    )
-                else:
-                    import requests
-
-                    resp = requests.get(
-                        url,
-                        auth=HTTPDigestAuth(usuario, senha),
-                        timeout=Config.TIMEOUT_VERIFICACAO,
-                    )
-
-                # Validação Intelbras:
-                # 1. Status 200 (autenticação OK)
-                # 2. Content-Type deve ser image/jpeg
-                # 3. Content-Length deve ser maior que MIN_SIZE (evita imagens "Sem Sinal")
-                content_type_ok = resp.headers.get("Content-Type", "").startswith(
-                    "image"
-                )
-                content_length = int(resp.headers.get("Content-Length", 0))
-                size_ok = content_length >= Config.INTELBRAS_MIN_IMAGE_SIZE
-
-                online = resp.status_code == 200 and content_type_ok and size_ok
-
-                if online:
-                    break  # Sucesso, sai do loop de retry
-                elif resp.status_code == 200 and content_type_ok and not size_ok:
-                    # Imagem muito pequena - provavelmente "Sem Sinal"
-                    print(
-                        f"[⚠️] {nome}: Imagem muito pequena ({content_length} bytes) - possível 'Sem Sinal'"
-                    )
-                    break  # Não continua tentando
-
-            except Exception as e:
-                ultima_exception = e
-                if tentativa < Config.TENTATIVAS_RETRY:
-                    # Backoff exponencial: 1s, 2s, 4s...
-                    backoff = Config.RETRY_BACKOFF * (2**tentativa)
-                    time.sleep(backoff)
-                continue
-
-        # Log apenas se falhou após todas as tentativas
-        if not online and ultima_exception:
-            print(f"[ERRO] {nome} [Intelbras]: {ultima_exception}")
-        elif not online and content_length > 0:
-            print(
-                f"[INFO] {nome} [Intelbras]: Offline ou sem sinal (image size: {content_length} bytes)"
-            )
-
-        status_str = "ON" if online else "OFF"
-        print(f"📷 {nome} está {status_str} [Intelbras CGI]")
-
-        # Atualiza cache
-        self.cache_manager.set_cached_result(chave_cache, online)
-
-        # Atualiza contador de falhas consecutivas
-        chave_falhas = f"{nome_condominio}_{nome}"
-        self.cache_manager.update_falhas_consecutivas(chave_falhas, online)
-
-        chave = f"{nome_condominio}_{nome}"
-        estado_anterior = self.ultimo_estado.get(chave)
-
-        # Envia alerta se voltou online
-        if estado_anterior is False and online:
-            cam_info = ConfigManager.construir_camera_info(
-                cam, nome_condominio, config_global
-            )
-            cam_info["ocorrencia"] = "961"
-            cam_info["complemento"] = f"{nome} voltou online"
-            enviar_alerta(cam_info, nome_condominio)
-
-        # Envia alerta se acabou de cair
-        if estado_anterior != online and not online:
-            cam_info = ConfigManager.construir_camera_info(
-                cam, nome_condominio, config_global
-            )
-            enviar_alerta(cam_info, nome_condominio)
-
-        self.ultimo_estado[chave] = online
-        return nome, status_str
-
-    def verificar_cameras(
-        self,
-        cameras: List[Dict[str, Any]],
-        nome_condominio: str = "Condomínio",
-        config_global: Optional[Dict[str, Any]] = None,
-    ):
-        """Verifica múltiplas câmeras em paralelo, mas com limite de concorrência e delay para não sobrecarregar a rede"""
-        # Inicializa com metadados do condomínio se disponível
-        self.status_atual[nome_condominio] = {
-            "cameras": [],
-            "metadata": config_global or {},
-        }
-
-        # Debug para verificar se os metadados estão sendo extraídos
-        if config_global:
-            print(
-                f"[DEBUG] ✅ {nome_condominio} - Empresa: {config_global.get('empresa')} - Metadados: {config_global}"
-            )
-        else:
-            print(f"[DEBUG] ❌ {nome_condominio} - NENHUM metadado extraído!")
-
-        if not cameras:
-            return
-
-        # Limpa cache antigo periodicamente
-        self.cache_manager.limpar_cache_antigo()
-
-        # Limite de concorrência e delay configuráveis
-        num_cameras = len(cameras)
-        max_workers = min(getattr(Config, "MAX_WORKERS_CAMERAS", 2), num_cameras) or 1
-        delay_entre_cameras = getattr(Config, "DELAY_ENTRE_CAMERAS", 0.5)
-
-        print(
-            f"[INFO] Verificando {num_cameras} câmeras em {nome_condominio} com {max_workers} workers e delay de {delay_entre_cameras}s"
-        )
-
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = []
-            for cam in cameras:
-                # Se a câmera não tem IP próprio, injeta o IP e porta do DVR/DV
-                if not cam.get("ip") and "_dvr_ip" in cam:
-                    cam = cam.copy()  # Cria uma cópia para não modificar o original
-                cam["_dvr_ip"] = cam.get(
-                    "_dvr_ip"
-                )  # Mantém o IP do DVR se já estiver definido
-                cam["_dvr_porta"] = cam.get(
-                    "_dvr_porta"
-                )  # Mantém a porta do DVR se já estiver definida
-
-                futures.append(
-                    executor.submit(
-                        self.verificar_camera_individual,
-                        cam,
-                        nome_condominio,
-                        config_global,
-                    )
-                )
-                time.sleep(
-                    delay_entre_cameras
-                )  # Pequeno delay entre submissões para não sobrecarregar a rede
-
-            # Processa resultados conforme ficam prontos
-            for future in concurrent.futures.as_completed(futures):
-                try:
-                    nome, status_str = future.result()
-                    if status_str != "NO_RTSP":
-                        self.status_atual[nome_condominio]["cameras"].append(
-                            {"nome": nome, "status": status_str}
-                        )
-                except Exception as e:
-                    print(f"[ERRO] Erro ao processar câmera em thread: {e}")
-
-    def get_status_atual(self) -> Dict[str, List[Dict[str, str]]]:
-        """Retorna o status atual de todas as câmeras"""
-        return self.status_atual
+"""
+Módulo responsável pelo serviço de verificação
+"""
+
+import asyncio
+import atexit
+import time
+import threading
+import concurrent.futures
+from collections import deque
+from typing import Callable, Dict, Any, List, Optional, Set
+from ..core.camera_target import CameraTarget, DvrEndpoint, Protocolo, obter_alvo
+from ..core.config_manager import ConfigManager
+from ..core.history_store import HistoricoCameras
+from ..core.state_store import EstadoPersistente
+from ..utils.cache_manager import CacheManager
+from ..utils.digest_auth import DigestAuthCache, CachedHTTPDigestAuth
+from ..utils.pacing import MedidorTaxa
+from ..utils import logger as logger_utils
+from ..utils.logger import LOGGER_CAMERAS, get_logger
+from ..utils.metrics import registro
+from app.config import Config
+from .alert_dispatcher import AlertDispatcher
+from .circuit_breaker import BLOQUEADO, TESTAR, DisjuntoresDVR, testar_conexao
+from .event_hub import EventHub
+from .image_health import MonitorImagem
+from .status_snapshot import PublicadorStatus
+
+
+logger = get_logger(__name__)
+# ON/OFF de cada câmera - nível próprio (LOG_NIVEL_CAMERAS), desligado por padrão
+logger_cameras = get_logger(LOGGER_CAMERAS)
+
+PROBE_DURACAO = registro.histograma(
+    "cameras_probe_duracao_segundos",
+    "Duração das requisições aos DVRs (snapshot ou status em lote)",
+    ("protocolo", "tipo"),
+)
+PROBES = registro.contador(
+    "cameras_probes_total",
+    "Requisições aos DVRs por resultado (ok, timeout, erro)",
+    ("protocolo", "tipo", "resultado"),
+)
+RETENTATIVAS = registro.contador(
+    "cameras_probe_retentativas_total",
+    "Novas tentativas de snapshot após falha ou resposta inválida",
+    ("protocolo",),
+)
+SNAPSHOT_BYTES = registro.contador(
+    "cameras_snapshot_bytes_total",
+    "Bytes de snapshot lidos e economizados pela leitura parcial",
+    ("tipo",),
+)
+FILA_VERIFICACAO = registro.medidor(
+    "verificacao_fila_cameras",
+    "Câmeras aguardando verificação (submetidas ao pool ou nas filas por DVR)",
+    ("modo",),
+)
+
+
+class VerificationService:
+    """Classe responsável por gerenciar verificações de câmeras"""
+
+    def __init__(self):
+        self.cache_manager = CacheManager()
+        self.ultimo_estado: Dict[str, bool] = {}
+        # Horário da última verificação real de cada câmera (persistido com o estado)
+        self.verificado_em: Dict[str, float] = {}
+        # Status publicado no dashboard (versionado; alterações apenas pelos métodos do publicador)
+        self.status = PublicadorStatus()
+        # Alterações de status enviadas aos navegadores conectados em /eventos
+        self.event_hub = EventHub()
+        self.status.ouvintes.append(self.event_hub.publicar)
+
+        # Limite de requisições simultâneas por DVR (modo com threads)
+        self._limites_dvr: Dict[str, threading.BoundedSemaphore] = {}
+        self._limites_dvr_lock = threading.Lock()
+
+        self.agendador = None
+
+        # Desafios Digest por DVR, reutilizados entre câmeras e ciclos
+        self.digest_cache = DigestAuthCache()
+
+        # Estatísticas do ciclo atual (bytes lidos/economizados nos snapshots)
+        self._estatisticas_lock = threading.Lock()
+        self.estatisticas_ciclo: Dict[str, int] = {}
+        self.iniciar_ciclo()
+
+        # Alertas são gravados na outbox e enviados em lote por uma thread dedicada
+        self.alert_dispatcher = AlertDispatcher()
+
+        # Taxa efetiva de requisições aos DVRs e de alertas enviados (dashboard)
+        self.medidor_probes = MedidorTaxa()
+        self.medidor_alertas = MedidorTaxa()
+
+        # DVRs que não suportam status em lote (chave_dvr -> timestamp da falha)
+        self.dvr_sem_bulk: Dict[str, float] = {}
+
+        # DVRs inacessíveis têm as câmeras marcadas OFF sem consulta
+        self.disjuntores: Optional[DisjuntoresDVR] = (
+            DisjuntoresDVR() if Config.USE_DISJUNTOR_DVR else None
+        )
+
+        # Saúde da imagem dos snapshots aprovados (congelada, preta, "Sem Sinal")
+        self.imagens: Optional[MonitorImagem] = (
+            MonitorImagem() if Config.IMAGEM_SAUDE_ATIVA else None
+        )
+
+        # Processo de verificação fragmentada: verifica só os DVRs das fatias
+        # arrendadas (None = todos); no processo do dashboard, o supervisor
+        # dos processos de verificação (app.services.sharding)
+        self.filtro_posse: Optional[Callable[[DvrEndpoint], bool]] = None
+        self.fragmentos = None
+
+        # Filas por DVR do motor assíncrono em execução (profundidade em /metrics)
+        self.filas_dvr: Dict[str, deque] = {}
+        FILA_VERIFICACAO.definir_funcao(
+            lambda: sum(len(fila) for fila in list(self.filas_dvr.values())), modo="asyncio"
+        )
+        registro.registrar_coletor(self.coletar_metricas)
+
+        # Pool de conexões HTTP reutilizável para melhor performance
+        self.http_session = None
+        if Config.USE_CONNECTION_POOL:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            self.http_session = requests.Session()
+
+            # Configurar adapter com pool de conexões
+            adapter = HTTPAdapter(
+                pool_connections=Config.CONNECTION_POOL_SIZE,
+                pool_maxsize=Config.CONNECTION_POOL_MAXSIZE,
+                max_retries=0,  # Trataremos retry manualmente
+            )
+            self.http_session.mount("http://", adapter)
+            self.http_session.mount("https://", adapter)
+
+            logger.info(
+                "Pool de conexões HTTP ativado - %d conexões", Config.CONNECTION_POOL_SIZE
+            )
+
+        # Último estado conhecido gravado em disco e restaurado na partida
+        self.estado_persistente: Optional[EstadoPersistente] = None
+        # chave -> (status, verificado_em) para a primeira agenda após o reinício
+        self.estados_restaurados: Dict[str, tuple] = {}
+        if Config.ESTADO_PERSISTIR:
+            self.estado_persistente = EstadoPersistente()
+            self.restaurar_estado()
+            self.estado_persistente.iniciar_gravacao(self.gravar_estado)
+            atexit.register(self._gravar_estado_final)
+
+        # Histórico de transições e agregados de disponibilidade (/disponibilidade)
+        self.historico: Optional[HistoricoCameras] = None
+        if Config.HISTORICO_ATIVO:
+            self.historico = HistoricoCameras()
+            if Config.HISTORICO_GRAVAR:
+                self.historico.iniciar_gravacao()
+                atexit.register(self._fechar_historico)
+
+    def restaurar_estado(self):
+        """Carrega o último retrato gravado (status, estados, falhas e cache)"""
+        try:
+            retrato = self.estado_persistente.carregar()
+        except Exception as e:
+            logger.error("Falha ao carregar o estado das câmeras: %s", e)
+            return
+        if retrato is None:
+            return
+
+        cameras = self.status.restaurar(retrato.status)
+        falhas = {}
+        for chave, estado in retrato.cameras.items():
+            if estado.online is not None:
+                self.ultimo_estado[chave] = estado.online
+            if estado.verificado_em:
+                self.verificado_em[chave] = estado.verificado_em
+            if estado.falhas:
+                falhas[chave] = estado.falhas
+            self.estados_restaurados[chave] = (
+                None if estado.online is None else ("ON" if estado.online else "OFF"),
+                estado.verificado_em,
+            )
+        self.cache_manager.importar(retrato.cache, falhas)
+        logger.info(
+            "Estado restaurado: %d câmeras no dashboard, %d estados, %d verificações em cache "
+            "(gravado há %.0fs)",
+            cameras,
+            len(retrato.cameras),
+            len(retrato.cache),
+            time.time() - retrato.gravado_em,
+        )
+
+    def _gravar_estado_final(self):
+        try:
+            self.gravar_estado()
+        except Exception as e:
+            logger.error("Falha ao gravar o estado das câmeras no encerramento: %s", e)
+
+    def _fechar_historico(self):
+        try:
+            self.historico.fechar()
+        except Exception as e:
+            logger.error("Falha ao gravar o histórico das câmeras no encerramento: %s", e)
+
+    def gravar_estado(self):
+        """Grava o retrato atual (thread de gravação periódica e encerramento)"""
+        if self.estado_persistente is None:
+            return
+        snapshot = self.status.snapshot()
+        cache, falhas = self.cache_manager.exportar()
+        # Cópias: os workers continuam atualizando os dicionários
+        ultimo_estado = dict(self.ultimo_estado)
+        verificado_em = dict(self.verificado_em)
+        cameras = [
+            (chave, ultimo_estado.get(chave), verificado_em.get(chave), falhas.get(chave, 0))
+            for chave in ultimo_estado.keys() | verificado_em.keys() | falhas.keys()
+        ]
+        self.estado_persistente.gravar(snapshot.versao, snapshot.corpo, cameras, cache)
+
+    @staticmethod
+    def extrair_dados_conexao(cam: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Extrai os dados de conexão da câmera (IP/porta da câmera ou do DVR,
+        canal no formato do protocolo e credenciais do DVR)
+        """
+        ip, porta, canal, usuario, senha, protocolo = CameraTarget.dados_conexao(cam)
+        return {
+            "nome": cam.get("name", "CAMERA"),
+            "ip": ip,
+            "porta": porta,
+            "canal": canal,
+            "usuario": usuario,
+            "senha": senha,
+            "protocol": protocolo.value,
+        }
+
+    @staticmethod
+    def alvo(cam: Dict[str, Any], nome_condominio: str) -> CameraTarget:
+        """
+        Descritor da câmera (montado pelo inventário; câmeras de outras
+        origens ganham o seu na primeira verificação)
+        """
+        return obter_alvo(cam, nome_condominio)
+
+    def limite_dvr(self, chave_dvr: str) -> threading.BoundedSemaphore:
+        """Semáforo que limita as requisições simultâneas a um mesmo DVR"""
+        with self._limites_dvr_lock:
+            semaforo = self._limites_dvr.get(chave_dvr)
+            if semaforo is None:
+                semaforo = threading.BoundedSemaphore(
+                    max(1, Config.MAX_CONEXOES_POR_DVR)
+                )
+                self._limites_dvr[chave_dvr] = semaforo
+            return semaforo
+
+    def dvr_liberado(self, dvr: DvrEndpoint) -> bool:
+        """Consulta o disjuntor do DVR, fazendo o teste TCP se pedido (modo com threads)"""
+        if self.disjuntores is None:
+            return True
+        decisao = self.disjuntores.avaliar(dvr.chave)
+        if decisao == TESTAR:
+            return self.disjuntores.registrar_teste(dvr.chave, testar_conexao(dvr.ip, dvr.porta))
+        return decisao != BLOQUEADO
+
+    def dvr_proprio(self, dvr: DvrEndpoint) -> bool:
+        """O DVR pertence a este processo (sempre, fora da verificação fragmentada)"""
+        return self.filtro_posse is None or self.filtro_posse(dvr)
+
+    def registrar_alcance(
+        self, dvr: DvrEndpoint, respondeu: bool, erro: Optional[BaseException] = None
+    ):
+        """Informa ao disjuntor se o DVR respondeu à verificação de uma câmera"""
+        if self.disjuntores is None:
+            return
+        if respondeu:
+            self.disjuntores.registrar_resposta(dvr.chave)
+        else:
+            self.disjuntores.registrar_sem_resposta(dvr.chave, erro)
+
+    def registrar_dvr_inacessivel(
+        self,
+        alvo: CameraTarget,
+        config_global: Optional[Dict[str, Any]],
+    ) -> List[Dict[str, Any]]:
+        """Marca a câmera OFF sem consultar o DVR (disjuntor aberto)"""
+        self.disjuntores.registrar_poupadas(alvo.dvr.chave)
+        logger_cameras.info(
+            "%s está OFF (DVR %s inacessível)",
+            alvo.nome,
+            alvo.dvr.chave,
+            extra={"condominio": alvo.condominio},
+        )
+        return self.registrar_resultado(
+            alvo.cam, alvo.condominio, config_global, alvo.chave_cache, False, alvo.chave
+        )
+
+    def imagem_monitorada(self, alvo: CameraTarget) -> bool:
+        """Saúde da imagem ativa para a câmera (Intelbras só com INTELBRAS_TRACK_IMAGE_SIZE)"""
+        if self.imagens is None:
+            return False
+        return alvo.protocolo is not Protocolo.INTELBRAS or Config.INTELBRAS_TRACK_IMAGE_SIZE
+
+    def imagem_suspeita(self, alvo: CameraTarget, content_length: int) -> bool:
+        """Triagem do snapshot aprovado"""
+        if not self.imagem_monitorada(alvo):
+            return False
+        return self.imagens.triagem(alvo.chave, content_length)
+
+    def amostras_imagem(self, alvos: List[CameraTarget]) -> Set[str]:
+        """
+        Câmeras de um DVR com status ON pelo lote que devem ser conferidas por
+        snapshot para a saúde da imagem (chaves; vazio sem análise)
+        """
+        if not alvos or not self.imagem_monitorada(alvos[0]) or not self.imagens.analise_ativa:
+            return set()
+        return self.imagens.amostrar(
+            alvos[0].dvr.chave, [alvo.chave for alvo in alvos], Config.IMAGEM_AMOSTRAS_LOTE
+        )
+
+    def confirmar_imagem(self, alvo: CameraTarget, problema: Optional[str]) -> bool:
+        """Registra o resultado da análise; True se a imagem está saudável"""
+        if problema is None:
+            return True
+        logger.warning(
+            "%s: imagem %s - câmera considerada OFF",
+            alvo.nome,
+            problema,
+            extra={"condominio": alvo.condominio},
+        )
+        return False
+
+    def imagem_saudavel(self, alvo: CameraTarget, content_length: int, corpo: bytes) -> bool:
+        """
+        Saúde da imagem no modo com threads (baixa o JPEG inteiro quando só os
+        primeiros bytes foram lidos e a triagem pede análise)
+        """
+        if not self.imagem_suspeita(alvo, content_length):
+            return True
+        try:
+            if len(corpo) < content_length:
+                corpo = self.baixar_imagem(alvo)
+        except Exception as e:
+            logger.debug("%s: falha ao baixar a imagem para análise: %r", alvo.nome, e)
+            return True
+        return self.confirmar_imagem(alvo, self.imagens.analisar(alvo.chave, corpo))
+
+    @staticmethod
+    def intercalar_por_dvr(alvos: List[CameraTarget]) -> List[CameraTarget]:
+        """
+        Reordena as câmeras alternando entre DVRs (round-robin), para que um
+        gravador com muitos canais não monopolize os workers
+        """
+        filas: Dict[str, deque] = {}
+        for alvo in alvos:
+            filas.setdefault(alvo.dvr.chave, deque()).append(alvo)
+
+        intercaladas = []
+        pendentes = list(filas.values())
+        while pendentes:
+            for fila in pendentes:
+                intercaladas.append(fila.popleft())
+            pendentes = [fila for fila in pendentes if fila]
+        return intercaladas
+
+    @staticmethod
+    def ler_content_length(valor: Optional[str]) -> int:
+        """Converte o cabeçalho Content-Length, tolerando valores ausentes ou inválidos"""
+        try:
+            return int(valor or 0)
+        except ValueError:
+            return 0
+
+    @staticmethod
+    def avaliar_snapshot(
+        protocol: str,
+        status_code: int,
+        content_type: str,
+        content_length: int,
+        inicio_corpo: bytes = b"",
+    ) -> tuple[bool, bool]:
+        """
+        Avalia a resposta do snapshot a partir dos cabeçalhos e, se disponível,
+        dos primeiros bytes do corpo
+
+        Returns:
+            (online, sem_sinal) - sem_sinal indica imagem Intelbras abaixo do
+            tamanho mínimo (placa "Sem Sinal"), caso em que não vale repetir
+        """
+        content_type_ok = status_code == 200 and content_type.startswith("image")
+        if content_type_ok and inicio_corpo and "jpeg" in content_type:
+            # JPEG válido sempre começa com o marcador SOI (FF D8)
+            content_type_ok = inicio_corpo.startswith(b"\xff\xd8")
+        if protocol != "intelbras":
+            return content_type_ok, False
+
+        # Validação Intelbras:
+        # 1. Status 200 (autenticação OK)
+        # 2. Content-Type deve ser image/jpeg
+        # 3. Content-Length deve ser maior que MIN_SIZE (evita imagens "Sem Sinal")
+        size_ok = content_length >= Config.INTELBRAS_MIN_IMAGE_SIZE
+        return content_type_ok and size_ok, content_type_ok and not size_ok
+
+    def coletar_alertas(
+        self,
+        cam: Dict[str, Any],
+        nome_condominio: str,
+        config_global: Optional[Dict[str, Any]],
+        online: bool,
+        chave: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Atualiza o último estado da câmera e retorna os alertas de transição
+        que devem ser enviados (queda ou retorno)
+
+        Args:
+            chave: Chave da câmera já calculada (CameraTarget.chave)
+        """
+        nome = cam.get("name", "CAMERA")
+        if chave is None:
+            chave = f"{nome_condominio}_{nome}"
+        estado_anterior = self.ultimo_estado.get(chave)
+        alertas = []
+
+        # Alerta se voltou online
+        if estado_anterior is False and online:
+            cam_info = ConfigManager.construir_camera_info(
+                cam, nome_condominio, config_global
+            )
+            cam_info["ocorrencia"] = "961"
+            cam_info["complemento"] = f"{nome} voltou online"
+            alertas.append(cam_info)
+
+        # Alerta se acabou de cair
+        if estado_anterior != online and not online:
+            alertas.append(
+                ConfigManager.construir_camera_info(cam, nome_condominio, config_global)
+            )
+
+        self.ultimo_estado[chave] = online
+        return alertas
+
+    def enviar_alertas(self, alertas: List[Dict[str, Any]], nome_condominio: str):
+        """Enfileira os alertas para envio (não bloqueia o worker de verificação)"""
+        if alertas:
+            self.medidor_alertas.registrar(len(alertas))
+        for cam_info in alertas:
+            self.alert_dispatcher.enfileirar(cam_info, nome_condominio)
+
+    def registrar_resultado(
+        self,
+        cam: Dict[str, Any],
+        nome_condominio: str,
+        config_global: Optional[Dict[str, Any]],
+        chave_cache: str,
+        online: bool,
+        chave: Optional[str] = None,
+        latencia: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Registra o resultado de uma verificação real (cache, falhas, histórico
+        e transição)
+
+        Args:
+            latencia: Duração da resposta do DVR em segundos (None sem resposta)
+        """
+        chave_falhas = chave or f"{nome_condominio}_{cam.get('name', 'CAMERA')}"
+        agora = time.time()
+        self.verificado_em[chave_falhas] = agora
+        if self.historico is not None:
+            self.historico.registrar(
+                nome_condominio, cam.get("name", "CAMERA"), online, agora, latencia
+            )
+
+        # Atualiza cache
+        self.cache_manager.set_cached_result(chave_cache, online, chave_falhas)
+
+        # Atualiza contador de falhas consecutivas
+        self.cache_manager.update_falhas_consecutivas(chave_falhas, online)
+
+        return self.coletar_alertas(cam, nome_condominio, config_global, online, chave_falhas)
+
+    @staticmethod
+    def eh_timeout(erro: BaseException) -> bool:
+        """Distingue timeouts (DVR lento ou inacessível) dos demais erros"""
+        import requests
+
+        return isinstance(
+            erro, (TimeoutError, asyncio.TimeoutError, requests.exceptions.Timeout)
+        )
+
+    def registrar_probe(
+        self,
+        protocolo: str,
+        tipo: str,
+        inicio: float,
+        erro: Optional[BaseException] = None,
+    ):
+        """
+        Registra a duração e o resultado de uma requisição ao DVR
+
+        Args:
+            inicio: time.perf_counter() antes da requisição
+            tipo: "snapshot", "lote" ou "imagem" (download para análise)
+        """
+        PROBE_DURACAO.observar(time.perf_counter() - inicio, protocolo=protocolo, tipo=tipo)
+        if erro is None:
+            resultado = "ok"
+        elif self.eh_timeout(erro):
+            resultado = "timeout"
+        else:
+            resultado = "erro"
+        PROBES.incrementar(protocolo=protocolo, tipo=tipo, resultado=resultado)
+
+    def requisitar_snapshot(self, alvo: CameraTarget) -> tuple[int, str, int, bytes]:
+        """
+        Requisita o snapshot (modo com threads) respeitando o limite por DVR
+
+        No modo "cabecalhos" a resposta é lida em streaming e apenas os
+        primeiros SNAPSHOT_PROBE_MAX_BYTES do corpo trafegam; o restante da
+        imagem é descartado fechando a conexão.
+
+        Returns:
+            (status_code, content_type, content_length, corpo) - corpo são os
+            bytes lidos (a imagem inteira no modo "completo")
+        """
+        import requests
+
+        apenas_cabecalhos = Config.SNAPSHOT_PROBE_MODE == "cabecalhos"
+        # Usa pool de conexões se disponível, senão cria nova requisição
+        cliente = self.http_session or requests
+        dvr = alvo.dvr
+        with self.limite_dvr(dvr.chave):
+            self.medidor_probes.registrar()
+            inicio_probe = time.perf_counter()
+            try:
+                resp = cliente.get(
+                    alvo.url_snapshot,
+                    auth=CachedHTTPDigestAuth(
+                        dvr.usuario, dvr.senha, self.digest_cache, dvr.chave
+                    ),
+                    timeout=Config.TIMEOUT_VERIFICACAO,
+                    stream=apenas_cabecalhos,
+                )
+                try:
+                    if apenas_cabecalhos:
+                        inicio = resp.raw.read(Config.SNAPSHOT_PROBE_MAX_BYTES)
+                        completo = len(inicio) < Config.SNAPSHOT_PROBE_MAX_BYTES
+                    else:
+                        inicio, completo = resp.content, True
+                finally:
+                    resp.close()
+            except Exception as e:
+                self.registrar_probe(dvr.protocolo, "snapshot", inicio_probe, e)
+                raise
+            self.registrar_probe(dvr.protocolo, "snapshot", inicio_probe)
+
+        content_length = self.ler_content_length(resp.headers.get("Content-Length"))
+        self.contabilizar_bytes(content_length, len(inicio), completo)
+        if not content_length and completo:
+            content_length = len(inicio)
+        return (
+            resp.status_code,
+            resp.headers.get("Content-Type", ""),
+            content_length,
+            inicio,
+        )
+
+    def baixar_imagem(self, alvo: CameraTarget) -> bytes:
+        """Baixa o snapshot inteiro para a análise de imagem (modo com threads)"""
+        import requests
+
+        cliente = self.http_session or requests
+        dvr = alvo.dvr
+        with self.limite_dvr(dvr.chave):
+            self.medidor_probes.registrar()
+            inicio_probe = time.perf_counter()
+            try:
+                resp = cliente.get(
+                    alvo.url_snapshot,
+                    auth=CachedHTTPDigestAuth(
+                        dvr.usuario, dvr.senha, self.digest_cache, dvr.chave
+                    ),
+                    timeout=Config.TIMEOUT_VERIFICACAO,
+                )
+                corpo = resp.content
+            except Exception as e:
+                self.registrar_probe(dvr.protocolo, "imagem", inicio_probe, e)
+                raise
+            self.registrar_probe(dvr.protocolo, "imagem", inicio_probe)
+        self.contabilizar_bytes(len(corpo), len(corpo), True)
+        return corpo
+
+    def contabilizar_bytes(self, content_length: int, lidos: int, completo: bool):
+        """Acumula os bytes de snapshot lidos e os economizados no ciclo atual"""
+        economizados = content_length - lidos if not completo and content_length > lidos else 0
+        with self._estatisticas_lock:
+            self.estatisticas_ciclo["bytes_lidos"] += lidos
+            self.estatisticas_ciclo["bytes_economizados"] += economizados
+        SNAPSHOT_BYTES.incrementar(lidos, tipo="lidos")
+        if economizados:
+            SNAPSHOT_BYTES.incrementar(economizados, tipo="economizados")
+
+    def iniciar_ciclo(self):
+        """Zera as estatísticas do ciclo de verificação"""
+        with self._estatisticas_lock:
+            self.estatisticas_ciclo = {"bytes_lidos": 0, "bytes_economizados": 0}
+
+    def finalizar_ciclo(self) -> Dict[str, int]:
+        """Registra e retorna as estatísticas do ciclo encerrado"""
+        with self._estatisticas_lock:
+            estatisticas = dict(self.estatisticas_ciclo)
+        logger.info(
+            "Snapshots: %.0f KiB lidos, %.0f KiB economizados no ciclo (modo %s)",
+            estatisticas["bytes_lidos"] / 1024,
+            estatisticas["bytes_economizados"] / 1024,
+            Config.SNAPSHOT_PROBE_MODE,
+        )
+        digest = self.digest_cache.estatisticas()
+        logger.info(
+            "Digest: %d round trips economizados, %d desafios, %d nonces expirados (%d DVRs em cache)",
+            digest["round_trips_economizados"],
+            digest["desafios_recebidos"],
+            digest["nonces_expirados"],
+            digest["dvrs_em_cache"],
+        )
+        cache = self.cache_manager.estatisticas()
+        consultas = cache["hits"] + cache["misses"]
+        taxa_acerto = cache["hits"] / consultas * 100 if consultas else 0.0
+        logger.info(
+            "Cache: %d entradas, %.1f%% de acerto, %d expiradas, %d despejadas",
+            cache["entradas"],
+            taxa_acerto,
+            cache["expiracoes"],
+            cache["despejos"],
+        )
+        alertas = self.alert_dispatcher.estatisticas()
+        logger.info(
+            "Alertas: %d enviados em %d lotes, %d pendentes na outbox, %d falhas",
+            alertas["enviados"],
+            alertas["lotes"],
+            alertas["fila"],
+            alertas["falhas"],
+        )
+        if self.disjuntores is not None:
+            disjuntores = self.disjuntores.estatisticas()
+            logger.info(
+                "Disjuntores: %d DVRs inacessíveis, %d em teste, %d câmeras marcadas OFF sem consulta",
+                disjuntores["abertos"],
+                disjuntores["semiabertos"],
+                disjuntores["cameras_poupadas"],
+            )
+        return estatisticas
+
+    def get_estatisticas(self) -> Dict[str, Any]:
+        """Indicadores de carga exibidos no dashboard"""
+        with self._estatisticas_lock:
+            ciclo = dict(self.estatisticas_ciclo)
+        estatisticas = {
+            "probes": self.medidor_probes.estatisticas(),
+            "alertas": self.medidor_alertas.estatisticas(),
+            "despacho_alertas": self.alert_dispatcher.estatisticas(),
+            "pacing": Config.USE_PACING,
+            "ciclo": ciclo,
+            "digest": self.digest_cache.estatisticas(),
+            "cache": self.cache_manager.estatisticas(),
+            "eventos": self.event_hub.estatisticas(),
+        }
+        if self.estado_persistente is not None:
+            estatisticas["estado"] = self.estado_persistente.estatisticas()
+        if self.historico is not None:
+            estatisticas["historico"] = self.historico.estatisticas()
+        if self.agendador is not None:
+            estatisticas["agenda"] = self.agendador.estatisticas()
+        if self.imagens is not None:
+            estatisticas["imagens"] = self.imagens.estatisticas()
+        if self.disjuntores is not None:
+            estatisticas["disjuntores"] = self.disjuntores.estatisticas()
+            estatisticas["disjuntores"]["inacessiveis"] = self.disjuntores.inacessiveis()
+        if self.fragmentos is not None:
+            # A verificação roda nos processos fragmentados - indicadores deles
+            self.fragmentos.mesclar_estatisticas(estatisticas)
+        return estatisticas
+
+    def coletar_metricas(self):
+        """Indicadores já mantidos pelos componentes, lidos a cada acesso a /metrics"""
+        cache = self.cache_manager.estatisticas()
+        consultas = cache["hits"] + cache["misses"]
+        digest = self.digest_cache.estatisticas()
+        alertas = self.alert_dispatcher.estatisticas()
+        filas = list(self.filas_dvr.values())
+        logs = logger_utils.estatisticas()
+
+        familias = [
+            (
+                "cache_consultas_total",
+                "counter",
+                "Consultas ao cache de verificações",
+                [({"resultado": "hit"}, cache["hits"]), ({"resultado": "miss"}, cache["misses"])],
+            ),
+            (
+                "cache_taxa_acerto",
+                "gauge",
+                "Fração das consultas atendidas pelo cache desde o início",
+                [({}, cache["hits"] / consultas if consultas else 0.0)],
+            ),
+            ("cache_entradas", "gauge", "Verificações em cache", [({}, cache["entradas"])]),
+            (
+                "cache_remocoes_total",
+                "counter",
+                "Entradas removidas do cache por expiração ou limite de tamanho",
+                [
+                    ({"motivo": "expiracao"}, cache["expiracoes"]),
+                    ({"motivo": "despejo"}, cache["despejos"]),
+                ],
+            ),
+            (
+                "digest_round_trips_economizados_total",
+                "counter",
+                "Requisições sem o desafio 401 graças ao cache de nonces Digest",
+                [({}, digest["round_trips_economizados"])],
+            ),
+            (
+                "digest_desafios_total",
+                "counter",
+                "Desafios Digest recebidos dos DVRs",
+                [({}, digest["desafios_recebidos"])],
+            ),
+            (
+                "verificacao_dvrs_ativos",
+                "gauge",
+                "DVRs com verificações em andamento no motor assíncrono",
+                [({}, len(filas))],
+            ),
+            (
+                "alertas_outbox_eventos",
+                "gauge",
+                "Alertas na outbox por estado",
+                [
+                    ({"estado": "pendente"}, alertas["fila"]),
+                    ({"estado": "falho"}, alertas["falhos_na_outbox"]),
+                ],
+            ),
+            (
+                "alertas_outbox_idade_segundos",
+                "gauge",
+                "Idade do alerta pendente mais antigo",
+                [({}, alertas["idade_mais_antigo_s"] or 0)],
+            ),
+            (
+                "alertas_despacho_eventos_total",
+                "counter",
+                "Eventos do despacho de alertas (falhas definitivas, duplicados, retentativas, lotes)",
+                [
+                    ({"evento": evento}, alertas[evento])
+                    for evento in ("falhas", "duplicados", "retentativas", "lotes")
+                ],
+            ),
+            (
+                "eventos_sse_conexoes",
+                "gauge",
+                "Navegadores conectados em /eventos",
+                [({}, self.event_hub.estatisticas()["conexoes"])],
+            ),
+            ("logs_fila", "gauge", "Registros de log aguardando a thread de escrita", [({}, logs["fila"])]),
+            (
+                "logs_descartados_total",
+                "counter",
+                "Registros de log perdidos por fila cheia ou suprimidos pela agregação de erros",
+                [
+                    ({"motivo": "fila_cheia"}, logs["descartados"]),
+                    ({"motivo": "agregacao"}, logs["suprimidos"]),
+                ],
+            ),
+        ]
+        if self.imagens is not None:
+            imagens = self.imagens.estatisticas()
+            familias.append(
+                (
+                    "imagem_saude_eventos_total",
+                    "counter",
+                    "Triagens de snapshot, imagens suspeitas, análises e problemas detectados",
+                    [
+                        ({"evento": evento}, imagens[evento])
+                        for evento in (
+                            "triagens", "suspeitas", "analises", "falhas_decodificacao",
+                            "congelada", "preta", "sem_sinal",
+                        )
+                    ],
+                )
+            )
+            familias.append(
+                (
+                    "imagem_cameras_com_problema",
+                    "gauge",
+                    "Câmeras cuja última imagem analisada estava congelada, preta ou sem sinal",
+                    [({}, imagens["com_problema"])],
+                )
+            )
+        if self.disjuntores is not None:
+            disjuntores = self.disjuntores.estatisticas()
+            familias.append(
+                (
+                    "dvr_disjuntores",
+                    "gauge",
+                    "DVRs com o disjuntor aberto (inacessíveis) ou em teste",
+                    [
+                        ({"estado": "aberto"}, disjuntores["abertos"]),
+                        ({"estado": "semiaberto"}, disjuntores["semiabertos"]),
+                    ],
+                )
+            )
+            familias.append(
+                (
+                    "dvr_disjuntor_eventos_total",
+                    "counter",
+                    "Aberturas e fechamentos dos disjuntores, testes TCP e câmeras marcadas OFF sem consulta",
+                    [
+                        ({"evento": "abertura"}, disjuntores["aberturas"]),
+                        ({"evento": "fechamento"}, disjuntores["fechamentos"]),
+                        ({"evento": "teste_tcp"}, disjuntores["testes_tcp"]),
+                        ({"evento": "camera_poupada"}, disjuntores["cameras_poupadas"]),
+                    ],
+                )
+            )
+        if self.agendador is not None:
+            agenda = self.agendador.estatisticas()
+            familias.append(
+                (
+                    "agenda_cameras",
+                    "gauge",
+                    "Câmeras na agenda adaptativa por situação",
+                    [
+                        ({"situacao": "total"}, agenda["cameras"]),
+                        ({"situacao": "vencida"}, agenda["vencidas"]),
+                        ({"situacao": "oscilando"}, agenda["oscilando"]),
+                    ],
+                )
+            )
+            familias.append(
+                (
+                    "agenda_intervalo_medio_segundos",
+                    "gauge",
+                    "Intervalo médio entre verificações na agenda adaptativa",
+                    [({}, agenda["intervalo_medio"])],
+                )
+            )
+        return familias
+
+    def verificar_camera_individual(
+        self,
+        cam: Dict[str, Any],
+        nome_condominio: str,
+        config_global: Optional[Dict[str, Any]] = None,
+    ) -> tuple[str, str]:
+        """
+        Dispatcher que roteia para o método de verificação apropriado baseado no protocolo do DVR
+
+        O protocolo é injetado pelo condominio_service como '_dvr_protocol'
+        """
+        alvo = self.alvo(cam, nome_condominio)
+
+        if alvo.protocolo is Protocolo.INTELBRAS:
+            return self.verificar_camera_intelbras(cam, nome_condominio, config_global, alvo)
+        else:  # hikvision or default
+            return self.verificar_camera_hikvision(cam, nome_condominio, config_global, alvo)
+
+    def verificar_camera_hikvision(
+        self,
+        cam: Dict[str, Any],
+        nome_condominio: str,
+        config_global: Optional[Dict[str, Any]] = None,
+        alvo: Optional[CameraTarget] = None,
+    ) -> tuple[str, str]:
+        """Verifica uma câmera Hikvision usando snapshot da API ISAPI (HTTPDigestAuth)"""
+        alvo = alvo or self.alvo(cam, nome_condominio)
+        nome = alvo.nome
+
+        if not alvo.dvr.configurado:
+            logger.warning("%s não possui dados de conexão suficientes. IP: %s", nome, alvo.dvr.ip)
+            return nome, "NO_CONFIG"
+
+        # Verifica cache primeiro
+        resultado_encontrado, resultado_cache = self.cache_manager.get_cached_result(
+            alvo.chave_cache
+        )
+        if resultado_encontrado:
+            status_str = "ON" if resultado_cache else "OFF"
+            logger_cameras.info(
+                "%s está %s (cache)", nome, status_str, extra={"condominio": nome_condominio}
+            )
+            self.enviar_alertas(
+                self.coletar_alertas(
+                    cam, nome_condominio, config_global, resultado_cache, alvo.chave
+                ),
+                nome_condominio,
+            )
+            return nome, status_str
+
+        if not self.dvr_liberado(alvo.dvr):
+            self.enviar_alertas(self.registrar_dvr_inacessivel(alvo, config_global), nome_condominio)
+            return nome, "OFF"
+
+        # Verificação real via snapshot API Hikvision (URL pré-calculada no alvo)
+        # Retry com backoff exponencial
+        online = False
+        ultima_exception = None
+        latencia = None
+
+        for tentativa in range(Config.TENTATIVAS_RETRY + 1):
+            if tentativa:
+                RETENTATIVAS.incrementar(protocolo="hikvision")
+            try:
+                inicio_probe = time.perf_counter()
+                status_code, content_type, content_length, inicio = (
+                    self.requisitar_snapshot(alvo)
+                )
+                latencia = time.perf_counter() - inicio_probe
+                online, _ = self.avaliar_snapshot(
+                    "hikvision", status_code, content_type, content_length, inicio
+                )
+
+                if online:
+                    online = self.imagem_saudavel(alvo, content_length, inicio)
+                    break  # Sucesso (ou imagem com problema), sai do loop de retry
+
+            except Exception as e:
+                ultima_exception = e
+                if tentativa < Config.TENTATIVAS_RETRY:
+                    # Backoff exponencial: 1s, 2s, 4s...
+                    backoff = Config.RETRY_BACKOFF * (2**tentativa)
+                    time.sleep(backoff)
+                continue
+        self.registrar_alcance(alvo.dvr, latencia is not None, ultima_exception)
+
+        # Log apenas se falhou após todas as tentativas
+        if not online and ultima_exception:
+            logger.warning("%s: %s", nome, ultima_exception, extra={"condominio": nome_condominio})
+
+        status_str = "ON" if online else "OFF"
+        logger_cameras.info("%s está %s", nome, status_str, extra={"condominio": nome_condominio})
+
+        self.enviar_alertas(
+            self.registrar_resultado(
+                cam, nome_condominio, config_global, alvo.chave_cache, online, alvo.chave, latencia
+            ),
+            nome_condominio,
+        )
+        return nome, status_str
+
+    def verificar_camera_intelbras(
+        self,
+        cam: Dict[str, Any],
+        nome_condominio: str,
+        config_global: Optional[Dict[str, Any]] = None,
+        alvo: Optional[CameraTarget] = None,
+    ) -> tuple[str, str]:
+        """
+        Verifica uma câmera Intelbras usando snapshot CGI (HTTPDigestAuth)
+
+        Protocolo CGI (Dahua): /cgi-bin/snapshot.cgi?channel={n}
+        Canais em formato numérico simples: 1, 2, 3, 4...
+
+        Validação em cascata:
+        1. Conectividade TCP (porta configurada)
+        2. Autenticação Digest (Status 200)
+        3. Content-Type: image/jpeg
+        4. Content-Length > MIN_SIZE (detecta imagens estáticas "Sem Sinal")
+        """
+        alvo = alvo or self.alvo(cam, nome_condominio)
+        nome = alvo.nome
+
+        if not alvo.dvr.configurado:
+            logger.warning("%s não possui dados de conexão suficientes. IP: %s", nome, alvo.dvr.ip)
+            return nome, "NO_CONFIG"
+
+        # Verifica cache primeiro
+        resultado_encontrado, resultado_cache = self.cache_manager.get_cached_result(
+            alvo.chave_cache
+        )
+        if resultado_encontrado:
+            status_str = "ON" if resultado_cache else "OFF"
+            logger_cameras.info(
+                "%s está %s (cache) [Intelbras]", nome, status_str,
+                extra={"condominio": nome_condominio},
+            )
+            self.enviar_alertas(
+                self.coletar_alertas(
+                    cam, nome_condominio, config_global, resultado_cache, alvo.chave
+                ),
+                nome_condominio,
+            )
+            return nome, status_str
+
+        if not self.dvr_liberado(alvo.dvr):
+            self.enviar_alertas(self.registrar_dvr_inacessivel(alvo, config_global), nome_condominio)
+            return nome, "OFF"
+
+        # Verificação real via snapshot CGI Intelbras (URL pré-calculada no alvo)
+        # Retry com backoff exponencial
+        online = False
+        ultima_exception = None
+        content_length = 0
+        latencia = None
+
+        for tentativa in range(Config.TENTATIVAS_RETRY + 1):
+            if tentativa:
+                RETENTATIVAS.incrementar(protocolo="intelbras")
+            try:
+                inicio_probe = time.perf_counter()
+                status_code, content_type, content_length, inicio = (
+                    self.requisitar_snapshot(alvo)
+                )
+                latencia = time.perf_counter() - inicio_probe
+                online, sem_sinal = self.avaliar_snapshot(
+                    "intelbras", status_code, content_type, content_length, inicio
+                )
+
+                if online:
+                    online = self.imagem_saudavel(alvo, content_length, inicio)
+                    break  # Sucesso (ou imagem com problema), sai do loop de retry
+                elif sem_sinal:
+                    # Imagem muito pequena - provavelmente "Sem Sinal"
+                    logger.warning(
+                        "%s: Imagem muito pequena (%d bytes) - possível 'Sem Sinal'",
+                        nome,
+                        content_length,
+                        extra={"condominio": nome_condominio},
+                    )
+                    break  # Não continua tentando
+
+            except Exception as e:
+                ultima_exception = e
+                if tentativa < Config.TENTATIVAS_RETRY:
+                    # Backoff exponencial: 1s, 2s, 4s...
+                    backoff = Config.RETRY_BACKOFF * (2**tentativa)
+                    time.sleep(backoff)
+                continue
+        self.registrar_alcance(alvo.dvr, latencia is not None, ultima_exception)
+
+        # Log apenas se falhou após todas as tentativas
+        if not online and ultima_exception:
+            logger.warning(
+                "%s [Intelbras]: %s", nome, ultima_exception, extra={"condominio": nome_condominio}
+            )
+        elif not online and content_length > 0:
+            logger_cameras.info(
+                "%s [Intelbras]: Offline ou sem sinal (image size: %d bytes)",
+                nome,
+                content_length,
+                extra={"condominio": nome_condominio},
+            )
+
+        status_str = "ON" if online else "OFF"
+        logger_cameras.info(
+            "%s está %s [Intelbras CGI]", nome, status_str, extra={"condominio": nome_condominio}
+        )
+
+        self.enviar_alertas(
+            self.registrar_resultado(
+                cam, nome_condominio, config_global, alvo.chave_cache, online, alvo.chave, latencia
+            ),
+            nome_condominio,
+        )
+        return nome, status_str
+
+    def verificar_cameras(
+        self,
+        cameras: List[Dict[str, Any]],
+        nome_condominio: str = "Condomínio",
+        config_global: Optional[Dict[str, Any]] = None,
+    ):
+        """Verifica múltiplas câmeras em paralelo, mas com limite de concorrência e delay para não sobrecarregar a rede"""
+        # Debug para verificar se os metadados estão sendo extraídos
+        if config_global:
+            logger.debug(
+                "%s - Empresa: %s - Metadados: %s",
+                nome_condominio,
+                config_global.get("empresa"),
+                config_global,
+            )
+        else:
+            logger.debug("%s - NENHUM metadado extraído!", nome_condominio)
+
+        if not cameras:
+            self.status.publicar_condominio(nome_condominio, [], config_global or {})
+            return
+
+        # Limpa cache antigo periodicamente
+        self.cache_manager.limpar_cache_antigo()
+
+        # Limite de concorrência e delay configuráveis
+        num_cameras = len(cameras)
+        max_workers = min(getattr(Config, "MAX_WORKERS_CAMERAS", 2), num_cameras) or 1
+        delay_entre_cameras = getattr(Config, "DELAY_ENTRE_CAMERAS", 0.5)
+
+        logger.debug(
+            "Verificando %d câmeras em %s com %d workers e delay de %ss",
+            num_cameras,
+            nome_condominio,
+            max_workers,
+            delay_entre_cameras,
+        )
+
+        resultados = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = []
+            # IP/porta do DVR e credenciais já resolvidos no alvo (sem copiar a câmera)
+            alvos = [self.alvo(cam, nome_condominio) for cam in cameras]
+            for alvo in self.intercalar_por_dvr(alvos):
+                verificar = (
+                    self.verificar_camera_intelbras
+                    if alvo.protocolo is Protocolo.INTELBRAS
+                    else self.verificar_camera_hikvision
+                )
+                future = executor.submit(
+                    verificar, alvo.cam, nome_condominio, config_global, alvo
+                )
+                FILA_VERIFICACAO.incrementar(modo="threads")
+                future.add_done_callback(
+                    lambda _: FILA_VERIFICACAO.decrementar(modo="threads")
+                )
+                futures.append(future)
+                time.sleep(
+                    delay_entre_cameras
+                )  # Pequeno delay entre submissões para não sobrecarregar a rede
+
+            # Processa resultados conforme ficam prontos
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    nome, status_str = future.result()
+                    if status_str != "NO_RTSP":
+                        resultados.append({"nome": nome, "status": status_str})
+                except Exception as e:
+                    logger.error("Erro ao processar câmera em thread: %s", e)
+
+        # Publica o condomínio inteiro de uma vez (sem lista parcial no dashboard)
+        self.status.publicar_condominio(nome_condominio, resultados, config_global or {})
+
+    def verificar_todos(self, clientes_data: List[tuple]):
+        """
+        Verifica todos os condomínios com o motor assíncrono (orçamento global
+        de concorrência definido em Config.MAX_CONCORRENCIA_GLOBAL)
+        """
+        from .async_verification import AsyncVerificationEngine
+
+        # Limpa cache antigo periodicamente
+        self.cache_manager.limpar_cache_antigo()
+
+        total_cameras = sum(len(data.get("cameras", [])) for _, data in clientes_data)
+        logger.info(
+            "Verificando %d câmeras (asyncio) com até %d requisições simultâneas",
+            total_cameras,
+            Config.MAX_CONCORRENCIA_GLOBAL,
+        )
+        AsyncVerificationEngine(self).executar(clientes_data)
+
+    def executar_agendado(self, carregar_inventario, intervalo_inventario: Optional[float] = None):
+        """
+        Verifica as câmeras continuamente com o agendador adaptativo (não retorna)
+
+        Args:
+            carregar_inventario: Função que retorna a lista (cliente_nome, data),
+                como get_alert_devices
+            intervalo_inventario: Segundos entre recargas do inventário
+                (padrão Config.AGENDA_INTERVALO_INVENTARIO)
+        """
+        from .async_verification import AsyncVerificationEngine
+        from .scheduler import AgendadorAdaptativo
+
+        # O estado anterior ao reinício só vale para a primeira agenda
+        estados, self.estados_restaurados = self.estados_restaurados, {}
+        self.agendador = AgendadorAdaptativo(estados_anteriores=estados)
+        logger.info(
+            "Agendamento adaptativo: intervalos de %ss a %ss, até %s verificações/s",
+            Config.AGENDA_INTERVALO_MIN,
+            Config.AGENDA_INTERVALO_MAX,
+            Config.AGENDA_PROBES_POR_SEGUNDO,
+        )
+        AsyncVerificationEngine(self).executar_continuo(
+            self.agendador, carregar_inventario, intervalo_inventario
+        )
+
+    def sincronizar_status(self, clientes_data: List[tuple]):
+        """
+        Ajusta o status publicado ao inventário: cria os condomínios novos e
+        remove condomínios e câmeras que não estão mais no banco (modo agendado)
+        """
+        for nome_condominio, nome in self.status.sincronizar(clientes_data):
+            chave = f"{nome_condominio}_{nome}"
+            self.cache_manager.remover(chave_falhas=chave)
+            self.ultimo_estado.pop(chave, None)
+            self.verificado_em.pop(chave, None)
+            if self.historico is not None:
+                self.historico.remover(nome_condominio, nome)
+            if self.imagens is not None:
+                self.imagens.remover(chave)
+
+    def atualizar_status_camera(self, nome_condominio: str, nome: str, status_str: str):
+        """Atualiza o status de uma única câmera (modo agendado)"""
+        self.status.atualizar_camera(nome_condominio, nome, status_str)
+
+    @property
+    def status_atual(self) -> Dict[str, Dict[str, Any]]:
+        """Visão somente leitura do status atual (snapshot da última versão)"""
+        return self.status.snapshot().dados
+
+    def get_status_atual(self) -> Dict[str, Dict[str, Any]]:
+        """Retorna o status atual de todas as câmeras"""
+        return self.status_atual
@@ -0,0 +1,251 @@
+"""
+Cliente HTTP assíncrono mínimo para verificação de snapshots
+
+Baseado apenas em asyncio (sem biblioteca HTTP assíncrona externa), suporta HTTP/1.1,
+corpo com Content-Length ou chunked e autenticação Digest sem bloquear o loop.
+"""
+import asyncio
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .digest_auth import DigestAuthCache, parse_desafio, montar_autorizacao
+
+
+class FalhaConexao(ConnectionError):
+    """A conexão TCP não chegou a abrir (recusada, sem rota ou timeout de conexão)"""
+
+
+class RespostaHTTP:
+    """Resposta HTTP simplificada (cabeçalhos com chaves em minúsculas)"""
+
+    __slots__ = ("status_code", "headers", "corpo", "completo")
+
+    def __init__(
+        self,
+        status_code: int,
+        headers: Dict[str, str],
+        corpo: bytes,
+        completo: bool = True,
+    ):
+        self.status_code = status_code
+        self.headers = headers
+        self.corpo = corpo
+        # False quando a leitura foi interrompida em max_corpo bytes
+        self.completo = completo
+
+    def header(self, nome: str, padrao: str = "") -> str:
+        return self.headers.get(nome.lower(), padrao)
+
+    @property
+    def manter_conexao(self) -> bool:
+        return self.header("Connection").lower() != "close"
+
+
+class AsyncHTTPClient:
+    """Cliente HTTP GET assíncrono com suporte a HTTP Digest"""
+
+    def __init__(self, timeout: float, cache_digest: Optional[DigestAuthCache] = None):
+        """
+        Args:
+            timeout: Timeout total de cada requisição (segundos)
+            cache_digest: Cache de desafios por DVR; sem ele cada requisição
+                autenticada paga o round trip do 401
+        """
+        self.timeout = timeout
+        self.cache_digest = cache_digest
+
+    async def get(
+        self,
+        url: str,
+        usuario: Optional[str] = None,
+        senha: Optional[str] = None,
+        max_corpo: Optional[int] = None,
+    ) -> RespostaHTTP:
+        """
+        Executa um GET respeitando o timeout total da requisição
+
+        Se o servidor responder 401 com desafio Digest e houver credenciais,
+        repete a requisição autenticada (na mesma conexão quando possível).
+
+        Args:
+            max_corpo: Se informado, lê no máximo esse número de bytes do corpo
+                da resposta final e descarta a conexão (o restante não trafega)
+
+        Raises:
+            FalhaConexao: Se a conexão não abriu; erros depois dela (timeout
+                de leitura, conexão derrubada) propagam como estão
+        """
+        partes = urlsplit(url)
+        host = partes.hostname
+        porta = partes.port or 80
+        uri = partes.path or "/"
+        if partes.query:
+            uri = f"{uri}?{partes.query}"
+
+        loop = asyncio.get_running_loop()
+        prazo = loop.time() + self.timeout
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(host, porta), timeout=self.timeout
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            raise FalhaConexao(f"{host}:{porta}: {e!r}") from e
+
+        try:
+            return await asyncio.wait_for(
+                self._get(reader, writer, host, porta, uri, usuario, senha, max_corpo),
+                timeout=prazo - loop.time(),
+            )
+        finally:
+            writer.close()  # Cancelado antes de começar, _get não fecha
+
+    async def _get(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        host: str,
+        porta: int,
+        uri: str,
+        usuario: Optional[str],
+        senha: Optional[str],
+        max_corpo: Optional[int],
+    ) -> RespostaHTTP:
+        chave = f"{host}:{porta}"
+        cache = self.cache_digest if usuario is not None else None
+        preemptiva = (
+            cache.autorizacao(chave, usuario, senha or "", "GET", uri) if cache else None
+        )
+
+        try:
+            resp = await self._requisitar(
+                reader, writer, host, porta, uri, preemptiva, max_corpo
+            )
+
+            if resp.status_code != 401 or usuario is None:
+                if preemptiva:
+                    cache.registrar_reuso()
+                return resp
+
+            desafio = parse_desafio(resp.header("WWW-Authenticate"))
+            if desafio is None:
+                return resp
+
+            if cache:
+                # Nonce novo (primeiro acesso ou expirado) - atualiza o cache
+                cache.registrar_desafio(
+                    chave, desafio, autorizacao_recusada=preemptiva is not None
+                )
+                autorizacao = cache.autorizacao(chave, usuario, senha or "", "GET", uri)
+            else:
+                autorizacao = montar_autorizacao(
+                    desafio, usuario, senha or "", "GET", uri
+                )
+            if autorizacao is None:
+                return resp
+
+            if not resp.manter_conexao:
+                writer.close()
+                reader, writer = await asyncio.open_connection(host, porta)
+
+            return await self._requisitar(
+                reader, writer, host, porta, uri, autorizacao, max_corpo
+            )
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    async def _requisitar(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        host: str,
+        porta: int,
+        uri: str,
+        autorizacao: Optional[str],
+        max_corpo: Optional[int] = None,
+    ) -> RespostaHTTP:
+        host_header = host if porta == 80 else f"{host}:{porta}"
+        linhas = [
+            f"GET {uri} HTTP/1.1",
+            f"Host: {host_header}",
+            "User-Agent: servidor-on-off",
+            "Accept: */*",
+            "Connection: keep-alive",
+        ]
+        if autorizacao:
+            linhas.append(f"Authorization: {autorizacao}")
+        writer.write(("\r\n".join(linhas) + "\r\n\r\n").encode("latin-1"))
+        await writer.drain()
+
+        status_code, headers = await self._ler_cabecalhos(reader)
+        # Desafios 401 são lidos por inteiro para permitir reutilizar a conexão
+        limite = None if status_code == 401 else max_corpo
+        corpo, completo = await self._ler_corpo(reader, headers, limite)
+        return RespostaHTTP(status_code, headers, corpo, completo)
+
+    @staticmethod
+    async def _ler_cabecalhos(
+        reader: asyncio.StreamReader,
+    ) -> Tuple[int, Dict[str, str]]:
+        bruto = await reader.readuntil(b"\r\n\r\n")
+        linhas = bruto.decode("latin-1").split("\r\n")
+
+        status = linhas[0].split(" ", 2)
+        if len(status) < 2 or not status[0].startswith("HTTP/"):
+            raise ConnectionError(f"Resposta HTTP inválida: {linhas[0]!r}")
+        status_code = int(status[1])
+
+        headers: Dict[str, str] = {}
+        for linha in linhas[1:]:
+            if ":" in linha:
+                chave, valor = linha.split(":", 1)
+                headers[chave.strip().lower()] = valor.strip()
+        return status_code, headers
+
+    @staticmethod
+    async def _ler_corpo(
+        reader: asyncio.StreamReader,
+        headers: Dict[str, str],
+        limite: Optional[int] = None,
+    ) -> Tuple[bytes, bool]:
+        """
+        Lê o corpo da resposta
+
+        Returns:
+            (corpo, completo) - completo é False se a leitura parou no limite
+        """
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            partes = []
+            lidos = 0
+            while True:
+                linha = await reader.readuntil(b"\r\n")
+                tamanho = int(linha.split(b";", 1)[0].strip() or b"0", 16)
+                if tamanho == 0:
+                    # Consome trailers até a linha vazia final
+                    while (await reader.readuntil(b"\r\n")) != b"\r\n":
+                        pass
+                    break
+                if limite is not None and lidos + tamanho > limite:
+                    partes.append(await reader.readexactly(limite - lidos))
+                    return b"".join(partes), False
+                partes.append(await reader.readexactly(tamanho))
+                lidos += tamanho
+                await reader.readexactly(2)
+            return b"".join(partes), True
+
+        if "content-length" in headers:
+            tamanho = int(headers["content-length"] or 0)
+            if limite is not None and tamanho > limite:
+                return await reader.readexactly(limite), False
+            return (await reader.readexactly(tamanho) if tamanho > 0 else b""), True
+
+        # Sem tamanho definido: lê até o servidor fechar a conexão
+        if limite is not None:
+            try:
+                return await reader.readexactly(limite), reader.at_eof()
+            except asyncio.IncompleteReadError as e:
+                return e.partial, True
+        return await reader.read(), True
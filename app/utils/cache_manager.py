@@ -1,68 +1,261 @@
-"""
-Módulo responsável pelo gerenciamento de cache
-"""
-import time
-from typing import Dict, Tuple, Any
-
-
-class CacheManager:
-    """Classe responsável por gerenciar cache de verificação de câmeras"""
-    
-    def __init__(self):
-        self.cache_verificacao: Dict[str, Tuple[bool, float]] = {}
-        self.falhas_consecutivas: Dict[str, int] = {}
-        self.CACHE_DURATION = 30  # segundos - não re-verifica a mesma câmera em menos de 30 segundos
-        self.CACHE_DURATION_OFFLINE = 120  # segundos - câmeras offline ficam em cache por mais tempo
-        self.ULTIMA_LIMPEZA_CACHE = time.time()
-    
-    def get_cached_result(self, chave_cache: str) -> Tuple[bool, bool]:
-        """
-        Obtém resultado do cache se ainda for válido
-        Retorna: (resultado_encontrado, resultado_cache)
-        """
-        tempo_atual = time.time()
-        
-        if chave_cache in self.cache_verificacao:
-            resultado_cache, timestamp = self.cache_verificacao[chave_cache]
-            
-            # Determina duração do cache baseado no status da câmera
-            duracao_cache = self.CACHE_DURATION_OFFLINE if not resultado_cache else self.CACHE_DURATION
-            
-            # Para câmeras com muitas falhas consecutivas, aumenta ainda mais o cache
-            if chave_cache in self.falhas_consecutivas and self.falhas_consecutivas[chave_cache] > 3:
-                duracao_cache = self.CACHE_DURATION_OFFLINE * 2  # 4 minutos para câmeras com muitas falhas
-            
-            if tempo_atual - timestamp < duracao_cache:
-                return True, resultado_cache
-        
-        return False, False
-    
-    def set_cached_result(self, chave_cache: str, resultado: bool):
-        """Define resultado no cache"""
-        self.cache_verificacao[chave_cache] = (resultado, time.time())
-    
-    def update_falhas_consecutivas(self, chave_falhas: str, online: bool):
-        """Atualiza contador de falhas consecutivas"""
-        if not online:
-            self.falhas_consecutivas[chave_falhas] = self.falhas_consecutivas.get(chave_falhas, 0) + 1
-        else:
-            self.falhas_consecutivas[chave_falhas] = 0  # Reset contador se voltou online
-    
-    def limpar_cache_antigo(self):
-        """Remove entradas antigas do cache para evitar vazamento de memória"""
-        tempo_atual = time.time()
-        
-        # Limpa cache a cada 5 minutos
-        if tempo_atual - self.ULTIMA_LIMPEZA_CACHE > 300:
-            chaves_para_remover = []
-            for chave, (_, timestamp) in self.cache_verificacao.items():
-                if tempo_atual - timestamp > self.CACHE_DURATION * 2:  # Remove após 2x o tempo de cache
-                    chaves_para_remover.append(chave)
-            
-            for chave in chaves_para_remover:
-                del self.cache_verificacao[chave]
-            
-            if chaves_para_remover:
-                print(f"[INFO] Limpeza de cache: {len(chaves_para_remover)} entradas removidas")
-            
-            self.ULTIMA_LIMPEZA_CACHE = tempo_atual 
\ No newline at end of file
+"""
+Módulo responsável pelo gerenciamento de cache
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Tuple
+
+from app.config import Config
+from .logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+class _Segmento:
+    """Parte do cache protegida por um lock próprio (lock striping)"""
+
+    __slots__ = ("lock", "entradas", "escritas", "hits", "misses", "expiracoes", "despejos")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Ordenado pelo último uso (leitura ou escrita): o início é o menos recente
+        self.entradas: "OrderedDict[str, Tuple]" = OrderedDict()
+        # (timestamp, chave) na ordem de escrita - expiração pelo início; itens
+        # de chaves regravadas ou removidas são descartados ao chegar no início
+        self.escritas: deque = deque()
+        self.hits = 0
+        self.misses = 0
+        self.expiracoes = 0
+        self.despejos = 0
+
+
+class CacheManager:
+    """
+    Classe responsável por gerenciar cache de verificação de câmeras
+
+    Cache TTL + LRU limitado a CACHE_MAX_ENTRADAS, dividido em CACHE_SEGMENTOS
+    segmentos com lock próprio para suportar os workers concorrentes. Cada
+    segmento mantém as entradas em ordem de uso (o despejo remove as menos
+    usadas) e uma fila das escritas em ordem de tempo, então a expiração só
+    inspeciona o início da fila (O(1) amortizado, sem varredura completa).
+    """
+
+    def __init__(self, max_entradas: int = None, num_segmentos: int = None):
+        self.CACHE_DURATION = Config.CACHE_DURATION  # segundos - não re-verifica a mesma câmera antes disso
+        self.CACHE_DURATION_OFFLINE = Config.CACHE_DURATION_OFFLINE  # segundos - câmeras offline ficam mais tempo
+        # Câmeras com muitas falhas consecutivas ficam em cache pelo dobro do tempo offline
+        self.CACHE_DURATION_MAXIMA = self.CACHE_DURATION_OFFLINE * 2
+
+        num_segmentos = num_segmentos or Config.CACHE_SEGMENTOS
+        max_entradas = max_entradas or Config.CACHE_MAX_ENTRADAS
+        self._num_segmentos = num_segmentos
+        self._max_por_segmento = max(1, max_entradas // num_segmentos)
+        self._verificacao = [_Segmento() for _ in range(num_segmentos)]
+        self._falhas = [_Segmento() for _ in range(num_segmentos)]
+
+    def _segmento(self, segmentos, chave: str) -> _Segmento:
+        return segmentos[hash(chave) % self._num_segmentos]
+
+    def _falhas_de(self, chave_falhas: str) -> int:
+        segmento = self._segmento(self._falhas, chave_falhas)
+        with segmento.lock:
+            falhas = segmento.entradas.get(chave_falhas)
+            if falhas is None:
+                return 0
+            segmento.entradas.move_to_end(chave_falhas)
+            return falhas
+
+    def get_cached_result(self, chave_cache: str) -> Tuple[bool, bool]:
+        """
+        Obtém resultado do cache se ainda for válido
+        Retorna: (resultado_encontrado, resultado_cache)
+        """
+        tempo_atual = time.time()
+        segmento = self._segmento(self._verificacao, chave_cache)
+
+        with segmento.lock:
+            entrada = segmento.entradas.get(chave_cache)
+            if entrada is None:
+                segmento.misses += 1
+                return False, False
+            resultado_cache, timestamp, chave_falhas = entrada
+
+        # Determina duração do cache baseado no status da câmera
+        duracao_cache = self.CACHE_DURATION_OFFLINE if not resultado_cache else self.CACHE_DURATION
+
+        # Para câmeras com muitas falhas consecutivas, aumenta ainda mais o cache
+        if not resultado_cache and chave_falhas and self._falhas_de(chave_falhas) > 3:
+            duracao_cache = self.CACHE_DURATION_MAXIMA
+
+        with segmento.lock:
+            if tempo_atual - timestamp < duracao_cache:
+                segmento.hits += 1
+                if chave_cache in segmento.entradas:
+                    segmento.entradas.move_to_end(chave_cache)
+                return True, resultado_cache
+
+            # Expirada - remove se não foi regravada enquanto o lock estava livre
+            if segmento.entradas.get(chave_cache) is entrada:
+                del segmento.entradas[chave_cache]
+                segmento.expiracoes += 1
+            segmento.misses += 1
+            return False, False
+
+    def set_cached_result(self, chave_cache: str, resultado: bool, chave_falhas: str = None):
+        """
+        Define resultado no cache
+
+        Args:
+            chave_falhas: Chave do contador de falhas consecutivas da câmera,
+                usada para estender o cache de câmeras que falham repetidamente
+        """
+        tempo_atual = time.time()
+        segmento = self._segmento(self._verificacao, chave_cache)
+        with segmento.lock:
+            segmento.entradas[chave_cache] = (resultado, tempo_atual, chave_falhas)
+            segmento.entradas.move_to_end(chave_cache)
+            segmento.escritas.append((tempo_atual, chave_cache))
+            self._expirar_inicio(segmento, tempo_atual)
+            self._compactar_escritas(segmento)
+            self._despejar_excedente(segmento)
+
+    def update_falhas_consecutivas(self, chave_falhas: str, online: bool):
+        """Atualiza contador de falhas consecutivas"""
+        segmento = self._segmento(self._falhas, chave_falhas)
+        with segmento.lock:
+            if online:
+                # Reset contador se voltou online (remove a entrada - o mapa não cresce)
+                segmento.entradas.pop(chave_falhas, None)
+                return
+            segmento.entradas[chave_falhas] = segmento.entradas.get(chave_falhas, 0) + 1
+            segmento.entradas.move_to_end(chave_falhas)
+            self._despejar_excedente(segmento)
+
+    def remover(self, chave_cache: str = None, chave_falhas: str = None):
+        """Remove as entradas de uma câmera (ex.: câmera removida do inventário)"""
+        if chave_cache:
+            segmento = self._segmento(self._verificacao, chave_cache)
+            with segmento.lock:
+                segmento.entradas.pop(chave_cache, None)
+        if chave_falhas:
+            segmento = self._segmento(self._falhas, chave_falhas)
+            with segmento.lock:
+                segmento.entradas.pop(chave_falhas, None)
+
+    def exportar(self) -> Tuple[List[Tuple[str, bool, float, str]], Dict[str, int]]:
+        """
+        Cópia do conteúdo para persistência
+
+        Returns:
+            ([(chave_cache, resultado, timestamp, chave_falhas)], {chave_falhas: falhas})
+        """
+        verificacoes = []
+        for segmento in self._verificacao:
+            with segmento.lock:
+                verificacoes.extend(
+                    (chave, resultado, timestamp, chave_falhas)
+                    for chave, (resultado, timestamp, chave_falhas) in segmento.entradas.items()
+                )
+        falhas: Dict[str, int] = {}
+        for segmento in self._falhas:
+            with segmento.lock:
+                falhas.update(segmento.entradas)
+        return verificacoes, falhas
+
+    def importar(self, verificacoes: List[Tuple[str, bool, float, str]], falhas: Dict[str, int]):
+        """Restaura o conteúdo exportado (entradas já vencidas são descartadas)"""
+        tempo_atual = time.time()
+        for chave, resultado, timestamp, chave_falhas in sorted(verificacoes, key=lambda v: v[2]):
+            if tempo_atual - timestamp > self.CACHE_DURATION_MAXIMA:
+                continue
+            segmento = self._segmento(self._verificacao, chave)
+            with segmento.lock:
+                # Em ordem de timestamp: a fila de escritas continua ordenada
+                segmento.entradas[chave] = (resultado, timestamp, chave_falhas)
+                segmento.escritas.append((timestamp, chave))
+                self._despejar_excedente(segmento)
+        for chave_falhas, contagem in falhas.items():
+            if contagem <= 0:
+                continue
+            segmento = self._segmento(self._falhas, chave_falhas)
+            with segmento.lock:
+                segmento.entradas[chave_falhas] = contagem
+                self._despejar_excedente(segmento)
+
+    def limpar(self):
+        """Esvazia todo o cache"""
+        for segmento in self._verificacao + self._falhas:
+            with segmento.lock:
+                segmento.entradas.clear()
+                segmento.escritas.clear()
+
+    def _expirar_inicio(self, segmento: _Segmento, tempo_atual: float) -> int:
+        """
+        Remove as entradas escritas há mais que a duração máxima de cache,
+        pelo início da fila de escritas (chamar com o lock do segmento adquirido)
+        """
+        removidas = 0
+        entradas = segmento.entradas
+        escritas = segmento.escritas
+        while escritas and tempo_atual - escritas[0][0] > self.CACHE_DURATION_MAXIMA:
+            timestamp, chave = escritas.popleft()
+            entrada = entradas.get(chave)
+            # Só remove se a entrada ainda é a desta escrita (não foi regravada)
+            if entrada is not None and entrada[1] == timestamp:
+                del entradas[chave]
+                removidas += 1
+        segmento.expiracoes += removidas
+        return removidas
+
+    def _compactar_escritas(self, segmento: _Segmento):
+        """
+        Reconstrói a fila de escritas quando as regravações a deixam muito
+        maior que o segmento (lock adquirido)
+        """
+        if len(segmento.escritas) <= 2 * self._max_por_segmento:
+            return
+        segmento.escritas = deque(
+            sorted((timestamp, chave) for chave, (_, timestamp, _) in segmento.entradas.items())
+        )
+
+    def _despejar_excedente(self, segmento: _Segmento):
+        """Remove as entradas menos recentes acima do limite (lock adquirido)"""
+        while len(segmento.entradas) > self._max_por_segmento:
+            segmento.entradas.popitem(last=False)
+            segmento.despejos += 1
+
+    def limpar_cache_antigo(self):
+        """Remove entradas expiradas do cache para evitar vazamento de memória"""
+        tempo_atual = time.time()
+        removidas = 0
+        for segmento in self._verificacao:
+            with segmento.lock:
+                removidas += self._expirar_inicio(segmento, tempo_atual)
+
+        if removidas:
+            logger.info("Limpeza de cache: %d entradas removidas", removidas)
+
+    def estatisticas(self) -> Dict[str, int]:
+        """Contadores de uso do cache (hits, misses, expirações e despejos)"""
+        estatisticas = {
+            "entradas": 0,
+            "contadores_falhas": 0,
+            "hits": 0,
+            "misses": 0,
+            "expiracoes": 0,
+            "despejos": 0,
+        }
+        for segmento in self._verificacao:
+            with segmento.lock:
+                estatisticas["entradas"] += len(segmento.entradas)
+                estatisticas["hits"] += segmento.hits
+                estatisticas["misses"] += segmento.misses
+                estatisticas["expiracoes"] += segmento.expiracoes
+                estatisticas["despejos"] += segmento.despejos
+        for segmento in self._falhas:
+            with segmento.lock:
+                estatisticas["contadores_falhas"] += len(segmento.entradas)
+                estatisticas["despejos"] += segmento.despejos
+        return estatisticas
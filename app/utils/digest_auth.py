@@ -0,0 +1,245 @@
+"""
+Utilitários de autenticação HTTP Digest (RFC 7616)
+
+Cálculo do cabeçalho Authorization, usado pelo cliente assíncrono e pelo
+modo com threads (requests), e cache de nonces por DVR para evitar o round
+trip do desafio 401 a cada snapshot.
+"""
+import hashlib
+import os
+import re
+import threading
+from typing import Dict, Optional
+
+from requests.auth import AuthBase
+from requests.cookies import extract_cookies_to_jar
+
+
+_PARAMETRO_RE = re.compile(r'(\w+)\s*=\s*("(?:[^"\\]|\\.)*"|[^,\s]*)')
+
+_ALGORITMOS = {
+    "MD5": hashlib.md5,
+    "MD5-SESS": hashlib.md5,
+    "SHA-256": hashlib.sha256,
+    "SHA-256-SESS": hashlib.sha256,
+}
+
+
+def parse_desafio(header: Optional[str]) -> Optional[Dict[str, str]]:
+    """
+    Interpreta o cabeçalho WWW-Authenticate de um desafio Digest
+
+    Returns:
+        Dicionário com os parâmetros do desafio (chaves em minúsculas)
+        ou None se o cabeçalho não for do tipo Digest
+    """
+    if not header:
+        return None
+
+    header = header.strip()
+    if not header.lower().startswith("digest"):
+        return None
+
+    desafio = {}
+    for chave, valor in _PARAMETRO_RE.findall(header[len("digest"):]):
+        if valor.startswith('"') and valor.endswith('"'):
+            valor = valor[1:-1].replace('\\"', '"')
+        desafio[chave.lower()] = valor
+
+    if "nonce" not in desafio:
+        return None
+    return desafio
+
+
+def montar_autorizacao(
+    desafio: Dict[str, str],
+    usuario: str,
+    senha: str,
+    metodo: str,
+    uri: str,
+    nc: int = 1,
+    cnonce: Optional[str] = None,
+) -> Optional[str]:
+    """
+    Monta o cabeçalho Authorization para um desafio Digest já recebido
+
+    Args:
+        desafio: Parâmetros retornados por parse_desafio
+        usuario: Usuário do DVR
+        senha: Senha do DVR
+        metodo: Método HTTP (GET)
+        uri: Caminho requisitado, incluindo query string
+        nc: Contador de uso do nonce (nonce-count)
+        cnonce: Nonce do cliente (gerado se não informado)
+
+    Returns:
+        Valor do cabeçalho Authorization ou None se o algoritmo não é suportado
+    """
+    algoritmo = desafio.get("algorithm", "MD5").upper()
+    hash_fn = _ALGORITMOS.get(algoritmo)
+    if hash_fn is None:
+        return None
+
+    def h(valor: str) -> str:
+        return hash_fn(valor.encode("utf-8")).hexdigest()
+
+    realm = desafio.get("realm", "")
+    nonce = desafio["nonce"]
+    qop_oferecido = [q.strip() for q in desafio.get("qop", "").split(",") if q.strip()]
+    qop = "auth" if "auth" in qop_oferecido else None
+    if qop_oferecido and qop is None:
+        # Apenas auth-int oferecido - não suportado para GET sem corpo
+        return None
+
+    cnonce = cnonce or os.urandom(8).hex()
+    nc_hex = f"{nc:08x}"
+
+    ha1 = h(f"{usuario}:{realm}:{senha}")
+    if algoritmo.endswith("-SESS"):
+        ha1 = h(f"{ha1}:{nonce}:{cnonce}")
+    ha2 = h(f"{metodo}:{uri}")
+
+    if qop:
+        resposta = h(f"{ha1}:{nonce}:{nc_hex}:{cnonce}:{qop}:{ha2}")
+    else:
+        resposta = h(f"{ha1}:{nonce}:{ha2}")
+
+    partes = [
+        f'username="{usuario}"',
+        f'realm="{realm}"',
+        f'nonce="{nonce}"',
+        f'uri="{uri}"',
+        f'response="{resposta}"',
+        f"algorithm={desafio.get('algorithm', 'MD5')}",
+    ]
+    if "opaque" in desafio:
+        partes.append(f'opaque="{desafio["opaque"]}"')
+    if qop:
+        partes.append(f"qop={qop}")
+        partes.append(f"nc={nc_hex}")
+        partes.append(f'cnonce="{cnonce}"')
+
+    return "Digest " + ", ".join(partes)
+
+
+class DigestAuthCache:
+    """
+    Cache thread-safe dos desafios Digest por DVR (chave ip:porta)
+
+    Com o desafio em cache o Authorization é enviado já na primeira
+    requisição (nonce-count incrementado a cada uso); um novo 401 só ocorre
+    quando o DVR considera o nonce expirado.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._desafios: Dict[str, Dict[str, str]] = {}
+        self._contadores: Dict[str, int] = {}
+        self.desafios_recebidos = 0  # 401 recebidos (sem cache ou nonce expirado)
+        self.nonces_expirados = 0  # Autorização em cache recusada pelo DVR
+        self.round_trips_economizados = 0  # Autorização em cache aceita de primeira
+
+    def autorizacao(
+        self, chave: str, usuario: str, senha: str, metodo: str, uri: str
+    ) -> Optional[str]:
+        """Monta o Authorization com o desafio em cache (None se não houver)"""
+        with self._lock:
+            desafio = self._desafios.get(chave)
+            if desafio is None:
+                return None
+            nc = self._contadores.get(chave, 0) + 1
+            self._contadores[chave] = nc
+        return montar_autorizacao(desafio, usuario, senha, metodo, uri, nc=nc)
+
+    def registrar_desafio(
+        self, chave: str, desafio: Dict[str, str], autorizacao_recusada: bool = False
+    ):
+        """Guarda um novo desafio recebido em um 401"""
+        with self._lock:
+            self._desafios[chave] = desafio
+            self._contadores[chave] = 0
+            self.desafios_recebidos += 1
+            if autorizacao_recusada:
+                self.nonces_expirados += 1
+
+    def registrar_reuso(self):
+        """Contabiliza uma requisição autenticada sem o round trip do 401"""
+        with self._lock:
+            self.round_trips_economizados += 1
+
+    def invalidar(self, chave: str):
+        with self._lock:
+            self._desafios.pop(chave, None)
+            self._contadores.pop(chave, None)
+
+    def estatisticas(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "dvrs_em_cache": len(self._desafios),
+                "desafios_recebidos": self.desafios_recebidos,
+                "nonces_expirados": self.nonces_expirados,
+                "round_trips_economizados": self.round_trips_economizados,
+            }
+
+
+class CachedHTTPDigestAuth(AuthBase):
+    """
+    Autenticação Digest para requests usando o DigestAuthCache compartilhado
+
+    Uma instância por requisição: envia o Authorization preemptivo quando há
+    desafio em cache e, em caso de 401, atualiza o cache e reenvia uma vez.
+    """
+
+    def __init__(self, usuario: str, senha: str, cache: DigestAuthCache, chave: str):
+        self.usuario = usuario
+        self.senha = senha
+        self.cache = cache
+        self.chave = chave
+        self._preemptivo = False
+        self._reenviado = False
+
+    def __call__(self, r):
+        autorizacao = self.cache.autorizacao(
+            self.chave, self.usuario, self.senha, r.method, r.path_url
+        )
+        if autorizacao:
+            r.headers["Authorization"] = autorizacao
+            self._preemptivo = True
+        r.register_hook("response", self.handle_401)
+        return r
+
+    def handle_401(self, r, **kwargs):
+        if r.status_code != 401:
+            if self._preemptivo and not self._reenviado:
+                self.cache.registrar_reuso()
+            return r
+
+        if self._reenviado:
+            return r
+
+        desafio = parse_desafio(r.headers.get("www-authenticate"))
+        if desafio is None:
+            return r
+        self.cache.registrar_desafio(
+            self.chave, desafio, autorizacao_recusada=self._preemptivo
+        )
+
+        # Consome o corpo do 401 e libera a conexão para reutilização
+        r.content
+        r.close()
+
+        prep = r.request.copy()
+        extract_cookies_to_jar(prep._cookies, r.request, r.raw)
+        prep.prepare_cookies(prep._cookies)
+        autorizacao = self.cache.autorizacao(
+            self.chave, self.usuario, self.senha, prep.method, prep.path_url
+        )
+        if autorizacao is None:
+            return r
+        prep.headers["Authorization"] = autorizacao
+        self._reenviado = True
+
+        _r = r.connection.send(prep, **kwargs)
+        _r.history.append(r)
+        _r.request = prep
+        return _r
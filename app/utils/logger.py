@@ -0,0 +1,288 @@
+"""
+Logging estruturado e não bloqueante
+
+Os módulos registram mensagens com get_logger(__name__); os registros são
+apenas enfileirados pela thread que verifica as câmeras e uma thread
+dedicada (QueueListener) formata e escreve a saída, de modo que a E/S de log
+não entra na latência das varreduras. Com a fila cheia o registro é
+descartado (e contado) em vez de bloquear.
+
+- LOG_NIVEL controla o nível geral da aplicação
+- Linhas por câmera (ON/OFF de cada verificação) usam o logger "app.cameras",
+  com nível próprio (LOG_NIVEL_CAMERAS) - desligadas por padrão em produção
+- LOG_FORMATO "json" gera uma linha JSON por registro; "texto" para console
+- Avisos e erros repetidos (mesmo logger e mesmo modelo de mensagem) são
+  limitados a LOG_AGREGACAO_LIMITE por LOG_AGREGACAO_JANELA; o excedente é
+  resumido em um único registro com a quantidade suprimida
+
+Use mensagens no estilo %-format (logger.warning("Falha em %s: %s", nome, e)):
+a formatação só acontece se o nível estiver habilitado e o modelo da
+mensagem é a chave da agregação.
+"""
+import atexit
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Optional, Tuple
+
+from app.config import Config
+
+
+RAIZ = "app"
+LOGGER_CAMERAS = "app.cameras"
+
+# Atributos padrão de um LogRecord - o restante veio de extra={...}
+_ATRIBUTOS_PADRAO = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "suprimidas"}
+
+
+def _campos_extras(record: logging.LogRecord) -> Dict[str, object]:
+    return {
+        chave: valor
+        for chave, valor in vars(record).items()
+        if chave not in _ATRIBUTOS_PADRAO and not chave.startswith("_")
+    }
+
+
+class FormatadorJSON(logging.Formatter):
+    """Uma linha JSON por registro (campos de extra={...} incluídos)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        dados = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created))
+            + f".{int(record.msecs):03d}",
+            "nivel": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        dados.update(_campos_extras(record))
+        if getattr(record, "suprimidas", 0):
+            dados["suprimidas"] = record.suprimidas
+        if record.exc_text:
+            dados["exc"] = record.exc_text
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+class FormatadorTexto(logging.Formatter):
+    """Formato legível para console: data [NÍVEL] logger: mensagem chave=valor"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        linha = super().format(record)
+        extras = _campos_extras(record)
+        if extras:
+            linha += " " + " ".join(f"{chave}={valor}" for chave, valor in extras.items())
+        if getattr(record, "suprimidas", 0):
+            linha += f" (+{record.suprimidas} ocorrências suprimidas)"
+        return linha
+
+
+class AgregadorErros(logging.Filter):
+    """
+    Limita avisos e erros repetidos: por (logger, modelo da mensagem), deixa
+    passar `limite` registros por janela e conta os demais. O total suprimido
+    sai no primeiro registro da janela seguinte ou, se a mensagem parou de
+    ocorrer, em um registro de resumo emitido na próxima varredura das janelas.
+    """
+
+    def __init__(self, limite: int, janela: float, destino: Optional[logging.Handler] = None):
+        super().__init__()
+        self.limite = limite
+        self.janela = janela
+        self.destino = destino
+        self._lock = threading.Lock()
+        # chave -> [início da janela, registros na janela, suprimidos]
+        self._janelas: Dict[Tuple[str, str], List] = {}
+        self._proxima_varredura = time.time() + janela
+        self.total_suprimidos = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING or getattr(record, "suprimidas", 0):
+            return True
+        chave = (record.name, str(record.msg))
+        agora = record.created
+        resumos = []
+        with self._lock:
+            if agora >= self._proxima_varredura:
+                resumos = self._varrer(agora)
+            janela = self._janelas.get(chave)
+            if janela is None or agora - janela[0] >= self.janela:
+                if janela is not None and janela[2]:
+                    record.suprimidas = janela[2]
+                self._janelas[chave] = [agora, 1, 0]
+                permitir = True
+            else:
+                janela[1] += 1
+                permitir = janela[1] <= self.limite
+                if not permitir:
+                    janela[2] += 1
+                    self.total_suprimidos += 1
+        for resumo in resumos:
+            self._emitir(resumo)
+        return permitir
+
+    def _varrer(self, agora: float) -> List[logging.LogRecord]:
+        """Remove janelas vencidas, gerando resumo das que tiveram supressões"""
+        self._proxima_varredura = agora + self.janela
+        resumos = []
+        for chave in [c for c, j in self._janelas.items() if agora - j[0] >= self.janela]:
+            inicio, _, suprimidos = self._janelas.pop(chave)
+            if suprimidos:
+                nome, modelo = chave
+                resumos.append(
+                    logging.makeLogRecord(
+                        {
+                            "name": nome,
+                            "levelno": logging.WARNING,
+                            "levelname": "WARNING",
+                            "msg": "Mensagem repetida suprimida: %s",
+                            "args": (modelo,),
+                            "suprimidas": suprimidos,
+                        }
+                    )
+                )
+        return resumos
+
+    def descarregar(self):
+        """Emite o resumo de todas as janelas com supressões (encerramento)"""
+        with self._lock:
+            resumos = self._varrer(float("inf"))
+        for resumo in resumos:
+            self._emitir(resumo)
+
+    def _emitir(self, record: logging.LogRecord):
+        if self.destino is not None:
+            self.destino.handle(record)
+
+
+class _HandlerFila(QueueHandler):
+    """Enfileira sem bloquear; com a fila cheia o registro é descartado"""
+
+    def __init__(self, fila: "queue.Queue"):
+        super().__init__(fila)
+        self.descartados = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve a mensagem agora (os argumentos podem mudar depois), mas
+        # deixa a formatação completa para a thread de escrita
+        mensagem = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        copia = logging.makeLogRecord(vars(record))
+        copia.msg = mensagem
+        copia.args = None
+        copia.exc_info = None
+        return copia
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+
+class _HandlerSaida(logging.StreamHandler):
+    """Escreve no sys.stdout vigente no momento da escrita (respeita redirect_stdout)"""
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, valor):
+        pass
+
+
+_lock = threading.Lock()
+_listener: Optional[QueueListener] = None
+_handler_fila: Optional[_HandlerFila] = None
+_agregador: Optional[AgregadorErros] = None
+
+
+def _nivel(nome) -> int:
+    if isinstance(nome, int):
+        return nome
+    nivel = logging.getLevelName(str(nome).upper())
+    return nivel if isinstance(nivel, int) else logging.INFO
+
+
+def configurar_logging(
+    nivel: Optional[str] = None,
+    nivel_cameras: Optional[str] = None,
+    formato: Optional[str] = None,
+):
+    """
+    Instala a fila e a thread de escrita no logger raiz da aplicação
+
+    Pode ser chamada de novo para trocar níveis ou formato (a configuração
+    anterior é desfeita). Os parâmetros omitidos vêm do Config.
+    """
+    global _listener, _handler_fila, _agregador
+    with _lock:
+        raiz = logging.getLogger(RAIZ)
+        if _listener is not None:
+            _listener.stop()
+            raiz.removeHandler(_handler_fila)
+
+        formato = (formato or Config.LOG_FORMATO).lower()
+        saida = _HandlerSaida()
+        saida.setFormatter(FormatadorJSON() if formato == "json" else FormatadorTexto())
+
+        fila: "queue.Queue" = queue.Queue(maxsize=Config.LOG_FILA_MAX)
+        _handler_fila = _HandlerFila(fila)
+        _agregador = AgregadorErros(
+            Config.LOG_AGREGACAO_LIMITE, Config.LOG_AGREGACAO_JANELA, destino=_handler_fila
+        )
+        _handler_fila.addFilter(_agregador)
+
+        raiz.addHandler(_handler_fila)
+        raiz.setLevel(_nivel(nivel or Config.LOG_NIVEL))
+        raiz.propagate = False
+        logging.getLogger(LOGGER_CAMERAS).setLevel(_nivel(nivel_cameras or Config.LOG_NIVEL_CAMERAS))
+
+        _listener = QueueListener(fila, saida, respect_handler_level=True)
+        _listener.start()
+
+
+def encerrar_logging():
+    """Resume as supressões pendentes e escreve o que ainda está na fila"""
+    global _listener
+    with _lock:
+        if _listener is None:
+            return
+        if _agregador is not None:
+            _agregador.descarregar()
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(encerrar_logging)
+
+
+def get_logger(nome: str) -> logging.Logger:
+    """
+    Logger sob a raiz da aplicação (configura o logging no primeiro uso)
+
+    Módulos executados como script (__main__) ficam como "app.main".
+    """
+    if _listener is None:
+        configurar_logging()
+    if nome == "__main__":
+        nome = f"{RAIZ}.main"
+    elif nome != RAIZ and not nome.startswith(RAIZ + "."):
+        nome = f"{RAIZ}.{nome}"
+    return logging.getLogger(nome)
+
+
+def estatisticas() -> Dict[str, int]:
+    """Registros enfileirados, descartados (fila cheia) e suprimidos (agregação)"""
+    return {
+        "fila": _handler_fila.queue.qsize() if _handler_fila is not None else 0,
+        "descartados": _handler_fila.descartados if _handler_fila is not None else 0,
+        "suprimidos": _agregador.total_suprimidos if _agregador is not None else 0,
+    }
@@ -0,0 +1,270 @@
+"""
+Métricas no formato de exposição de texto do Prometheus (versão 0.0.4)
+
+Registro em processo e sem dependências externas: contadores, medidores e
+histogramas com rótulos. Cada série guarda apenas números (o histograma,
+uma contagem por faixa), de modo que uma observação no caminho quente custa
+uma busca binária e um incremento sob lock. Indicadores que outros
+componentes já mantêm (cache, pool MySQL, outbox) entram por coletores,
+executados apenas quando /metrics é lido.
+"""
+import bisect
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .logger import get_logger
+
+
+logger = get_logger(__name__)
+
+# Faixas padrão (segundos) - de respostas locais a timeouts de DVR
+FAIXAS_PADRAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# (nome, tipo, ajuda, [(rótulos, valor)]) - formato retornado pelos coletores
+Familia = Tuple[str, str, str, List[Tuple[Dict[str, Any], float]]]
+
+
+def _formatar_valor(valor: float) -> str:
+    if valor == math.inf:
+        return "+Inf"
+    if valor == -math.inf:
+        return "-Inf"
+    if isinstance(valor, float) and valor.is_integer() and abs(valor) < 1e15:
+        return str(int(valor))
+    return repr(valor)
+
+
+def _escapar(valor: Any) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatar_rotulos(rotulos: Iterable[Tuple[str, Any]]) -> str:
+    pares = ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in rotulos)
+    return "{" + pares + "}" if pares else ""
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], Any] = {}
+
+    def _chave(self, valores: Dict[str, Any]) -> Tuple[str, ...]:
+        if len(valores) != len(self.rotulos):
+            raise ValueError(f"{self.nome}: rótulos esperados {self.rotulos}, recebidos {tuple(valores)}")
+        return tuple(str(valores[rotulo]) for rotulo in self.rotulos)
+
+    def _amostras(self) -> List[Tuple[str, Tuple[Tuple[str, Any], ...], float]]:
+        raise NotImplementedError
+
+    def exportar(self) -> List[str]:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+        for nome, rotulos, valor in self._amostras():
+            linhas.append(f"{nome}{_formatar_rotulos(rotulos)} {_formatar_valor(valor)}")
+        return linhas
+
+
+class Contador(_Metrica):
+    """Valor que só cresce (eventos, bytes, erros)"""
+
+    tipo = "counter"
+
+    def incrementar(self, quantidade: float = 1, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._series[chave] = self._series.get(chave, 0) + quantidade
+
+    def valor(self, **rotulos) -> float:
+        with self._lock:
+            return self._series.get(self._chave(rotulos), 0)
+
+    def _amostras(self):
+        with self._lock:
+            series = list(self._series.items())
+        return [(self.nome, tuple(zip(self.rotulos, chave)), valor) for chave, valor in series]
+
+
+class Medidor(_Metrica):
+    """Valor instantâneo que sobe e desce (filas, conexões abertas)"""
+
+    tipo = "gauge"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()):
+        super().__init__(nome, ajuda, rotulos)
+        self._funcoes: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def definir_funcao(self, funcao: Callable[[], float], **rotulos):
+        """Série calculada apenas na exportação (ex.: tamanho de uma fila)"""
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._funcoes[chave] = funcao
+
+    def definir(self, valor: float, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._series[chave] = valor
+
+    def incrementar(self, quantidade: float = 1, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._series[chave] = self._series.get(chave, 0) + quantidade
+
+    def decrementar(self, quantidade: float = 1, **rotulos):
+        self.incrementar(-quantidade, **rotulos)
+
+    def valor(self, **rotulos) -> float:
+        with self._lock:
+            return self._series.get(self._chave(rotulos), 0)
+
+    def _amostras(self):
+        with self._lock:
+            series = dict(self._series)
+            funcoes = list(self._funcoes.items())
+        for chave, funcao in funcoes:
+            try:
+                series[chave] = funcao()
+            except Exception as e:
+                logger.error("Falha ao calcular a métrica %s: %s", self.nome, e)
+        return [(self.nome, tuple(zip(self.rotulos, chave)), valor) for chave, valor in series.items()]
+
+
+class _SerieHistograma:
+    __slots__ = ("contagens", "soma", "total")
+
+    def __init__(self, num_faixas: int):
+        # Uma posição por faixa mais a faixa +Inf
+        self.contagens = [0] * (num_faixas + 1)
+        self.soma = 0.0
+        self.total = 0
+
+
+class Histograma(_Metrica):
+    """Distribuição de durações em faixas fixas (percentis calculados no Prometheus)"""
+
+    tipo = "histogram"
+
+    def __init__(
+        self,
+        nome: str,
+        ajuda: str,
+        rotulos: Sequence[str] = (),
+        faixas: Optional[Sequence[float]] = None,
+    ):
+        super().__init__(nome, ajuda, rotulos)
+        self.faixas = tuple(sorted(faixas or FAIXAS_PADRAO))
+
+    def observar(self, valor: float, **rotulos):
+        chave = self._chave(rotulos)
+        indice = bisect.bisect_left(self.faixas, valor)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = _SerieHistograma(len(self.faixas))
+            serie.contagens[indice] += 1
+            serie.soma += valor
+            serie.total += 1
+
+    @contextmanager
+    def cronometrar(self, **rotulos):
+        """Observa a duração do bloco (também quando ele termina com exceção)"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **rotulos)
+
+    def _amostras(self):
+        with self._lock:
+            series = [
+                (chave, list(serie.contagens), serie.soma, serie.total)
+                for chave, serie in self._series.items()
+            ]
+        amostras = []
+        for chave, contagens, soma, total in series:
+            rotulos = tuple(zip(self.rotulos, chave))
+            acumulado = 0
+            for limite, contagem in zip(self.faixas + (math.inf,), contagens):
+                acumulado += contagem
+                amostras.append(
+                    (f"{self.nome}_bucket", rotulos + (("le", _formatar_valor(float(limite))),), acumulado)
+                )
+            amostras.append((f"{self.nome}_sum", rotulos, soma))
+            amostras.append((f"{self.nome}_count", rotulos, total))
+        return amostras
+
+
+class RegistroMetricas:
+    """Conjunto de métricas e coletores exportados em /metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metricas: "OrderedDict[str, _Metrica]" = OrderedDict()
+        self._coletores: List[Callable[[], Iterable[Familia]]] = []
+
+    def _obter(self, classe, nome: str, *args, **kwargs):
+        with self._lock:
+            metrica = self._metricas.get(nome)
+            if metrica is None:
+                metrica = self._metricas[nome] = classe(nome, *args, **kwargs)
+            elif not isinstance(metrica, classe):
+                raise ValueError(f"Métrica {nome} já registrada como {metrica.tipo}")
+            return metrica
+
+    def contador(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()) -> Contador:
+        return self._obter(Contador, nome, ajuda, rotulos)
+
+    def medidor(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()) -> Medidor:
+        return self._obter(Medidor, nome, ajuda, rotulos)
+
+    def histograma(
+        self,
+        nome: str,
+        ajuda: str,
+        rotulos: Sequence[str] = (),
+        faixas: Optional[Sequence[float]] = None,
+    ) -> Histograma:
+        return self._obter(Histograma, nome, ajuda, rotulos, faixas)
+
+    def registrar_coletor(self, coletor: Callable[[], Iterable[Familia]]):
+        """
+        Adiciona uma função chamada a cada leitura de /metrics que retorna
+        famílias (nome, tipo, ajuda, [(rótulos, valor)])
+        """
+        with self._lock:
+            self._coletores.append(coletor)
+
+    def exportar(self) -> str:
+        """Texto no formato de exposição do Prometheus"""
+        with self._lock:
+            metricas = list(self._metricas.values())
+            coletores = list(self._coletores)
+
+        linhas: List[str] = []
+        for metrica in metricas:
+            linhas.extend(metrica.exportar())
+        for coletor in coletores:
+            try:
+                familias = list(coletor())
+            except Exception as e:
+                logger.error("Falha no coletor de métricas %r: %s", coletor, e)
+                continue
+            for nome, tipo, ajuda, amostras in familias:
+                linhas.append(f"# HELP {nome} {ajuda}")
+                linhas.append(f"# TYPE {nome} {tipo}")
+                for rotulos, valor in amostras:
+                    linhas.append(
+                        f"{nome}{_formatar_rotulos(sorted(rotulos.items()))} {_formatar_valor(valor)}"
+                    )
+        return "\n".join(linhas) + "\n"
+
+
+# Registro compartilhado do processo
+registro = RegistroMetricas()
@@ -0,0 +1,71 @@
+"""
+Utilitários de distribuição de carga ao longo do intervalo de verificação
+
+Cada câmera recebe uma fase fixa dentro do intervalo, derivada da sua chave,
+para que as verificações fiquem espalhadas de forma uniforme (e estável entre
+ciclos e reinícios) em vez de dispararem todas no início do ciclo.
+"""
+import threading
+import time
+import zlib
+from typing import Dict
+
+
+def fase_deterministica(chave: str, periodo: float) -> float:
+    """
+    Deslocamento da câmera dentro do período, em segundos
+
+    Usa CRC32 (e não hash()) para que a fase seja a mesma em todos os
+    processos e reinícios do servidor.
+    """
+    if periodo <= 0:
+        return 0.0
+    return zlib.crc32(chave.encode("utf-8")) / 2**32 * periodo
+
+
+class MedidorTaxa:
+    """
+    Medidor thread-safe de eventos por segundo em janela deslizante
+
+    Mantém um contador por segundo em um buffer circular; a taxa de qualquer
+    janela até JANELA_MAXIMA segundos é calculada sem guardar eventos individuais.
+    """
+
+    JANELA_MAXIMA = 300  # segundos
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contagens = [0] * self.JANELA_MAXIMA
+        self._segundos = [0] * self.JANELA_MAXIMA
+        self.total = 0
+
+    def registrar(self, quantidade: int = 1):
+        segundo = int(time.time())
+        indice = segundo % self.JANELA_MAXIMA
+        with self._lock:
+            if self._segundos[indice] != segundo:
+                self._segundos[indice] = segundo
+                self._contagens[indice] = 0
+            self._contagens[indice] += quantidade
+            self.total += quantidade
+
+    def taxa(self, janela: int = 60) -> float:
+        """Média de eventos por segundo nos últimos `janela` segundos completos"""
+        janela = max(1, min(janela, self.JANELA_MAXIMA - 1))
+        atual = int(time.time())
+        inicio = atual - janela
+        with self._lock:
+            eventos = sum(
+                contagem
+                for segundo, contagem in zip(self._segundos, self._contagens)
+                if inicio <= segundo < atual
+            )
+        return eventos / janela
+
+    def estatisticas(self) -> Dict[str, float]:
+        return {
+            "taxa_10s": round(self.taxa(10), 2),
+            "taxa_1min": round(self.taxa(60), 2),
+            "taxa_5min": round(self.taxa(self.JANELA_MAXIMA - 1), 2),
+            "total": self.total,
+        }
@@ -3,7 +3,12 @@ Protocol utilities for camera verification
 
 Provides utilities for handling different camera protocols (Hikvision ISAPI vs Intelbras CGI)
 """
-from typing import Dict, Any
+import re
+import xml.etree.ElementTree as ET
+from typing import Dict, Any, Optional
+
+
+_DAHUA_STATE_RE = re.compile(r"^states\[(\d+)\]\.(\w+)=(.*)$")
 
 
 class ProtocolUtils:
@@ -98,3 +103,95 @@ class ProtocolUtils:
             return f"http://{ip}:{porta}/ISAPI/Streaming/channels/{canal}/picture"
         else:
             raise ValueError(f"Unsupported protocol: {protocol}. Use 'hikvision' or 'intelbras'")
+
+    @staticmethod
+    def build_channel_status_url(ip: str, porta: int, protocol: str) -> str:
+        """
+        Builds the URL that returns the state of every channel of a DVR/NVR
+        in a single request
+
+        Examples:
+            Hikvision: http://192.168.1.100:80/ISAPI/ContentMgmt/InputProxy/channels/status
+            Intelbras: http://192.168.1.200:80/cgi-bin/LogicDeviceManager.cgi?action=getCameraState&uniqueChannels[0]=-1
+        """
+        if protocol == "intelbras":
+            return (
+                f"http://{ip}:{porta}/cgi-bin/LogicDeviceManager.cgi"
+                "?action=getCameraState&uniqueChannels[0]=-1"
+            )
+        elif protocol == "hikvision":
+            return f"http://{ip}:{porta}/ISAPI/ContentMgmt/InputProxy/channels/status"
+        else:
+            raise ValueError(f"Unsupported protocol: {protocol}. Use 'hikvision' or 'intelbras'")
+
+    @staticmethod
+    def parse_channel_status(protocol: str, body: bytes) -> Dict[str, Optional[bool]]:
+        """
+        Parses a bulk channel status response
+
+        Args:
+            protocol: Protocol type ("hikvision" or "intelbras")
+            body: Raw response body
+
+        Returns:
+            Mapping of channel (in the protocol's snapshot format: "101" for
+            Hikvision, "1" for Intelbras) to True (online), False (offline)
+            or None (ambiguous state - must be confirmed by snapshot)
+
+        Raises:
+            ValueError: If the body cannot be parsed
+        """
+        if protocol == "hikvision":
+            try:
+                root = ET.fromstring(body)
+            except ET.ParseError as e:
+                raise ValueError(f"Invalid ISAPI channel status XML: {e}")
+
+            estados: Dict[str, Optional[bool]] = {}
+            for elem in root.iter():
+                if not elem.tag.endswith("InputProxyChannelStatus"):
+                    continue
+                campos = {
+                    filho.tag.rsplit("}", 1)[-1]: (filho.text or "").strip()
+                    for filho in elem
+                }
+                canal_id = campos.get("id", "")
+                if not canal_id.isdigit():
+                    continue
+                online = campos.get("online", "").lower()
+                estados[f"{int(canal_id)}01"] = (
+                    True if online == "true" else False if online == "false" else None
+                )
+            return estados
+
+        elif protocol == "intelbras":
+            # Response format (one key=value per line, channels are 0-based):
+            #   states[0].channel=0
+            #   states[0].connectionState=Connected
+            canais: Dict[str, Dict[str, str]] = {}
+            for linha in body.decode("utf-8", errors="replace").splitlines():
+                match = _DAHUA_STATE_RE.match(linha.strip())
+                if match:
+                    indice, campo, valor = match.groups()
+                    canais.setdefault(indice, {})[campo] = valor.strip()
+
+            if not canais:
+                raise ValueError("Invalid CGI camera state response")
+
+            estados = {}
+            for campos in canais.values():
+                canal = campos.get("channel", "")
+                if not canal.isdigit():
+                    continue
+                estado = campos.get("connectionState", "").lower()
+                estados[str(int(canal) + 1)] = (
+                    True
+                    if estado == "connected"
+                    else False
+                    if estado in ("unconnect", "disconnected")
+                    else None
+                )
+            return estados
+
+        else:
+            raise ValueError(f"Unsupported protocol: {protocol}. Use 'hikvision' or 'intelbras'")
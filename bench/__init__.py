@@ -0,0 +1,3 @@
+"""
+Ferramentas de benchmark e simulação offline (não fazem parte da aplicação)
+"""
@@ -0,0 +1,160 @@
+"""
+Benchmark da outbox de alertas após uma queda da API Moni
+
+Grava N eventos com a API fora do ar, sobe uma API simulada e mede quanto
+tempo o AlertDispatcher leva para drenar o acúmulo. Também mede o custo do
+enfileiramento (o que o worker de verificação paga por alerta) durante a
+drenagem e confere se todos os eventos chegaram na ordem.
+
+Uso:
+    python -m bench.alert_outbox --eventos 10000 --lote 20 --latencia 0.01
+"""
+import argparse
+import contextlib
+import json
+import os
+import re
+import socket
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.config import Config
+from app import alert
+from app.core.alert_outbox import AlertOutbox
+from app.services.alert_dispatcher import AlertDispatcher
+
+
+_SETOR_RE = re.compile(r", (\d+), '[^']*'\)")
+
+
+class FakeMoniAPI:
+    """Endpoint ExecutarComando simulado que registra os eventos recebidos"""
+
+    def __init__(self, latencia: float = 0.0):
+        self.latencia = latencia
+        self.requisicoes = 0
+        self.eventos = 0
+        self.setores = []
+        self._lock = threading.Lock()
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                corpo = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                if api.latencia:
+                    time.sleep(api.latencia)
+                with api._lock:
+                    api.requisicoes += 1
+                    api.eventos += corpo["comando"].count("(CURRENT_TIMESTAMP")
+                    api.setores.extend(int(s) for s in _SETOR_RE.findall(corpo["comando"]))
+                self.send_response(200)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"ok")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/ExecutarComando"
+
+    def iniciar(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _camera_info(sequencia: int):
+    return {
+        "cliente": "BENCH",
+        "particao": "001",
+        "empresa": 1,
+        "ocorrencia": "CAMERA_OFFLINE",
+        "identificacao": f"Camera {sequencia}",
+        "codigomaquina": 1,
+        "codigoconjuntodeocorrencias": 1,
+        "setor": sequencia,
+        "complemento": f"Camera {sequencia} está offline",
+        "nome": f"Camera {sequencia}",
+    }
+
+
+def _percentil(valores, p):
+    valores = sorted(valores)
+    return valores[int(p * (len(valores) - 1))] if valores else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--eventos", type=int, default=10000)
+    parser.add_argument("--lote", type=int, default=Config.ALERTAS_MAX_LOTE)
+    parser.add_argument("--latencia", type=float, default=0.01, help="latência da API (s)")
+    args = parser.parse_args()
+
+    Config.ALERTAS_BACKOFF = 0.1
+    Config.ALERTAS_BACKOFF_MAX = 0.2
+    Config.ALERTAS_JANELA_LOTE = 0.05
+
+    with tempfile.TemporaryDirectory() as diretorio, open(os.devnull, "w") as nulo:
+        # API fora do ar: porta sem servidor
+        alert.API_URL = f"http://127.0.0.1:{_porta_livre()}/ExecutarComando"
+        dispatcher = AlertDispatcher(
+            AlertOutbox(os.path.join(diretorio, "outbox.db")), max_lote=args.lote
+        )
+
+        with contextlib.redirect_stdout(nulo):
+            tempos = []
+            for sequencia in range(args.eventos):
+                inicio = time.perf_counter()
+                dispatcher.enfileirar(_camera_info(sequencia), "Bench")
+                tempos.append(time.perf_counter() - inicio)
+        pendentes = dispatcher.outbox.estatisticas()["pendentes"]
+        print(
+            f"Acúmulo com a API fora: {pendentes} eventos na outbox | enfileirar: "
+            f"p50 {_percentil(tempos, 0.5) * 1e6:.0f} µs, p99 {_percentil(tempos, 0.99) * 1e6:.0f} µs"
+        )
+
+        api = FakeMoniAPI(latencia=args.latencia)
+        api.iniciar()
+        alert.API_URL = api.url
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(nulo):
+            # Novos alertas continuam chegando durante a drenagem
+            tempos_drenagem = []
+            for sequencia in range(args.eventos, args.eventos + 1000):
+                t = time.perf_counter()
+                dispatcher.enfileirar(_camera_info(sequencia), "Bench")
+                tempos_drenagem.append(time.perf_counter() - t)
+                time.sleep(0.0005)
+            drenado = dispatcher.aguardar(timeout=300)
+        duracao = time.perf_counter() - inicio
+
+        total = args.eventos + 1000
+        em_ordem = api.setores == sorted(api.setores)
+        print(
+            f"Drenagem: {len(api.setores)}/{total} eventos em {duracao:.2f}s "
+            f"({len(api.setores) / duracao:.0f} eventos/s, {api.requisicoes} requisições, "
+            f"lote {args.lote}, latência da API {args.latencia * 1000:.0f} ms)"
+        )
+        print(
+            f"Enfileirar durante a drenagem: p50 {_percentil(tempos_drenagem, 0.5) * 1e6:.0f} µs, "
+            f"p99 {_percentil(tempos_drenagem, 0.99) * 1e6:.0f} µs"
+        )
+        print(
+            f"Completo: {drenado and len(set(api.setores)) == total} | em ordem: {em_ordem} | "
+            f"duplicados: {len(api.setores) - len(set(api.setores))}"
+        )
+        dispatcher.outbox.fechar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Benchmark do descritor compacto das câmeras (CameraTarget)
+
+Monta um inventário sintético no formato de app.core.inventory.montar_camera e
+compara, para uma varredura completa, derivar os dados de conexão, as chaves e
+a URL do snapshot a cada verificação (como o caminho quente fazia antes) com
+ler os atributos do descritor montado uma vez por carga. Também mede a memória
+retida pelos descritores.
+
+Uso:
+    python -m bench.camera_target --dvrs 2000 --canais 16
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from app.core.camera_target import CameraTarget, montar_alvos
+from app.utils.protocol_utils import ProtocolUtils
+
+
+def _inventario(args):
+    clientes_data = []
+    for indice in range(args.dvrs):
+        protocolo = "hikvision" if indice % 2 == 0 else "intelbras"
+        cameras = [
+            {
+                "name": f"Camera {canal}",
+                "canal": f"{canal}01",
+                "channel": f"{canal}01",
+                "_dvr_ip": f"10.{indice // 65536}.{indice // 256 % 256}.{indice % 256}",
+                "_dvr_porta": 80,
+                "_dvr_usuario": "admin",
+                "_dvr_senha": "senha",
+                "_dvr_protocol": protocolo,
+                "uuid": f"{indice}-{canal}",
+            }
+            for canal in range(1, args.canais + 1)
+        ]
+        clientes_data.append((f"Cliente {indice}", {"metadata": {}, "cameras": cameras}))
+    return clientes_data
+
+
+def _derivar(cam, nome_condominio):
+    """Trabalho por verificação sem descritor: dicionário, chaves e URL"""
+    ip, porta, canal, usuario, senha, protocolo = CameraTarget.dados_conexao(cam)
+    dados = {
+        "nome": cam.get("name", "CAMERA"),
+        "ip": ip,
+        "porta": porta,
+        "canal": canal,
+        "usuario": usuario,
+        "senha": senha,
+        "protocol": protocolo.value,
+    }
+    chave_cache = f"{nome_condominio}_{dados['nome']}_{ip}_{canal}"
+    if dados["protocol"] == "intelbras":
+        chave_cache += "_intelbras"
+    chave = f"{nome_condominio}_{dados['nome']}"
+    chave_dvr = f"{ip}:{porta}"
+    url = ProtocolUtils.build_snapshot_url(ip, porta, canal, dados["protocol"])
+    return chave, chave_cache, chave_dvr, url, usuario, senha
+
+
+def _ler(alvo):
+    """Mesmos dados lidos do descritor"""
+    dvr = alvo.dvr
+    return alvo.chave, alvo.chave_cache, dvr.chave, alvo.url_snapshot, dvr.usuario, dvr.senha
+
+
+def _medir(funcao, argumentos):
+    gc.collect()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultados = [funcao(*args) for args in argumentos]
+    duracao = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del resultados
+    return duracao, pico
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do descritor compacto das câmeras")
+    parser.add_argument("--dvrs", type=int, default=2000)
+    parser.add_argument("--canais", type=int, default=16)
+    args = parser.parse_args()
+
+    gc.collect()
+    tracemalloc.start()
+    clientes_data = _inventario(args)
+    inventario, _ = tracemalloc.get_traced_memory()
+    inicio = time.perf_counter()
+    montadas = montar_alvos(clientes_data)
+    montagem = time.perf_counter() - inicio
+    com_alvos, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"Inventário: {montadas} câmeras em {args.dvrs} DVRs")
+    print(
+        f"  dicionários {inventario / 2**20:.1f} MiB ({inventario / montadas:.0f} B/câmera) | "
+        f"descritores +{(com_alvos - inventario) / 2**20:.1f} MiB "
+        f"({(com_alvos - inventario) / montadas:.0f} B/câmera) | montagem {montagem * 1000:.0f} ms"
+    )
+
+    # Varredura: a lista de resultados mantém vivo o que cada verificação aloca
+    cameras = [(cam, nome) for nome, data in clientes_data for cam in data["cameras"]]
+    duracao, pico = _medir(_derivar, cameras)
+    print(
+        f"  por verificação (derivando): {duracao / montadas * 1e6:.2f} µs/câmera, "
+        f"{pico / montadas:.0f} B/câmera alocados"
+    )
+    duracao, pico = _medir(_ler, [(cam["_alvo"],) for cam, _ in cameras])
+    print(
+        f"  por verificação (descritor): {duracao / montadas * 1e6:.2f} µs/câmera, "
+        f"{pico / montadas:.0f} B/câmera alocados"
+    )
+
+
+if __name__ == "__main__":
+    main()
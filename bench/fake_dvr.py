@@ -0,0 +1,289 @@
+"""
+DVR simulado (Hikvision ISAPI / Intelbras CGI) para testes e benchmarks offline
+
+Servidor HTTP/1.1 em asyncio que responde aos endpoints usados pelo
+VerificationService: snapshot por canal e status de todos os canais, com
+autenticação Digest (MD5, qop=auth) e conexões keep-alive. Também simula
+falhas de rede: latência com variação, perda (conexão derrubada sem
+resposta) e DVR travado (aceita a conexão e nunca responde).
+
+Uso avulso:
+    python -m bench.fake_dvr --protocolo hikvision --canais 32 --porta 18080
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import re
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from app.utils.digest_auth import parse_desafio
+
+
+ONLINE = "online"
+OFFLINE = "offline"
+AMBIGUO = "ambiguo"
+SEM_SINAL = "sem_sinal"
+
+_SNAPSHOT_HIK_RE = re.compile(r"^/ISAPI/Streaming/channels/(\d+)/picture$")
+
+
+def _md5(valor: str) -> str:
+    return hashlib.md5(valor.encode("utf-8")).hexdigest()
+
+
+class FakeDVR:
+    """DVR simulado com estado configurável por canal"""
+
+    def __init__(
+        self,
+        protocolo: str = "hikvision",
+        canais: int = 16,
+        usuario: str = "admin",
+        senha: str = "admin",
+        tamanho_imagem: int = 60_000,
+        latencia: float = 0.0,
+        suporta_lote: bool = True,
+        usos_por_nonce: int = 0,
+        variacao_latencia: float = 0.0,
+        perda: float = 0.0,
+        travado: bool = False,
+        semente: Optional[int] = None,
+    ):
+        self.protocolo = protocolo
+        self.usuario = usuario
+        self.senha = senha
+        self.tamanho_imagem = tamanho_imagem
+        self.latencia = latencia
+        self.suporta_lote = suporta_lote
+        # Status HTTP forçado no status em lote (ex.: 503 para DVR sobrecarregado)
+        self.status_lote = 200
+        # Latência sorteada em latencia ± variacao_latencia
+        self.variacao_latencia = variacao_latencia
+        # Probabilidade de derrubar a conexão sem responder
+        self.perda = perda
+        # Aceita conexões e lê as requisições, mas nunca responde
+        self.travado = travado
+        self._aleatorio = random.Random(semente)
+        self.perdidas = 0
+        self.realm = "IP Camera" if protocolo == "hikvision" else "Login to DVR"
+        self.nonce = os.urandom(8).hex()
+        # Após N requisições autenticadas o nonce expira (0 = nunca expira)
+        self.usos_por_nonce = usos_por_nonce
+        self._usos_nonce = 0
+        self._nonce_expirado = False
+        # Estado por canal lógico (1..N)
+        self.estados: Dict[int, str] = {canal: ONLINE for canal in range(1, canais + 1)}
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.porta: Optional[int] = None
+        self.requisicoes = 0
+        self.requisicoes_lote = 0
+        self.requisicoes_snapshot = 0
+        self.desafios = 0
+        self.bytes_enviados = 0
+
+    async def iniciar(self, host: str = "127.0.0.1", porta: int = 0) -> int:
+        self.server = await asyncio.start_server(self._atender, host, porta)
+        self.porta = self.server.sockets[0].getsockname()[1]
+        return self.porta
+
+    async def parar(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+    def _autenticado(self, autorizacao: Optional[str], uri: str) -> bool:
+        if not autorizacao:
+            return False
+        campos = parse_desafio(autorizacao)
+        if not campos or campos.get("username") != self.usuario:
+            return False
+        if campos.get("nonce") != self.nonce:
+            self._nonce_expirado = True
+            return False
+        ha1 = _md5(f"{self.usuario}:{self.realm}:{self.senha}")
+        ha2 = _md5(f"GET:{campos.get('uri', uri)}")
+        if campos.get("qop"):
+            esperado = _md5(
+                f"{ha1}:{campos['nonce']}:{campos.get('nc')}:{campos.get('cnonce')}:{campos['qop']}:{ha2}"
+            )
+        else:
+            esperado = _md5(f"{ha1}:{campos['nonce']}:{ha2}")
+        if esperado != campos.get("response"):
+            return False
+        self._usos_nonce += 1
+        if self.usos_por_nonce and self._usos_nonce >= self.usos_por_nonce:
+            self.nonce = os.urandom(8).hex()
+            self._usos_nonce = 0
+        return True
+
+    async def _atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                bruto = await reader.readuntil(b"\r\n\r\n")
+                linhas = bruto.decode("latin-1").split("\r\n")
+                metodo, uri, _ = linhas[0].split(" ", 2)
+                headers = {}
+                for linha in linhas[1:]:
+                    if ":" in linha:
+                        chave, valor = linha.split(":", 1)
+                        headers[chave.strip().lower()] = valor.strip()
+
+                self.requisicoes += 1
+                if self.travado:
+                    await reader.read()  # nunca responde - até o cliente desistir e fechar
+                    break
+                latencia = self.latencia
+                if self.variacao_latencia:
+                    latencia += self._aleatorio.uniform(
+                        -self.variacao_latencia, self.variacao_latencia
+                    )
+                if latencia > 0:
+                    await asyncio.sleep(latencia)
+                if self.perda and self._aleatorio.random() < self.perda:
+                    self.perdidas += 1
+                    writer.transport.abort()
+                    return
+
+                self._nonce_expirado = False
+                if not self._autenticado(headers.get("authorization"), uri):
+                    self.desafios += 1
+                    stale = ", stale=TRUE" if self._nonce_expirado else ""
+                    await self._responder(
+                        writer,
+                        401,
+                        b"",
+                        {
+                            "WWW-Authenticate": (
+                                f'Digest realm="{self.realm}", nonce="{self.nonce}", '
+                                f'qop="auth", algorithm=MD5{stale}'
+                            )
+                        },
+                    )
+                else:
+                    status, corpo, extra = self._rotear(metodo, uri)
+                    await self._responder(writer, status, corpo, extra)
+
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            pass  # Encerramento do servidor com conexões presas (DVR travado)
+        finally:
+            writer.close()
+
+    async def _responder(
+        self,
+        writer: asyncio.StreamWriter,
+        status: int,
+        corpo: bytes,
+        extra: Dict[str, str],
+    ):
+        motivo = {200: "OK", 401: "Unauthorized", 404: "Not Found"}.get(status, "Error")
+        cabecalhos = [f"HTTP/1.1 {status} {motivo}", f"Content-Length: {len(corpo)}"]
+        cabecalhos += [f"{chave}: {valor}" for chave, valor in extra.items()]
+        dados = ("\r\n".join(cabecalhos) + "\r\n\r\n").encode("latin-1") + corpo
+        self.bytes_enviados += len(dados)
+        writer.write(dados)
+        await writer.drain()
+
+    def _rotear(self, metodo: str, uri: str):
+        partes = urlsplit(uri)
+        caminho = partes.path
+        query = parse_qs(partes.query)
+
+        if self.protocolo == "hikvision":
+            if caminho == "/ISAPI/ContentMgmt/InputProxy/channels/status" and self.suporta_lote:
+                self.requisicoes_lote += 1
+                if self.status_lote != 200:
+                    return self.status_lote, b"", {"Content-Type": "text/plain"}
+                return 200, self._status_hikvision(), {"Content-Type": "application/xml"}
+            match = _SNAPSHOT_HIK_RE.match(caminho)
+            if match:
+                return self._snapshot(int(match.group(1)) // 100)
+        else:
+            if caminho == "/cgi-bin/LogicDeviceManager.cgi" and self.suporta_lote:
+                self.requisicoes_lote += 1
+                if self.status_lote != 200:
+                    return self.status_lote, b"", {"Content-Type": "text/plain"}
+                return 200, self._status_intelbras(), {"Content-Type": "text/plain"}
+            if caminho == "/cgi-bin/snapshot.cgi":
+                canal = query.get("channel", ["1"])[0]
+                if canal.isdigit():
+                    return self._snapshot(int(canal))
+
+        return 404, b"Not Found", {"Content-Type": "text/plain"}
+
+    def _snapshot(self, canal: int):
+        self.requisicoes_snapshot += 1
+        estado = self.estados.get(canal)
+        if estado is None or estado == OFFLINE:
+            return 404, b"", {"Content-Type": "text/plain"}
+        if estado == SEM_SINAL:
+            tamanho = 512
+        else:
+            # Imagem ao vivo: o ruído do sensor varia o tamanho do JPEG a cada captura
+            variacao = self.tamanho_imagem // 50
+            tamanho = self.tamanho_imagem + self._aleatorio.randint(-variacao, variacao)
+        corpo = b"\xff\xd8\xff\xe0" + b"\x00" * (tamanho - 6) + b"\xff\xd9"
+        return 200, corpo, {"Content-Type": "image/jpeg"}
+
+    def _status_hikvision(self) -> bytes:
+        itens = []
+        for canal, estado in sorted(self.estados.items()):
+            if estado == AMBIGUO:
+                online = ""
+            else:
+                online = f"<online>{'false' if estado == OFFLINE else 'true'}</online>"
+            itens.append(
+                f"<InputProxyChannelStatus><id>{canal}</id>{online}</InputProxyChannelStatus>"
+            )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<InputProxyChannelStatusList xmlns="http://www.hikvision.com/ver20/XMLSchema">'
+            + "".join(itens)
+            + "</InputProxyChannelStatusList>"
+        ).encode("utf-8")
+
+    def _status_intelbras(self) -> bytes:
+        linhas = []
+        for indice, (canal, estado) in enumerate(sorted(self.estados.items())):
+            conexao = {OFFLINE: "Unconnect", AMBIGUO: "Connecting"}.get(estado, "Connected")
+            linhas.append(f"states[{indice}].channel={canal - 1}")
+            linhas.append(f"states[{indice}].connectionState={conexao}")
+        return ("\r\n".join(linhas) + "\r\n").encode("utf-8")
+
+    def cameras(self, nome_prefixo: str = "Camera") -> list:
+        """Gera a lista de câmeras no formato retornado por get_alert_devices"""
+        return [
+            {
+                "name": f"{nome_prefixo} {canal}",
+                "canal": f"{canal}01",
+                "channel": f"{canal}01",
+                "_dvr_ip": "127.0.0.1",
+                "_dvr_porta": self.porta,
+                "_dvr_usuario": self.usuario,
+                "_dvr_senha": self.senha,
+                "_dvr_protocol": self.protocolo,
+            }
+            for canal in sorted(self.estados)
+        ]
+
+
+async def _main(args):
+    dvr = FakeDVR(protocolo=args.protocolo, canais=args.canais, latencia=args.latencia)
+    porta = await dvr.iniciar(porta=args.porta)
+    print(f"[INFO] DVR simulado ({args.protocolo}, {args.canais} canais) em 127.0.0.1:{porta}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--protocolo", choices=["hikvision", "intelbras"], default="hikvision")
+    parser.add_argument("--canais", type=int, default=16)
+    parser.add_argument("--porta", type=int, default=18080)
+    parser.add_argument("--latencia", type=float, default=0.0)
+    asyncio.run(_main(parser.parse_args()))
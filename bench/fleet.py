@@ -0,0 +1,358 @@
+"""
+Teste de carga com uma frota simulada de DVRs
+
+Sobe, em um processo separado, N DVRs simulados (bench.fake_dvr: Hikvision
+ISAPI e Intelbras CGI com Digest, latência, perda de pacotes, DVRs travados,
+DVRs desligados e imagens "Sem Sinal") e a API Moni simulada. No processo principal executa
+varreduras completas do VerificationService com o caminho real de alertas
+(outbox + AlertDispatcher) e relata tempo de varredura, latência p50/p99 das
+requisições, CPU e RSS por 1.000 câmeras. Como a frota roda em outro
+processo, CPU e memória medidos são apenas os da aplicação.
+
+Entre as varreduras uma fração dos canais muda de estado, gerando alertas
+de queda e de retorno; ao final o relatório confere se todos os alertas
+gerados chegaram à API simulada.
+
+Uso:
+    python -m bench.fleet --dvrs 200 --canais 16 --latencia 0.05 --perda 0.01 --travados 0.01
+    python -m bench.fleet --motor threads --timeout 3 --tentativas 1
+    python -m bench.fleet --mortos 0.1 --sem-disjuntor   # custo dos sites desligados
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import contextlib
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from app.config import Config
+from app import alert
+from app.services.verification_service import VerificationService
+from bench.alert_outbox import FakeMoniAPI
+from bench.fake_dvr import AMBIGUO, OFFLINE, ONLINE, SEM_SINAL, FakeDVR
+
+
+def _aumentar_limite_arquivos():
+    """Cada DVR e cada conexão simultânea consomem um descritor"""
+    try:
+        import resource
+
+        _, maximo = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (maximo, maximo))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+def _sortear_estado(aleatorio: random.Random, args) -> str:
+    return aleatorio.choices(
+        [ONLINE, OFFLINE, AMBIGUO, SEM_SINAL],
+        weights=[1 - args.offline - args.ambiguos - args.sem_sinal, args.offline, args.ambiguos, args.sem_sinal],
+    )[0]
+
+
+def _processo_frota(conexao, args):
+    """Frota de DVRs e API Moni simuladas, controladas pelo processo principal"""
+    _aumentar_limite_arquivos()
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+    aleatorio = random.Random(args.semente)
+    dvrs = []
+    mortos = 0
+    for indice in range(args.dvrs):
+        dvr = FakeDVR(
+            protocolo="hikvision" if indice % 2 == 0 else "intelbras",
+            canais=args.canais,
+            latencia=args.latencia,
+            variacao_latencia=args.variacao_latencia,
+            perda=args.perda,
+            travado=aleatorio.random() < args.travados,
+            suporta_lote=aleatorio.random() < args.suporte_lote,
+            semente=aleatorio.randrange(2**32),
+        )
+        for canal in dvr.estados:
+            dvr.estados[canal] = _sortear_estado(aleatorio, args)
+        asyncio.run_coroutine_threadsafe(dvr.iniciar(), loop).result()
+        if not dvr.travado and aleatorio.random() < args.mortos:
+            # Site sem energia/link: a porta deixa de aceitar conexões
+            asyncio.run_coroutine_threadsafe(dvr.parar(), loop).result()
+            mortos += 1
+        dvrs.append(dvr)
+
+    api = FakeMoniAPI(latencia=args.latencia_api)
+    api.iniciar()
+    conexao.send(
+        {
+            "dvrs": [(dvr.protocolo, dvr.porta, dvr.usuario, dvr.senha, len(dvr.estados)) for dvr in dvrs],
+            "travados": sum(dvr.travado for dvr in dvrs),
+            "mortos": mortos,
+            "api": api.url,
+        }
+    )
+
+    async def alterar(fracao: float) -> int:
+        alterados = 0
+        for dvr in dvrs:
+            for canal, estado in dvr.estados.items():
+                if aleatorio.random() < fracao:
+                    dvr.estados[canal] = OFFLINE if estado != OFFLINE else ONLINE
+                    alterados += 1
+        return alterados
+
+    async def encerrar():
+        # Conexões presas em DVRs travados ficam pendentes - cancela tudo
+        for dvr in dvrs:
+            dvr.server.close()
+        tarefas = [tarefa for tarefa in asyncio.all_tasks() if tarefa is not asyncio.current_task()]
+        for tarefa in tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*tarefas, return_exceptions=True)
+
+    while True:
+        comando, parametro = conexao.recv()
+        if comando == "alterar":
+            conexao.send(asyncio.run_coroutine_threadsafe(alterar(parametro), loop).result())
+        elif comando == "contadores":
+            conexao.send(
+                {
+                    "requisicoes": sum(dvr.requisicoes for dvr in dvrs),
+                    "perdidas": sum(dvr.perdidas for dvr in dvrs),
+                    "alertas": api.eventos,
+                    "requisicoes_api": api.requisicoes,
+                }
+            )
+        else:
+            asyncio.run_coroutine_threadsafe(encerrar(), loop).result(timeout=10)
+            loop.call_soon_threadsafe(loop.stop)
+            return
+
+
+class VerificationServiceBench(VerificationService):
+    """VerificationService que guarda a duração e o resultado de cada requisição ao DVR"""
+
+    def __init__(self):
+        super().__init__()
+        self.duracoes = []
+        self.timeouts = 0
+        self.erros = 0
+
+    def registrar_probe(self, protocolo, tipo, inicio, erro=None):
+        self.duracoes.append(time.perf_counter() - inicio)
+        if erro is not None:
+            if self.eh_timeout(erro):
+                self.timeouts += 1
+            else:
+                self.erros += 1
+        super().registrar_probe(protocolo, tipo, inicio, erro)
+
+
+def _montar_clientes(frota) -> list:
+    """Um condomínio por DVR, no formato retornado por get_alert_devices"""
+    clientes_data = []
+    for indice, (protocolo, porta, usuario, senha, canais) in enumerate(frota["dvrs"]):
+        cameras = [
+            {
+                "name": f"DVR{indice} Camera {canal}",
+                "canal": f"{canal}01",
+                "channel": f"{canal}01",
+                "_dvr_ip": "127.0.0.1",
+                "_dvr_porta": porta,
+                "_dvr_usuario": usuario,
+                "_dvr_senha": senha,
+                "_dvr_protocol": protocolo,
+                "setor": canal,
+            }
+            for canal in range(1, canais + 1)
+        ]
+        clientes_data.append(
+            (f"Condominio {indice}", {"metadata": {"empresa": 1, "codigo_moni": indice}, "cameras": cameras})
+        )
+    return clientes_data
+
+
+def _varrer_threads(service: VerificationService, clientes_data: list):
+    """Mesmo fluxo de processar_condominios_threads (app.main) sem subir o Flask"""
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=Config.MAX_WORKERS_CONDOMINIOS
+    ) as executor:
+        futures = [
+            executor.submit(
+                service.verificar_cameras, data.get("cameras", []), nome, data.get("metadata", {})
+            )
+            for nome, data in clientes_data
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            future.result()
+
+
+def _rss_mb() -> float:
+    """Memória residente atual do processo (MiB)"""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for linha in f:
+                if linha.startswith("VmRSS:"):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _percentil(valores, p):
+    valores = sorted(valores)
+    return valores[int(p * (len(valores) - 1))] if valores else 0.0
+
+
+def _varrer(service: VerificationServiceBench, clientes_data: list, motor: str) -> dict:
+    service.cache_manager.limpar()  # cada varredura consulta todos os DVRs
+    service.duracoes = []
+    service.timeouts = service.erros = 0
+    alertas_antes = service.medidor_alertas.total
+    service.iniciar_ciclo()
+
+    cpu_inicio = time.process_time()
+    inicio = time.perf_counter()
+    if motor == "asyncio":
+        service.verificar_todos(clientes_data)
+    else:
+        _varrer_threads(service, clientes_data)
+    duracao = time.perf_counter() - inicio
+    cpu = time.process_time() - cpu_inicio
+
+    status = [cam["status"] for dados in service.status_atual.values() for cam in dados["cameras"]]
+    return {
+        "duracao": duracao,
+        "cpu": cpu,
+        "requisicoes": len(service.duracoes),
+        "p50": _percentil(service.duracoes, 0.5),
+        "p99": _percentil(service.duracoes, 0.99),
+        "timeouts": service.timeouts,
+        "erros": service.erros,
+        "on": status.count("ON"),
+        "off": status.count("OFF"),
+        "alertas": service.medidor_alertas.total - alertas_antes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--dvrs", type=int, default=100)
+    parser.add_argument("--canais", type=int, default=16, help="câmeras por DVR")
+    parser.add_argument("--motor", choices=["asyncio", "threads"], default="asyncio")
+    parser.add_argument("--varreduras", type=int, default=2)
+    parser.add_argument("--alteracoes", type=float, default=0.05, help="fração de canais que mudam entre varreduras")
+    parser.add_argument("--latencia", type=float, default=0.05, help="latência dos DVRs (s)")
+    parser.add_argument("--variacao-latencia", type=float, default=0.03, help="± em torno da latência (s)")
+    parser.add_argument("--perda", type=float, default=0.01, help="probabilidade de derrubar a requisição")
+    parser.add_argument("--travados", type=float, default=0.01, help="fração de DVRs que nunca respondem")
+    parser.add_argument("--mortos", type=float, default=0.0, help="fração de DVRs desligados (conexão recusada)")
+    parser.add_argument("--suporte-lote", type=float, default=0.7, help="fração de DVRs com status em lote")
+    parser.add_argument("--offline", type=float, default=0.08)
+    parser.add_argument("--ambiguos", type=float, default=0.03)
+    parser.add_argument("--sem-sinal", type=float, default=0.02)
+    parser.add_argument("--latencia-api", type=float, default=0.01, help="latência da API Moni (s)")
+    parser.add_argument("--timeout", type=float, default=Config.TIMEOUT_VERIFICACAO)
+    parser.add_argument("--tentativas", type=int, default=Config.TENTATIVAS_RETRY, help="retentativas por snapshot")
+    parser.add_argument("--concorrencia", type=int, default=Config.MAX_CONCORRENCIA_GLOBAL)
+    parser.add_argument("--workers", type=int, default=Config.MAX_WORKERS_CAMERAS, help="workers por condomínio (threads)")
+    parser.add_argument("--delay", type=float, default=Config.DELAY_ENTRE_CAMERAS, help="delay entre submissões (threads)")
+    parser.add_argument("--sem-lote", action="store_true", help="desliga USE_BULK_DVR_PROBE")
+    parser.add_argument("--sem-disjuntor", action="store_true", help="desliga USE_DISJUNTOR_DVR")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    _aumentar_limite_arquivos()
+    contexto = multiprocessing.get_context("spawn")
+    conexao, conexao_frota = contexto.Pipe()
+    processo = contexto.Process(target=_processo_frota, args=(conexao_frota, args), daemon=True)
+    processo.start()
+    frota = conexao.recv()
+    total_cameras = args.dvrs * args.canais
+    print(
+        f"Frota: {args.dvrs} DVRs x {args.canais} canais = {total_cameras} câmeras "
+        f"({frota['travados']} DVRs travados, {frota['mortos']} desligados, perda {args.perda:.1%}, "
+        f"latência {args.latencia * 1000:.0f}±{args.variacao_latencia * 1000:.0f} ms)"
+    )
+
+    Config.USE_PACING = False  # mede a varredura sem espalhá-la pelo intervalo
+    Config.USE_BULK_DVR_PROBE = not args.sem_lote
+    Config.USE_DISJUNTOR_DVR = not args.sem_disjuntor
+    Config.TIMEOUT_VERIFICACAO = args.timeout
+    Config.TENTATIVAS_RETRY = args.tentativas
+    Config.MAX_CONCORRENCIA_GLOBAL = args.concorrencia
+    Config.MAX_WORKERS_CAMERAS = args.workers
+    Config.DELAY_ENTRE_CAMERAS = args.delay
+    alert.API_URL = frota["api"]
+
+    # Os logs da aplicação vão para /dev/null; o relatório, para a saída original
+    saida = sys.stdout
+    with tempfile.TemporaryDirectory() as diretorio, open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        Config.ALERTAS_OUTBOX_PATH = os.path.join(diretorio, "outbox.db")
+        Config.ESTADO_PERSISTIR = False  # cada execução parte do zero
+        Config.HISTORICO_PATH = os.path.join(diretorio, "historico.db")
+        rss_inicial = _rss_mb()
+        clientes_data = _montar_clientes(frota)
+        service = VerificationServiceBench()
+
+        por_mil = 1000 / total_cameras
+        for numero in range(1, args.varreduras + 1):
+            if numero > 1:
+                conexao.send(("alterar", args.alteracoes))
+                print(f"  {conexao.recv()} canais mudaram de estado", file=saida)
+            r = _varrer(service, clientes_data, args.motor)
+            rss = _rss_mb()
+            print(
+                f"Varredura {numero} ({args.motor}): {r['duracao']:.2f}s "
+                f"({total_cameras / r['duracao']:.0f} câmeras/s) | ON {r['on']} / OFF {r['off']} | "
+                f"{r['alertas']} alertas",
+                file=saida,
+            )
+            print(
+                f"  {r['requisicoes']} requisições: p50 {r['p50'] * 1000:.0f} ms, "
+                f"p99 {r['p99'] * 1000:.0f} ms | {r['timeouts']} timeouts, {r['erros']} erros",
+                file=saida,
+            )
+            print(
+                f"  CPU {r['cpu']:.2f}s ({r['cpu'] * por_mil:.3f}s por 1k câmeras) | "
+                f"RSS {rss:.1f} MiB ({(rss - rss_inicial) * por_mil:.2f} MiB por 1k câmeras)",
+                file=saida,
+            )
+            if service.disjuntores is not None:
+                disjuntores = service.disjuntores.estatisticas()
+                print(
+                    f"  Disjuntores: {disjuntores['abertos']} DVRs abertos, "
+                    f"{disjuntores['cameras_poupadas']} câmeras OFF sem consulta, "
+                    f"{disjuntores['testes_tcp']} testes TCP",
+                    file=saida,
+                )
+
+        inicio = time.perf_counter()
+        entregue = service.alert_dispatcher.aguardar(timeout=120)
+        conexao.send(("contadores", None))
+        contadores = conexao.recv()
+        print(
+            f"Alertas: {contadores['alertas']}/{service.medidor_alertas.total} entregues à API "
+            f"simulada em {contadores['requisicoes_api']} requisições (outbox drenada: {entregue}, "
+            f"+{time.perf_counter() - inicio:.2f}s após a última varredura)",
+            file=saida,
+        )
+        print(
+            f"DVRs: {contadores['requisicoes']} requisições recebidas, "
+            f"{contadores['perdidas']} derrubadas pela perda simulada",
+            file=saida,
+        )
+        service.alert_dispatcher.outbox.fechar()
+        service.historico.fechar()
+
+    conexao.send(("parar", None))
+    processo.join(timeout=5)
+
+
+if __name__ == "__main__":
+    main()
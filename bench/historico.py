@@ -0,0 +1,123 @@
+"""
+Benchmark do histórico de status (app.core.history_store)
+
+Preenche um banco temporário com os agregados que a frota acumularia no
+período (minutos e horas dentro da retenção, dias no período todo) e mede:
+o custo de registrar verificações e de uma gravação periódica, e o tempo das
+consultas de disponibilidade por condomínio e por câmera em intervalos de 24h
+a um ano (bordas fora do alinhamento dos baldes).
+
+Uso:
+    python -m bench.historico --condominios 50 --cameras 20 --dias 365
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from app.core.history_store import DIA, HORA, MINUTO, HistoricoCameras
+
+
+def _preencher(historico, args, agora):
+    """Insere os agregados diretamente (simular meses de verificações levaria horas)"""
+    aleatorio = random.Random(42)
+    linhas = 0
+    conn = historico._conn
+    conn.execute("BEGIN")
+    for largura, retencao in historico.retencao.items():
+        inicio = historico.balde(agora - min(retencao, args.dias * DIA), largura)
+        baldes = range(inicio, historico.balde(agora, largura), largura)
+        for indice_condominio in range(args.condominios):
+            condominio = f"Condominio {indice_condominio}"
+            lote = []
+            for indice_camera in range(args.cameras):
+                camera = f"Camera {indice_camera}"
+                instavel = aleatorio.random() < 0.05
+                for balde in baldes:
+                    off = largura * aleatorio.random() * (0.5 if instavel else 0.02)
+                    lote.append(
+                        (largura, condominio, balde, camera, largura - off, off,
+                         aleatorio.randint(0, 4) if instavel else 0, 0.05 * largura / MINUTO,
+                         largura // MINUTO)
+                    )
+            conn.executemany(
+                "INSERT INTO agregados VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", lote
+            )
+            linhas += len(lote)
+    conn.execute("COMMIT")
+    return linhas
+
+
+def _medir(funcao, repeticoes=20):
+    duracoes = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        duracoes.append(time.perf_counter() - inicio)
+    return statistics.median(duracoes) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do histórico de status")
+    parser.add_argument("--condominios", type=int, default=50)
+    parser.add_argument("--cameras", type=int, default=20, help="câmeras por condomínio")
+    parser.add_argument("--dias", type=int, default=365)
+    args = parser.parse_args()
+
+    total = args.condominios * args.cameras
+    agora = time.time()
+    with tempfile.TemporaryDirectory() as diretorio:
+        historico = HistoricoCameras(os.path.join(diretorio, "historico.db"))
+
+        inicio = time.perf_counter()
+        linhas = _preencher(historico, args, agora)
+        print(
+            f"Banco: {total} câmeras, {args.dias} dias, {linhas} agregados "
+            f"({time.perf_counter() - inicio:.1f}s para preencher, "
+            f"{os.path.getsize(historico.caminho) / 2**20:.0f} MiB)"
+        )
+
+        # Ingestão: uma verificação por câmera, ~5% mudando de estado
+        aleatorio = random.Random(7)
+        verificacoes = [
+            (f"Condominio {c}", f"Camera {n}", aleatorio.random() > 0.05, aleatorio.uniform(0.02, 0.2))
+            for c in range(args.condominios)
+            for n in range(args.cameras)
+        ]
+        for condominio, camera, _, _ in verificacoes:
+            historico.registrar(condominio, camera, True, agora - 60)
+        inicio = time.perf_counter()
+        for condominio, camera, online, latencia in verificacoes:
+            historico.registrar(condominio, camera, online, agora, latencia)
+        registro = (time.perf_counter() - inicio) / total * 1e6
+        inicio = time.perf_counter()
+        historico.descarregar(agora)
+        gravacao = (time.perf_counter() - inicio) * 1000
+        print(f"Ingestão: {registro:.1f} µs por verificação | gravação periódica {gravacao:.0f} ms")
+
+        desalinhado = agora - 1234.5
+        for periodo in ("24h", "7d", "30d", "365d"):
+            segundos = {"24h": DIA, "7d": 7 * DIA, "30d": 30 * DIA, "365d": 365 * DIA}[periodo]
+            de = desalinhado - segundos
+            por_condominio = _medir(
+                lambda: historico.disponibilidade("Condominio 7", de, desalinhado)
+            )
+            por_camera = _medir(
+                lambda: historico.disponibilidade("Condominio 7", de, desalinhado, "Camera 3")
+            )
+            serie = _medir(
+                lambda: historico.serie(
+                    "Condominio 7", "Camera 3", de, desalinhado, HORA if segundos <= 14 * DIA else DIA
+                )
+            )
+            print(
+                f"  {periodo:>4}: condomínio ({args.cameras} câmeras) {por_condominio:.2f} ms | "
+                f"câmera {por_camera:.2f} ms | série {serie:.2f} ms"
+            )
+        historico.fechar()
+
+
+if __name__ == "__main__":
+    main()
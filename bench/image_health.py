@@ -0,0 +1,173 @@
+"""
+Benchmark da saúde da imagem (app.services.image_health)
+
+Gera JPEGs reais (Pillow + NumPy) para quatro tipos de câmera: cena ao vivo
+(com ruído de sensor e pequenas variações entre capturas, de dia, à noite e
+em uma noite quase sem luz - escura e uniforme, mas com ruído), imagem congelada (o mesmo JPEG repetido), imagem preta e placa "NO VIDEO".
+Passa cada câmera por várias verificações seguidas pela triagem e, quando
+suspeita, pela análise; relata o custo de cada nível, a fração de imagens
+ao vivo decodificadas, a detecção por tipo e a memória por câmera.
+
+Uso:
+    python -m bench.image_health --cameras 200 --verificacoes 6 --largura 1280
+"""
+import argparse
+import io
+import random
+import statistics
+import time
+import tracemalloc
+
+from app.config import Config
+from app.services.image_health import MonitorImagem
+
+
+AO_VIVO = "ao_vivo"
+NOTURNA = "noturna"
+ESCURA = "escura"
+CONGELADA = "congelada"
+PRETA = "preta"
+PLACA = "placa"
+
+
+def _jpeg(pixels, qualidade=75) -> bytes:
+    from PIL import Image
+
+    saida = io.BytesIO()
+    Image.fromarray(pixels).save(saida, "JPEG", quality=qualidade)
+    return saida.getvalue()
+
+
+def _cena(aleatorio, largura, altura, brilho):
+    """Cena sintética (gradiente e retângulos) usada como fundo de uma câmera"""
+    import numpy as np
+
+    y, x = np.mgrid[0:altura, 0:largura]
+    cena = (x / largura * 80 + y / altura * 60 + brilho).astype(np.float32)
+    for _ in range(12):
+        x0, y0 = aleatorio.randrange(largura), aleatorio.randrange(altura)
+        cena[y0:y0 + aleatorio.randrange(40, 200), x0:x0 + aleatorio.randrange(40, 300)] += (
+            aleatorio.uniform(-60, 60)
+        )
+    return cena
+
+
+def _captura(cena, gerador, ruido):
+    import numpy as np
+
+    pixels = cena + gerador.normal(0, ruido, cena.shape).astype(np.float32)
+    return np.clip(pixels, 0, 255).astype(np.uint8)
+
+
+def _placa(largura, altura):
+    import numpy as np
+    from PIL import Image, ImageDraw
+
+    imagem = Image.new("L", (largura, altura), 40)
+    desenho = ImageDraw.Draw(imagem)
+    # Texto centralizado em blocos (independe das fontes instaladas)
+    for indice in range(8):
+        x0 = largura // 3 + indice * largura // 24
+        desenho.rectangle((x0, altura // 2 - 20, x0 + largura // 40, altura // 2 + 20), fill=230)
+    return np.asarray(imagem)
+
+
+def _cameras(args):
+    """Sequência de JPEGs (uma por verificação) de cada câmera simulada"""
+    import numpy as np
+
+    aleatorio = random.Random(42)
+    gerador = np.random.default_rng(42)
+    largura, altura = args.largura, args.largura * 9 // 16
+    tipos = [AO_VIVO] * 6 + [NOTURNA] * 2 + [ESCURA, CONGELADA, PRETA, PLACA]
+    cameras = []
+    for indice in range(args.cameras):
+        tipo = tipos[indice % len(tipos)]
+        if tipo in (AO_VIVO, NOTURNA, CONGELADA):
+            cena = _cena(aleatorio, largura, altura, 90 if tipo != NOTURNA else 10)
+            ruido = 6 if tipo != NOTURNA else 3
+            capturas = [_jpeg(_captura(cena, gerador, ruido)) for _ in range(args.verificacoes)]
+            if tipo == CONGELADA:
+                capturas = [capturas[0]] * args.verificacoes
+        elif tipo == ESCURA:
+            capturas = [
+                _jpeg(_captura(np.full((altura, largura), 12, np.float32), gerador, 2))
+                for _ in range(args.verificacoes)
+            ]
+        elif tipo == PRETA:
+            capturas = [_jpeg(np.full((altura, largura), 16, np.uint8))] * args.verificacoes
+        else:
+            capturas = [_jpeg(_placa(largura, altura))] * args.verificacoes
+        cameras.append((f"Camera {indice}", tipo, capturas))
+    return cameras
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da saúde da imagem")
+    parser.add_argument("--cameras", type=int, default=220)
+    parser.add_argument("--verificacoes", type=int, default=6, help="verificações por câmera")
+    parser.add_argument("--largura", type=int, default=1280)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    cameras = _cameras(args)
+    tamanhos = [len(jpeg) for _, _, capturas in cameras for jpeg in capturas]
+    print(
+        f"{args.cameras} câmeras x {args.verificacoes} verificações, {args.largura}px "
+        f"(JPEG mediano {statistics.median(tamanhos) / 1024:.0f} KiB, "
+        f"{time.perf_counter() - inicio:.1f}s para gerar)"
+    )
+
+    monitor = MonitorImagem()
+    triagem = analise = 0.0
+    analisadas = {tipo: 0 for tipo in (AO_VIVO, NOTURNA, ESCURA, CONGELADA, PRETA, PLACA)}
+    verificacoes = dict.fromkeys(analisadas, 0)
+    detectadas = {}
+    for numero in range(args.verificacoes):
+        for nome, tipo, capturas in cameras:
+            jpeg = capturas[numero]
+            verificacoes[tipo] += 1
+            t0 = time.perf_counter()
+            suspeita = monitor.triagem(nome, len(jpeg))
+            triagem += time.perf_counter() - t0
+            if not suspeita:
+                continue
+            analisadas[tipo] += 1
+            t0 = time.perf_counter()
+            problema = monitor.analisar(nome, jpeg)
+            analise += time.perf_counter() - t0
+            if problema is not None:
+                detectadas.setdefault(tipo, {}).setdefault(problema, set()).add(nome)
+
+    # Memória em uma segunda passada (tracemalloc distorce os tempos)
+    tracemalloc.start()
+    monitor_memoria = MonitorImagem()
+    for numero in range(args.verificacoes):
+        for nome, _, capturas in cameras:
+            if monitor_memoria.triagem(nome, len(capturas[numero])):
+                monitor_memoria.analisar(nome, capturas[numero])
+    memoria = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    total = sum(verificacoes.values())
+    total_analises = sum(analisadas.values())
+    print(
+        f"Triagem: {triagem / total * 1e6:.1f} µs por verificação | "
+        f"análise: {analise / max(1, total_analises) * 1000:.2f} ms por imagem "
+        f"({total_analises} de {total} verificações decodificadas)"
+    )
+    print(f"Memória: {memoria / args.cameras:.0f} B por câmera (anéis de {Config.IMAGEM_HISTORICO})")
+    for tipo in analisadas:
+        por_problema = {
+            problema: len(nomes) for problema, nomes in detectadas.get(tipo, {}).items()
+        }
+        cameras_tipo = sum(1 for _, t, _ in cameras if t == tipo)
+        print(
+            f"  {tipo:>9}: {cameras_tipo} câmeras, {analisadas[tipo]}/{verificacoes[tipo]} "
+            f"verificações analisadas, detectadas {por_problema or '-'}"
+        )
+    print(f"Estatísticas: {monitor.estatisticas()}")
+
+
+if __name__ == "__main__":
+    main()
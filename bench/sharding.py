@@ -0,0 +1,203 @@
+"""
+Benchmark da verificação fragmentada (app.services.sharding)
+
+Sobe a frota simulada de bench.fleet em um processo separado e, para cada
+quantidade de processos de verificação pedida, executa varreduras contínuas
+durante --duracao segundos em K processos que arrendam as fatias pela
+coordenação em SQLite (FragmentoVerificacao real, inventário da frota no
+lugar do banco). Relata, por quantidade N de processos, as requisições aos
+DVRs (probes) e as verificações por segundo somadas, os probes/s de cada
+processo, a escala em relação a um processo, CPU por processo, se algum par de processos
+verificou a mesma câmera e se o estado juntado para o dashboard cobre toda
+a frota.
+
+A escala só se aproxima de linear com núcleos livres para os processos de
+verificação e para a frota simulada (os núcleos disponíveis são impressos).
+
+Uso:
+    python -m bench.sharding --dvrs 200 --canais 16 --processos 1 2 4 --duracao 20
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+from app.config import Config
+from app import alert
+from bench.fleet import _aumentar_limite_arquivos, _montar_clientes, _processo_frota
+
+
+def _processo_verificacao(indice, caminho, frota, args, pronto, inicio, conexao):
+    """Processo de verificação: varreduras seguidas só das fatias arrendadas"""
+    from app.core.shard_store import CoordenacaoFragmentos
+    from app.services.sharding import FragmentoVerificacao, configurar_processo
+    from app.services.verification_service import VerificationService
+
+    _aumentar_limite_arquivos()
+    sys.stdout = open(os.devnull, "w")  # logs da aplicação
+    Config.ALERTAS_OUTBOX_PATH = os.path.join(os.path.dirname(caminho), "alertas_outbox.db")
+    configurar_processo(indice)
+    alert.API_URL = frota["api"]
+    Config.HISTORICO_ATIVO = False
+    Config.USE_PACING = False
+    Config.TIMEOUT_VERIFICACAO = args.timeout
+    Config.TENTATIVAS_RETRY = args.tentativas
+
+    clientes_data = _montar_clientes(frota)
+    service = VerificationService()
+    fragmento = FragmentoVerificacao(
+        service,
+        CoordenacaoFragmentos(caminho, fatias=args.fatias),
+        f"bench/{indice}",
+        carregar_inventario=lambda: clientes_data,
+    )
+    verificadas = set()
+    service.status.ouvintes.append(
+        lambda _, alteracoes: verificadas.update(
+            (condominio, nome) for condominio, nome, valor in alteracoes if nome and valor
+        )
+    )
+    fragmento.iniciar()
+    pronto.set()
+    inicio.wait()
+
+    limite = time.monotonic() + args.duracao
+    varreduras = 0
+    cameras = 0
+    probes_inicio = service.medidor_probes.total
+    cpu_inicio = time.process_time()
+    while time.monotonic() < limite:
+        service.cache_manager.limpar()  # cada varredura consulta todos os DVRs
+        filtrado = fragmento.carregar()
+        service.verificar_todos(filtrado)
+        varreduras += 1
+        cameras += fragmento.cameras
+    duracao = args.duracao + max(0.0, time.monotonic() - limite)
+    fragmento.encerrar()
+    conexao.send(
+        {
+            "verificacoes": cameras,
+            "probes": service.medidor_probes.total - probes_inicio,
+            "duracao": duracao,
+            "varreduras": varreduras,
+            "cpu": time.process_time() - cpu_inicio,
+            "fatias": len(fragmento.proprias),
+            "cameras": verificadas,
+        }
+    )
+
+
+def _rodada(processos: int, frota, args) -> dict:
+    from app.core.shard_store import CoordenacaoFragmentos
+
+    contexto = multiprocessing.get_context("spawn")
+    pasta = tempfile.mkdtemp(prefix="bench_sharding_")
+    caminho = os.path.join(pasta, "fragmentos.db")
+    CoordenacaoFragmentos(caminho, fatias=args.fatias).anunciar(
+        f"bench/{indice}" for indice in range(processos)
+    )
+
+    inicio = contexto.Event()
+    filhos = []
+    for indice in range(processos):
+        pronto = contexto.Event()
+        receptor, emissor = contexto.Pipe(duplex=False)
+        processo = contexto.Process(
+            target=_processo_verificacao,
+            args=(indice, caminho, frota, args, pronto, inicio, emissor),
+        )
+        processo.start()
+        filhos.append((processo, pronto, receptor))
+    for _, pronto, _ in filhos:
+        pronto.wait(60)
+    inicio.set()
+    resultados = [receptor.recv() for _, _, receptor in filhos]
+    for processo, _, _ in filhos:
+        processo.join()
+
+    coordenacao = CoordenacaoFragmentos(caminho, fatias=args.fatias)
+    juntadas, _ = coordenacao.alteracoes_desde(0)
+    vistas = {}
+    repetidas = 0
+    for indice, resultado in enumerate(resultados):
+        for camera in resultado["cameras"]:
+            if camera in vistas and vistas[camera] != indice:
+                repetidas += 1
+            vistas[camera] = indice
+    return {
+        "processos": processos,
+        "taxa": sum(r["verificacoes"] / r["duracao"] for r in resultados),
+        "probes": [r["probes"] / r["duracao"] for r in resultados],
+        "varreduras": [r["varreduras"] for r in resultados],
+        "fatias": [r["fatias"] for r in resultados],
+        "cpu": [r["cpu"] / r["duracao"] for r in resultados],
+        "repetidas": repetidas,
+        "cameras": len(vistas),
+        "juntadas": len({(condominio, nome) for condominio, nome, _ in juntadas}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da verificação fragmentada")
+    parser.add_argument("--dvrs", type=int, default=200)
+    parser.add_argument("--canais", type=int, default=16, help="câmeras por DVR")
+    parser.add_argument("--processos", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--fatias", type=int, default=Config.SHARD_FATIAS)
+    parser.add_argument("--duracao", type=float, default=20, help="segundos de varreduras por rodada")
+    parser.add_argument("--latencia", type=float, default=0.02, help="latência dos DVRs (s)")
+    parser.add_argument("--timeout", type=float, default=3)
+    parser.add_argument("--tentativas", type=int, default=1, help="retentativas por snapshot")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    frota_args = SimpleNamespace(
+        dvrs=args.dvrs,
+        canais=args.canais,
+        latencia=args.latencia,
+        variacao_latencia=args.latencia / 2,
+        perda=0.0,
+        travados=0.0,
+        mortos=0.0,
+        suporte_lote=0.0,  # snapshots: o custo por câmera é o que escala
+        offline=0.08,
+        ambiguos=0.0,
+        sem_sinal=0.0,
+        latencia_api=0.01,
+        semente=args.semente,
+    )
+    contexto = multiprocessing.get_context("spawn")
+    conexao, conexao_frota = contexto.Pipe()
+    processo_frota = contexto.Process(target=_processo_frota, args=(conexao_frota, frota_args), daemon=True)
+    processo_frota.start()
+    frota = conexao.recv()
+    total = args.dvrs * args.canais
+    print(
+        f"{args.dvrs} DVRs x {args.canais} canais = {total} câmeras, {args.fatias} fatias, "
+        f"{os.cpu_count()} núcleos"
+    )
+
+    base = None
+    try:
+        for processos in args.processos:
+            rodada = _rodada(processos, frota, args)
+            probes = sum(rodada["probes"])
+            base = base or probes / processos
+            print(
+                f"{processos} processo(s): {probes:.0f} probes/s "
+                f"({[f'{p:.0f}' for p in rodada['probes']]} por processo), "
+                f"{rodada['taxa']:.0f} verificações/s "
+                f"(escala {probes / base:.2f}x, ideal {processos}x), fatias {rodada['fatias']}, "
+                f"varreduras {rodada['varreduras']}, CPU {[f'{c:.0%}' for c in rodada['cpu']]}, "
+                f"câmeras verificadas {rodada['cameras']}/{total}, juntadas {rodada['juntadas']}, "
+                f"verificadas por mais de um processo: {rodada['repetidas']}"
+            )
+    finally:
+        conexao.send(("encerrar", None))
+        processo_frota.join(15)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Fixtures compartilhadas: DVRs simulados (bench.fake_dvr) em um loop asyncio
+de background e um VerificationService isolado do disco e da API Moni
+"""
+import asyncio
+import threading
+
+import pytest
+
+from app.config import Config
+from app.services.verification_service import VerificationService
+from bench.fake_dvr import FakeDVR
+
+
+class VerificationServiceTeste(VerificationService):
+    """VerificationService que guarda os alertas em vez de enviá-los à API"""
+
+    def __init__(self):
+        super().__init__()
+        self.alertas_enviados = []
+
+    def enviar_alertas(self, alertas, nome_condominio):
+        self.alertas_enviados.extend(alertas)
+
+
+@pytest.fixture(autouse=True)
+def configuracao(monkeypatch, tmp_path):
+    """Nada é gravado em app/data e as varreduras não são espalhadas no intervalo"""
+    monkeypatch.setattr(Config, "ESTADO_PERSISTIR", False)
+    monkeypatch.setattr(Config, "HISTORICO_ATIVO", False)
+    monkeypatch.setattr(Config, "USE_PACING", False)
+    monkeypatch.setattr(Config, "ALERTAS_OUTBOX_PATH", str(tmp_path / "alertas_outbox.db"))
+    monkeypatch.setattr(Config, "TIMEOUT_VERIFICACAO", 2)
+    monkeypatch.setattr(Config, "TENTATIVAS_RETRY", 0)
+
+
+@pytest.fixture(scope="session")
+def laco_dvrs():
+    """Loop asyncio em thread própria onde rodam os DVRs simulados"""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield loop
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+
+
+@pytest.fixture
+def iniciar_dvr(laco_dvrs):
+    """Fábrica de DVRs simulados já escutando em 127.0.0.1 (parados no fim do teste)"""
+    dvrs = []
+
+    def iniciar(**kwargs) -> FakeDVR:
+        dvr = FakeDVR(**kwargs)
+        asyncio.run_coroutine_threadsafe(dvr.iniciar(), laco_dvrs).result(5)
+        dvrs.append(dvr)
+        return dvr
+
+    yield iniciar
+    for dvr in dvrs:
+        asyncio.run_coroutine_threadsafe(dvr.parar(), laco_dvrs).result(5)
+
+
+@pytest.fixture
+def criar_service():
+    """Fábrica de serviços isolados (um por varredura que deve partir do zero)"""
+    return VerificationServiceTeste
+
+
+@pytest.fixture
+def service(criar_service):
+    return criar_service()
@@ -0,0 +1,93 @@
+"""AlertDispatcher: chave única por evento e eventos recusados que não bloqueiam a outbox"""
+import pytest
+import requests
+
+from app import alert
+from app.config import Config
+from app.core.alert_outbox import AlertOutbox
+from app.services.alert_dispatcher import AlertDispatcher
+
+
+class _Resposta:
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+
+
+def _camera_info(nome):
+    return {
+        "nome": nome,
+        "identificacao": nome,
+        "ocorrencia": "E130",
+        "cliente": "0001",
+        "particao": "001",
+        "empresa": 1,
+        "codigomaquina": 1,
+        "codigoconjuntodeocorrencias": 1,
+        "setor": 1,
+        "complemento": "Câmera offline",
+    }
+
+
+class _ApiSimulada:
+    """
+    ExecutarComando simulado: recusa (400) os comandos que citam "recusada"
+    e responde 503 nas `indisponivel` primeiras chamadas
+    """
+
+    def __init__(self):
+        self.aceitos = []
+        self.indisponivel = 0
+
+    def enviar_comando(self, comando, session=None, timeout=None):
+        if self.indisponivel:
+            self.indisponivel -= 1
+            raise requests.HTTPError("503 Service Unavailable", response=_Resposta(503))
+        if "recusada" in comando:
+            raise requests.HTTPError("400 Bad Request", response=_Resposta(400))
+        self.aceitos.append(comando)
+        return _Resposta()
+
+
+@pytest.fixture
+def api(monkeypatch):
+    api = _ApiSimulada()
+    monkeypatch.setattr(alert, "enviar_comando", api.enviar_comando)
+    monkeypatch.setattr(Config, "ALERTAS_MAX_TENTATIVAS", 3)
+    monkeypatch.setattr(Config, "ALERTAS_BACKOFF", 0.01)
+    monkeypatch.setattr(Config, "ALERTAS_BACKOFF_MAX", 0.01)
+    monkeypatch.setattr(Config, "ALERTAS_JANELA_LOTE", 0.01)
+    return api
+
+
+def test_eventos_iguais_no_mesmo_segundo_sao_todos_entregues(api):
+    dispatcher = AlertDispatcher(AlertOutbox(":memory:"))
+    assert dispatcher.enfileirar(_camera_info("Cam 1"), "Condominio")
+    assert dispatcher.enfileirar(_camera_info("Cam 1"), "Condominio")
+
+    assert dispatcher.aguardar(10)
+    comandos = "".join(api.aceitos)
+    assert comandos.count("(CURRENT_TIMESTAMP") == 2
+    assert "#" not in comandos  # nada além do complemento original para o operador
+
+
+def test_eventos_recusados_sozinhos_sao_marcados_como_falhos(api):
+    dispatcher = AlertDispatcher(AlertOutbox(":memory:"))
+    dispatcher.enfileirar(_camera_info("Cam recusada 1"), "Condominio")
+    dispatcher.enfileirar(_camera_info("Cam recusada 2"), "Condominio")
+    assert dispatcher.aguardar(10)
+    assert dispatcher.estatisticas()["falhos_na_outbox"] == 2
+
+    dispatcher.enfileirar(_camera_info("Cam 3"), "Condominio")
+    assert dispatcher.aguardar(10)
+    assert len(api.aceitos) == 1 and "Cam 3" in api.aceitos[0]
+
+
+def test_api_com_erro_5xx_nao_consome_tentativas(api):
+    api.indisponivel = 4 * Config.ALERTAS_MAX_TENTATIVAS
+    dispatcher = AlertDispatcher(AlertOutbox(":memory:"))
+    for indice in range(3):
+        dispatcher.enfileirar(_camera_info(f"Cam {indice}"), "Condominio")
+
+    assert dispatcher.aguardar(10)
+    assert dispatcher.estatisticas()["falhos_na_outbox"] == 0
+    assert "".join(api.aceitos).count("(CURRENT_TIMESTAMP") == 3
@@ -0,0 +1,119 @@
+"""
+Sondagem em lote (status de todos os canais em uma requisição) contra o
+DVR simulado: status resolvidos pelo lote, snapshot para canais ambíguos e
+DVRs sem suporte, e o mesmo resultado do modo somente snapshot
+"""
+import pytest
+
+from app.config import Config
+from bench.fake_dvr import AMBIGUO, OFFLINE, ONLINE
+
+PROTOCOLOS = ("hikvision", "intelbras")
+
+
+def _varrer(service, *dvrs):
+    clientes_data = [
+        (f"Condominio {indice}", {"metadata": {}, "cameras": dvr.cameras(f"DVR{indice} Cam")})
+        for indice, dvr in enumerate(dvrs)
+    ]
+    service.verificar_todos(clientes_data)
+    return {
+        (condominio, cam["nome"]): cam["status"]
+        for condominio, dados in service.status_atual.items()
+        for cam in dados["cameras"]
+    }
+
+
+def _esperado(indice, dvr):
+    return {
+        (f"Condominio {indice}", f"DVR{indice} Cam {canal}"): "OFF" if estado == OFFLINE else "ON"
+        for canal, estado in dvr.estados.items()
+    }
+
+
+@pytest.mark.parametrize("protocolo", PROTOCOLOS)
+def test_lote_resolve_todos_os_canais_em_uma_requisicao(monkeypatch, service, iniciar_dvr, protocolo):
+    monkeypatch.setattr(Config, "USE_BULK_DVR_PROBE", True)
+    monkeypatch.setattr(Config, "IMAGEM_AMOSTRAS_LOTE", 0)
+    dvr = iniciar_dvr(protocolo=protocolo, canais=8)
+    dvr.estados.update({2: OFFLINE, 5: OFFLINE})
+
+    assert _varrer(service, dvr) == _esperado(0, dvr)
+    assert dvr.requisicoes_lote == 1
+    assert dvr.requisicoes_snapshot == 0
+    assert len(service.alertas_enviados) == 2
+
+
+@pytest.mark.parametrize("protocolo", PROTOCOLOS)
+def test_canais_ambiguos_confirmados_por_snapshot(monkeypatch, service, iniciar_dvr, protocolo):
+    monkeypatch.setattr(Config, "USE_BULK_DVR_PROBE", True)
+    monkeypatch.setattr(Config, "IMAGEM_AMOSTRAS_LOTE", 0)
+    dvr = iniciar_dvr(protocolo=protocolo, canais=8)
+    dvr.estados.update({3: AMBIGUO, 4: OFFLINE, 7: AMBIGUO})
+
+    assert _varrer(service, dvr) == _esperado(0, dvr)
+    assert dvr.requisicoes_lote == 1
+    assert dvr.requisicoes_snapshot == 2
+
+
+def test_canais_on_amostrados_por_snapshot_para_a_saude_da_imagem(monkeypatch, service, iniciar_dvr):
+    monkeypatch.setattr(Config, "USE_BULK_DVR_PROBE", True)
+    monkeypatch.setattr(Config, "IMAGEM_AMOSTRAS_LOTE", 2)
+    if not service.imagens.analise_ativa:
+        pytest.skip("NumPy/Pillow não instalados")
+    dvr = iniciar_dvr(protocolo="hikvision", canais=8)
+    dvr.estados[1] = OFFLINE
+
+    assert _varrer(service, dvr) == _esperado(0, dvr)
+    assert dvr.requisicoes_lote == 1
+    assert dvr.requisicoes_snapshot == 2
+    assert service.imagens.estatisticas()["triagens"] == 2
+
+
+def test_dvr_sem_suporte_usa_snapshots(monkeypatch, service, iniciar_dvr):
+    monkeypatch.setattr(Config, "USE_BULK_DVR_PROBE", True)
+    dvr = iniciar_dvr(protocolo="hikvision", canais=6, suporta_lote=False)
+    dvr.estados[1] = OFFLINE
+
+    assert _varrer(service, dvr) == _esperado(0, dvr)
+    assert dvr.requisicoes_snapshot == 6
+    assert f"127.0.0.1:{dvr.porta}" in service.dvr_sem_bulk
+
+
+def test_lote_e_snapshot_chegam_ao_mesmo_status(monkeypatch, criar_service, iniciar_dvr):
+    dvrs = []
+    for indice, protocolo in enumerate(PROTOCOLOS * 2):
+        dvr = iniciar_dvr(protocolo=protocolo, canais=12)
+        for canal in dvr.estados:
+            dvr.estados[canal] = (ONLINE, ONLINE, OFFLINE, AMBIGUO)[(canal + indice) % 4]
+        dvrs.append(dvr)
+
+    resultados = {}
+    for usar_lote in (False, True):
+        monkeypatch.setattr(Config, "USE_BULK_DVR_PROBE", usar_lote)
+        resultados[usar_lote] = _varrer(criar_service(), *dvrs)
+
+    assert resultados[True] == resultados[False]
+    assert len(resultados[True]) == 48
+    assert sum(dvr.requisicoes_lote for dvr in dvrs) == len(dvrs)
+
+
+def test_dvr_com_erro_5xx_no_lote_nao_e_marcado_sem_suporte(monkeypatch, service, iniciar_dvr):
+    monkeypatch.setattr(Config, "USE_BULK_DVR_PROBE", True)
+    monkeypatch.setattr(Config, "IMAGEM_AMOSTRAS_LOTE", 0)
+    dvr = iniciar_dvr(protocolo="hikvision", canais=4)
+    dvr.status_lote = 503
+
+    assert _varrer(service, dvr) == _esperado(0, dvr)
+    assert dvr.requisicoes_snapshot == 4
+    assert dvr.requisicoes_lote == 1
+    assert not service.dvr_sem_bulk  # a próxima passada tenta o lote de novo
+
+
+def test_lote_sem_nenhum_canal_conta_como_sem_suporte(monkeypatch, service, iniciar_dvr):
+    monkeypatch.setattr(Config, "USE_BULK_DVR_PROBE", True)
+    dvr = iniciar_dvr(protocolo="hikvision", canais=4)
+    monkeypatch.setattr(dvr, "_status_hikvision", lambda: b"<InputProxyChannelStatusList/>")
+
+    assert _varrer(service, dvr) == _esperado(0, dvr)
+    assert f"127.0.0.1:{dvr.porta}" in service.dvr_sem_bulk
@@ -0,0 +1,41 @@
+"""CacheManager: despejo do menos usado e expiração pela ordem de escrita"""
+import time
+
+from app.utils.cache_manager import CacheManager
+
+
+def test_leitura_protege_entrada_do_despejo():
+    cache = CacheManager(max_entradas=3, num_segmentos=1)
+    for chave in ("a", "b", "c"):
+        cache.set_cached_result(chave, True)
+
+    assert cache.get_cached_result("a") == (True, True)
+    cache.set_cached_result("d", True)
+
+    assert cache.get_cached_result("a") == (True, True)
+    assert cache.get_cached_result("b") == (False, False)
+    assert cache.estatisticas()["despejos"] == 1
+
+
+def test_expiracao_segue_a_escrita_mesmo_com_leituras(monkeypatch):
+    cache = CacheManager(max_entradas=10, num_segmentos=1)
+    agora = time.time()
+    monkeypatch.setattr(time, "time", lambda: agora)
+    cache.set_cached_result("antiga", True)
+    cache.set_cached_result("recente", True)
+    cache.get_cached_result("antiga")  # lida por último, mas escrita primeiro
+
+    monkeypatch.setattr(time, "time", lambda: agora + cache.CACHE_DURATION_MAXIMA + 1)
+    cache.set_cached_result("nova", True)
+
+    assert cache.estatisticas()["entradas"] == 1
+    assert cache.get_cached_result("nova") == (True, True)
+
+
+def test_regravacoes_nao_acumulam_na_fila_de_escritas():
+    cache = CacheManager(max_entradas=4, num_segmentos=1)
+    for _ in range(100):
+        cache.set_cached_result("a", False, "falhas_a")
+
+    assert len(cache._verificacao[0].escritas) <= 8
+    assert cache.get_cached_result("a") == (True, False)
@@ -0,0 +1,98 @@
+"""DisjuntoresDVR: abertura só após falhas confirmadas e um teste TCP por vez"""
+import asyncio
+
+import requests
+
+from app.config import Config
+from app.services import async_verification
+from app.services.circuit_breaker import (
+    ABERTO,
+    BLOQUEADO,
+    FECHADO,
+    LIBERADO,
+    TESTAR,
+    DisjuntoresDVR,
+)
+from app.utils.async_http import FalhaConexao
+
+DVR = "10.0.0.1:80"
+
+
+def test_um_teste_tcp_falho_nao_abre():
+    disjuntores = DisjuntoresDVR(falhas_para_abrir=3)
+    assert disjuntores.avaliar(DVR) == TESTAR
+    assert disjuntores.registrar_teste(DVR, "TimeoutError") is True
+    assert disjuntores.estado(DVR) == FECHADO
+
+
+def test_falhas_seguidas_confirmam_o_dvr_inacessivel():
+    disjuntores = DisjuntoresDVR(falhas_para_abrir=3)
+    for _ in range(2):
+        assert disjuntores.avaliar(DVR) == TESTAR
+        assert disjuntores.registrar_teste(DVR, "TimeoutError") is True
+    disjuntores.registrar_sem_resposta(DVR, FalhaConexao("recusada"))
+
+    # No limite o teste TCP decide: só abre se ele também falhar
+    assert disjuntores.estado(DVR) == FECHADO
+    assert disjuntores.avaliar(DVR) == TESTAR
+    assert disjuntores.registrar_teste(DVR, "TimeoutError") is False
+    assert disjuntores.estado(DVR) == ABERTO
+    assert disjuntores.avaliar(DVR) == BLOQUEADO
+
+
+def test_limite_atingido_com_teste_tcp_ok_mantem_fechado():
+    disjuntores = DisjuntoresDVR(falhas_para_abrir=2)
+    disjuntores.registrar_resposta(DVR)
+    for _ in range(2):
+        disjuntores.registrar_sem_resposta(DVR, requests.exceptions.ConnectTimeout())
+
+    assert disjuntores.avaliar(DVR) == TESTAR  # mesmo com resposta recente
+    assert disjuntores.registrar_teste(DVR, None) is True
+    assert disjuntores.estado(DVR) == FECHADO
+    assert disjuntores.avaliar(DVR) == LIBERADO
+
+
+def test_timeout_de_leitura_nao_conta_como_dvr_sem_resposta():
+    disjuntores = DisjuntoresDVR(falhas_para_abrir=1)
+    disjuntores.registrar_resposta(DVR)
+    for erro in (asyncio.TimeoutError(), requests.exceptions.ReadTimeout(), ValueError("HTTP 503")):
+        disjuntores.registrar_sem_resposta(DVR, erro)
+
+    assert disjuntores.avaliar(DVR) == LIBERADO
+
+
+def test_resposta_zera_as_falhas_do_teste():
+    disjuntores = DisjuntoresDVR(falhas_para_abrir=2)
+    disjuntores.avaliar(DVR)
+    disjuntores.registrar_teste(DVR, "TimeoutError")
+    disjuntores.registrar_resposta(DVR)
+    disjuntores.registrar_sem_resposta(DVR)
+
+    assert disjuntores.estado(DVR) == FECHADO
+
+
+def test_apenas_um_chamador_testa_o_dvr_fechado():
+    disjuntores = DisjuntoresDVR()
+    decisoes = [disjuntores.avaliar(DVR) for _ in range(4)]
+
+    assert decisoes == [TESTAR, LIBERADO, LIBERADO, LIBERADO]
+    disjuntores.registrar_teste(DVR, None)
+    assert disjuntores.avaliar(DVR) == LIBERADO
+
+
+def test_syn_perdido_nao_marca_dvr_saudavel_offline(monkeypatch, service, iniciar_dvr):
+    monkeypatch.setattr(Config, "USE_BULK_DVR_PROBE", False)
+    dvr = iniciar_dvr(protocolo="hikvision", canais=6)
+    testes = []
+
+    async def testar_conexao_async(host, porta, timeout=None):
+        testes.append(porta)
+        return "TimeoutError" if len(testes) == 1 else None
+
+    monkeypatch.setattr(async_verification, "testar_conexao_async", testar_conexao_async)
+    service.verificar_todos([("Condominio", {"metadata": {}, "cameras": dvr.cameras()})])
+
+    cameras = service.status_atual["Condominio"]["cameras"]
+    assert [cam["status"] for cam in cameras] == ["ON"] * 6
+    assert service.disjuntores.estado(f"127.0.0.1:{dvr.porta}") == FECHADO
+    assert service.alertas_enviados == []
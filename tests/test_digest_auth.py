@@ -0,0 +1,65 @@
+"""Digest em cache: nonce-count crescente e novo desafio quando o DVR expira o nonce"""
+import asyncio
+
+from app.core.camera_target import obter_alvo
+from app.utils.async_http import AsyncHTTPClient
+from app.utils.digest_auth import DigestAuthCache, parse_desafio
+
+DESAFIO = {"realm": "IP Camera", "nonce": "abc", "qop": "auth", "algorithm": "MD5"}
+
+
+def _nc(autorizacao):
+    return parse_desafio(autorizacao)["nc"]
+
+
+def test_nc_incrementa_a_cada_uso_e_reinicia_com_novo_desafio():
+    cache = DigestAuthCache()
+    assert cache.autorizacao("dvr", "admin", "admin", "GET", "/") is None
+
+    cache.registrar_desafio("dvr", DESAFIO)
+    usos = [_nc(cache.autorizacao("dvr", "admin", "admin", "GET", "/")) for _ in range(3)]
+    assert usos == ["00000001", "00000002", "00000003"]
+    assert cache.autorizacao("outro", "admin", "admin", "GET", "/") is None  # contador por DVR
+
+    cache.registrar_desafio("dvr", dict(DESAFIO, nonce="def"), autorizacao_recusada=True)
+    assert _nc(cache.autorizacao("dvr", "admin", "admin", "GET", "/")) == "00000001"
+    assert cache.estatisticas()["nonces_expirados"] == 1
+
+
+def test_nonce_expirado_recebe_novo_desafio_e_a_requisicao_segue(iniciar_dvr):
+    dvr = iniciar_dvr(protocolo="hikvision", canais=1, usos_por_nonce=3)
+    aceitas = []
+    autenticado = dvr._autenticado
+
+    def registrar(autorizacao, uri):
+        aceita = autenticado(autorizacao, uri)
+        if aceita:
+            campos = parse_desafio(autorizacao)
+            aceitas.append((campos["nonce"], campos["nc"]))
+        return aceita
+
+    dvr._autenticado = registrar
+    cache = DigestAuthCache()
+    cliente = AsyncHTTPClient(2, cache_digest=cache)
+    url = obter_alvo(dvr.cameras()[0], "Condominio").url_snapshot
+
+    async def requisitar():
+        return [(await cliente.get(url, dvr.usuario, dvr.senha)).status_code for _ in range(5)]
+
+    assert asyncio.run(requisitar()) == [200] * 5
+    # Três usos do primeiro nonce; o quarto é recusado (stale) e refeito com o novo
+    (primeiro, _), (segundo, _) = aceitas[0], aceitas[3]
+    assert primeiro != segundo
+    assert aceitas == [
+        (primeiro, "00000001"),
+        (primeiro, "00000002"),
+        (primeiro, "00000003"),
+        (segundo, "00000001"),
+        (segundo, "00000002"),
+    ]
+    assert cache.estatisticas() == {
+        "dvrs_em_cache": 1,
+        "desafios_recebidos": 2,
+        "nonces_expirados": 1,
+        "round_trips_economizados": 3,
+    }
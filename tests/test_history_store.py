@@ -0,0 +1,63 @@
+"""HistoricoCameras: gravação que falha não perde o que estava em memória"""
+import sqlite3
+
+import pytest
+
+from app.core.history_store import DIA, HistoricoCameras
+
+
+class _ConexaoInstavel:
+    """Conexão que falha nas gravações enquanto `falhar` estiver ligado"""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self.falhar = True
+
+    def executemany(self, *args):
+        if self.falhar:
+            raise sqlite3.OperationalError("disk I/O error")
+        return self._conn.executemany(*args)
+
+    def __getattr__(self, nome):
+        return getattr(self._conn, nome)
+
+
+def test_falha_na_gravacao_devolve_agregados_e_trechos():
+    historico = HistoricoCameras(":memory:")
+    inicio = 100 * DIA
+    historico.registrar("Condominio", "Cam 1", True, instante=inicio)
+    historico.registrar("Condominio", "Cam 1", False, instante=inicio + 60)
+
+    conexao = historico._conn = _ConexaoInstavel(historico._conn)
+    with pytest.raises(sqlite3.OperationalError):
+        historico.descarregar(instante=inicio + 120)
+    assert not historico._conn.in_transaction
+
+    conexao.falhar = False
+    historico.descarregar(instante=inicio + 180)
+
+    resumo = historico.disponibilidade("Condominio", inicio, inicio + 180)["cameras"]["Cam 1"]
+    assert (resumo["segundos_on"], resumo["segundos_off"], resumo["transicoes"]) == (60, 120, 1)
+    assert [trecho["status"] for trecho in historico.trechos("Condominio", "Cam 1", inicio, inicio + 180)] == [
+        "OFF",
+        "ON",
+    ]
+
+
+def test_consulta_de_outro_processo_mostra_o_trecho_aberto(tmp_path):
+    caminho = str(tmp_path / "historico.db")
+    gravador, leitor = HistoricoCameras(caminho), HistoricoCameras(caminho)
+    inicio = 100 * DIA
+    gravador.registrar("Condominio", "Cam 1", True, instante=inicio)
+    gravador.registrar("Condominio", "Cam 1", False, instante=inicio + 60)
+    gravador.descarregar(instante=inicio + 120)
+
+    trechos = leitor.trechos("Condominio", "Cam 1", inicio, inicio + 180)
+    assert [(trecho["inicio"], trecho["fim"], trecho["status"]) for trecho in trechos] == [
+        (inicio + 60, None, "OFF"),
+        (inicio, inicio + 60, "ON"),
+    ]
+
+    gravador.remover("Condominio", "Cam 1", instante=inicio + 150)
+    gravador.descarregar(instante=inicio + 180)
+    assert leitor.trechos("Condominio", "Cam 1", inicio, inicio + 180)[0]["fim"] == inicio + 150
@@ -0,0 +1,58 @@
+"""MonitorImagem: quadro preto confirmado, cena noturna escura e rodízio de amostras"""
+import io
+
+import pytest
+
+from app.config import Config
+from app.services.image_health import PRETA, SEM_SINAL, MonitorImagem
+
+np = pytest.importorskip("numpy")
+Image = pytest.importorskip("PIL.Image")
+
+
+def _jpeg(pixels) -> bytes:
+    saida = io.BytesIO()
+    Image.fromarray(pixels).save(saida, "JPEG", quality=75)
+    return saida.getvalue()
+
+
+def _verificar(monitor, chave, jpeg):
+    if monitor.triagem(chave, len(jpeg)):
+        return monitor.analisar(chave, jpeg)
+    return None
+
+
+@pytest.fixture
+def monitor(monkeypatch):
+    monkeypatch.setattr(Config, "IMAGEM_ANALISE", True)
+    return MonitorImagem()
+
+
+def test_quadro_preto_repetido_confirmado_apos_varias_analises(monitor):
+    preto = _jpeg(np.full((360, 640), 16, np.uint8))
+    resultados = [_verificar(monitor, "cam", preto) for _ in range(Config.IMAGEM_CONFIRMACOES_PRETA + 1)]
+
+    assert resultados[:-1] == [None] * Config.IMAGEM_CONFIRMACOES_PRETA
+    assert resultados[-1] == PRETA
+
+
+def test_cena_noturna_escura_nao_e_preta(monitor):
+    gerador = np.random.default_rng(1)
+    for _ in range(8):
+        pixels = np.clip(12 + gerador.normal(0, 2, (360, 640)), 0, 255).astype(np.uint8)
+        assert _verificar(monitor, "cam", _jpeg(pixels)) is None
+
+
+def test_placa_sem_video_clara(monitor):
+    placa = _jpeg(np.full((360, 640), 120, np.uint8))
+    assert [_verificar(monitor, "cam", placa) for _ in range(2)][-1] == SEM_SINAL
+
+
+def test_amostras_em_rodizio_e_cameras_em_observacao(monitor):
+    chaves = [f"cam{indice}" for indice in range(5)]
+    rodadas = [monitor.amostrar("dvr", chaves, 2) for _ in range(3)]
+    assert rodadas == [{"cam0", "cam1"}, {"cam2", "cam3"}, {"cam4", "cam0"}]
+
+    monitor.triagem("cam3", 5000)
+    monitor.triagem("cam3", 5000)  # mesmo tamanho: suspeita em aberto
+    assert "cam3" in monitor.amostrar("dvr", chaves, 0)
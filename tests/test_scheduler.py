@@ -0,0 +1,109 @@
+"""AgendadorAdaptativo: recuo, flapping, entradas obsoletas e câmeras do mesmo DVR juntas"""
+import time
+
+import pytest
+
+from app.config import Config
+from app.services.scheduler import AgendadorAdaptativo
+
+
+def _cameras(porta, canais, prefixo="Cam"):
+    return [
+        {
+            "name": f"{prefixo} {canal}",
+            "canal": f"{canal}01",
+            "channel": f"{canal}01",
+            "_dvr_ip": "127.0.0.1",
+            "_dvr_porta": porta,
+            "_dvr_usuario": "admin",
+            "_dvr_senha": "admin",
+            "_dvr_protocol": "hikvision",
+        }
+        for canal in range(1, canais + 1)
+    ]
+
+
+@pytest.fixture
+def agendador(monkeypatch):
+    monkeypatch.setattr(Config, "INTERVALO_VERIFICACAO", 100)
+    monkeypatch.setattr(Config, "AGENDA_INTERVALO_MIN", 10)
+    monkeypatch.setattr(Config, "AGENDA_INTERVALO_MAX", 300)
+    monkeypatch.setattr(Config, "AGENDA_FATOR_BACKOFF", 2)
+    monkeypatch.setattr(Config, "AGENDA_JANELA_FLAPPING", 1000)
+    monkeypatch.setattr(Config, "AGENDA_LIMITE_FLAPPING", 3)
+    monkeypatch.setattr(Config, "AGENDA_JANELA_DVR", 30)
+    return AgendadorAdaptativo(probes_por_segundo=1000)
+
+
+def _unica(agendador):
+    agendador.sincronizar([("Condominio", {"metadata": {}, "cameras": _cameras(8000, 1)})])
+    (chave,) = agendador.cameras
+    return chave, agendador.cameras[chave]
+
+
+def test_camera_estavel_recua_ate_o_teto(agendador):
+    chave, item = _unica(agendador)
+    agendador.registrar_resultado(chave, "ON", agora=0)
+    assert item.intervalo == 100  # primeira verificação mantém o intervalo inicial
+
+    intervalos = []
+    for agora in range(1, 6):
+        agendador.registrar_resultado(chave, "ON", agora=agora)
+        intervalos.append(item.intervalo)
+    assert intervalos == [200, 300, 300, 300, 300]
+
+    agendador.registrar_resultado(chave, "OFF", agora=10)
+    assert item.intervalo == 10
+    assert item.proxima == 20
+
+
+def test_camera_oscilando_fica_no_intervalo_minimo(agendador):
+    chave, item = _unica(agendador)
+    for agora, status in enumerate(["ON", "OFF", "ON", "OFF"]):
+        agendador.registrar_resultado(chave, status, agora=agora)
+
+    # Três transições na janela: mesmo estável continua no mínimo
+    agendador.registrar_resultado(chave, "OFF", agora=5)
+    assert item.intervalo == 10
+
+    # Passada a janela a câmera volta a recuar
+    agendador.registrar_resultado(chave, "OFF", agora=2000)
+    assert item.intervalo == 20
+
+
+def test_reagendamento_invalida_a_entrada_anterior(agendador):
+    chave, item = _unica(agendador)
+    agora = item.proxima
+    assert [vencida.chave for vencida in agendador.proximas(agora)] == [chave]
+
+    agendador.registrar_resultado(chave, "ON", agora=agora)
+    agendador.reagendar(chave, 0)
+    assert len(agendador._heap) == 2  # a entrada de registrar_resultado ficou obsoleta
+
+    vencidas = agendador.proximas(agora + 1000)
+    assert [vencida.chave for vencida in vencidas] == [chave]
+    assert agendador._heap == []
+
+
+def test_cameras_do_mesmo_dvr_saem_juntas(agendador):
+    agendador.sincronizar(
+        [
+            ("Condominio A", {"metadata": {}, "cameras": _cameras(8000, 4)}),
+            ("Condominio B", {"metadata": {}, "cameras": _cameras(8001, 2, "Outro")}),
+        ]
+    )
+    iniciais = agendador.proximas(time.time())
+    assert len(iniciais) == 6
+
+    # Câmeras do DVR A defasadas em 5s; as do DVR B vencem bem depois
+    base = 1000.0
+    dvr_a = [item for item in iniciais if item.cam["_dvr_porta"] == 8000]
+    for deslocamento, item in enumerate(dvr_a):
+        agendador.registrar_resultado(item.chave, "ON", agora=base + deslocamento * 5)
+    for item in iniciais:
+        if item not in dvr_a:
+            agendador.registrar_resultado(item.chave, "ON", agora=base + 500)
+
+    vencidas = agendador.proximas(base + 100)
+    assert sorted(item.chave for item in vencidas) == sorted(item.chave for item in dvr_a)
+    assert agendador.proximas(base + 115) == []  # entradas antecipadas ficaram obsoletas
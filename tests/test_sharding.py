@@ -0,0 +1,66 @@
+"""Verificação fragmentada: hash consistente das fatias e posse exclusiva pelos arrendamentos"""
+import time
+
+import pytest
+
+from app.config import Config
+from app.core.shard_store import CoordenacaoFragmentos
+from app.services.sharding import fatia_da_chave
+
+CHAVES = [f"10.{indice // 250}.{indice % 250}.1:{80 + indice % 3}" for indice in range(5000)]
+
+
+def test_fatia_estavel_entre_processos():
+    # Valores fixos: outro processo (ou máquina) precisa chegar à mesma fatia
+    assert fatia_da_chave("10.0.0.1:80", 64) == 20
+    assert fatia_da_chave("192.168.1.10:8000", 64) == 19
+    assert fatia_da_chave("dvr.exemplo.com.br:37777", 64) == 15
+    assert all(0 <= fatia_da_chave(chave, 7) < 7 for chave in CHAVES)
+
+
+@pytest.mark.parametrize("fatias", [1, 8, 63])
+def test_nova_fatia_move_so_a_fracao_minima(fatias):
+    antes = {chave: fatia_da_chave(chave, fatias) for chave in CHAVES}
+    depois = {chave: fatia_da_chave(chave, fatias + 1) for chave in CHAVES}
+    movidas = [chave for chave in CHAVES if antes[chave] != depois[chave]]
+
+    # Só vão para a fatia nova, e cerca de 1/(fatias + 1) das chaves
+    assert all(depois[chave] == fatias for chave in movidas)
+    esperado = len(CHAVES) / (fatias + 1)
+    assert 0.7 * esperado <= len(movidas) <= 1.3 * esperado
+
+
+def test_dois_donos_nunca_verificam_a_mesma_fatia(monkeypatch, tmp_path):
+    monkeypatch.setattr(Config, "SHARD_MARGEM", 10)
+    monkeypatch.setattr(Config, "SHARD_CARENCIA", 45)
+    relogio = [1_000_000.0]
+    monkeypatch.setattr(time, "time", lambda: relogio[0])
+
+    caminho = str(tmp_path / "fragmentos.db")
+    donos = {
+        dono: CoordenacaoFragmentos(caminho, fatias=8, arrendamento=60) for dono in ("a", "b")
+    }
+    posse = {dono: (set(), 0.0) for dono in donos}
+    # a entra primeiro; b entra depois; a fica sem renovar (travado) por um tempo
+    ativo = {
+        "a": lambda t: not 150 <= t < 260,
+        "b": lambda t: t >= 5,
+    }
+
+    verificadas_por_b = set()
+    for passo in range(0, 400, 5):
+        relogio[0] = 1_000_000.0 + passo
+        for dono, coordenacao in donos.items():
+            if ativo[dono](passo) and passo % 20 == (0 if dono == "a" else 5):
+                posse[dono] = coordenacao.renovar(dono)
+
+        # O dono verifica a fatia até SHARD_MARGEM antes do vencimento que gravou
+        verificando = {
+            dono: fatias if relogio[0] < expira_em - Config.SHARD_MARGEM else set()
+            for dono, (fatias, expira_em) in posse.items()
+        }
+        assert not verificando["a"] & verificando["b"], passo
+        verificadas_por_b |= verificando["b"]
+
+    # A cota foi redistribuída e, com a travado, b assumiu todas as fatias
+    assert verificadas_por_b == set(range(8))
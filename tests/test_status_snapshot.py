@@ -0,0 +1,59 @@
+"""PublicadorStatus: delta na borda do log, versões desconhecidas e remoções"""
+from app.services.status_snapshot import PublicadorStatus
+
+
+def _cameras(*pares):
+    return [{"nome": nome, "status": status} for nome, status in pares]
+
+
+def test_delta_na_borda_do_log():
+    publicador = PublicadorStatus(max_alteracoes=3)
+    inicial = publicador.versao
+    publicador.publicar_condominio("A", _cameras(("Cam 1", "ON"), ("Cam 2", "ON")))
+    for status in ("OFF", "ON", "OFF"):
+        publicador.atualizar_camera("A", "Cam 1", status)
+
+    # O log guarda as três últimas versões: a anterior à mais antiga ainda responde
+    mais_antiga = publicador.versao - 2
+    delta = publicador.delta(mais_antiga - 1)
+    assert delta["versao"] == publicador.versao
+    assert delta["cameras"] == [{"condominio": "A", "nome": "Cam 1", "status": "OFF"}]
+    assert publicador.delta(mais_antiga - 2) is None
+    assert publicador.delta(inicial) is None
+
+    assert publicador.delta(publicador.versao) == {
+        "versao": publicador.versao,
+        "condominios": {},
+        "cameras": [],
+    }
+
+
+def test_versao_de_outro_processo_pede_snapshot():
+    publicador = PublicadorStatus()
+    publicador.atualizar_camera("A", "Cam 1", "ON")
+
+    assert publicador.delta(publicador._versao_inicial - 1) is None  # processo anterior
+    assert publicador.delta(publicador.versao + 1) is None  # versão futura
+    assert publicador.delta(publicador._versao_inicial)["cameras"] == [
+        {"condominio": "A", "nome": "Cam 1", "status": "ON"}
+    ]
+
+
+def test_remocoes_aparecem_no_delta():
+    publicador = PublicadorStatus()
+    publicador.publicar_condominio("A", _cameras(("Cam 1", "ON"), ("Cam 2", "OFF")))
+    publicador.publicar_condominio("B", _cameras(("Cam 1", "ON")))
+    versao = publicador.versao
+
+    removidas = publicador.sincronizar(
+        [("A", {"metadata": {}, "cameras": [{"name": "Cam 1"}]})]
+    )
+    assert sorted(removidas) == [("A", "Cam 2"), ("B", "Cam 1")]
+
+    delta = publicador.delta(versao)
+    assert delta["condominios"] == {"B": None}
+    assert sorted(delta["cameras"], key=lambda cam: cam["condominio"]) == [
+        {"condominio": "A", "nome": "Cam 2", "status": None},
+        {"condominio": "B", "nome": "Cam 1", "status": None},
+    ]
+    assert "B" not in publicador.snapshot().dados
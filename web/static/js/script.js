@@ -24,44 +24,171 @@ function startRefreshTimer() {
 }
 
 // ── Fetch Status ──
-async function atualizarStatus() {
-  try {
-    const response = await fetch('/status');
-    const data = await response.json();
-    dadosGlobais = data;
+// Versão do último status recebido (header X-Status-Versao) - habilita o modo delta
+let versaoStatus = null;
+
+function aplicarDelta(delta) {
+  for (const [nome, metadata] of Object.entries(delta.condominios || {})) {
+    if (metadata === null) {
+      delete dadosGlobais[nome];
+    } else if (dadosGlobais[nome]) {
+      dadosGlobais[nome].metadata = metadata;
+    } else {
+      dadosGlobais[nome] = { cameras: [], metadata };
+    }
+  }
 
-    let totalOn = 0;
-    let totalOff = 0;
+  for (const alteracao of delta.cameras || []) {
+    const condominio = dadosGlobais[alteracao.condominio];
+    if (!condominio) continue;
+    const indice = condominio.cameras.findIndex(c => c.nome === alteracao.nome);
+    if (alteracao.status === null) {
+      if (indice >= 0) condominio.cameras.splice(indice, 1);
+    } else if (indice >= 0) {
+      condominio.cameras[indice].status = alteracao.status;
+    } else {
+      condominio.cameras.push({ nome: alteracao.nome, status: alteracao.status });
+    }
+  }
+}
 
-    for (const condominioData of Object.values(data)) {
-      const cameras = condominioData.cameras || condominioData;
-      totalOn += cameras.filter(c => c.status === 'ON').length;
-      totalOff += cameras.filter(c => c.status === 'OFF').length;
+async function buscarStatus() {
+  if (dadosGlobais && versaoStatus !== null) {
+    const response = await fetch(`/status?since=${versaoStatus}`);
+    if (response.ok) {
+      const delta = await response.json();
+      const mudou = (delta.cameras || []).length > 0 || Object.keys(delta.condominios || {}).length > 0;
+      aplicarDelta(delta);
+      versaoStatus = delta.versao;
+      return mudou;
     }
+    // 410: versão fora do histórico do servidor (ex.: reinício) - recarrega tudo
+  }
 
-    const total = totalOn + totalOff;
-    const percentOffline = total > 0 ? ((totalOff / total) * 100).toFixed(1) : '0.0';
+  const response = await fetch('/status');
+  dadosGlobais = await response.json();
+  versaoStatus = Number(response.headers.get('X-Status-Versao')) || null;
+  return true;
+}
 
-    // Update summary stat cards
-    document.getElementById('stat-total').textContent = total;
-    document.getElementById('stat-online').textContent = totalOn;
-    document.getElementById('stat-offline').textContent = totalOff;
-    document.getElementById('stat-percent').textContent = percentOffline + '%';
+function atualizarResumo() {
+  let totalOn = 0;
+  let totalOff = 0;
 
-    // Render cards
-    renderizarCondominios();
+  for (const condominioData of Object.values(dadosGlobais)) {
+    const cameras = condominioData.cameras || condominioData;
+    totalOn += cameras.filter(c => c.status === 'ON').length;
+    totalOff += cameras.filter(c => c.status === 'OFF').length;
+  }
+
+  const total = totalOn + totalOff;
+  const percentOffline = total > 0 ? ((totalOff / total) * 100).toFixed(1) : '0.0';
+
+  // Update summary stat cards
+  document.getElementById('stat-total').textContent = total;
+  document.getElementById('stat-online').textContent = totalOn;
+  document.getElementById('stat-offline').textContent = totalOff;
+  document.getElementById('stat-percent').textContent = percentOffline + '%';
+}
+
+async function atualizarStatus() {
+  try {
+    const mudou = await buscarStatus();
+
+    if (mudou) {
+      atualizarResumo();
+      // Render cards
+      renderizarCondominios();
+    }
 
     // Reset refresh timer
     startRefreshTimer();
+    conectarEventos();
   } catch (err) {
     console.error('Erro ao buscar status:', err);
-    const container = document.getElementById('container-condominios');
-    container.innerHTML = '<div style="text-align:center;color:#666;padding:40px;">Erro ao carregar dados.</div>';
-    container.classList.remove('loading');
+    if (!dadosGlobais) {
+      const container = document.getElementById('container-condominios');
+      container.innerHTML = '<div style="text-align:center;color:#666;padding:40px;">Erro ao carregar dados.</div>';
+      container.classList.remove('loading');
+    }
   }
 }
 
+// ── Live Events (SSE) ──
+// Com a conexão aberta cada mudança de status chega em tempo real; o polling
+// acima fica apenas como contingência quando ela cai
+let eventos = null;
+let renderizacaoPendente = null;
+
+function agendarRenderizacao() {
+  // Agrupa rajadas de eventos em uma única renderização
+  if (renderizacaoPendente) return;
+  renderizacaoPendente = setTimeout(() => {
+    renderizacaoPendente = null;
+    atualizarResumo();
+    renderizarCondominios();
+  }, 500);
+}
+
+function eventosConectados() {
+  return eventos !== null && eventos.readyState === EventSource.OPEN;
+}
+
+function conectarEventos() {
+  if (!window.EventSource || eventos !== null || versaoStatus === null) return;
+
+  eventos = new EventSource(`/eventos?since=${versaoStatus}`);
+
+  eventos.onmessage = (e) => {
+    const delta = JSON.parse(e.data);
+    if (!dadosGlobais || delta.versao <= versaoStatus) return;
+    aplicarDelta(delta);
+    versaoStatus = delta.versao;
+    startRefreshTimer();
+    agendarRenderizacao();
+  };
+
+  // Eventos perdidos no servidor - recarrega o snapshot e reconecta
+  eventos.addEventListener('reset', () => {
+    eventos.close();
+    eventos = null;
+    versaoStatus = null;
+    atualizarStatus();
+  });
+}
 
+// ── Fetch Probe Rate ──
+async function atualizarEstatisticas() {
+  try {
+    const response = await fetch('/estatisticas');
+    const data = await response.json();
+    const probes = data.probes || {};
+    const alertas = data.alertas || {};
+
+    document.getElementById('stat-probes').textContent = (probes.taxa_1min || 0).toFixed(1);
+    // Verificação fragmentada: taxas somadas de todos os processos
+    const fragmentos = data.fragmentos;
+    document.getElementById('stat-probes-detalhe').textContent =
+      `5 min: ${(probes.taxa_5min || 0).toFixed(1)}/s · alertas: ${(alertas.taxa_5min || 0).toFixed(2)}/s` +
+      (fragmentos ? ` · ${fragmentos.membros.length} processos` : '');
+
+    // Disjuntores por DVR: abertos (OFF sem consulta) e em teste
+    const disjuntores = data.disjuntores;
+    const cardDisjuntores = document.getElementById('stat-card-disjuntores');
+    cardDisjuntores.style.display = disjuntores ? '' : 'none';
+    if (disjuntores) {
+      document.getElementById('stat-disjuntores').textContent =
+        disjuntores.abertos + disjuntores.semiabertos;
+      document.getElementById('stat-disjuntores-detalhe').textContent =
+        `${disjuntores.semiabertos} em teste · ${disjuntores.cameras_poupadas} câmeras OFF sem consulta`;
+      cardDisjuntores.title = (disjuntores.inacessiveis || [])
+        .map(d => `${d.dvr} (${d.estado}): ${d.motivo || ''}`)
+        .join('\n');
+    }
+  } catch (err) {
+    console.error('Erro ao buscar estatísticas:', err);
+  }
+}
 
 // ── Severity classification ──
 function getSeverity(offPercent) {
@@ -218,4 +345,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
 // ── Start ──
 atualizarStatus();
-setInterval(atualizarStatus, 600000); // 10 minutes
+// Contingência sem SSE: só as alterações trafegam (?since=)
+setInterval(() => { if (!eventosConectados()) atualizarStatus(); }, 30000);
+atualizarEstatisticas();
+setInterval(atualizarEstatisticas, 10000); // 10 seconds